@@ -32,11 +32,10 @@ from typing import Final
 
 
 #=============================================================================
-from .connection             import Connection
-from .cursor                 import Cursor
 from .db_types               import *
 from .exceptions             import *
-from .extension_messages     import ExtensionMessages
+from .extension_messages     import ExtensionMessages, QueryTiming, SlowStatement
+from .statement_cache        import StatementCache
 
 
 #=============================================================================
@@ -53,6 +52,9 @@ threadsafety: Final[int] = 1
 #     2         Threads may share the module and connections.
 #     3         Threads may share the module, connections and cursors.
 #===============================================================================
+# Notice: threads that want to share connections should check them out
+# from a 'ConnectionPool', which serializes their use (see module
+# connection_pool).
 
 paramstyle: Final[str] = 'format'
 #===============================================================================
@@ -83,4 +85,31 @@ def warning(msg: str) -> None:
     warnings.warn( msg )
 
 
+#=============================================================================
+# Notice: next imports must take place once function 'warning()' is defined
+# since the imported modules import it from this package.
+from .cursor                 import Cursor
+from .connection             import Connection
+from .tpc_connection         import TPCConnection
+from .async_cursor           import AsyncCursor
+from .async_connection       import AsyncConnection
+from .connection_pool        import ConnectionPool
+from .streaming_cursor       import StreamingCursor
+from .wrappers               import ConnectionWrapper, CursorWrapper
+from .result_cache           import CachingConnection, CachingCursor, ResultCache
+from .instrumentation        import Instrumentation, InstrumentedConnection, InstrumentedCursor
+from .tpc_coordinator        import TPCCoordinator, TPCDecisionLog
+from .sqlite_driver          import SQLiteConnection, SQLiteCursor
+from .routing                import RoutingConnection, RoutingCursor
+from .sharding               import ShardedConnection, ShardedCursor
+from .statement_timeout      import StatementWatchDog, TimeoutConnection, TimeoutCursor
+from .buffered_writer        import BufferedWriter
+from .lazy_rows              import LazyRow
+from .converters             import ConverterRegistry, ConvertingConnection, ConvertingCursor
+from .memory_budget          import MemoryBudget
+from .slow_query_log         import SlowQueryLog
+from .parallel               import QueryResult, run_queries
+from .binding                import CompiledOperation, compile_operation
+
+
 #=====   end of package module   Libs.ObjectSqlLib   =====#
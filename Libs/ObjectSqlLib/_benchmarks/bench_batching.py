@@ -0,0 +1,91 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This script compares the loading of the 2020 road races results of the
+#  use case WomenCyclingDatabase, row after row and with batched
+#  '.executemany()'.
+#
+
+#=============================================================================
+import csv
+import glob
+import os
+from time import perf_counter
+
+from Libs.ObjectSqlLib import SQLiteConnection
+
+
+#=============================================================================
+RESULTS_DIR = os.path.join( os.path.dirname(__file__), '..', '..', '..',
+                            'UseCases', 'WomenCyclingDatabase', 'data', 'RoadRaces', 'Results', '2020' )
+
+INSERT = "INSERT INTO results_rr_we (ranking, bib, last_name, first_name, country, team, age) VALUES (%s, %s, %s, %s, %s, %s, %s)"
+
+
+#-------------------------------------------------------------------------
+def results_rows():
+    '''Yields the rows of all the results CSV files.
+    '''
+    for filepath in sorted( glob.glob(os.path.join(RESULTS_DIR, '*.csv')) ):
+        with open( filepath, newline='', encoding='utf-8' ) as csv_file:
+            for row in csv.DictReader( csv_file ):
+                yield ( row['Rank'], row['BIB'], row['Last Name'], row['First Name'],
+                        row['Country'], row['Team'], row['Age'] )
+
+
+#-------------------------------------------------------------------------
+def new_cursor():
+    cnx = SQLiteConnection()
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE results_rr_we (ranking, bib, last_name, first_name, country, team, age)" )
+    return cnx, cursor
+
+
+#=============================================================================
+if __name__ == '__main__':
+    """Script description.
+    """
+    #-------------------------------------------------------------------------
+    rows = list( results_rows() ) * 10
+    
+    cnx, cursor = new_cursor()
+    start = perf_counter()
+    for row in rows:
+        cursor.execute( INSERT, row )
+    row_by_row_s = perf_counter() - start
+    print( f"row by row: {len(rows)} rows, {len(rows)} round trips, {len(rows) / row_by_row_s:10.0f} rows/s" )
+    cursor.close()
+    cnx.close()
+    
+    for max_rows in (10, 100, 1000):
+        cnx, cursor = new_cursor()
+        report = cursor.executemany_batched( INSERT, iter(rows), max_rows=max_rows )
+        print( f"batched by {max_rows:4d}: {report.rows} rows, {len(report.batches):5d} round trips, "
+               f"{report.rows_per_s:10.0f} rows/s" )
+        cursor.close()
+        cnx.close()
+    
+    print( '\n-- done!' )
+
+
+#=====   end of   Libs.ObjectSqlLib._benchmarks.bench_batching   =====#
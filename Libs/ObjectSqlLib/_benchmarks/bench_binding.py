@@ -0,0 +1,93 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This script compares the binding of 1M sets of parameters to a same
+#  operation, scanned at every binding and compiled once (see module
+#  binding), for the rendering of SQL literals and for the translation
+#  of named parameters into positional ones.
+#
+
+#=============================================================================
+import datetime
+import re
+from time import perf_counter
+
+from Libs.ObjectSqlLib.binding import compile_operation, escape_literal
+
+
+#=============================================================================
+SETS_COUNT = 1_000_000
+
+FORMAT_INSERT = "INSERT INTO results (ranking, bib, name, team, speed, day) VALUES (%s, %s, %s, %s, %s, %s)"
+NAMED_INSERT  = "INSERT INTO results (ranking, bib, name, team, speed, day) VALUES (:rank, :bib, :name, :team, :speed, :day)"
+
+FORMAT_TOKENS = re.compile( r'%%|%s' )
+NAMED_TOKENS  = re.compile( r"'(?:[^']|'')*'|::|:([A-Za-z_]\w*)" )
+
+
+#-------------------------------------------------------------------------
+def scanned_render(operation: str, parameters: tuple) -> str:
+    '''Renders parameters by scanning the operation at every call.
+    '''
+    values = iter( parameters )
+    return FORMAT_TOKENS.sub( lambda m: escape_literal(next(values)) if m.group() == '%s' else '%', operation )
+
+#-------------------------------------------------------------------------
+def scanned_arguments(operation: str, parameters: dict) -> tuple:
+    '''Returns the positional arguments of named parameters by scanning the operation at every call.
+    '''
+    return tuple( parameters[m.group(1)] for m in NAMED_TOKENS.finditer(operation) if m.group(1) )
+
+
+#-------------------------------------------------------------------------
+def timed(label: str, bind, operation: str, sets: list) -> None:
+    start = perf_counter()
+    for parameters in sets:
+        bind( operation, parameters )
+    duration_s = perf_counter() - start
+    print( f"{label:32s}: {len(sets) / duration_s:12,.0f} sets/s ({duration_s:6.2f} s)" )
+
+
+#=============================================================================
+if __name__ == '__main__':
+    """Script description.
+    """
+    #-------------------------------------------------------------------------
+    day = datetime.date( 2020, 9, 27 )
+    positional_sets = [ (i % 150 + 1, 1000 + i % 150, f"rider {i % 150}", "Team O'Neill", 41.5 + i % 7, day)
+                        for i in range(SETS_COUNT) ]
+    named_sets = [ dict(zip(('rank', 'bib', 'name', 'team', 'speed', 'day'), p)) for p in positional_sets ]
+    
+    print( f"binding of {SETS_COUNT:,} sets of 6 parameters" )
+    timed( 'render, scanned per call', scanned_render, FORMAT_INSERT, positional_sets )
+    timed( 'render, compiled', lambda operation, parameters: compile_operation(operation).render(parameters),
+           FORMAT_INSERT, positional_sets )
+    timed( 'named -> qmark, scanned per call', scanned_arguments, NAMED_INSERT, named_sets )
+    timed( 'named -> qmark, compiled', lambda operation, parameters: compile_operation(operation, 'named').arguments(parameters),
+           NAMED_INSERT, named_sets )
+    
+    assert compile_operation( FORMAT_INSERT ).render( positional_sets[-1] ) == scanned_render( FORMAT_INSERT, positional_sets[-1] )
+    print( '\n-- done!' )
+
+
+#=====   end of   Libs.ObjectSqlLib._benchmarks.bench_binding   =====#
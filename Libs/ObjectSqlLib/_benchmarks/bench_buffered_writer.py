@@ -0,0 +1,104 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This script compares telemetry-like single-row inserts, each one exe-
+#  cuted and committed on its own, with the same inserts buffered by a
+#  BufferedWriter and flushed by batches.
+#
+#  Round trips to a database server are simulated by a latency paid on
+#  every execution and every commit of the SQLite driver.
+#
+
+#=============================================================================
+import os
+import tempfile
+import time
+from time   import perf_counter
+from typing import Optional
+
+from Libs.ObjectSqlLib import BufferedWriter, SQLiteConnection, SQLiteCursor
+
+
+#=============================================================================
+ROWS_COUNT = 5_000
+LATENCY_S = 0.000_2         ## per round trip
+
+
+#=============================================================================
+class LatencyConnection( SQLiteConnection ):
+    '''Pays a simulated round trip on every commit and creates latency cursors.
+    '''
+    def commit(self) -> None:
+        time.sleep( LATENCY_S )
+        super().commit()
+    def cursor(self) -> 'LatencyCursor':
+        return LatencyCursor( self )
+
+class LatencyCursor( SQLiteCursor ):
+    '''Pays a simulated round trip on every execution.
+    '''
+    def execute(self, operation: str, *parameters) -> None:
+        time.sleep( LATENCY_S )
+        super().execute( operation, *parameters )
+
+
+#-------------------------------------------------------------------------
+def single_rows_case(cnx: LatencyConnection) -> Optional[dict]:
+    cursor = cnx.cursor()
+    for i in range( ROWS_COUNT ):
+        cursor.execute( "INSERT INTO samples (time, value) VALUES (%s, %s)", (float(i), i * 0.5) )
+        cnx.commit()
+    cursor.close()
+    return None
+
+def buffered_case(cnx: LatencyConnection) -> Optional[dict]:
+    with BufferedWriter( cnx, max_rows=500, flush_period_s=0.05 ) as writer:
+        for i in range( ROWS_COUNT ):
+            writer.insert( 'samples', (float(i), i * 0.5), ('time', 'value') )
+    return writer.metrics()
+
+
+#=============================================================================
+if __name__ == '__main__':
+    """Script description.
+    """
+    #-------------------------------------------------------------------------
+    print( f"{ROWS_COUNT} single-row inserts, {LATENCY_S * 1e3:.1f} ms per round trip\n" )
+    print( "case               duration ms        rows/s   flushes   p99 flush ms" )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, case in ( ('single rows'    , single_rows_case),
+                            ('buffered writer', buffered_case   ) ):
+            cnx = LatencyConnection( os.path.join(tmp_dir, f"{name.replace(' ', '_')}.db") )
+            cnx.cursor().execute( "CREATE TABLE samples (time REAL, value REAL)" )
+            start = perf_counter()
+            metrics = case( cnx )
+            duration_s = perf_counter() - start
+            flushes = '-' if metrics is None else str( sum(metrics['flushes'].values()) )
+            p99 = '-' if metrics is None else f"{metrics['flush_latency']['p99_us'] / 1e3:.2f}"
+            print( f"{name:16s} {duration_s * 1e3:12.1f} {ROWS_COUNT / duration_s:13,.0f} {flushes:>9s} {p99:>14s}" )
+            cnx.close()
+    
+    print( '\n-- done!' )
+
+
+#=====   end of   Libs.ObjectSqlLib._benchmarks.bench_buffered_writer   =====#
@@ -0,0 +1,95 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This script compares the loading of the 2020 road races results CSV
+#  files of the use case WomenCyclingDatabase, row after row with
+#  '.execute()' and with '.copy_from()'.
+#
+
+#=============================================================================
+import csv
+import glob
+import os
+from time import perf_counter
+
+from Libs.ObjectSqlLib import SQLiteConnection
+
+
+#=============================================================================
+RESULTS_DIR = os.path.join( os.path.dirname(__file__), '..', '..', '..',
+                            'UseCases', 'WomenCyclingDatabase', 'data', 'RoadRaces', 'Results', '2020' )
+
+# Notice: the first column of the CSV headers is unnamed, so the columns
+# are explicitly named and the headers are just skipped.
+COLUMNS = ( 'idx', 'ranking', 'bib', 'last_name', 'first_name', 'country', 'team',
+            'gender', 'age', 'phase', 'heat', 'result', 'irm' )
+
+
+#-------------------------------------------------------------------------
+def new_cursor():
+    cnx = SQLiteConnection()
+    cursor = cnx.cursor()
+    cursor.execute( f"CREATE TABLE results_csv ({', '.join(COLUMNS)})" )
+    return cnx, cursor
+
+
+#=============================================================================
+if __name__ == '__main__':
+    """Script description.
+    """
+    #-------------------------------------------------------------------------
+    ROUNDS_COUNT = 10
+    filepaths = sorted( glob.glob(os.path.join(RESULTS_DIR, '*.csv')) ) * ROUNDS_COUNT
+    insert = f"INSERT INTO results_csv VALUES ({', '.join(['%s'] * len(COLUMNS))})"
+    
+    cnx, cursor = new_cursor()
+    rows_count = 0
+    start = perf_counter()
+    for filepath in filepaths:
+        with open( filepath, newline='', encoding='utf-8' ) as csv_file:
+            reader = csv.reader( csv_file )
+            next( reader )
+            for row in reader:
+                cursor.execute( insert, [value or None for value in row] )
+                rows_count += 1
+    duration_s = perf_counter() - start
+    print( f"row by row: {rows_count} rows, {rows_count / duration_s:10.0f} rows/s" )
+    cursor.close()
+    cnx.close()
+    
+    for buffer_size in (4096, 1 << 16):
+        cnx, cursor = new_cursor()
+        rows_count = duration_s = 0
+        for filepath in filepaths:
+            with open( filepath, newline='', encoding='utf-8' ) as csv_file:
+                report = cursor.copy_from( 'results_csv', csv_file, COLUMNS, header=True, buffer_size=buffer_size )
+            rows_count += report.rows
+            duration_s += report.duration_s
+        print( f"copy_from, {buffer_size:5d} chars buffers: {rows_count} rows, {rows_count / duration_s:10.0f} rows/s" )
+        cursor.close()
+        cnx.close()
+    
+    print( '\n-- done!' )
+
+
+#=====   end of   Libs.ObjectSqlLib._benchmarks.bench_bulk_copy   =====#
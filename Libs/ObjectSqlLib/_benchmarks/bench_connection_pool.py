@@ -0,0 +1,123 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This script measures the checkout latency and the throughput of pools
+#  of connections when shared by 1 up to 64 threads.  Connections are
+#  SQLite reference driver ones over a temporary local database file.
+#
+
+#=============================================================================
+import os
+import tempfile
+from statistics import mean, quantiles
+from threading  import Barrier, Thread
+from time       import perf_counter
+
+from Libs.ObjectSqlLib import ConnectionPool, SQLiteConnection
+
+
+#=============================================================================
+def run_pooled(db_path: str, threads_count: int, checkouts_count: int, pool_size: int) -> tuple:
+    '''Runs the pooled benchmark for one count of threads.
+    
+    Returns:
+        The mean and 99th percentile checkout latencies, in seconds, and
+        the throughput, in count of checkouts per second.
+    '''
+    pool = ConnectionPool( lambda: SQLiteConnection(db_path), pool_size, pool_size, None )
+    latencies = [ [] for _ in range(threads_count) ]
+    barrier = Barrier( threads_count + 1 )
+    
+    def _work(latencies_list: list) -> None:
+        barrier.wait()
+        for _ in range( checkouts_count ):
+            start = perf_counter()
+            cnx = pool.acquire()
+            latencies_list.append( perf_counter() - start )
+            cursor = cnx.cursor()
+            cursor.execute( "SELECT COUNT(*) FROM t" )
+            cursor.fetchone()
+            cursor.close()
+            pool.release( cnx )
+    
+    threads = [ Thread(target=_work, args=(lat,)) for lat in latencies ]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = perf_counter() - start
+    pool.close()
+    
+    all_latencies = [ l for lat in latencies for l in lat ]
+    return mean( all_latencies ), quantiles( all_latencies, n=100 )[98], len( all_latencies ) / elapsed
+
+
+#-------------------------------------------------------------------------
+def run_unpooled(db_path: str, checkouts_count: int) -> float:
+    '''Runs the reference benchmark with a new connection per query in a single thread.
+    
+    Returns:
+        The mean connection opening latency, in seconds.
+    '''
+    start = perf_counter()
+    for _ in range( checkouts_count ):
+        cnx = SQLiteConnection( db_path )
+        cursor = cnx.cursor()
+        cursor.execute( "SELECT COUNT(*) FROM t" )
+        cursor.fetchone()
+        cursor.close()
+        cnx.close()
+    return (perf_counter() - start) / checkouts_count
+
+
+#=============================================================================
+if __name__ == '__main__':
+    """Script description.
+    """
+    #-------------------------------------------------------------------------
+    CHECKOUTS_COUNT = 500
+    POOL_SIZE = 8
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join( tmp_dir, 'bench.db' )
+        cnx = SQLiteConnection( db_path )
+        cursor = cnx.cursor()
+        cursor.execute( "CREATE TABLE t (x INTEGER)" )
+        cursor.executemany( "INSERT INTO t VALUES (%s)", [(i,) for i in range(100)] )
+        cnx.commit()
+        cursor.close()
+        cnx.close()
+        
+        print( f"no pool, 1 thread: {run_unpooled(db_path, CHECKOUTS_COUNT) * 1e6:9.1f} us per query" )
+        print( f"pool of {POOL_SIZE} connections, {CHECKOUTS_COUNT} checkouts per thread" )
+        print( "threads  mean latency (us)  p99 latency (us)  checkouts/s" )
+        for threads_count in (1, 2, 4, 8, 16, 32, 64):
+            mean_s, p99_s, throughput = run_pooled( db_path, threads_count, CHECKOUTS_COUNT, POOL_SIZE )
+            print( f"{threads_count:7d}  {mean_s * 1e6:17.1f}  {p99_s * 1e6:16.1f}  {throughput:11.0f}" )
+    
+    print( '\n-- done!' )
+
+
+#=====   end of   Libs.ObjectSqlLib._benchmarks.bench_connection_pool   =====#
@@ -0,0 +1,117 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This script compares the iterations over a result set row after row
+#  with '.fetchone()' and with prefetched batches,  either fetched  on
+#  demand or by a background thread.
+#
+#  Round trips to a database server are simulated by a latency paid on
+#  every fetch of the SQLite driver.  The consumer processes every row
+#  with a small amount of I/O-like work (i.e. releasing the GIL).
+#
+
+#=============================================================================
+import time
+from statistics import median
+from time       import perf_counter
+from typing     import Callable, List, Optional, Tuple
+
+from Libs.ObjectSqlLib import SQLiteConnection, SQLiteCursor
+
+
+#=============================================================================
+ROWS_COUNT = 5_000
+ROUNDS_COUNT = 5
+LATENCY_S = 0.000_2         ## per round trip
+PROCESSING_S = 0.000_02     ## per row
+
+
+#=============================================================================
+class LatencyCursor( SQLiteCursor ):
+    '''Pays a simulated round trip on every fetch.
+    '''
+    def fetchone(self) -> Optional[Tuple]:
+        time.sleep( LATENCY_S )
+        return super().fetchone()
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        time.sleep( LATENCY_S )
+        return super().fetchmany( size )
+
+
+#-------------------------------------------------------------------------
+def bench(iterate: Callable[[LatencyCursor], int], cursor: LatencyCursor) -> Tuple[float, float]:
+    '''Returns the minimum and median durations of the rounds of a case, in seconds.
+    '''
+    durations = []
+    for _ in range( ROUNDS_COUNT ):
+        cursor.execute( "SELECT id, name, score FROM t" )
+        start = perf_counter()
+        assert iterate( cursor ) == ROWS_COUNT
+        durations.append( perf_counter() - start )
+    return min( durations ), median( durations )
+
+
+#-------------------------------------------------------------------------
+def process(rows) -> int:
+    count = 0
+    for count, _ in enumerate( rows, 1 ):
+        if count % 50 == 0:
+            time.sleep( 50 * PROCESSING_S )
+    return count
+
+def fetchone_case(cursor: LatencyCursor) -> int:
+    return process( iter(cursor.fetchone, None) )
+
+def on_demand_case(cursor: LatencyCursor) -> int:
+    return process( cursor.prefetched(background=False) )
+
+def background_case(cursor: LatencyCursor) -> int:
+    return process( cursor.prefetched(background=True) )
+
+
+#=============================================================================
+if __name__ == '__main__':
+    """Script description.
+    """
+    #-------------------------------------------------------------------------
+    cnx = SQLiteConnection()
+    cursor = LatencyCursor( cnx )
+    cursor.execute( "CREATE TABLE t (id INTEGER, name TEXT, score REAL)" )
+    cursor.executemany( "INSERT INTO t VALUES (%s, %s, %s)",
+                        [ (i, f'rider {i}', i * 0.5) for i in range(ROWS_COUNT) ] )
+    
+    print( f"{ROWS_COUNT} rows, {LATENCY_S * 1e3:.1f} ms per round trip, {ROUNDS_COUNT} rounds per case - durations in ms\n" )
+    print( "case                  min    median        rows/s" )
+    for name, case in ( ('fetchone'            , fetchone_case  ),
+                        ('prefetched on demand', on_demand_case ),
+                        ('prefetched backgrnd' , background_case) ):
+        duration_min, duration_median = bench( case, cursor )
+        print( f"{name:20s} {duration_min * 1e3:6.1f} {duration_median * 1e3:9.1f} {ROWS_COUNT / duration_median:13,.0f}" )
+    
+    cursor.close()
+    cnx.close()
+    
+    print( '\n-- done!' )
+
+
+#=====   end of   Libs.ObjectSqlLib._benchmarks.bench_prefetch   =====#
@@ -0,0 +1,139 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This script measures the overhead of the reference SQLite driver  of
+#  this library against raw sqlite3, for fetchone(), fetchmany(), fetch-
+#  all() and executemany().
+#
+#  As with pytest-benchmark, every case runs many rounds and the  min-
+#  imum and median durations of the rounds are reported.  The gap  be-
+#  tween both medians is the cost of the abstraction layer.
+#
+
+#=============================================================================
+import sqlite3
+from statistics import median
+from time       import perf_counter
+from typing     import Callable, Tuple
+
+from Libs.ObjectSqlLib import SQLiteConnection
+
+
+#=============================================================================
+ROWS_COUNT = 100_000
+ROUNDS_COUNT = 7
+
+ROWS = [ (i, f'rider {i}', i * 0.5) for i in range(ROWS_COUNT) ]
+
+
+#-------------------------------------------------------------------------
+def bench(case: Callable[[object], None], cursor: object) -> Tuple[float, float]:
+    '''Returns the minimum and median durations of the rounds of a case, in seconds.
+    '''
+    durations = []
+    for _ in range( ROUNDS_COUNT ):
+        start = perf_counter()
+        case( cursor )
+        durations.append( perf_counter() - start )
+    return min( durations ), median( durations )
+
+
+#-------------------------------------------------------------------------
+def fetchone_case(select: str) -> Callable:
+    def _case(cursor):
+        cursor.execute( select )
+        while cursor.fetchone() is not None:
+            pass
+    return _case
+
+def fetchmany_case(select: str) -> Callable:
+    def _case(cursor):
+        cursor.execute( select )
+        while cursor.fetchmany( 500 ):
+            pass
+    return _case
+
+def fetchall_case(select: str) -> Callable:
+    def _case(cursor):
+        cursor.execute( select )
+        cursor.fetchall()
+    return _case
+
+def executemany_case(insert: str) -> Callable:
+    def _case(cursor):
+        cursor.execute( "DELETE FROM w" )
+        cursor.executemany( insert, ROWS )
+    return _case
+
+
+#-------------------------------------------------------------------------
+def new_raw_cursor() -> sqlite3.Cursor:
+    cursor = sqlite3.connect( ':memory:' ).cursor()
+    cursor.execute( "CREATE TABLE t (id INTEGER, name TEXT, score REAL)" )
+    cursor.execute( "CREATE TABLE w (id INTEGER, name TEXT, score REAL)" )
+    cursor.executemany( "INSERT INTO t VALUES (?, ?, ?)", ROWS )
+    return cursor
+
+def new_driver_cursor():
+    cursor = SQLiteConnection().cursor()
+    cursor.execute( "CREATE TABLE t (id INTEGER, name TEXT, score REAL)" )
+    cursor.execute( "CREATE TABLE w (id INTEGER, name TEXT, score REAL)" )
+    cursor.executemany( "INSERT INTO t VALUES (%s, %s, %s)", ROWS )
+    return cursor
+
+
+#=============================================================================
+if __name__ == '__main__':
+    """Script description.
+    """
+    #-------------------------------------------------------------------------
+    SELECT = "SELECT id, name, score FROM t"
+    CASES = (
+        ( 'fetchone'   , fetchone_case(SELECT)   , fetchone_case(SELECT)    ),
+        ( 'fetchmany'  , fetchmany_case(SELECT)  , fetchmany_case(SELECT)   ),
+        ( 'fetchall'   , fetchall_case(SELECT)   , fetchall_case(SELECT)    ),
+        ( 'executemany', executemany_case("INSERT INTO w VALUES (?, ?, ?)"),
+                         executemany_case("INSERT INTO w VALUES (%s, %s, %s)") ),
+    )
+    
+    raw_cursor = new_raw_cursor()
+    driver_cursor = new_driver_cursor()
+    
+    print( f"{ROWS_COUNT} rows, {ROUNDS_COUNT} rounds per case - durations in ms\n" )
+    print( "case          raw min  raw median  driver min  driver median  overhead  driver rows/s" )
+    for name, raw_case, driver_case in CASES:
+        raw_min, raw_median = bench( raw_case, raw_cursor )
+        driver_min, driver_median = bench( driver_case, driver_cursor )
+        print( f"{name:12s} {raw_min * 1e3:8.1f} {raw_median * 1e3:11.1f} {driver_min * 1e3:11.1f} "
+               f"{driver_median * 1e3:14.1f} {(driver_median / raw_median - 1.0) * 100.0:8.1f} % "
+               f"{ROWS_COUNT / driver_median:14,.0f}" )
+    
+    driver_connection = driver_cursor.connection
+    driver_cursor.close()
+    driver_connection.close()
+    raw_cursor.connection.close()
+    
+    print( '\n-- done!' )
+
+
+#=====   end of   Libs.ObjectSqlLib._benchmarks.bench_sqlite_driver   =====#
@@ -0,0 +1,85 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This script compares the latency of 'Cursor.execute()' when statements
+#  are prepared once thanks to the statement cache of the connection and
+#  when they are prepared on every call.
+#
+
+#=============================================================================
+from time import perf_counter
+
+from Libs.ObjectSqlLib import SQLiteConnection, SQLiteCursor
+
+
+#=============================================================================
+class UncachedSQLiteCursor( SQLiteCursor ):
+    '''Prepares operations on every call to '.execute*()'.
+    '''
+    def _prepared(self, operation: str) -> object:
+        return self._connection._prepare_statement( operation )
+
+
+#-------------------------------------------------------------------------
+def run(cursor: SQLiteCursor, operation: str, executions_count: int) -> float:
+    '''Returns the mean latency of execute, in seconds.
+    '''
+    start = perf_counter()
+    for i in range( executions_count ):
+        cursor.execute( operation, (i, i, i) )
+    return (perf_counter() - start) / executions_count
+
+
+#=============================================================================
+if __name__ == '__main__':
+    """Script description.
+    """
+    #-------------------------------------------------------------------------
+    EXECUTIONS_COUNT = 200_000
+    OPERATION = ( "SELECT %s + 1, '%%' || %s, CASE WHEN %s > 10 THEN 'large' ELSE 'small' END "
+                  "FROM (SELECT 1 AS one) WHERE one = 1" )
+    
+    ## notice: sqlite3 re-prepares statements still in use by another cursor of the same
+    ## connection, so that each cursor gets its own connection here
+    cnx = SQLiteConnection()
+    cached = cnx.cursor()
+    uncached_cnx = SQLiteConnection()
+    uncached = UncachedSQLiteCursor( uncached_cnx )
+    
+    for _ in range( 3 ):
+        uncached_s = run( uncached, OPERATION, EXECUTIONS_COUNT )
+        cached_s = run( cached, OPERATION, EXECUTIONS_COUNT )
+        print( f"uncached: {uncached_s * 1e6:6.2f} us   cached: {cached_s * 1e6:6.2f} us   "
+               f"gain: {(1.0 - cached_s / uncached_s) * 100.0:5.1f} %" )
+    
+    cache = cnx.statement_cache
+    print( f"statement cache - hits: {cache.hits}, misses: {cache.misses}, evictions: {cache.evictions}" )
+    cached.close()
+    uncached.close()
+    cnx.close()
+    uncached_cnx.close()
+    
+    print( '\n-- done!' )
+
+
+#=====   end of   Libs.ObjectSqlLib._benchmarks.bench_statement_cache   =====#
@@ -0,0 +1,134 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import asyncio
+import gc
+import warnings
+from typing import List, Optional, Tuple
+
+from Libs.ObjectSqlLib import AsyncConnection, AsyncCursor, NUMBER
+
+
+#=============================================================================
+class RangeConnection( AsyncConnection ):
+    '''The testing connection - queries are the count of integer rows to return.
+    '''
+    def __init__(self, latency_s: float = 0.0) -> None:
+        self.latency_s = latency_s
+        self.fetches_count = 0
+    async def close(self) -> None:
+        pass
+    async def commit(self) -> None:
+        pass
+    async def rollback(self) -> None:
+        pass
+    def cursor(self) -> AsyncCursor:
+        return RangeCursor( self )
+
+
+class RangeCursor( AsyncCursor ):
+    '''The testing cursor - simulates network latency with asyncio.sleep().
+    '''
+    async def close(self) -> None:
+        pass
+    async def execute(self, operation: str, *parameters) -> None:
+        await asyncio.sleep( self._connection.latency_s )
+        self._rows = [ (i,) for i in range(int(operation)) ]
+        self._row_count = len( self._rows )
+        self._row_number = 0
+        self._description = ( ('i', NUMBER, None, None, None, None, False), )
+        self._reset_rows_batch()
+    async def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        self._connection.fetches_count += 1
+        size = self._array_size if size is None else size
+        rows = self._rows[ self._row_number:self._row_number + size ]
+        self._row_number += len( rows )
+        return rows
+    async def fetchone(self) -> Optional[Tuple]:
+        rows = await self.fetchmany( 1 )
+        return rows[0] if rows else None
+    async def fetchall(self) -> List[Tuple]:
+        return await self.fetchmany( len(self._rows) )
+
+
+#=============================================================================
+def test_async_iteration_by_batches():
+    async def _run() -> list:
+        async with RangeConnection() as cnx:
+            async with cnx.cursor() as cursor:
+                cursor.arraysize = 4
+                await cursor.execute( '10' )
+                return [ row async for row in cursor ], cnx.fetches_count
+    
+    rows, fetches_count = asyncio.run( _run() )
+    assert rows == [ (i,) for i in range(10) ]
+    assert fetches_count == 4  ## 4 + 4 + 2 rows, then the empty batch
+
+
+#-------------------------------------------------------------------------
+def test_abstract_coroutines():
+    class BareConnection( AsyncConnection ):
+        def __init__(self) -> None:
+            pass
+    
+    async def _run() -> list:
+        cnx = BareConnection()
+        cursor = cnx.cursor()
+        awaitables = [ cnx.close(), cnx.commit(), cnx.rollback(),
+                       cursor.callproc( 'proc' ), cursor.close(), cursor.execute( 'SELECT 1' ),
+                       cursor.executemany( 'SELECT ?', [(1,)] ), cursor.fetchall(), cursor.fetchmany(),
+                       cursor.fetchone(), cursor.nextset(), cursor.scroll( 1 ) ]
+        errors = []
+        for awaitable in awaitables:
+            try:
+                await awaitable
+            except NotImplementedError as exc:
+                errors.append( str(exc) )
+        try:
+            async for _row in cursor:
+                pass
+        except NotImplementedError as exc:
+            errors.append( str(exc) )
+        return errors
+    
+    ## a coroutine left unawaited would be reported by a RuntimeWarning
+    with warnings.catch_warnings():
+        warnings.simplefilter( 'error', RuntimeWarning )
+        errors = asyncio.run( _run() )
+        gc.collect()
+    
+    assert len( errors ) == 13
+    assert errors[0] == "method 'close()' must be implemented in class 'BareConnection'."
+    assert errors[5] == "method 'execute()' must be implemented in class 'AsyncCursor'."
+    assert errors[-1] == "method 'fetchmany()' must be implemented in class 'AsyncCursor'."
+    
+    cursor = BareConnection().cursor()
+    for name in ('setinputsizes', 'setoutputsize'):
+        try:
+            getattr( cursor, name )( 1 )
+            assert False, name
+        except NotImplementedError:
+            pass
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_async_cursor   =====#
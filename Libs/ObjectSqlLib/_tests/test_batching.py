@@ -0,0 +1,83 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import pytest
+
+from Libs.ObjectSqlLib import SQLiteConnection, SQLiteCursor
+from Libs.ObjectSqlLib.batching import chunks, multi_row_placeholders_count, rewrite_multi_row_insert
+
+
+#=============================================================================
+class CountingCursor( SQLiteCursor ):
+    '''Counts the calls to execute().
+    '''
+    executions_count = 0
+    def execute(self, operation: str, *parameters) -> None:
+        self.executions_count += 1
+        super().execute( operation, *parameters )
+
+
+#=============================================================================
+def test_rewrite():
+    assert rewrite_multi_row_insert( "INSERT INTO t (a, b) VALUES (%s, %s)", 3 ) == \
+           "INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)"
+    assert rewrite_multi_row_insert( "insert into t values(%s) returning id;", 2 ) == \
+           "insert into t values(%s), (%s) returning id;"
+    assert multi_row_placeholders_count( "INSERT INTO t VALUES (%s, %s, 'x')" ) is None
+    assert multi_row_placeholders_count( "INSERT INTO t VALUES (%s) ON CONFLICT (a) DO UPDATE SET b = %s" ) is None
+    assert multi_row_placeholders_count( "UPDATE t SET a = %s" ) is None
+    with pytest.raises( ValueError ):
+        rewrite_multi_row_insert( "DELETE FROM t WHERE a = %s", 2 )
+
+
+#-------------------------------------------------------------------------
+def test_chunks():
+    rows = ( (i, 'x' * 10) for i in range(10) )
+    assert [ len(c) for c, _ in chunks(rows, 4) ] == [ 4, 4, 2 ]
+    rows = ( (i, 'x' * 10) for i in range(10) )
+    assert [ (len(c), b) for c, b in chunks(rows, 100, 40) ] == [ (2, 36) ] * 5
+
+
+#-------------------------------------------------------------------------
+def test_executemany_batched():
+    cnx = SQLiteConnection()
+    cursor = CountingCursor( cnx )
+    cursor.execute( "CREATE TABLE t (a INTEGER, b TEXT)" )
+    
+    report = cursor.executemany_batched( "INSERT INTO t (a, b) VALUES (%s, %s)",
+                                         ((i, str(i)) for i in range(2500)),
+                                         max_rows=1000 )
+    assert cursor.executions_count == 1 + 3
+    assert [ b.rows for b in report.batches ] == [ 1000, 1000, 500 ]
+    assert report.rows == 2500 and cursor.rowcount == 2500 and report.rows_per_s > 0.0
+    
+    report = cursor.executemany_batched( "UPDATE t SET b = %s WHERE a = %s", [('u', 1), ('v', 2)] )
+    assert cursor.executions_count == 1 + 3 + 2 and report.rows == 2 and cursor.rowcount == 2
+    
+    cursor.execute( "SELECT COUNT(*), SUM(a) FROM t" )
+    assert cursor.fetchone() == (2500, sum(range(2500)))
+    cursor.close()
+    cnx.close()
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_batching   =====#
@@ -0,0 +1,71 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import datetime
+from decimal import Decimal
+
+import pytest
+
+from Libs.ObjectSqlLib import compile_operation, ProgrammingError
+
+
+#=============================================================================
+def test_paramstyles():
+    operations = { 'format'  : "SELECT * FROM t WHERE a = %s AND b LIKE 'x%%' AND c = %s",
+                   'pyformat': "SELECT * FROM t WHERE a = %(a)s AND b LIKE 'x%%' AND c = %(c)s",
+                   'named'   : "SELECT * FROM t WHERE a = :a AND b LIKE 'x%' AND c = :c",
+                   'numeric' : "SELECT * FROM t WHERE a = :1 AND b LIKE 'x%' AND c = :2",
+                   'qmark'   : "SELECT * FROM t WHERE a = ? AND b LIKE 'x%' AND c = ?" }
+    for paramstyle, operation in operations.items():
+        compiled = compile_operation( operation, paramstyle )
+        assert compiled is compile_operation( operation, paramstyle )
+        assert compiled.segments == ( "SELECT * FROM t WHERE a = ", " AND b LIKE 'x%' AND c = ", "" )
+        assert compiled.translated( 'dollar' ) == "SELECT * FROM t WHERE a = $1 AND b LIKE 'x%' AND c = $2"
+        assert compiled.translated( 'format' ) == operations[ 'format' ]
+        parameters = { 'a': 1, 'c': "it's" } if paramstyle in ('named', 'pyformat') else ( 1, "it's" )
+        assert compiled.arguments( parameters ) == ( 1, "it's" )
+        assert compiled.render( parameters ) == "SELECT * FROM t WHERE a = 1 AND b LIKE 'x%' AND c = 'it''s'"
+    
+    compiled = compile_operation( "SELECT ':a', x::text /* :b */ FROM t WHERE y = :c -- :d\n AND z = :c", 'named' )
+    assert compiled.keys == ( 'c', 'c' ) and compiled.arguments( {'c': 3} ) == ( 3, 3 )
+    compiled = compile_operation( "UPDATE t SET a = :2 WHERE b = :1", 'numeric' )
+    assert compiled.translated( 'qmark' ) == "UPDATE t SET a = ? WHERE b = ?" and compiled.arguments( 'xy' ) == ( 'y', 'x' )
+    with pytest.raises( ProgrammingError ):
+        compile_operation( "SELECT %s, %s" ).render( (1,) )
+    with pytest.raises( ProgrammingError ):
+        compile_operation( "SELECT %s", 'unknown' )
+
+
+#-------------------------------------------------------------------------
+def test_escapers():
+    class Speed( float ):
+        pass
+    values = ( None, True, 42, -1.5, float('nan'), Decimal('3.10'), b'\x00\xff', bytearray(b'\x01'),
+               datetime.date(2020, 9, 27), datetime.datetime(2020, 9, 27, 14, 30), Speed(41.5) )
+    assert compile_operation( ', '.join(['%s'] * len(values)) ).render( values ) == (
+           "NULL, TRUE, 42, -1.5, 'NaN', 3.10, X'00ff', X'01', '2020-09-27', '2020-09-27 14:30:00', 41.5" )
+    with pytest.raises( ProgrammingError, match="type 'object'" ):
+        compile_operation( "SELECT %s" ).render( (object(),) )
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_binding   =====#
@@ -0,0 +1,161 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import threading
+import time
+
+import pytest
+
+from Libs.ObjectSqlLib import BufferedWriter, IntegrityError, OperationalError, SQLiteConnection
+
+
+#=============================================================================
+class SlowConnection( SQLiteConnection ):
+    """SQLite connections which commits wait for an event."""
+    def __init__(self, path: str) -> None:
+        super().__init__( path )
+        self.released = threading.Event()
+        self.commits_count = 0
+    
+    def commit(self) -> None:
+        self.released.wait()
+        self.commits_count += 1
+        super().commit()
+
+
+#-------------------------------------------------------------------------
+def _counts(path) -> dict:
+    cnx = SQLiteConnection( str(path) )
+    cursor = cnx.cursor()
+    counts = {}
+    for table in ('samples', 'events'):
+        cursor.execute( f"SELECT COUNT(*) FROM {table}" )
+        counts[ table ] = cursor.fetchone()[0]
+    cnx.close()
+    return counts
+
+
+#-------------------------------------------------------------------------
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / 'telemetry.db'
+    cnx = SQLiteConnection( str(path) )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE samples (time REAL, value REAL)" )
+    cursor.execute( "CREATE TABLE events (id INTEGER PRIMARY KEY, name TEXT)" )
+    cnx.commit()
+    cnx.close()
+    return path
+
+
+#=============================================================================
+def test_flush_triggers(db_path):
+    cnx = SQLiteConnection( str(db_path) )
+    writer = BufferedWriter( cnx, max_rows=100, max_bytes=None, flush_period_s=None )
+    for i in range(250):
+        writer.insert( 'samples', (float(i), i / 2), ('time', 'value') )
+    writer.insert( 'events', (1, 'start') )
+    assert _counts( db_path ) == { 'samples': 200, 'events': 0 }
+    assert writer.buffered_rows == 51
+    
+    writer.flush()
+    assert _counts( db_path ) == { 'samples': 250, 'events': 1 }
+    metrics = writer.metrics()
+    assert metrics['flushes'] == { 'size': 2, 'tick': 0, 'call': 1 }
+    assert metrics['flushed_rows'] == 251 and metrics['max_flush_rows'] == 100
+    assert metrics['flush_latency']['count'] == 3 and metrics['buffered_rows'] == 0
+    
+    writer.max_bytes = 200
+    for i in range(30):
+        writer.insert( 'events', (10 + i, 'x' * 20) )
+    assert writer.flushes_counts['size'] > 2 and writer.buffered_rows < 30
+    writer.close()
+    assert _counts( db_path )['events'] == 31
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_periodic_flush(db_path):
+    cnx = SQLiteConnection( str(db_path) )
+    with BufferedWriter( cnx, flush_period_s=0.02 ) as writer:
+        writer.insert( 'samples', (1.0, 2.0) )
+        start = time.perf_counter()
+        while writer.buffered_rows and time.perf_counter() - start < 2.0:
+            time.sleep( 0.01 )
+        assert _counts( db_path )['samples'] == 1
+        assert writer.flushes_counts['tick'] == 1
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_backpressure(db_path):
+    cnx = SlowConnection( str(db_path) )
+    writer = BufferedWriter( cnx, max_rows=10, flush_period_s=None, max_buffered_rows=20, block_timeout_s=0.05 )
+    flusher = threading.Thread( target=lambda: [writer.insert('samples', (float(i), 0.0)) for i in range(10)] )
+    flusher.start()
+    time.sleep( 0.05 )          ## the flusher is now blocked in the commit of its 10 rows
+    for i in range(9):
+        writer.insert( 'samples', (float(i), 1.0) )
+    writer.insert( 'events', (1, 'full') )
+    with pytest.raises( OperationalError ):
+        writer.insert( 'events', (2, 'blocked') )
+    assert writer.blocked_count == 1
+    
+    cnx.released.set()
+    flusher.join()
+    writer.insert( 'events', (2, 'unblocked') )
+    writer.close()
+    assert _counts( db_path ) == { 'samples': 19, 'events': 2 }
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_full_with_many_tables(db_path):
+    cnx = SQLiteConnection( str(db_path) )
+    writer = BufferedWriter( cnx, max_rows=10, flush_period_s=None, max_buffered_rows=10, block_timeout_s=None )
+    for i in range(9):
+        writer.insert( 'samples', (float(i), 0.0) )
+    writer.insert( 'events', (1, 'full') )
+    writer.insert( 'events', (2, 'flushed by the inserting thread') )
+    assert writer.blocked_count == 1 and writer.buffered_rows == 1
+    writer.close()
+    assert _counts( db_path ) == { 'samples': 9, 'events': 2 }
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_failed_flush(db_path):
+    cnx = SQLiteConnection( str(db_path) )
+    writer = BufferedWriter( cnx, flush_period_s=None )
+    writer.insert( 'events', (1, 'a') )
+    writer.insert( 'events', (1, 'b') )
+    with pytest.raises( IntegrityError ):
+        writer.flush()
+    assert writer.errors_count == 1 and writer.dropped_rows_count == 2
+    writer.insert( 'events', (2, 'c') )
+    writer.close()
+    assert _counts( db_path )['events'] == 1
+    cnx.close()
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_buffered_writer   =====#
@@ -0,0 +1,114 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import csv
+import io
+import tracemalloc
+
+from Libs.ObjectSqlLib import SQLiteConnection
+
+
+#=============================================================================
+class GeneratedCSV( io.TextIOBase ):
+    '''A readable text stream which generates CSV lines on the fly.'''
+    def __init__(self, rows_count: int) -> None:
+        self._lines = ( f"{i},Rider {i},\"Team, {i % 20}\"\n" for i in range(rows_count) )
+        self._pending = ''
+    def read(self, size: int = -1) -> str:
+        while len( self._pending ) < size:
+            line = next( self._lines, None )
+            if line is None:
+                break
+            self._pending += line
+        text, self._pending = self._pending[:size], self._pending[size:]
+        return text
+
+
+#-------------------------------------------------------------------------
+class Semicolon( csv.excel ):
+    delimiter = ';'
+
+
+#-------------------------------------------------------------------------
+def _new_cursor():
+    cursor = SQLiteConnection().cursor()
+    cursor.execute( "CREATE TABLE results (bib INTEGER, name TEXT, team TEXT)" )
+    return cursor
+
+#-------------------------------------------------------------------------
+def _copy_peak(rows_count: int) -> int:
+    cursor = _new_cursor()
+    tracemalloc.start()
+    report = cursor.copy_from( 'results', GeneratedCSV(rows_count), buffer_size=4096 )
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert report.rows == rows_count and cursor.rowcount == rows_count
+    return peak
+
+
+#=============================================================================
+def test_copy_from_file_like():
+    cursor = _new_cursor()
+    text = 'name,bib,team\n"Vos, Marianne",1,Jumbo\r\n"Van der\nBreggen",2,\nLongo Borghini,3,Trek\n'
+    report = cursor.copy_from( 'results', io.StringIO(text), header=True, buffer_size=7 )
+    assert report.rows == 3 and report.rows_per_s > 0
+    cursor.execute( "SELECT bib, name, team FROM results ORDER BY bib" )
+    assert cursor.fetchall() == [ (1, 'Vos, Marianne', 'Jumbo'), (2, 'Van der\nBreggen', None),
+                                  (3, 'Longo Borghini', 'Trek') ]
+
+
+#-------------------------------------------------------------------------
+def test_copy_from_generators():
+    cursor = _new_cursor()
+    report = cursor.copy_from( 'results', (f"{i};rider {i};NA\n" for i in range(10)),
+                               columns=('bib', 'name', 'team'), dialect=Semicolon, null='NA' )
+    assert report.rows == 10
+    report = cursor.copy_from( 'results', ((100 + i, f"rider {i}", None) for i in range(2500)), max_rows=1000 )
+    assert report.rows == 2500 and len( report.batches ) == 3
+    cursor.execute( "SELECT COUNT(*), COUNT(team) FROM results" )
+    assert cursor.fetchone() == (2510, 0)
+
+
+#-------------------------------------------------------------------------
+def test_copy_to():
+    cursor = _new_cursor()
+    cursor.copy_from( 'results', [(1, 'Vos, Marianne', None), (2, 'Vollering', 'SD Worx')] )
+    stream = io.StringIO()
+    report = cursor.copy_to( 'results', stream, columns=('bib', 'name', 'team'), header=True, null='NULL' )
+    assert report.rows == 2
+    assert stream.getvalue() == 'bib,name,team\r\n1,"Vos, Marianne",NULL\r\n2,Vollering,SD Worx\r\n'
+    
+    copy = _new_cursor()
+    stream.seek( 0 )
+    copy.copy_from( 'results', stream, header=True, null='NULL' )
+    copy.execute( "SELECT * FROM results ORDER BY bib" )
+    assert copy.fetchall() == [ (1, 'Vos, Marianne', None), (2, 'Vollering', 'SD Worx') ]
+
+
+#-------------------------------------------------------------------------
+def test_constant_memory():
+    ## only the report grows, by one timing per batch of 1000 rows
+    assert _copy_peak( 200_000 ) < 1.25 * _copy_peak( 20_000 )
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_bulk_copy   =====#
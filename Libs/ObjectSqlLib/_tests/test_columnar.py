@@ -0,0 +1,76 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import datetime
+import decimal
+from array import array
+
+from Libs.ObjectSqlLib import DATETIME, NUMBER, STRING, SQLiteConnection
+from Libs.ObjectSqlLib.columnar import rows_to_columns
+
+
+#=============================================================================
+def test_rows_to_columns():
+    day = datetime.datetime( 2020, 8, 16 )
+    description = ( ('id'   , NUMBER  , None, None, None, None, False),
+                    ('speed', NUMBER  , None, None, None, None, True ),
+                    ('name' , STRING  , None, None, None, None, True ),
+                    ('day'  , DATETIME, None, None, None, None, False) )
+    rows = [ (1, 41.5, 'Marianne', day),
+             (2, None, None      , day),
+             (3, 39  , 'Lizzie'  , day) ]
+    
+    ids, speeds, names, days = rows_to_columns( rows, description )
+    assert ids.values == array( 'q', [1, 2, 3] ) and ids.null_mask == bytearray( 3 )
+    assert speeds.values == array( 'd', [41.5, 0.0, 39.0] ) and speeds.null_mask == bytearray( [0, 1, 0] )
+    assert names.values == [ 'Marianne', None, 'Lizzie' ] and names.null_mask == bytearray( [0, 1, 0] )
+    assert days.name == 'day' and days.type_code is DATETIME and days.values == [ day ] * 3
+    
+    ## Decimals and integers beyond 64 bits keep their precision
+    amounts, counts = rows_to_columns( [(decimal.Decimal('0.1'), 1 << 64), (None, 1)], description[:2] )
+    assert amounts.values == [ decimal.Decimal('0.1'), None ] and amounts.null_mask == bytearray( [0, 1] )
+    assert counts.values == [ 1 << 64, 1 ]
+    counts, = rows_to_columns( [(0.5,), ((1 << 53) + 1,)], description[:1] )
+    assert counts.values == [ 0.5, (1 << 53) + 1 ]
+
+
+#-------------------------------------------------------------------------
+def test_cursor_fetch_columns():
+    cnx = SQLiteConnection()
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE t (x INTEGER, y TEXT)" )
+    cursor.executemany( "INSERT INTO t VALUES (%s, %s)", [(i, str(i)) for i in range(10)] )
+    cursor.execute( "SELECT x, y FROM t ORDER BY x" )
+    
+    x, y = cursor.fetch_columns( 4 )
+    assert x.values == array( 'q', range(4) ) and y.values == [ '0', '1', '2', '3' ]
+    x, y = cursor.fetch_columns()
+    assert x.values == array( 'q', range(4, 10) )
+    x, y = cursor.fetch_columns()
+    assert len( x.values ) == 0 and len( y.values ) == 0
+    
+    cursor.close()
+    cnx.close()
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_columnar   =====#
@@ -0,0 +1,108 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+from threading import Thread
+
+import pytest
+
+from Libs.ObjectSqlLib import ConnectionPool, InterfaceError, OperationalError, ProgrammingError, SQLiteConnection
+
+
+#=============================================================================
+def test_sizing():
+    pool = ConnectionPool( SQLiteConnection, min_size=2, max_size=3 )
+    assert pool.size == 2 and pool.idle_count == 2
+    
+    cnx = [ pool.acquire() for _ in range(3) ]
+    assert pool.size == 3 and pool.in_use_count == 3 and pool.idle_count == 0
+    
+    for c in cnx:
+        pool.release( c )
+    assert pool.size == 3 and pool.idle_count == 3
+    pool.close()
+    assert pool.size == 0
+
+
+#-------------------------------------------------------------------------
+def test_checkout_timeout():
+    with ConnectionPool( SQLiteConnection, min_size=0, max_size=1, timeout_s=0.05 ) as pool:
+        with pool.connection():
+            with pytest.raises( OperationalError ):
+                pool.acquire()
+        assert pool.acquire( 0.0 ) is not None
+
+
+#-------------------------------------------------------------------------
+def test_validation_on_checkout():
+    valid = { 'ok': True }
+    pool = ConnectionPool( SQLiteConnection, validate=lambda _cnx: valid['ok'] )
+    first = pool.acquire()
+    pool.release( first )
+    assert pool.acquire() is first
+    pool.release( first )
+    
+    valid['ok'] = False
+    second = pool.acquire()
+    assert second is not first and pool.size == 1
+    pool.release( second )
+    pool.close()
+
+
+#-------------------------------------------------------------------------
+def test_misuse():
+    pool = ConnectionPool( SQLiteConnection )
+    with pytest.raises( ProgrammingError ):
+        pool.release( SQLiteConnection() )
+    pool.close()
+    with pytest.raises( InterfaceError ):
+        pool.acquire()
+
+
+#-------------------------------------------------------------------------
+def test_threads_sharing():
+    pool = ConnectionPool( SQLiteConnection, min_size=1, max_size=4 )
+    errors = []
+    
+    def _work():
+        try:
+            for _ in range( 50 ):
+                with pool.connection() as cnx:
+                    cursor = cnx.cursor()
+                    cursor.execute( "SELECT %s", (1,) )
+                    assert cursor.fetchone() == (1,)
+                    cursor.close()
+        except Exception as e:
+            errors.append( e )
+    
+    threads = [ Thread(target=_work) for _ in range(16) ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    assert not errors
+    assert pool.size <= 4 and pool.in_use_count == 0
+    pool.close()
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_connection_pool   =====#
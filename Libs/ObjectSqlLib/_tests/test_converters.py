@@ -0,0 +1,70 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import datetime
+import decimal
+
+from Libs.ObjectSqlLib import (BINARY, ConverterRegistry, DatesFromTicks, NUMBER, STRING,
+                               TimeFromTicks, TimesFromTicks, TimestampFromTicks,
+                               TimestampsFromTicks)
+
+
+#=============================================================================
+class INTEGER( NUMBER ):
+    pass
+
+
+#=============================================================================
+def test_compiled_conversions():
+    registry = ConverterRegistry()
+    registry.register( NUMBER, decimal.Decimal )
+    registry.register( BINARY, bytes.hex )
+    description = [ ('id'     , INTEGER, None, None, None, None, False),
+                    ('name'   , STRING , None, None, None, None, True ),
+                    ('photo'  , BINARY , None, None, None, None, True ),
+                    ('untyped', None   , None, None, None, None, True ) ]
+    row_converter = registry.compile( description )
+    assert row_converter.converters == ( decimal.Decimal, None, bytes.hex, None )
+    assert registry.compile( list(description) ) is row_converter
+    assert row_converter.convert( [(1, 'a', b'\x01', 'x'), (None, 'b', None, 'y')] ) == \
+               [ (decimal.Decimal(1), 'a', '01', 'x'), (None, 'b', None, 'y') ]
+    assert row_converter.convert_row( (2, 'c', b'\xff', 0) ) == ( decimal.Decimal(2), 'c', 'ff', 0 )
+    
+    rows = [ ('a',), ('b',) ]
+    assert registry.compile( [('name', STRING)] ).convert( rows ) is rows
+    assert registry.compile( None ).is_identity
+    registry.register( NUMBER, None )
+    assert len( registry ) == 1 and registry.compile( description ).converters[0] is None
+
+
+#-------------------------------------------------------------------------
+def test_vectorized_ticks():
+    ticks = [ 0.0, 1_597_579_200.25, -86_400.5 ]
+    assert DatesFromTicks( ticks ) == [ datetime.date.fromtimestamp(t) for t in ticks ]
+    assert TimesFromTicks( ticks ) == [ TimeFromTicks(t) for t in ticks ]
+    assert TimestampsFromTicks( ticks ) == [ TimestampFromTicks(t) for t in ticks ]
+    assert TimesFromTicks( iter(ticks[1:2]) )[0].microsecond == 250_000
+    assert DatesFromTicks( [] ) == []
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_converters   =====#
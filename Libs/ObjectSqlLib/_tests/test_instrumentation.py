@@ -0,0 +1,68 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import json
+
+from Libs.ObjectSqlLib import Instrumentation, InstrumentedConnection, SlowStatementWarning, SQLiteConnection
+from Libs.ObjectSqlLib.instrumentation import LatencyHistogram
+
+
+#=============================================================================
+def test_histogram():
+    histogram = LatencyHistogram()
+    for us in range( 1, 10_001 ):
+        histogram.record( us / 1e6 )
+    snapshot = histogram.to_dict()
+    assert snapshot['count'] == 10_000 and snapshot['min_us'] == 1 and snapshot['max_us'] == 10_000
+    for p, expected in ( ('p50_us', 5_000), ('p90_us', 9_000), ('p99_us', 9_900) ):
+        assert expected <= snapshot[p] <= expected * 1.0625
+    assert sum( count for _, count in snapshot['buckets'] ) == 10_000
+
+
+#-------------------------------------------------------------------------
+def test_statements_recording():
+    cnx = InstrumentedConnection( SQLiteConnection(), Instrumentation(slow_threshold_s=0.0) )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE t (x INTEGER, y TEXT)" )
+    for i in range( 5 ):
+        cursor.execute( "INSERT INTO t VALUES (%s, %s)", (i, 'abcd') )
+    cursor.execute( "SELECT x, y FROM t WHERE x >= 1" )
+    assert len( cursor.fetchmany(3) ) == 3 and cursor.fetchone() is not None and cursor.fetchall() == []
+    
+    snapshot = json.loads( cnx.instrumentation.to_json() )
+    insert = snapshot[ "INSERT INTO t VALUES (?)" ]
+    assert insert['executions'] == 5 and insert['rows_affected'] == 5 and insert['bytes_sent'] == 5 * 12
+    select = snapshot[ "SELECT x, y FROM t WHERE x >= ?" ]
+    assert select['rows_fetched'] == 4 and select['fetch_latency']['count'] == 3
+    assert select['bytes_received'] == 4 * 12
+    ## messages are cleared by every execution (PEP 249): only the last slow one is left
+    assert [ cls for cls, _ in cursor.messages ] == [ SlowStatementWarning ]
+    
+    cnx.instrumentation.enabled = False
+    cursor.execute( "SELECT x FROM t" )
+    assert len( cursor.fetchall() ) == 5
+    assert cnx.instrumentation.stats_for( "SELECT x FROM t" ).executions == 0
+    cnx.close()
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_instrumentation   =====#
@@ -0,0 +1,86 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import pickle
+
+import pytest
+
+from Libs.ObjectSqlLib           import RoutingConnection, SQLiteConnection
+from Libs.ObjectSqlLib.lazy_rows import lazy_row_class
+
+
+#=============================================================================
+def test_decoding_on_access():
+    decoded = []
+    def _decoder(raw):
+        decoded.append( raw )
+        return raw.upper()
+    
+    row_class = lazy_row_class( ('id', 'name', 'id'), (int, _decoder, int) )
+    row = row_class( ('1', 'marianne', '2') )
+    assert decoded == []
+    assert row.name == 'MARIANNE' and row['name'] == 'MARIANNE' and row[1] == 'MARIANNE'
+    assert decoded == [ 'marianne' ]
+    assert row.id == 1 and row[-1] == 2 and row[:2] == (1, 'MARIANNE')
+    assert row == (1, 'MARIANNE', 2) and hash( row ) == hash( (1, 'MARIANNE', 2) )
+    assert decoded == [ 'marianne' ] and len( row ) == 3
+    assert pickle.loads( pickle.dumps(row) ) == (1, 'MARIANNE', 2)
+    assert lazy_row_class( ('id', 'name', 'id'), (int, _decoder, int) ) is row_class
+    
+    with pytest.raises( AttributeError ):
+        row.unknown
+    with pytest.raises( KeyError ):
+        row[ 'unknown' ]
+    with pytest.raises( IndexError ):
+        row[ 3 ]
+    with pytest.raises( AttributeError ):
+        row.other = 0
+
+
+#-------------------------------------------------------------------------
+def test_sqlite_lazy_rows(tmp_path):
+    cnx = SQLiteConnection( ':memory:' )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE riders (id INTEGER, name TEXT)" )
+    cursor.executemany( "INSERT INTO riders VALUES (%s, %s)", [(1, 'Marianne'), (2, 'Pauline')] )
+    cursor.lazy_rows = True
+    cursor.execute( "SELECT id, name FROM riders ORDER BY id" )
+    assert cursor.fetchone().name == 'Marianne'
+    assert [ (row.id, row['name']) for row in cursor.fetchall() ] == [ (2, 'Pauline') ]
+    cursor.lazy_rows = False
+    cursor.execute( "SELECT id, name FROM riders ORDER BY id" )
+    assert type( cursor.fetchone() ) is tuple
+    cnx.close()
+    
+    connections = [ SQLiteConnection(str(tmp_path / f"{name}.db")) for name in ('primary', 'replica') ]
+    for node in connections:
+        node.cursor().execute( "CREATE TABLE node (name TEXT)" )
+    cnx = RoutingConnection( connections[0], connections[1:] )
+    cursor = cnx.cursor()
+    cursor.lazy_rows = True
+    cursor.execute( "SELECT 'replica' AS name" )
+    assert cursor.node == 1 and cursor.lazy_rows and cursor.fetchone().name == 'replica'
+    cnx.close()
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_lazy_rows   =====#
@@ -0,0 +1,67 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import pytest
+
+from Libs.ObjectSqlLib import CachingConnection, MemoryBudget, OperationalError, SQLiteConnection
+
+
+#=============================================================================
+def test_gauge():
+    budget = MemoryBudget( 100 )
+    assert budget.charge( 60 ) and budget.buffered_bytes == 60
+    assert not budget.charge( 60 ) and budget.exceeded_count == 1
+    budget.release( 100 )
+    assert budget.buffered_bytes == 20 and budget.peak_bytes == 120
+    assert budget.to_dict() == { 'max_bytes': 100, 'on_exceeded': 'stream', 'buffered_bytes': 20,
+                                 'peak_bytes': 120, 'exceeded': 1 }
+    assert "memory budget of 100 bytes" in str( budget.error("the result set") )
+    assert MemoryBudget().charge( 1 << 40 )
+
+
+#-------------------------------------------------------------------------
+def test_sqlite_fetchall_within_budget():
+    budget = MemoryBudget( 50_000 )
+    cnx = SQLiteConnection( ':memory:' )
+    cnx.memory_budget = budget
+    other = CachingConnection( SQLiteConnection(':memory:') )
+    other.memory_budget = budget
+    assert other.wrapped.memory_budget is budget and other.buffered_bytes == 0
+    
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE samples (value TEXT)" )
+    cursor.executemany( "INSERT INTO samples VALUES (%s)", [('x' * 100,)] * 1000 )
+    cursor.execute( "SELECT value FROM samples LIMIT 100" )
+    assert len( cursor.fetchall() ) == 100 and budget.buffered_bytes == 0
+    
+    cursor.execute( "SELECT value FROM samples" )
+    with pytest.raises( OperationalError, match="'.fetchmany\\(\\)'" ):
+        cursor.fetchall()
+    assert budget.buffered_bytes == 0 and budget.peak_bytes > 50_000
+    cursor.execute( "SELECT value FROM samples" )
+    assert sum( len(cursor.fetchmany(300)) for _ in range(4) ) == 1000
+    cnx.close()
+    other.close()
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_memory_budget   =====#
@@ -0,0 +1,72 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import functools
+
+import pytest
+
+from Libs.ObjectSqlLib import (OperationalError, QueryTiming, QueryTimingWarning,
+                               run_queries, SQLiteConnection)
+
+
+#=============================================================================
+@pytest.fixture
+def connect(tmp_path):
+    db_path = str( tmp_path / 'riders.db' )
+    cnx = SQLiteConnection( db_path )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE riders (id INTEGER PRIMARY KEY, team TEXT)" )
+    cursor.executemany( "INSERT INTO riders (team) VALUES (%s)", [(f'team {i % 4}',) for i in range(100)] )
+    cnx.commit()
+    cnx.close()
+    return functools.partial( SQLiteConnection, db_path )
+
+
+#=============================================================================
+def test_threads(connect):
+    queries = [ ("SELECT COUNT(*) FROM riders WHERE team = %s", (f'team {i}',)) for i in range(4) ]
+    queries += [ "SELECT MAX(id) FROM riders", "SELECT * FROM no_table" ]
+    results = list( run_queries(connect, queries, workers=3) )
+    assert sorted( r.index for r in results ) == list( range(6) )
+    
+    results.sort( key=lambda r: r.index )
+    assert [ r.fetchall() for r in results[:5] ] == [ [(25,)] ] * 4 + [ [(100,)] ]
+    assert all( r.error is None and len(r.messages) == 1 for r in results[:5] )
+    cls, timing = results[0].messages[0]
+    assert cls is QueryTimingWarning and isinstance( timing, QueryTiming ) and timing.worker.startswith( 'query' )
+    
+    failed = results[5]
+    assert isinstance( failed.error, OperationalError ) and failed.rows is None
+    assert [ cls for cls, _ in failed.messages ] == [ QueryTimingWarning, OperationalError ]
+
+
+#-------------------------------------------------------------------------
+def test_ordered_processes(connect):
+    queries = [ ("SELECT id FROM riders WHERE id <= %s ORDER BY id", (n,)) for n in (50, 3, 20) ]
+    results = list( run_queries(connect, queries, workers=2, ordered=True, processes=True) )
+    assert [ r.index for r in results ] == [ 0, 1, 2 ]
+    assert results[1].fetchall() == [ (1,), (2,), (3,) ] and results[1].description[0][0] == 'id'
+    assert [ len(r.rows) for r in results ] == [ 50, 3, 20 ] and results[0].timing.worker.startswith( 'process' )
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_parallel   =====#
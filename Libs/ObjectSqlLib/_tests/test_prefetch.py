@@ -0,0 +1,166 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import pytest
+
+from Libs.ObjectSqlLib import CachingConnection, Cursor, InstrumentedConnection, OperationalError, SQLiteConnection
+from Libs.ObjectSqlLib.prefetch import AdaptiveArraySize, PrefetchIterator
+
+
+#=============================================================================
+class LatencyCursor( Cursor ):
+    '''A forward-only cursor which generates its rows with a latency per fetch.
+    
+    The operation is the count of rows to generate.
+    '''
+    def __init__(self, latency_s: float = 0.0, failing_fetch: Optional[int] = None) -> None:
+        super().__init__( None )
+        self.latency_s = latency_s
+        self.failing_fetch = failing_fetch
+        self.sizes = []
+        self._rows = iter( () )
+    def close(self) -> None:
+        pass
+    def execute(self, operation: str, *parameters) -> None:
+        self._rows = ( (i, f"row #{i:060d}") for i in range(int(operation)) )
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        if len( self.sizes ) == self.failing_fetch:
+            raise OperationalError( "connection lost" )
+        self.sizes.append( size )
+        time.sleep( self.latency_s )
+        return [ row for _, row in zip(range(size), self._rows) ]
+
+
+#=============================================================================
+def test_adaptive_size():
+    controller = AdaptiveArraySize( initial_size=10, memory_budget=30_000, target_latency_s=0.1 )
+    rows = [ (1, 'x' * 92) ] * 10   ## 100 bytes per row
+    assert [ controller.update(rows, 0.01) for _ in range(3) ] == [ 20, 40, 80 ]
+    assert controller.update( rows, 0.2 ) == 40
+    assert controller.update( rows, 0.01 ) == 80
+    assert controller.update( rows, 0.01 ) == 100    ## memory budget: 3 batches of 100 rows
+    assert controller.update( [], 0.01 ) == 100
+
+
+#-------------------------------------------------------------------------
+@pytest.mark.parametrize( 'background', [True, False] )
+def test_iteration(background: bool):
+    cursor = LatencyCursor()
+    cursor.execute( '1000' )
+    assert [ row[0] for row in cursor.prefetched(background=background) ] == list( range(1000) )
+    assert cursor.sizes[:4] == [ 16, 32, 64, 128 ]
+    
+    cursor.execute( '1000' )
+    assert [ row[0] for row in cursor ] == list( range(1000) )
+    
+    cursor.execute( '1000' )
+    cursor.sizes.clear()
+    assert sum( 1 for _ in cursor.prefetched(memory_budget=100 * 64, background=background) ) == 1000
+    assert max( cursor.sizes ) <= 100 // 3
+
+
+#-------------------------------------------------------------------------
+def test_overlap():
+    cursor = LatencyCursor( latency_s=0.020 )
+    cursor.execute( '200' )
+    iterator = PrefetchIterator( cursor, AdaptiveArraySize(initial_size=20, max_size=20), background=True )
+    start = time.perf_counter()
+    for row in iterator:
+        if row[0] % 20 == 0:
+            time.sleep( 0.020 )     ## processing of the batch
+    duration_s = time.perf_counter() - start
+    ## 11 fetches and 10 processings overlap rather than taking 420 ms
+    assert iterator.fetches_count == 11
+    assert duration_s < 0.350
+
+
+#-------------------------------------------------------------------------
+def test_errors_and_close():
+    cursor = LatencyCursor( failing_fetch=2 )
+    cursor.execute( '1000' )
+    with pytest.raises( OperationalError ):
+        for _ in cursor.prefetched( background=True ):
+            pass
+    
+    cursor = LatencyCursor( latency_s=0.005 )
+    cursor.execute( '10000' )
+    threads_count = threading.active_count()
+    with cursor.prefetched( background=True ) as rows:
+        for row in rows:
+            if row[0] == 100:
+                break
+    assert threading.active_count() == threads_count
+    fetched_sizes = sum( cursor.sizes )
+    time.sleep( 0.020 )
+    assert sum( cursor.sizes ) == fetched_sizes
+
+
+#-------------------------------------------------------------------------
+def test_wrappers_iteration():
+    cnx = CachingConnection( SQLiteConnection() )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE t (a)" )
+    cursor.executemany( "INSERT INTO t VALUES (%s)", [(i,) for i in range(100)] )
+    for _ in range( 2 ):
+        cursor.execute( "SELECT a FROM t ORDER BY a" )
+        assert [ row[0] for row in cursor ] == list( range(100) )
+    
+    ## iterations and fetches of wrappers share their position
+    for cnx in ( cnx, InstrumentedConnection(cnx) ):
+        cursor = cnx.cursor()
+        cursor.execute( "SELECT a FROM t ORDER BY a" )
+        for row in cursor:
+            break
+        assert row == (0,) and cursor.fetchone() == (1,)
+        assert next( cursor ) == (2,) and cursor.fetchmany( 2 ) == [ (3,), (4,) ]
+        assert [ row[0] for row in cursor ] == list( range(5, 100) )
+    cnx.close()
+    
+    ## breaking out of iterations leaves the cursor free for its next execution
+    cnx = InstrumentedConnection( SQLiteConnection() )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE t (a)" )
+    cursor.executemany( "INSERT INTO t VALUES (%s)", [(i,) for i in range(1000)] )
+    threads_count = threading.active_count()
+    for background in (False, True):
+        cursor.execute( "SELECT a FROM t WHERE a > %s ORDER BY a", (-1,) )
+        for row in cursor.prefetched( memory_budget=1 << 10, background=background ):
+            break
+        cursor.execute( "SELECT count(*) FROM t" )
+        assert cursor.fetchone() == (1000,)
+    
+    ## dropped iterators get their threads stopped
+    cursor.execute( "SELECT a FROM t WHERE a > %s ORDER BY a", (-1,) )
+    rows = cursor.prefetched( memory_budget=1 << 10, background=True )
+    next( rows )
+    del rows
+    time.sleep( 0.050 )
+    assert threading.active_count() == threads_count
+    cnx.close()
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_prefetch   =====#
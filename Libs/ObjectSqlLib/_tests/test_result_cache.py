@@ -0,0 +1,112 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+from Libs.ObjectSqlLib import CachingConnection, ResultCache, SQLiteConnection
+from Libs.ObjectSqlLib.result_cache import result_key
+
+
+#=============================================================================
+def _new_connection() -> CachingConnection:
+    cnx = CachingConnection( SQLiteConnection() )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE riders (id INTEGER, name TEXT)" )
+    cursor.execute( "CREATE TABLE teams (id INTEGER, name TEXT)" )
+    cursor.executemany( "INSERT INTO riders VALUES (%s, %s)", [(1, 'Annemiek'), (2, 'Anna'), (3, 'Marianne')] )
+    cursor.execute( "INSERT INTO teams VALUES (%s, %s)", (1, 'Movistar') )
+    cnx.commit()
+    return cnx
+
+
+#=============================================================================
+def test_ttl_and_bytes_eviction():
+    now = [ 0.0 ]
+    cache = ResultCache( max_bytes=250, ttl_s=10.0, clock=lambda: now[0] )
+    assert cache.put( 'a', (), [(1,)], 1, frozenset({'t'}) )
+    assert cache.put( 'b', (), [(2,)], 1, frozenset({'u'}) )
+    assert cache.get( 'a' ) is not None
+    assert cache.put( 'c', (), [(3,), (4,)], 2, frozenset({'t'}) )   ## evicts LRU entry 'b'
+    assert cache.get( 'b' ) is None and cache.bytes <= 250
+    assert not cache.put( 'd', (), [(0,)] * 10, 10, frozenset() )
+    now[0] = 10.0
+    assert cache.get( 'a' ) is None and len( cache ) == 1
+
+
+#-------------------------------------------------------------------------
+def test_hits_through_fetch_methods():
+    cnx = _new_connection()
+    cursor = cnx.cursor()
+    query = "SELECT id, name FROM riders WHERE id >= %s ORDER BY id"
+    cursor.execute( query, (2,) )
+    assert cursor.fetchall() == [ (2, 'Anna'), (3, 'Marianne') ]
+    
+    ## the database is modified behind the cache: cached rows are served
+    cnx._wrapped._db.execute( "DELETE FROM riders" )
+    cursor.execute( query, (2,) )
+    assert cursor.fetchone() == (2, 'Anna')
+    assert cursor.fetchmany( 5 ) == [ (3, 'Marianne') ]
+    assert cursor.description[1][0] == 'name'
+    assert cnx.result_cache.hits == 1 and cnx.result_cache.misses == 1
+    
+    cnx.rollback()
+    assert len( cnx.result_cache ) == 0
+    cursor.execute( query, (2,) )
+    assert len( cursor.fetchall() ) == 2
+    
+    ## equal parameters of distinct types are cached apart
+    for value, value_type in ((1, 'integer'), (1.0, 'real'), (True, 'integer'), (1, 'integer')):
+        cursor.execute( "SELECT typeof(%s)", (value,) )
+        assert cursor.fetchall() == [ (value_type,) ]
+    assert result_key( 'q', (1,) ) != result_key( 'q', (1.0,) ) != result_key( 'q', (True,) ) != result_key( 'q', (1,) )
+    assert result_key( 'q', {'a': 1} ) != result_key( 'q', {'a': 1.0} )
+    assert cnx.result_cache.hits == 2
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_dml_invalidation():
+    cnx = _new_connection()
+    cursor = cnx.cursor()
+    cursor.execute( "SELECT COUNT(*) FROM riders" )
+    cursor.execute( "SELECT name FROM teams" )
+    assert len( cnx.result_cache ) == 2
+    
+    cursor.execute( "INSERT INTO riders VALUES (%s, %s)", (4, 'Lizzie') )
+    assert len( cnx.result_cache ) == 1
+    cursor.execute( "SELECT COUNT(*) FROM riders" )
+    assert cursor.fetchone() == (4,)
+    
+    ## tables of plain JOINs are read also
+    query = "SELECT teams.name FROM riders JOIN teams ON riders.id = teams.id"
+    cursor.execute( query )
+    assert cursor.fetchall() == [ ('Movistar',) ]
+    cursor.execute( "UPDATE teams SET name = %s", ('Canyon',) )
+    cursor.execute( query )
+    assert cursor.fetchall() == [ ('Canyon',) ]
+    
+    cursor.execute( "DROP TABLE teams" )
+    assert len( cnx.result_cache ) == 0
+    cnx.commit()
+    cnx.close()
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_result_cache   =====#
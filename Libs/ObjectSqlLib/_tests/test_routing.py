@@ -0,0 +1,120 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+from typing import List
+
+import pytest
+
+from Libs.ObjectSqlLib import OperationalError, RoutingConnection, SQLiteConnection
+
+
+#=============================================================================
+def _routing_connection(tmp_path, policy: str, now: List[float]) -> RoutingConnection:
+    '''Creates a primary and two replicas as SQLite files which tell their name.
+    '''
+    connections = []
+    for name in ('primary', 'replica_1', 'replica_2'):
+        cnx = SQLiteConnection( str(tmp_path / f"{name}.db") )
+        cursor = cnx.cursor()
+        cursor.execute( "CREATE TABLE node (name TEXT)" )
+        cursor.executemany( "INSERT INTO node VALUES (%s)", [(name,)] * 3 )
+        cnx.commit()
+        connections.append( cnx )
+    return RoutingConnection( connections[0], connections[1:], policy, sticky_s=1.0, clock=lambda: now[0] )
+
+
+#-------------------------------------------------------------------------
+def _read_node(cursor) -> str:
+    cursor.execute( "SELECT name FROM node" )
+    return cursor.fetchall()[0][0]
+
+
+#=============================================================================
+def test_round_robin(tmp_path):
+    cnx = _routing_connection( tmp_path, 'round_robin', [0.0] )
+    cursor = cnx.cursor()
+    assert [ _read_node(cursor) for _ in range(4) ] == [ 'replica_1', 'replica_2', 'replica_1', 'replica_2' ]
+    assert [ r['reads'] for r in cnx.snapshot()['replicas'] ] == [ 2, 2 ]
+    assert cnx.snapshot()['primary']['reads'] == 0
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_least_outstanding(tmp_path):
+    cnx = _routing_connection( tmp_path, 'least_outstanding', [0.0] )
+    cursors = [ cnx.cursor() for _ in range(3) ]
+    for cursor in cursors[:2]:
+        cursor.execute( "SELECT name FROM node" )
+    assert [ c.fetchone()[0] for c in cursors[:2] ] == [ 'replica_1', 'replica_2' ]
+    assert [ r.outstanding for r in cnx.replica_stats ] == [ 1, 1 ]
+    
+    cursors[1].fetchmany( 10 )
+    assert [ r.outstanding for r in cnx.replica_stats ] == [ 1, 0 ]
+    assert _read_node( cursors[2] ) == 'replica_2'
+    assert [ r.outstanding for r in cnx.replica_stats ] == [ 1, 0 ]
+    cursors[0].close()
+    assert [ r.outstanding for r in cnx.replica_stats ] == [ 0, 0 ]
+    assert [ r.reads for r in cnx.replica_stats ] == [ 1, 2 ]
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_read_your_writes(tmp_path):
+    now = [ 0.0 ]
+    cnx = _routing_connection( tmp_path, 'round_robin', now )
+    cursor = cnx.cursor()
+    cursor.execute( "INSERT INTO node VALUES (%s)", ('written',) )
+    assert cnx.in_transaction and cursor.node == 0
+    assert _read_node( cursor ) == 'primary'
+    
+    cnx.commit()
+    assert _read_node( cursor ) == 'primary'
+    now[0] = 0.999
+    assert _read_node( cursor ) == 'primary'
+    now[0] = 1.0
+    assert _read_node( cursor ) == 'replica_1'
+    
+    cursor.execute( "DELETE FROM node" )
+    cnx.rollback()
+    assert _read_node( cursor ) == 'replica_2'
+    
+    cnx.commit()    ## no pending writes: no stickiness
+    assert _read_node( cursor ) == 'replica_1'
+    
+    snapshot = cnx.snapshot()
+    assert snapshot['primary']['writes'] == 2 and snapshot['primary']['reads'] == 3
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_errors(tmp_path):
+    cnx = _routing_connection( tmp_path, 'round_robin', [0.0] )
+    cursor = cnx.cursor()
+    with pytest.raises( OperationalError ):
+        cursor.execute( "SELECT * FROM missing_table" )
+    assert cnx.replica_stats[0].errors == 1 and cnx.replica_stats[0].outstanding == 0
+    assert _read_node( cursor ) == 'replica_2'
+    cnx.close()
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_routing   =====#
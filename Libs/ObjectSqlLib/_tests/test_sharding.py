@@ -0,0 +1,148 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import pytest
+
+from Libs.ObjectSqlLib import (NotSupportedError, ProgrammingError, ShardedConnection,
+                               SQLiteConnection, SQLiteCursor)
+from Libs.ObjectSqlLib.sharding import shard_of
+
+
+#=============================================================================
+class CountingCursor( SQLiteCursor ):
+    '''Counts the calls to execute() per connection.
+    '''
+    def execute(self, operation: str, *parameters) -> None:
+        self._connection.executions_count += 1
+        super().execute( operation, *parameters )
+
+class CountingConnection( SQLiteConnection ):
+    executions_count = 0
+    def cursor(self) -> CountingCursor:
+        return CountingCursor( self )
+
+
+#-------------------------------------------------------------------------
+ROWS = [ (i % 30, f"rider {i % 50:02d}", None if i % 17 == 0 else float(i * 37 % 101)) for i in range(300) ]
+
+def _connections():
+    '''Returns a sharded connection over 3 shards and a single reference connection, with the same rows.
+    '''
+    sharded = ShardedConnection( [CountingConnection() for _ in range(3)], {'results': 'race_id'} )
+    reference = SQLiteConnection()
+    for cnx in ( sharded, reference ):
+        cursor = cnx.cursor()
+        cursor.execute( "CREATE TABLE results (race_id INTEGER, rider TEXT, time REAL)" )
+        cursor.execute( "CREATE TABLE races (race_id INTEGER, name TEXT)" )
+        cursor.executemany( "INSERT INTO results (race_id, rider, time) VALUES (%s, %s, %s)", ROWS )
+        cursor.executemany( "INSERT INTO races VALUES (%s, %s)", [(i, f"race {i}") for i in range(30)] )
+        cnx.commit()
+    return sharded, reference
+
+def _fetched(cnx, operation: str, *parameters):
+    cursor = cnx.cursor()
+    cursor.execute( operation, *parameters )
+    return cursor.fetchall()
+
+
+#=============================================================================
+def test_routing():
+    sharded, _ = _connections()
+    for index, shard in enumerate( sharded.shards ):
+        race_ids = { row[0] for row in _fetched(shard, "SELECT race_id FROM results") }
+        assert race_ids and all( shard_of(race_id, 3) == index for race_id in race_ids )
+        assert len( _fetched(shard, "SELECT * FROM races") ) == 30
+    
+    counts = [ shard.executions_count for shard in sharded.shards ]
+    rows = _fetched( sharded, "SELECT rider FROM results WHERE race_id = %s AND rider <> 'x' ORDER BY rider", (7,) )
+    assert rows == sorted( (row[1],) for row in ROWS if row[0] == 7 )
+    assert _fetched( sharded, "SELECT COUNT(*) FROM results r WHERE r.race_id = 7 AND (rider = 'a' OR 1 = 1)" ) == [ (10,) ]
+    assert _fetched( sharded, "SELECT name FROM races WHERE race_id = %s", (3,) ) == [ ('race 3',) ]
+    increments = [ shard.executions_count - count for shard, count in zip(sharded.shards, counts) ]
+    expected = [ 1, 0, 0 ]      ## replicated table on the first shard
+    expected[ shard_of(7, 3) ] += 2
+    assert increments == expected
+    
+    ## not a point query: run on every shard
+    assert len( _fetched(sharded, "SELECT * FROM results WHERE race_id = 7 OR race_id = 8") ) == 20
+    
+    with pytest.raises( ProgrammingError ):
+        sharded.cursor().execute( "INSERT INTO results (rider) VALUES ('nobody')" )
+    with pytest.raises( NotSupportedError ):
+        sharded.cursor().execute( "UPDATE results SET race_id = 1 WHERE race_id = 2" )
+    sharded.close()
+
+
+#-------------------------------------------------------------------------
+@pytest.mark.parametrize( 'query, parameters', [
+    ( "SELECT race_id, rider, time FROM results ORDER BY time DESC, rider, race_id", () ),
+    ( "SELECT rider, time AS t, race_id FROM results ORDER BY t, 1, results.race_id LIMIT %s OFFSET %s", (25, 10) ),
+    ( "SELECT DISTINCT rider FROM results WHERE time > %s ORDER BY rider DESC", (50.0,) ),
+    ( "SELECT COUNT(*), SUM(time), MIN(time), MAX(time) FROM results", () ),
+    ( "SELECT rider, COUNT(*) AS n, SUM(time) FROM results GROUP BY rider ORDER BY n DESC, rider LIMIT 7", () ),
+    ( "SELECT r.rider, MAX(r.time) FROM results r JOIN races USING (race_id) WHERE races.name <> 'race 2' "
+      "GROUP BY r.rider ORDER BY 1", () ),
+    ( "SELECT results.rider, races.name FROM races JOIN results ON results.race_id = races.race_id "
+      "ORDER BY results.rider, races.name", () ),
+    ( "SELECT race_id, rider, COUNT(*), MIN(time) FROM results GROUP BY rider, race_id ORDER BY rider, race_id", () ),
+] )
+def test_merged_queries(query: str, parameters: tuple):
+    sharded, reference = _connections()
+    cursor = sharded.cursor()
+    cursor.execute( query, parameters )
+    expected_cursor = reference.cursor()
+    expected_cursor.execute( query, parameters )
+    assert [ d[0] for d in cursor.description ] == [ d[0] for d in expected_cursor.description ]
+    rows = cursor.fetchmany( 3 ) + cursor.fetchall()
+    assert rows == expected_cursor.fetchall()
+    assert cursor.rownumber == len( rows )
+    sharded.close()
+
+
+#-------------------------------------------------------------------------
+def test_row_counts_and_errors():
+    sharded, _ = _connections()
+    cursor = sharded.cursor()
+    cursor.execute( "UPDATE results SET time = 0.0 WHERE time IS NULL" )
+    assert cursor.rowcount == sum( 1 for row in ROWS if row[2] is None )
+    cursor.execute( "DELETE FROM results WHERE race_id = %s", (4,) )
+    assert cursor.rowcount == 10
+    cursor.execute( "SELECT rider, COUNT(*) FROM results GROUP BY rider" )
+    assert cursor.rowcount == 50 and len( cursor.fetchall() ) == 50
+    
+    for query in ( "SELECT AVG(time) FROM results",
+                   "SELECT COUNT(DISTINCT rider) FROM results",
+                   "SELECT rider, COUNT(*) FROM results GROUP BY rider HAVING COUNT(*) > 5",
+                   "SELECT COUNT(*) FROM results GROUP BY rider",
+                   "SELECT MAX(time) FROM results GROUP BY race_id",
+                   "SELECT rider, COUNT(*) FROM results GROUP BY rider, race_id",
+                   "SELECT rider FROM results ORDER BY LOWER(rider)",
+                   "SELECT rider FROM results UNION SELECT name FROM races" ):
+        with pytest.raises( NotSupportedError ):
+            cursor.execute( query )
+    with pytest.raises( ProgrammingError ):
+        cursor.fetchone()
+    sharded.close()
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_sharding   =====#
@@ -0,0 +1,69 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import json
+
+from Libs.ObjectSqlLib import (Instrumentation, InstrumentedConnection, SlowQueryLog,
+                               SlowStatement, SlowStatementWarning, SQLiteConnection)
+
+
+#=============================================================================
+def test_plans_capture(tmp_path):
+    db_path = str( tmp_path / 'riders.db' )
+    log = SlowQueryLog( str(tmp_path / 'slow.jsonl'), lambda: SQLiteConnection(db_path), 'EXPLAIN QUERY PLAN ' )
+    cnx = InstrumentedConnection( SQLiteConnection(db_path), Instrumentation(slow_threshold_s=0.0, slow_query_log=log) )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE riders (id INTEGER PRIMARY KEY, name TEXT)" )
+    cursor.executemany( "INSERT INTO riders (name) VALUES (%s)", [('Marianne',), ('Lotte',)] )
+    cnx.commit()
+    for rider_id in ( 1, 2 ):
+        cursor.execute( "SELECT name FROM riders WHERE id = %s", (rider_id,) )
+    
+    (cls, slow), = cursor.messages
+    assert cls is SlowStatementWarning and isinstance( slow, SlowStatement )
+    assert str( slow ).startswith( "statement executed in" ) and slow.parameters == (2,)
+    assert 'USING INTEGER PRIMARY KEY' in str( slow.plan ) and slow.explain_error is None
+    assert log.records_count == 4 and log.explains_count == 1  ## the second SELECT reuses the plan of the first one
+    
+    log.close()
+    records = [ json.loads(line) for line in open(log.path) ]
+    assert [ r['operation'][:6] for r in records ] == [ 'CREATE', 'INSERT', 'SELECT', 'SELECT' ]
+    assert records[0]['plan'] is None and 'Error' in records[0]['explain_error']  ## EXPLAIN of CREATE TABLE fails on an existing table
+    assert records[1]['parameters'] is None and records[1]['explain_error'] is None and records[1]['rowcount'] == 2
+    assert records[3]['plan'] == records[2]['plan'] and records[3]['parameters'] == [ 2 ]
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_rotation(tmp_path):
+    path = str( tmp_path / 'slow.jsonl' )
+    log = SlowQueryLog( path, max_bytes=1000, backup_count=2 )
+    for i in range( 20 ):
+        log.record( f"SELECT {i}", (b'\x00\xff', i), 0.5, 0.1 )
+    log.close()
+    sizes = [ len( open(p).read() ) for p in (path, path + '.1', path + '.2') ]
+    assert all( 0 < size <= 1000 for size in sizes ) and not ( tmp_path / 'slow.jsonl.3' ).exists()
+    assert json.loads( open(path).readlines()[-1] )['parameters'] == [ '00ff', 19 ]
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_slow_query_log   =====#
@@ -0,0 +1,134 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+from array import array
+
+import pytest
+
+from Libs.ObjectSqlLib import (Binary, IntegrityError, NotSupportedError, OperationalError,
+                               ProgrammingError, SQLiteConnection, STRING)
+
+
+#=============================================================================
+@pytest.fixture
+def cnx():
+    cnx = SQLiteConnection()
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE riders (id INTEGER PRIMARY KEY, name TEXT NOT NULL)" )
+    cursor.executemany( "INSERT INTO riders (name) VALUES (%s)", [(f'rider {i}',) for i in range(10)] )
+    cnx.commit()
+    cursor.close()
+    yield cnx
+    cnx.close()
+
+
+#=============================================================================
+def test_counts_and_description(cnx):
+    cursor = cnx.cursor()
+    assert cursor.description is None and cursor.rowcount == -1
+    
+    cursor.execute( "INSERT INTO riders (name) VALUES (%s)", ('Lizzie',) )
+    assert cursor.rowcount == 1 and cursor.lastrowid == 11 and cursor.description is None
+    cursor.executemany( "UPDATE riders SET name = name || '!' WHERE id = %s", [(1,), (2,), (99,)] )
+    assert cursor.rowcount == 2
+    
+    cursor.execute( "SELECT id, name FROM riders WHERE name LIKE '%%!'" )
+    assert [ d[0] for d in cursor.description ] == [ 'id', 'name' ]
+    assert cursor.fetchall() == [ (1, 'rider 0!'), (2, 'rider 1!') ] and cursor.rownumber == 2
+
+
+#-------------------------------------------------------------------------
+def test_fetches_and_iteration(cnx):
+    cursor = cnx.cursor()
+    cursor.arraysize = 4
+    cursor.execute( "SELECT id FROM riders ORDER BY id" )
+    assert cursor.fetchone() == (1,)
+    assert cursor.fetchmany() == [ (2,), (3,), (4,), (5,) ]
+    assert cursor.fetchmany( 2 ) == [ (6,), (7,) ]
+    assert [ row[0] for row in cursor ] == [ 8, 9, 10 ]
+    assert cursor.fetchone() is None and cursor.rownumber == 10
+    
+    cursor.execute( "DELETE FROM riders WHERE id > 100" )
+    with pytest.raises( ProgrammingError ):
+        cursor.fetchall()
+
+
+#-------------------------------------------------------------------------
+def test_scroll_and_nextset(cnx):
+    cursor = cnx.cursor()
+    cursor.execute( "SELECT id FROM riders ORDER BY id" )
+    cursor.scroll( 3 )
+    assert cursor.fetchone() == (4,)
+    cursor.scroll( 6, mode='absolute' )
+    assert cursor.fetchone() == (7,)
+    with pytest.raises( NotSupportedError ):
+        cursor.scroll( -1 )
+    with pytest.raises( IndexError ):
+        cursor.scroll( 5 )
+    assert cursor.nextset() is None
+    
+    cursor.execute( "UPDATE riders SET name = 'x' WHERE id = 1" )
+    with pytest.raises( ProgrammingError ):
+        cursor.nextset()
+
+
+#-------------------------------------------------------------------------
+def test_callproc_and_sizes(cnx):
+    cnx.create_function( 'age_category', 1, lambda age: 'U23' if age < 23 else 'Elite' )
+    cursor = cnx.cursor()
+    cursor.setinputsizes( (STRING,) )
+    cursor.setoutputsize( 1024 )
+    assert cursor.callproc( 'age_category', (21,) ) == (21,)
+    assert cursor.fetchall() == [ ('U23',) ]
+
+
+#-------------------------------------------------------------------------
+def test_binary_parameters(cnx):
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE photos (data BLOB)" )
+    photo = bytearray( b'\x89PNG' )
+    view = Binary( photo )
+    photo[0] = 0  ## no copy
+    assert type( view ) is memoryview and view.tobytes() == b'\x00PNG' and Binary( 'PNG' ) == b'PNG'
+    cursor.executemany( "INSERT INTO photos VALUES (%s)", [(view,), (array('b', [1, 0]),)] )
+    cursor.execute( "SELECT data FROM photos" )
+    assert cursor.fetchall() == [ (b'\x00PNG',), (b'\x01\x00',) ]
+
+
+#-------------------------------------------------------------------------
+def test_errors_translation(cnx):
+    cursor = cnx.cursor()
+    with pytest.raises( IntegrityError ):
+        cursor.execute( "INSERT INTO riders (id, name) VALUES (1, 'duplicate')" )
+    with pytest.raises( OperationalError ):
+        cursor.execute( "SELECT * FROM no_such_table" )
+    
+    cursor.close()
+    with pytest.raises( ProgrammingError ):
+        cursor.execute( "SELECT 1" )
+    cnx.close()
+    with pytest.raises( ProgrammingError ):
+        cnx.cursor()
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_sqlite_driver   =====#
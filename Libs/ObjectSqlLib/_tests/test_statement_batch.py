@@ -0,0 +1,111 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import pytest
+
+from Libs.ObjectSqlLib import (CachingConnection, IntegrityError, ProgrammingError,
+                               SQLiteConnection, StreamingCursor)
+
+
+#=============================================================================
+BATCH = [ ("INSERT INTO riders VALUES (%s, %s)", (3, 'Lotte')),
+          ("SELECT id, name FROM riders ORDER BY id", None),
+          ("UPDATE riders SET name = upper(name)", ()),
+          ("SELECT count(*) FROM riders", ()) ]
+
+
+#-------------------------------------------------------------------------
+@pytest.fixture
+def cnx():
+    cnx = SQLiteConnection( ':memory:' )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE riders (id INTEGER PRIMARY KEY, name TEXT)" )
+    cursor.executemany( "INSERT INTO riders VALUES (%s, %s)", [(1, 'Marianne'), (2, 'Pauline')] )
+    yield cnx
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def _check_batch_results(cursor) -> None:
+    assert cursor.description is None and cursor.rowcount == 1 and cursor.lastrowid == 3
+    with pytest.raises( ProgrammingError ):
+        cursor.fetchall()
+    
+    assert cursor.nextset() is True
+    assert [ d[0] for d in cursor.description ] == [ 'id', 'name' ]
+    assert cursor.fetchone() == (1, 'Marianne')
+    assert cursor.fetchall() == [ (2, 'Pauline'), (3, 'Lotte') ]
+    
+    assert cursor.nextset() is True
+    assert cursor.description is None and cursor.rowcount == 3
+    
+    assert cursor.nextset() is True
+    assert cursor.fetchall() == [ (3,) ]
+    assert cursor.nextset() is None
+
+
+#=============================================================================
+def test_sequential_batch(cnx):
+    cursor = cnx.cursor()
+    cursor.execute_batch( iter(BATCH) )
+    _check_batch_results( cursor )
+    
+    cursor.execute_batch( BATCH[1:2] )
+    cursor.execute( "SELECT name FROM riders WHERE id = 1" )
+    assert cursor.fetchall() == [ ('MARIANNE',) ]
+    assert cursor.nextset() is None
+
+
+#-------------------------------------------------------------------------
+def test_failing_batch(cnx):
+    cursor = cnx.cursor()
+    with pytest.raises( ProgrammingError ):
+        cursor.execute_batch( [] )
+    with pytest.raises( IntegrityError ):
+        cursor.execute_batch( [("INSERT INTO riders VALUES (%s, %s)", (1, 'Lotte')),
+                               ("INSERT INTO riders VALUES (%s, %s)", (4, 'Annemiek'))] )
+    cursor.execute( "SELECT count(*) FROM riders" )
+    assert cursor.fetchall() == [ (2,) ]
+
+
+#-------------------------------------------------------------------------
+def test_wrapped_batch(cnx):
+    caching_cnx = CachingConnection( cnx )
+    cursor = caching_cnx.cursor()
+    cursor.execute( "SELECT count(*) FROM riders" )
+    assert cursor.fetchall() == [ (2,) ]
+    
+    cursor.execute_batch( BATCH )
+    _check_batch_results( cursor )
+    cursor.execute( "SELECT count(*) FROM riders" )
+    assert cursor.fetchall() == [ (3,) ]    ## invalidated by the batch
+    
+    streaming_cursor = StreamingCursor( cnx.cursor(), window_size=1 )
+    streaming_cursor.execute_batch( BATCH[1:] )
+    assert streaming_cursor.fetchall() == [ (1, 'MARIANNE'), (2, 'PAULINE'), (3, 'LOTTE') ]
+    assert streaming_cursor.nextset() is True and streaming_cursor.rowcount == 3
+    assert streaming_cursor.nextset() is True and streaming_cursor.fetchone() == (3,)
+    streaming_cursor.close()
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_statement_batch   =====#
@@ -0,0 +1,64 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+from Libs.ObjectSqlLib import SQLiteConnection, StatementCache
+
+
+#=============================================================================
+def test_lru_eviction():
+    evicted = []
+    cache = StatementCache( 2, lambda op, prepared: evicted.append((op, prepared)) )
+    prepare = lambda op: op.upper()
+    
+    assert cache.get_or_prepare( 'a', prepare ) == 'A'
+    assert cache.get_or_prepare( 'b', prepare ) == 'B'
+    assert cache.get_or_prepare( 'a', prepare ) == 'A'   ## 'b' becomes the LRU one
+    assert cache.get_or_prepare( 'c', prepare ) == 'C'
+    
+    assert evicted == [ ('b', 'B') ]
+    assert 'a' in cache and 'b' not in cache and len( cache ) == 2
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 3, 1)
+    
+    cache.resize( 1 )
+    assert evicted[-1] == ('a', 'A') and cache.evictions == 2
+    cache.clear()
+    assert len( cache ) == 0 and evicted[-1] == ('c', 'C') and cache.evictions == 2
+
+
+#-------------------------------------------------------------------------
+def test_connection_statement_cache():
+    cnx = SQLiteConnection()
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE t (x INTEGER, y TEXT)" )
+    for i in range( 10 ):
+        cursor.execute( "INSERT INTO t VALUES (%s, '%%')", (i,) )
+    cursor.execute( "SELECT COUNT(*), MIN(y) FROM t" )
+    assert cursor.fetchone() == (10, '%')
+    
+    cache = cnx.statement_cache
+    assert (cache.hits, cache.misses, cache.evictions) == (9, 3, 0)
+    cursor.close()
+    cnx.close()
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_statement_cache   =====#
@@ -0,0 +1,90 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import threading
+import time
+
+import pytest
+
+from Libs.ObjectSqlLib import (NotSupportedError, OperationalError, SQLiteConnection,
+                               StatementWatchDog, TimeoutConnection)
+
+
+#=============================================================================
+ENDLESS_QUERY = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+
+
+#-------------------------------------------------------------------------
+@pytest.fixture
+def watchdog():
+    watchdog = StatementWatchDog( resolution_s=0.002 )
+    watchdog.start()
+    yield watchdog
+    watchdog.stop()
+
+
+#=============================================================================
+def test_cancelled_statement(watchdog):
+    cnx = TimeoutConnection( SQLiteConnection(':memory:'), timeout_s=0.05, watchdog=watchdog )
+    cursor = cnx.cursor()
+    start = time.perf_counter()
+    with pytest.raises( OperationalError, match="timeout of 0.05 s" ):
+        cursor.execute( ENDLESS_QUERY )
+    assert time.perf_counter() - start < 1.0
+    assert cursor.timeouts_count == 1 and cursor.messages[-1][0] is OperationalError
+    
+    cursor.execute( "SELECT 1" )
+    assert cursor.fetchall() == [ (1,) ] and cursor.messages == []
+    assert len( watchdog ) == 0 and watchdog.expired_count == 1
+    
+    cursor.timeout_s = None
+    cursor.execute( "SELECT 2" )
+    assert cursor.fetchone() == (2,)
+    assert cnx.cursor().timeout_s == 0.05
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_many_deadlines(watchdog):
+    threads_count = threading.active_count()
+    start = time.perf_counter()
+    cancelled = []
+    deadlines = [ watchdog.arm(0.5 + i * 1e-5, lambda i=i: cancelled.append(i)) for i in range(5000) ]
+    assert len( watchdog ) == 5000 and threading.active_count() == threads_count
+    
+    assert not any( watchdog.disarm(deadline) for deadline in deadlines[1::2] )
+    assert len( watchdog ) == 2500
+    while len( watchdog ) and time.perf_counter() - start < 5.0:
+        time.sleep( 0.01 )
+    assert len( watchdog ) == 0 and watchdog.expired_count == 2500
+    assert cancelled == list( range(0, 5000, 2) )
+    assert all( watchdog.disarm(deadline) for deadline in deadlines[0::2] )
+    
+    def _not_supported():
+        raise NotSupportedError( "no cancel" )
+    deadline = watchdog.arm( 0.0, _not_supported )
+    assert deadline.wait_cancelled( 1.0 ) and watchdog.disarm( deadline )
+    assert isinstance( deadline.cancel_error, NotSupportedError )
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_statement_timeout   =====#
@@ -0,0 +1,101 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import tracemalloc
+from typing import List, Optional, Tuple
+
+import pytest
+
+from Libs.ObjectSqlLib import Cursor, StreamingCursor
+
+
+#=============================================================================
+class GeneratedCursor( Cursor ):
+    '''A forward-only source cursor which generates its rows on the fly.
+    
+    The operation is the count of rows to generate.
+    '''
+    def __init__(self) -> None:
+        super().__init__( None )
+        self._rows = iter( () )
+    def close(self) -> None:
+        pass
+    def execute(self, operation: str, *parameters) -> None:
+        count = int( operation )
+        self._rows = ( (i, f"row #{i:012d}", float(i)) for i in range(count) )
+        self._row_count = count
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        return [ row for _, row in zip(range(size), self._rows) ]
+
+
+#-------------------------------------------------------------------------
+def _walk_through(rows_count: int) -> int:
+    '''Streams a result set forward, scrolls back to its start and forward again.
+    
+    Returns:
+        The peak of memory allocated while streaming.
+    '''
+    cursor = StreamingCursor( GeneratedCursor(), window_size=500 )
+    tracemalloc.start()
+    cursor.execute( str(rows_count) )
+    for count, row in enumerate( cursor ):
+        assert row[0] == count
+    cursor.scroll( 0, 'absolute' )
+    assert cursor.fetchone()[0] == 0
+    cursor.scroll( rows_count // 2 - 1 )
+    assert cursor.fetchmany( 3 )[0][0] == rows_count // 2
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cursor.close()
+    return peak
+
+
+#=============================================================================
+def test_scroll():
+    cursor = StreamingCursor( GeneratedCursor(), window_size=10 )
+    cursor.execute( '95' )
+    assert [ r[0] for r in cursor.fetchmany(15) ] == list( range(15) )
+    cursor.scroll( 60 )
+    assert cursor.fetchone()[0] == 75 and cursor.rownumber == 76
+    cursor.scroll( -70 )
+    assert [ r[0] for r in cursor.fetchmany(12) ] == list( range(6, 18) )
+    cursor.scroll( 95, mode='absolute' )
+    assert cursor.fetchone() is None
+    with pytest.raises( IndexError ):
+        cursor.scroll( 1 )
+    with pytest.raises( IndexError ):
+        cursor.scroll( -1, mode='absolute' )
+    assert cursor.rownumber == 95
+    cursor.scroll( 90, mode='absolute' )
+    assert len( cursor.fetchall() ) == 5 and cursor.spooled_rows_count == 95
+    cursor.close()
+
+
+#-------------------------------------------------------------------------
+def test_memory_stays_flat():
+    small_peak = _walk_through( 20_000 )
+    large_peak = _walk_through( 200_000 )
+    assert large_peak < 1.5 * small_peak
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_streaming_cursor   =====#
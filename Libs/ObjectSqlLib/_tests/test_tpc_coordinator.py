@@ -0,0 +1,193 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import os
+import time
+from threading import Thread
+
+import pytest
+
+from Libs.ObjectSqlLib import OperationalError, ProgrammingError, TPCConnection, TPCCoordinator, TPCDecisionLog
+
+
+#=============================================================================
+class FakeBranch( TPCConnection ):
+    """An in-memory TPC branch which survives the crashes of its coordinators."""
+    def __init__(self, latency_s: float = 0.0, fail_on: str = '') -> None:
+        self.latency_s = latency_s
+        self.fail_on = fail_on
+        self.current = None
+        self.prepared = set()
+        self.committed = []
+        self.rolled_back = []
+    
+    def close(self): pass
+    def commit(self): pass
+    def rollback(self): pass
+    
+    def tpc_begin(self, xid):
+        self.current = xid
+    
+    def tpc_prepare(self):
+        time.sleep( self.latency_s )
+        if self.fail_on == 'prepare':
+            raise OperationalError( "prepare failed" )
+        self.prepared.add( self.current )
+    
+    def tpc_commit(self, xid=None):
+        time.sleep( self.latency_s )
+        if self.fail_on == 'commit':
+            raise OperationalError( "connection lost" )
+        xid = xid or self.current
+        self.prepared.discard( xid )
+        self.committed.append( xid )
+    
+    def tpc_rollback(self, xid=None):
+        xid = xid or self.current
+        self.prepared.discard( xid )
+        self.rolled_back.append( xid )
+    
+    def tpc_recover(self):
+        return list( self.prepared )
+
+
+#=============================================================================
+def test_parallel_commit(tmp_path):
+    branches = [ FakeBranch(latency_s=0.1) for _ in range(4) ]
+    with TPCCoordinator( branches, str(tmp_path / 'tpc.log') ) as coordinator:
+        coordinator.begin( b'tx-1' )
+        start = time.perf_counter()
+        coordinator.commit()
+        assert time.perf_counter() - start < 0.6  ## 0.8s if branches were run one after the other
+    
+    assert [ b.committed for b in branches ] == [ [(0, b'tx-1', str(i).encode())] for i in range(4) ]
+    assert TPCDecisionLog( str(tmp_path / 'tpc.log') ).decisions() == {}
+
+
+#=============================================================================
+def test_prepare_failure_rolls_back(tmp_path):
+    branches = [ FakeBranch(), FakeBranch(fail_on='prepare'), FakeBranch() ]
+    with TPCCoordinator( branches, str(tmp_path / 'tpc.log') ) as coordinator:
+        coordinator.begin( b'tx-1' )
+        with pytest.raises( OperationalError ):
+            coordinator.commit()
+        assert all( len(b.rolled_back) == 1 and not b.committed for b in branches )
+        assert os.path.getsize( tmp_path / 'tpc.log' ) == 0  ## presumed abort: nothing logged
+
+
+#=============================================================================
+def test_recovery_after_crash(tmp_path):
+    log_path = str( tmp_path / 'tpc.log' )
+    branches = [ FakeBranch(), FakeBranch(fail_on='commit'), FakeBranch() ]
+    with TPCCoordinator( branches, log_path ) as coordinator:
+        coordinator.begin( b'decided' )
+        with pytest.raises( OperationalError ):
+            coordinator.commit()
+    assert branches[1].prepared == { (0, b'decided', b'1') }
+    
+    ## a transaction prepared on a branch without any logged decision
+    branches[2].prepared.add( (0, b'undecided', b'2') )
+    
+    branches[1].fail_on = ''
+    with TPCCoordinator( branches, log_path ) as coordinator:
+        finished = coordinator.recover()
+        assert sorted( finished ) == [ (0, b'decided', b'1'), (0, b'undecided', b'2') ]
+        assert branches[1].committed == [ (0, b'decided', b'1') ]
+        assert branches[2].rolled_back == [ (0, b'undecided', b'2') ]
+        assert coordinator.log.decisions() == {}
+        
+        ## recovery is a startup procedure: it would roll back running transactions
+        coordinator.begin( b'running' )
+        with pytest.raises( ProgrammingError ):
+            coordinator.recover()
+        coordinator.rollback()
+
+
+#=============================================================================
+def test_log_batches_fsyncs(tmp_path):
+    log = TPCDecisionLog( str(tmp_path / 'tpc.log') )
+    records = [ { 'format_id': 0, 'gtrid': f'{i:04x}', 'branches': 2, 'decision': 'commit' } for i in range(400) ]
+    threads = [ Thread(target=log.append, args=(r,)) for r in records ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    log.close()
+    
+    assert len( log.decisions() ) == 400
+    assert log.fsyncs_count < 400  ## concurrent appends share fsyncs
+
+
+#=============================================================================
+class FailingFile:
+    """A log file which first write fails."""
+    def __init__(self, file) -> None:
+        self.file = file
+        self.failed = False
+    
+    def write(self, text: str) -> None:
+        if not self.failed:
+            self.failed = True
+            time.sleep( 0.010 )     ## lets more records join the group of the failed write
+            raise OSError( "no space left on device" )
+        self.file.write( text )
+    
+    def __getattr__(self, name: str):
+        return getattr( self.file, name )
+
+
+#-------------------------------------------------------------------------
+def test_log_write_failure(tmp_path):
+    log = TPCDecisionLog( str(tmp_path / 'tpc.log') )
+    log._file = FailingFile( log._file )
+    outcomes = {}
+    def append(gtrid: str) -> None:
+        try:
+            log.append( { 'format_id': 0, 'gtrid': gtrid, 'branches': 2, 'decision': 'commit' } )
+            outcomes[ gtrid ] = 'durable'
+        except OSError:
+            outcomes[ gtrid ] = 'failed'
+    threads = [ Thread(target=append, args=(f'{i:04x}',)) for i in range(50) ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    log.close()
+    
+    ## every record of the failed group gets its error, none is reported durable
+    assert len( outcomes ) == 50 and 'failed' in outcomes.values()
+    assert { key[1] for key in log.decisions() } == { g for g, outcome in outcomes.items() if outcome == 'durable' }
+    
+    branches = [ FakeBranch(), FakeBranch() ]
+    with TPCCoordinator( branches, str(tmp_path / 'tpc_2.log') ) as coordinator:
+        coordinator.log._file = FailingFile( coordinator.log._file )
+        coordinator.begin( b'tx-1' )
+        with pytest.raises( OSError ):
+            coordinator.commit()
+        assert all( len(b.rolled_back) == 1 and not b.prepared and not b.committed for b in branches )
+        coordinator.begin( b'tx-2' )
+        coordinator.commit()
+        assert coordinator.log.decisions() == {}
+
+
+#=====   end of   Libs.ObjectSqlLib._tests.test_tpc_coordinator   =====#
@@ -0,0 +1,123 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+from typing import Optional
+
+from Utils.decorators import abstract
+from .                import AsyncCursor
+
+
+#=============================================================================
+class AsyncConnection:
+    """Class of asynchronous connection objects.
+    
+    This is the asyncio counterpart of class Connection.  It is  an
+    interface,  i.e. an abstract class.  Every method that may wait
+    for the database is a coroutine that must be awaited:
+      - .close()
+      - .commit()
+      - .rollback()
+    
+    Next methods may be overwritten or overloaded in implementing
+    classes:
+      - .__init__()
+      - .cursor()
+    
+    Since constructors cannot be awaited, implementing classes should
+    provide a coroutine that opens the connection,  e.g.  a  class
+    method 'connect()'.
+    
+    Async connections are asynchronous context managers  which close
+    the connection on exit:
+    
+        async with await MyAsyncConnection.connect( dsn ) as cnx:
+            ...
+    
+    See class Connection for the documentation of the PEP 249 inter-
+    face.
+    """
+    
+    #-------------------------------------------------------------------------
+    @abstract
+    def __init__(self, _dsn     : str,
+                       _user    : Optional[str] = None,
+                       _password: Optional[str] = None,
+                       _host    : Optional[str] = None,
+                       _database: Optional[str] = None ) -> None:
+        '''Constructor.
+        
+        MUST BE IMPLEMENTED in inheriting classes.
+        See Connection.__init__().
+        '''
+        ...
+
+    #-------------------------------------------------------------------------
+    async def __aenter__(self) -> 'AsyncConnection':
+        '''Enters a runtime context - the connection is closed on exit.
+        '''
+        return self
+
+    #-------------------------------------------------------------------------
+    async def __aexit__(self, *_args) -> None:
+        '''Exits the runtime context and closes this connection.
+        '''
+        await self.close()
+
+    #-------------------------------------------------------------------------
+    @abstract
+    async def close(self) -> None:
+        '''Close the connection now.
+        
+        See Connection.close().
+        '''
+        ...
+
+    #-------------------------------------------------------------------------
+    @abstract
+    async def commit(self) -> None:
+        '''Commit any pending transaction to the database.
+        
+        See Connection.commit().
+        '''
+        ...
+
+    #-------------------------------------------------------------------------
+    def cursor(self) -> AsyncCursor:
+        '''Return a new AsyncCursor Object using the connection.
+        
+        Creating a cursor does not wait for the database and is not
+        a coroutine. See Connection.cursor().
+        '''
+        return AsyncCursor( self )
+
+    #-------------------------------------------------------------------------
+    @abstract
+    async def rollback(self) -> None:
+        '''This method is optional since not all databases provide transaction support.
+        
+        See Connection.rollback().
+        '''
+        ...
+
+
+#=====   end of   Libs.ObjectSqlLib.async_connection   =====#
@@ -0,0 +1,322 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+from typing import ForwardRef, List, Optional, Tuple, Union
+
+from Utils.decorators import abstract
+from . import ExtensionMessages, TYPE, warning
+
+
+#=============================================================================
+AsyncConnectionRef = ForwardRef( "AsyncConnection" )
+AsyncCursorRef     = ForwardRef( "AsyncCursor" )
+
+
+#=============================================================================
+class AsyncCursor:
+    """The class of asynchronous DB cursors.
+    
+    This is the asyncio counterpart of class Cursor.  It  mirrors the
+    PEP 249 interface of Cursor, except that every method that may wait
+    for the database is a coroutine that must be awaited:
+      - .callproc()
+      - .close()
+      - .execute()
+      - .executemany()
+      - .fetchall()
+      - .fetchmany()
+      - .fetchone()
+      - .nextset()
+      - .scroll()
+    
+    Async cursors are asynchronous iterators. Rows are streamed by
+    batches of '.arraysize' rows:
+    
+        await cursor.execute( "SELECT ..." )
+        async for row in cursor:
+            ...
+    
+    Implementing classes are expected to run their I/O on the event
+    loop (e.g. with asyncio streams), so that thousands of concurrent
+    queries run without any thread per query.
+    
+    See class Cursor for the documentation of the PEP 249 interface.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, parent_connection: AsyncConnectionRef) -> None:
+        '''Constructor.
+        
+        Args:
+            parent_connection: AsyncConnectionRef
+                A reference  to  the  connection  from  which  this
+                cursor has been instantiated.
+        '''
+        self._connection = parent_connection
+        self._row_count = self.NO_ROW_COUNT
+        self._row_number = 0
+        self._last_row_id = None
+        self._array_size = 1
+        self._messages: ExtensionMessages = []
+        self._description = None
+        self._rows_batch: List[Tuple] = []
+        self._rows_batch_index = 0
+
+    #-------------------------------------------------------------------------
+    async def __aenter__(self) -> AsyncCursorRef:
+        '''Enters a runtime context - the cursor is closed on exit.
+        '''
+        return self
+
+    #-------------------------------------------------------------------------
+    async def __aexit__(self, *_args) -> None:
+        '''Exits the runtime context and closes this cursor.
+        '''
+        await self.close()
+
+    #-------------------------------------------------------------------------
+    def __aiter__(self) -> AsyncCursorRef:
+        '''Returns self to make cursors compatible to the asynchronous iteration protocol.
+        '''
+        return self
+
+    #-------------------------------------------------------------------------
+    async def __anext__(self) -> Tuple:
+        '''Returns the next row from the currently executing SQL statement.
+        
+        Rows are fetched by batches of '.arraysize' rows with a call to
+        '.fetchmany()' each time the current batch is exhausted.
+        
+        Raises:
+            StopAsyncIteration: the result set is exhausted.
+        '''
+        if self._rows_batch_index >= len( self._rows_batch ):
+            self._rows_batch = await self.fetchmany( self._array_size )
+            self._rows_batch_index = 0
+            if not self._rows_batch:
+                raise StopAsyncIteration
+        
+        row = self._rows_batch[ self._rows_batch_index ]
+        self._rows_batch_index += 1
+        return row
+
+    #-------------------------------------------------------------------------
+    @property
+    def arraysize(self) -> int:
+        '''Specifies the number of rows to fetch at a time with .fetchmany() and with asynchronous iterations.
+        
+        It defaults to 1 meaning to fetch a single row at a time.
+        '''
+        return self._array_size
+        
+    @arraysize.setter
+    def arraysize(self, size: int) -> None:
+        '''Specifies the number of rows to fetch at a time with .fetchmany() and with asynchronous iterations.
+        '''
+        assert size > 0
+        self._array_size = size
+
+    #-------------------------------------------------------------------------
+    @property
+    def connection(self) -> AsyncConnectionRef:
+        '''Returns a reference to the AsyncConnection object on which the cursor was created.
+        '''
+        warning( "DB-API extension AsyncCursor.connection used" )
+        return self._connection
+
+    #-------------------------------------------------------------------------
+    @property
+    def description(self) -> Optional[Tuple[Tuple[str, TYPE, Optional[int], Optional[int], Optional[int], Optional[int], Optional[bool]]]]:
+        '''This read-only attribute is a sequence of 7-item sequences.
+        
+        It is based on protected attribute '._description'  which  is
+        to be set by the '.execute*()' methods. See Cursor.description.
+        '''
+        return self._description
+
+    #-------------------------------------------------------------------------
+    @property
+    def lastrowid(self) -> int:
+        '''Provides the rowid of the last modified row.
+        '''
+        warning( "DB-API extension AsyncCursor.lastrowid used" )
+        return self._last_row_id
+
+    #-------------------------------------------------------------------------
+    @property
+    def messages(self) -> ExtensionMessages:
+        '''The list of messages which the interfaces receives from the underlying database for this cursor.
+        '''
+        warning( "DB-API extension AsyncCursor.messages used" )
+        return self._messages
+
+    #-------------------------------------------------------------------------
+    @property
+    def rowcount(self) -> int:
+        '''Specifies the number of rows that the last .execute*() produced or affected.
+        
+        It  is  based  on  protected  attribute '._row_count' which
+        should be set in '.execute*()' methods. See Cursor.rowcount.
+        '''
+        return self._row_count
+
+    #-------------------------------------------------------------------------
+    @property
+    def rownumber(self) -> int:
+        '''provide the current 0-based index of the cursor
+        '''
+        warning( "DB-API extension AsyncCursor.rownumber used" )
+        return self._row_number
+
+    #-------------------------------------------------------------------------
+    @abstract
+    async def callproc(self, proc_name: str, *parameters) -> Optional:
+        '''Calls a stored database procedure with the given name.
+        
+        See Cursor.callproc().
+        '''
+        ...
+
+    #-------------------------------------------------------------------------
+    @abstract
+    async def close(self) -> None:
+        '''Closes the cursor now.
+        
+        See Cursor.close().
+        '''
+        ...
+
+    #-------------------------------------------------------------------------
+    @abstract
+    async def execute(self, operation: str, *parameters) -> Optional:
+        '''Prepares and executes a database operation (query or command).
+        
+        Implementations must reset the rows batch of the asynchronous
+        iterations with a call to '._reset_rows_batch()'.
+        See Cursor.execute().
+        '''
+        ...
+
+    #-------------------------------------------------------------------------
+    @abstract
+    async def executemany(self, operation: str, seq_of_parameters: tuple) -> Optional:
+        '''Prepares a database operation (query or command) and then execute it against all parameter sequences or mappings found in the sequence seq_of_parameters.
+        
+        See Cursor.executemany().
+        '''
+        ...
+
+    #-------------------------------------------------------------------------
+    @abstract
+    async def fetchall(self) -> List[Tuple]:
+        '''Fetch all (remaining) rows of a query result.
+        
+        See Cursor.fetchall().
+        '''
+        ...
+
+    #-------------------------------------------------------------------------
+    @abstract
+    async def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        '''Fetch the next set of rows of a query result.
+        
+        See Cursor.fetchmany().
+        '''
+        ...
+
+    #-------------------------------------------------------------------------
+    @abstract
+    async def fetchone(self) -> Optional[Tuple]:
+        '''Fetch the next row of a query result set.
+        
+        See Cursor.fetchone().
+        '''
+        ...
+
+    #-------------------------------------------------------------------------
+    @abstract
+    async def nextset(self) -> Optional[bool]:
+        '''Makes the cursor skip to the next available set.
+        
+        See Cursor.nextset().
+        '''
+        ...
+
+    #-------------------------------------------------------------------------
+    @abstract
+    async def scroll(self, value: int, mode: Optional[str] = 'relative') -> None:
+        '''Scrolls the cursor in the result set to a new position according to mode.
+        
+        See Cursor.scroll().
+        '''
+        warning( "DB-API extension AsyncCursor.scroll() used" )
+
+    #-------------------------------------------------------------------------
+    @abstract
+    def setinputsizes(self, sizes: Tuple[Union[int,TYPE]]) -> None:
+        '''This can be used before a call to .execute*() to predefine memory areas for the operation's parameters.
+        
+        This method does not wait for the database and is not a coroutine.
+        See Cursor.setinputsizes().
+        '''
+        ...
+
+    #-------------------------------------------------------------------------
+    @abstract
+    def setoutputsize(self, size: int, column_index: Optional[int] = None) -> None:
+        '''Sets a column buffer size for fetches of large columns (e.g. LONGs, BLOBs, etc.).
+        
+        This method does not wait for the database and is not a coroutine.
+        See Cursor.setoutputsize().
+        '''
+        ...
+
+    #-------------------------------------------------------------------------
+    def _add_message(self, exc_ref: Exception, exc_value: object) -> None:
+        '''Appends a message to the list of messages received from the DB interface.
+        '''
+        warning( "DB-API extension AsyncCursor.messages used - add message")
+        self._messages.append( (exc_ref, exc_value) )
+
+    #-------------------------------------------------------------------------
+    def _clear_messages(self) -> None:
+        '''Clears the list of messages received from the DB interface.
+        '''
+        warning( "DB-API extension AsyncCursor.messages used - clear messages")
+        del self._messages[:]
+
+    #-------------------------------------------------------------------------
+    def _reset_rows_batch(self) -> None:
+        '''Drops the rows batch of the asynchronous iterations.
+        
+        This is not part of PEP 249.  It is to be called by  implem-
+        entations of the '.execute*()' and '.nextset()' methods.
+        '''
+        self._rows_batch = []
+        self._rows_batch_index = 0
+
+    #-------------------------------------------------------------------------
+    # Class data
+    NO_ROW_COUNT = -1
+
+#=====   end of   Libs.ObjectSqlLib.async_cursor   =====#
@@ -0,0 +1,293 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the batching engine of '.executemany()'.
+#
+# Sequences of parameters - or any iterable of them, generators included -
+# are split into chunks bounded by a count of rows and by a budget of
+# bytes.  INSERT ... VALUES (%s, ...) operations (paramstyle 'format')
+# are rewritten into multi-row VALUES statements, so that every chunk
+# costs one round trip to the database rather than one per row.
+#
+
+#=============================================================================
+import re
+from time   import perf_counter
+from typing import ForwardRef, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+
+#=============================================================================
+CursorRef = ForwardRef( "Cursor" )
+
+
+#=============================================================================
+class BatchTiming( NamedTuple ):
+    """The class of timings of single batches.
+    
+    Attributes:
+        rows: int
+            The count of rows of the batch.
+        bytes: int
+            The estimated size of the parameters of the batch.
+        duration_s: float
+            The duration of the batch, expressed as a fractional value
+            of seconds.
+    """
+    rows      : int
+    bytes     : int
+    duration_s: float
+
+
+#=============================================================================
+class BatchReport:
+    """The class of reports of batched operations.
+    
+    Reports list the timing of every batch and provide the totals of
+    rows, bytes and duration, plus the throughput in rows per second.
+    """
+    #-------------------------------------------------------------------------
+    def __init__(self) -> None:
+        '''Constructor.
+        '''
+        self.batches: List[BatchTiming] = []
+
+    #-------------------------------------------------------------------------
+    def __repr__(self) -> str:
+        return ( f"BatchReport(batches={len(self.batches)}, rows={self.rows}, "
+                 f"bytes={self.bytes}, duration_s={self.duration_s:.6f})" )
+
+    #-------------------------------------------------------------------------
+    @property
+    def bytes(self) -> int:
+        '''The estimated size of all the processed parameters.
+        '''
+        return sum( b.bytes for b in self.batches )
+
+    #-------------------------------------------------------------------------
+    @property
+    def duration_s(self) -> float:
+        '''The cumulated duration of the batches, in seconds.
+        '''
+        return sum( b.duration_s for b in self.batches )
+
+    #-------------------------------------------------------------------------
+    @property
+    def rows(self) -> int:
+        '''The count of processed rows.
+        '''
+        return sum( b.rows for b in self.batches )
+
+    #-------------------------------------------------------------------------
+    @property
+    def rows_per_s(self) -> float:
+        '''The throughput of the batches, in rows per second.
+        '''
+        duration_s = self.duration_s
+        return self.rows / duration_s if duration_s > 0.0 else 0.0
+
+    #-------------------------------------------------------------------------
+    def add(self, rows: int, bytes_count: int, duration_s: float) -> None:
+        '''Appends the timing of a batch to this report.
+        '''
+        self.batches.append( BatchTiming(rows, bytes_count, duration_s) )
+
+
+#=============================================================================
+def chunks(seq_of_parameters: Iterable[Sequence],
+           max_rows         : int,
+           max_bytes        : Optional[int] = None) -> Iterator[Tuple[List[Sequence], int]]:
+    '''Splits an iterable of parameters into chunks.
+    
+    The iterable is consumed lazily, so that generators of parameters
+    are never fully held in memory.
+    
+    Args:
+        seq_of_parameters: Iterable[Sequence]
+            The parameters of the successive rows.
+        max_rows: int
+            The maximum count of rows per chunk.
+        max_bytes: int
+            The budget of bytes per chunk,  as estimated by function
+            'parameters_size()'. A chunk always contains at least one
+            row, whatever its size. May be None for no budget.
+            Defaults to None.
+    
+    Yields:
+        The successive chunks and their estimated size in bytes.
+    '''
+    assert max_rows > 0
+    chunk, chunk_bytes = [], 0
+    for parameters in seq_of_parameters:
+        size = parameters_size( parameters )
+        if chunk and max_bytes is not None and chunk_bytes + size > max_bytes:
+            yield chunk, chunk_bytes
+            chunk, chunk_bytes = [], 0
+        chunk.append( parameters )
+        chunk_bytes += size
+        if len( chunk ) >= max_rows:
+            yield chunk, chunk_bytes
+            chunk, chunk_bytes = [], 0
+    if chunk:
+        yield chunk, chunk_bytes
+
+
+#-------------------------------------------------------------------------
+def execute_batched(cursor           : CursorRef,
+                    operation        : str,
+                    seq_of_parameters: Iterable[Sequence],
+                    max_rows         : int = 1000,
+                    max_bytes        : Optional[int] = 1 << 20,
+                    max_parameters   : int = 32766) -> BatchReport:
+    '''Executes an operation against all the parameters of an iterable, batch after batch.
+    
+    When the operation is a single-row INSERT ... VALUES (%s, ...), it
+    is  rewritten  into  a  multi-row  statement  executed  once per
+    chunk with '.execute()'. Otherwise, chunks are executed row after
+    row with '.execute()'.
+    
+    The '._row_count' of the cursor is set to the total count of rows
+    affected by the batches, or to -1 if it cannot be determined.
+    
+    Args:
+        cursor: Cursor
+            The cursor that executes the batches.
+        operation: str
+            The operation to execute, with paramstyle 'format'.
+        seq_of_parameters: Iterable[Sequence]
+            The parameters of the successive rows. May be a generator.
+        max_rows: int
+            The maximum count of rows per batch. Defaults to 1000.
+        max_bytes: int
+            The budget of bytes per batch. May be None. Defaults to 1 MB.
+        max_parameters: int
+            The maximum count of parameters per statement  accepted  by
+            the database. Defaults to 32766 (SQLite).
+    
+    Returns:
+        The report of the timings of the batches.
+    '''
+    report = BatchReport()
+    row_count = 0
+    placeholders_count = multi_row_placeholders_count( operation )
+    
+    if placeholders_count is None:
+        for chunk, chunk_bytes in chunks( seq_of_parameters, max_rows, max_bytes ):
+            start = perf_counter()
+            for parameters in chunk:
+                cursor.execute( operation, parameters )
+                row_count = _add_row_count( row_count, cursor._row_count )
+            report.add( len(chunk), chunk_bytes, perf_counter() - start )
+    
+    else:
+        max_rows = max( 1, min(max_rows, max_parameters // placeholders_count) )
+        rewritten_rows_count, rewritten = 0, operation
+        for chunk, chunk_bytes in chunks( seq_of_parameters, max_rows, max_bytes ):
+            start = perf_counter()
+            if len( chunk ) != rewritten_rows_count:
+                rewritten_rows_count = len( chunk )
+                rewritten = rewrite_multi_row_insert( operation, rewritten_rows_count )
+            cursor.execute( rewritten, [v for parameters in chunk for v in parameters] )
+            row_count = _add_row_count( row_count, cursor._row_count )
+            report.add( len(chunk), chunk_bytes, perf_counter() - start )
+    
+    cursor._row_count = row_count
+    return report
+
+
+#-------------------------------------------------------------------------
+def multi_row_placeholders_count(operation: str) -> Optional[int]:
+    '''Returns the count of placeholders of a single-row INSERT operation that can be rewritten.
+    
+    Args:
+        operation: str
+            The operation to check, with paramstyle 'format'.
+    
+    Returns:
+        The count of '%s' placeholders of the VALUES tuple,  or None
+        if the operation cannot be rewritten into a multi-row one.
+    '''
+    match = _INSERT_VALUES.match( operation )
+    if match is None or '%s' in match.group( 'suffix' ):
+        return None
+    return match.group( 'values' ).count( '%s' )
+
+
+#-------------------------------------------------------------------------
+def parameters_size(parameters: Sequence) -> int:
+    '''Returns an estimation of the size in bytes of the parameters of a row.
+    
+    Strings and binary values count for their length, other values
+    count for 8 bytes.
+    '''
+    size = 0
+    for value in ( parameters.values() if isinstance(parameters, dict) else parameters ):
+        if isinstance( value, (str, bytes, bytearray) ):
+            size += len( value )
+        elif isinstance( value, memoryview ):
+            size += value.nbytes
+        else:
+            size += 8
+    return size
+
+
+#-------------------------------------------------------------------------
+def rewrite_multi_row_insert(operation: str, rows_count: int) -> str:
+    '''Rewrites a single-row INSERT ... VALUES (%s, ...) operation into a multi-row one.
+    
+    Args:
+        operation: str
+            The single-row operation, with paramstyle 'format'.
+        rows_count: int
+            The count of rows of the rewritten operation.
+    
+    Returns:
+        The rewritten operation.
+    
+    Raises:
+        ValueError: the operation cannot be rewritten.
+    '''
+    assert rows_count > 0
+    if multi_row_placeholders_count( operation ) is None:
+        raise ValueError( f"operation cannot be rewritten as a multi-row INSERT: {operation!r}" )
+    match = _INSERT_VALUES.match( operation )
+    values = match.group( 'values' )
+    return ( match.group('prefix') + 
+             ', '.join( [values] * rows_count ) +
+             match.group('suffix') )
+
+
+#-------------------------------------------------------------------------
+def _add_row_count(total: int, row_count: int) -> int:
+    '''Cumulates row counts, -1 meaning undetermined.
+    '''
+    return -1 if total < 0 or row_count is None or row_count < 0 else total + row_count
+
+
+#-------------------------------------------------------------------------
+_INSERT_VALUES = re.compile( r"(?P<prefix>\s*INSERT\s+INTO\s+[^;]+?\s+VALUES\s*)"
+                             r"(?P<values>\(\s*%s(?:\s*,\s*%s)*\s*\))"
+                             r"(?P<suffix>[^;]*;?\s*)$",
+                             re.IGNORECASE | re.DOTALL )
+
+
+#=====   end of   Libs.ObjectSqlLib.batching   =====#
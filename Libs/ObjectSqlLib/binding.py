@@ -0,0 +1,277 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the compiled binding of parameters to operations.
+#
+# Operations are parsed once into their literal segments and the refer-
+# ences of their placeholders, whatever their paramstyle: 'format',
+# 'pyformat', 'named', 'numeric' or 'qmark'.  Compiled operations are
+# cached per text and paramstyle.  They may then be:
+#
+#    - translated into a positional paramstyle, e.g. the native one of
+#      a driver, with '.arguments()' ordering the parameters accordingly;
+#    - rendered with their parameters as SQL literals,  for  the drivers
+#      and the tools which need the final text of operations.
+#
+# Rendering dispatches on the exact type of values to type-specialized
+# escapers (see ESCAPERS) and formats the whole text with a single '%'
+# formatting of a precompiled template.
+#
+# As with any paramstyle 'format' driver,  '%%' stands for a single '%'
+# everywhere in 'format' and 'pyformat' operations,  literals included.
+# With the other paramstyles,  placeholders are searched outside string
+# literals, quoted identifiers and comments only.
+#
+
+#=============================================================================
+import datetime
+import math
+import re
+from decimal   import Decimal
+from functools import lru_cache
+from operator  import itemgetter
+from typing    import Callable, Dict, Mapping, Sequence, Tuple, Union
+
+from . import ProgrammingError
+
+
+#=============================================================================
+class CompiledOperation:
+    """The class of operations parsed into literal segments and placeholders.
+    
+    Attributes:
+        paramstyle: str
+            The paramstyle of the operation.
+        segments: Tuple[str, ...]
+            The literal texts of the operation around its placeholders,
+            one more than the placeholders. '%%' are unescaped.
+        keys: Tuple[Union[int, str], ...]
+            The references of the placeholders, in order: the indexes of
+            the positional parameters or the names of the named ones.
+    """
+    __slots__ = ( 'paramstyle', 'segments', 'keys', '_arguments', '_template', '_translations' )
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, paramstyle: str,
+                       segments  : Tuple[str, ...],
+                       keys      : Tuple[Union[int, str], ...]) -> None:
+        '''Constructor.
+        
+        Use function compile_operation() rather than this constructor,
+        so that compiled operations are cached.
+        '''
+        assert len( segments ) == len( keys ) + 1
+        self.paramstyle = paramstyle
+        self.segments = segments
+        self.keys = keys
+        self._template = '%s'.join( segment.replace('%', '%%') for segment in segments )
+        self._translations: Dict[str, str] = {}
+        if keys == tuple( range(len(keys)) ):
+            self._arguments = None  ## the parameters are the arguments
+        elif len( keys ) == 1:
+            key = keys[0]
+            self._arguments = lambda parameters: ( parameters[key], )
+        else:
+            self._arguments = itemgetter( *keys )
+
+    #-------------------------------------------------------------------------
+    def arguments(self, parameters: Union[Sequence, Mapping]) -> Sequence:
+        '''Returns the parameters in the order of the placeholders.
+        
+        These are the arguments of the translations of this operation
+        into positional paramstyles (see '.translated()').
+        
+        Raises:
+            ProgrammingError: parameters do not match the placeholders.
+        '''
+        try:
+            if self._arguments is None:
+                if len( parameters ) != len( self.keys ) or isinstance( parameters, dict ):
+                    raise TypeError
+                return parameters
+            return self._arguments( parameters )
+        except (IndexError, KeyError, TypeError):
+            raise ProgrammingError( f"parameters {parameters!r} do not match the {len(self.keys)} placeholders "
+                                    f"of paramstyle '{self.paramstyle}' of the operation" ) from None
+
+    #-------------------------------------------------------------------------
+    def render(self, parameters: Union[Sequence, Mapping] = ()) -> str:
+        '''Returns the text of this operation with its parameters rendered as SQL literals.
+        
+        Raises:
+            ProgrammingError: parameters do not match the placeholders, or
+                values have no escaper.
+        '''
+        if self._arguments is not None or len( parameters ) != len( self.keys ) or isinstance( parameters, dict ):
+            parameters = self.arguments( parameters )
+        try:
+            return self._template % tuple( [ESCAPERS[type(value)](value) for value in parameters] )
+        except KeyError:
+            return self._template % tuple( [escape_literal(value) for value in parameters] )
+
+    #-------------------------------------------------------------------------
+    def translated(self, paramstyle: str) -> str:
+        '''Returns the text of this operation with positional placeholders.
+        
+        Translations are cached.
+        
+        Args:
+            paramstyle: str
+                'qmark', 'numeric', 'format',  or 'dollar' for the $1,
+                $2, ... placeholders of PostgreSQL.  The arguments of the
+                translated operation are returned by '.arguments()'.
+        '''
+        try:
+            return self._translations[ paramstyle ]
+        except KeyError:
+            pass
+        placeholder = _POSITIONAL_PLACEHOLDERS[ paramstyle ]
+        segments = self.segments
+        if paramstyle == 'format':
+            segments = [ segment.replace('%', '%%') for segment in segments ]
+        parts = [ segments[0] ]
+        for index, segment in enumerate( segments[1:] ):
+            parts += [ placeholder.format(index + 1), segment ]
+        text = self._translations[ paramstyle ] = ''.join( parts )
+        return text
+
+
+#=============================================================================
+@lru_cache( maxsize=4096 )
+def compile_operation(operation: str, paramstyle: str = 'format') -> CompiledOperation:
+    '''Parses an operation into its literal segments and its placeholders.
+    
+    Compiled operations are cached per arguments.
+    
+    Args:
+        operation: str
+            The text of the operation.
+        paramstyle: str
+            The paramstyle of the operation, as specified by PEP 249.
+            Defaults to 'format', the one of this library.
+    
+    Raises:
+        ProgrammingError: the paramstyle is unknown, or the operation
+            mixes numbered and unnumbered placeholders.
+    '''
+    try:
+        tokens = _TOKENS[ paramstyle ]
+    except KeyError:
+        raise ProgrammingError( f"unknown paramstyle '{paramstyle}'" ) from None
+    
+    segments = []
+    keys = []
+    literal = []
+    position = 0
+    for match in tokens.finditer( operation ):
+        token = match.group()
+        if token == '%%':
+            literal += [ operation[position:match.start()], '%' ]
+        elif match.lastindex is None and token[0] != '?' and token != '%s':
+            continue  ## a string literal, a quoted identifier or a comment
+        else:
+            literal.append( operation[position:match.start()] )
+            segments.append( ''.join(literal) )
+            literal = []
+            if paramstyle == 'numeric':
+                keys.append( int(match.group(1)) - 1 )
+            elif match.lastindex is not None:
+                keys.append( match.group(1) )
+            else:
+                keys.append( len(keys) )
+        position = match.end()
+    literal.append( operation[position:] )
+    segments.append( ''.join(literal) )
+    
+    if paramstyle == 'numeric' and keys and min( keys ) < 0:
+        raise ProgrammingError( "numeric placeholders are numbered from 1" )
+    return CompiledOperation( paramstyle, tuple(segments), tuple(keys) )
+
+
+#-------------------------------------------------------------------------
+def escape_literal(value: object) -> str:
+    '''Returns the SQL literal of a value.
+    
+    Values are escaped by the escaper of their type in ESCAPERS or,
+    failing that, of their nearest base type, which is then registered
+    for their type.
+    
+    Raises:
+        ProgrammingError: there is no escaper for the type of value.
+    '''
+    value_type = type( value )
+    try:
+        return ESCAPERS[ value_type ]( value )
+    except KeyError:
+        pass
+    for base in value_type.__mro__[1:]:
+        if base in ESCAPERS:
+            escaper = ESCAPERS[ value_type ] = ESCAPERS[ base ]
+            return escaper( value )
+    raise ProgrammingError( f"values of type '{value_type.__name__}' cannot be rendered as SQL literals" )
+
+
+#=============================================================================
+## Type-specialized escapers, keyed by exact type of values
+def _escape_binary(value: Union[bytes, bytearray, memoryview]) -> str:
+    return f"X'{value.hex()}'"
+
+def _escape_float(value: float) -> str:
+    if math.isfinite( value ):
+        return repr( value )
+    return "'NaN'" if value != value else ( "'Infinity'" if value > 0 else "'-Infinity'" )
+
+def _escape_str(value: str) -> str:
+    return "'" + value.replace( "'", "''" ) + "'"
+
+ESCAPERS: Dict[type, Callable[[object], str]] = {
+    int              : int.__repr__,
+    float            : _escape_float,
+    str              : _escape_str,
+    bool             : lambda value: 'TRUE' if value else 'FALSE',
+    type(None)       : lambda value: 'NULL',
+    Decimal          : lambda value: str( value ) if value.is_finite() else f"'{value}'",
+    bytes            : _escape_binary,
+    bytearray        : _escape_binary,
+    memoryview       : _escape_binary,
+    datetime.date    : lambda value: f"'{value.isoformat()}'",
+    datetime.datetime: lambda value: f"'{value.isoformat(' ')}'",
+    datetime.time    : lambda value: f"'{value.isoformat()}'",
+}
+
+
+#=============================================================================
+_POSITIONAL_PLACEHOLDERS = { 'qmark': '?', 'numeric': ':{}', 'format': '%s', 'dollar': '${}' }
+
+_QUOTED = r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/"
+
+_TOKENS = {
+    'format'  : re.compile( r'%%|%s' ),
+    'pyformat': re.compile( r'%%|%\((\w+)\)s' ),
+    'named'   : re.compile( rf'{_QUOTED}|::|:([A-Za-z_]\w*)', re.DOTALL ),
+    'numeric' : re.compile( rf'{_QUOTED}|::|:(\d+)', re.DOTALL ),
+    'qmark'   : re.compile( rf'{_QUOTED}|\?', re.DOTALL ),
+}
+
+
+#=====   end of   Libs.ObjectSqlLib.binding   =====#
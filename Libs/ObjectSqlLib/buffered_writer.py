@@ -0,0 +1,364 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the write-behind buffering of inserted rows.
+#
+# A BufferedWriter accumulates the rows inserted into tables, one buffer
+# per table,  and flushes every buffer as a single batched executemany
+# (see module batching) once it reaches a count of rows or a budget of
+# bytes,  or on the periodic tick of a repeated timer.  Producers which
+# insert rows faster than the database absorbs them are blocked  once
+# the writer holds its maximum count of rows,  buffered or being flushed.
+#
+
+#=============================================================================
+from threading import Condition, Lock
+from time      import monotonic, perf_counter
+from typing    import Dict, List, Optional, Sequence, Tuple
+
+from Utils.repeated_timer import RepeatedTimer
+from .                    import Connection, InterfaceError, OperationalError
+from .batching            import parameters_size
+from .instrumentation     import LatencyHistogram
+
+
+#=============================================================================
+TableKey = Tuple[ str, Optional[Tuple[str, ...]] ]  ## (table name, column names or None)
+
+
+#=============================================================================
+class BufferedWriter:
+    """The class of write-behind buffers of inserted rows.
+    
+    Rows are inserted with '.insert()' and written later,  by batches,
+    with the cursor of the writer.  A buffer gets flushed:
+      - by the inserting thread, when it reaches '.max_rows' rows or
+        '.max_bytes' bytes;
+      - by the inserting thread, together with all other buffers, when
+        the writer holds '.max_buffered_rows' rows;
+      - by the timer of the writer, every '.flush_period_s' seconds;
+      - by '.flush()' and '.close()'.
+    Flushes are serialized,  so that the wrapped connection is used by
+    a single thread at a time.  Every flush is committed when '.commit'
+    is True.
+    
+    A failed flush is rolled back and its rows are dropped.  Its error
+    is raised by the next call to '.insert()' or '.flush()'.
+    
+    Usage:
+        with BufferedWriter( cnx, max_rows=500, flush_period_s=0.5 ) as writer:
+            for sample in telemetry:
+                writer.insert( 'samples', (sample.time, sample.value), ('time', 'value') )
+        ## rows are all flushed here
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, connection       : Connection,
+                       max_rows         : int = 1000,
+                       max_bytes        : Optional[int] = 1 << 20,
+                       flush_period_s   : Optional[float] = 1.0,
+                       max_buffered_rows: int = 100_000,
+                       block_timeout_s  : Optional[float] = 30.0,
+                       commit           : bool = True) -> None:
+        '''Constructor.
+        
+        Args:
+            connection: Connection
+                A reference to the connection the rows are written with.
+                It should not be used by any other thread while this
+                writer is open.
+            max_rows: int
+                The count of rows of a table which triggers the flush of
+                its buffer. Defaults to 1000.
+            max_bytes: int
+                The estimated size of the rows of a table which triggers
+                the flush of its buffer. May be None. Defaults to 1 MB.
+            flush_period_s: float
+                The period of the flushes of all buffers, in seconds. May
+                be None for no periodic flushes. Defaults to 1 second.
+            max_buffered_rows: int
+                The maximum count of rows held by this writer,  buffered
+                or being flushed. Inserting threads are blocked once it
+                is reached (backpressure). Defaults to 100,000.
+            block_timeout_s: float
+                The maximum interval of time inserting threads are blocked
+                for, in seconds. May be None to wait forever. Defaults to
+                30 seconds.
+            commit: bool
+                True if every flush is committed. Defaults to True.
+        '''
+        assert max_rows > 0 and max_buffered_rows >= max_rows
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.flush_period_s = flush_period_s
+        self.max_buffered_rows = max_buffered_rows
+        self.block_timeout_s = block_timeout_s
+        self.commit = commit
+        
+        self.latency = LatencyHistogram()   ## durations of the flushes
+        self.flushes_counts = { 'size': 0, 'tick': 0, 'call': 0 }
+        self.flushed_rows_count = 0
+        self.flushed_bytes_count = 0
+        self.max_flush_rows = 0
+        self.errors_count = 0
+        self.dropped_rows_count = 0
+        self.blocked_count = 0
+        
+        self._connection = connection
+        self._cursor = connection.cursor()
+        self._buffers: Dict[TableKey, _TableBuffer] = {}
+        self._held_rows = 0
+        self._condition = Condition()
+        self._flush_lock = Lock()
+        self._error: Optional[Exception] = None
+        self._closed = False
+        
+        self._timer = None
+        if flush_period_s is not None:
+            self._timer = _FlushTimer( flush_period_s, 'buffered-writer', self )
+            self._timer.daemon = True
+            self._timer.start()
+
+    #-------------------------------------------------------------------------
+    def __enter__(self) -> 'BufferedWriter':
+        return self
+
+    #-------------------------------------------------------------------------
+    def __exit__(self, *_args) -> None:
+        self.close()
+
+    #-------------------------------------------------------------------------
+    @property
+    def buffered_rows(self) -> int:
+        '''The count of the rows held by this writer, buffered or being flushed.
+        '''
+        return self._held_rows
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Stops the timer of this writer and flushes all its buffers.
+        
+        Does nothing if it is already closed.  The connection is not
+        closed.
+        
+        Raises:
+            Error: the last flush failed.
+        '''
+        if self._closed:
+            return
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+        try:
+            self.flush()
+        finally:
+            self._closed = True
+            self._cursor.close()
+
+    #-------------------------------------------------------------------------
+    def flush(self) -> None:
+        '''Writes all the buffered rows, synchronously.
+        
+        Raises:
+            Error: this flush or a previous one failed.
+        '''
+        self._flush( None, 'call' )
+        self._raise_error()
+
+    #-------------------------------------------------------------------------
+    def insert(self, table: str, row: Sequence, columns: Optional[Sequence[str]] = None) -> None:
+        '''Buffers a row to be inserted into a table.
+        
+        Args:
+            table: str
+                The name of the table.
+            row: Sequence
+                The values of the row.
+            columns: Sequence[str]
+                The names of the columns of the values, or None for all
+                the columns of the table in their order. Defaults to None.
+        
+        Raises:
+            Error: a previous flush failed.
+            InterfaceError: this writer is closed.
+            OperationalError: this writer has been full for more than
+                '.block_timeout_s' seconds.
+        '''
+        self._raise_error()
+        key = ( table, None if columns is None else tuple(columns) )
+        size = parameters_size( row )
+        
+        with self._condition:
+            if self._closed:
+                raise InterfaceError( "buffered writer is closed" )
+            if self._held_rows >= self.max_buffered_rows:
+                self._wait_for_room()
+            buffer = self._buffers.get( key )
+            if buffer is None:
+                buffer = self._buffers[ key ] = _TableBuffer( key, len(row) )
+            buffer.rows.append( row )
+            buffer.bytes += size
+            self._held_rows += 1
+            full = len( buffer.rows ) >= self.max_rows or (self.max_bytes is not None and buffer.bytes >= self.max_bytes)
+        
+        if full:
+            self._flush( [key], 'size' )
+
+    #-------------------------------------------------------------------------
+    def metrics(self) -> Dict:
+        '''Returns a snapshot of the metrics of this writer.
+        
+        Latencies are expressed in microseconds.
+        '''
+        flushes_count = self.latency.count
+        return { 'buffered_rows'  : self._held_rows,
+                 'flushes'        : dict( self.flushes_counts ),
+                 'flushed_rows'   : self.flushed_rows_count,
+                 'flushed_bytes'  : self.flushed_bytes_count,
+                 'mean_flush_rows': self.flushed_rows_count / flushes_count if flushes_count else 0.0,
+                 'max_flush_rows' : self.max_flush_rows,
+                 'errors'         : self.errors_count,
+                 'dropped_rows'   : self.dropped_rows_count,
+                 'blocked'        : self.blocked_count,
+                 'flush_latency'  : self.latency.to_dict() }
+
+    #-------------------------------------------------------------------------
+    def _flush(self, keys: Optional[List[TableKey]], trigger: str) -> None:
+        '''Writes the buffered rows of tables.
+        
+        Args:
+            keys: List[TableKey]
+                The keys of the buffers to flush, or None for all of them.
+            trigger: str
+                The trigger of the flush: 'size', 'tick' or 'call'.
+        '''
+        with self._flush_lock:
+            self._flush_locked( keys, trigger )
+
+    #-------------------------------------------------------------------------
+    def _flush_locked(self, keys: Optional[List[TableKey]], trigger: str) -> None:
+        '''Writes the buffered rows of tables, the flush lock being held.
+        
+        Args:
+            keys: List[TableKey]
+                The keys of the buffers to flush, or None for all of them.
+            trigger: str
+                The trigger of the flush: 'size', 'tick' or 'call'.
+        '''
+        with self._condition:
+            buffers = [ self._buffers.pop(key) for key in (keys or list(self._buffers)) if key in self._buffers ]
+        if not buffers:
+            return
+        
+        rows_count = sum( len(buffer.rows) for buffer in buffers )
+        start = perf_counter()
+        try:
+            for buffer in buffers:
+                self._cursor.executemany_batched( buffer.operation, buffer.rows, self.max_rows, self.max_bytes )
+            if self.commit:
+                self._connection.commit()
+        except Exception as e:
+            self.errors_count += 1
+            self.dropped_rows_count += rows_count
+            self._error = e
+            try:
+                self._connection.rollback()
+            except Exception:
+                pass  ## the error of the flush is the one to be reported
+        else:
+            self.latency.record( perf_counter() - start )
+            self.flushes_counts[ trigger ] += 1
+            self.flushed_rows_count += rows_count
+            self.flushed_bytes_count += sum( buffer.bytes for buffer in buffers )
+            self.max_flush_rows = max( self.max_flush_rows, rows_count )
+        finally:
+            with self._condition:
+                self._held_rows -= rows_count
+                self._condition.notify_all()
+
+    #-------------------------------------------------------------------------
+    def _raise_error(self) -> None:
+        '''Raises the error of the last failed flush, if any, once.
+        '''
+        error = self._error
+        if error is not None:
+            self._error = None
+            raise error
+
+    #-------------------------------------------------------------------------
+    def _wait_for_room(self) -> None:
+        '''Blocks the inserting thread until this writer holds less than its maximum count of rows.
+        
+        The buffered rows are flushed by the inserting thread itself when
+        no other flush is running,  so that a single thread which spreads
+        its rows over several tables does not wait for itself.  Other-
+        wise, the thread waits for the end of the running flush.
+        
+        The condition of this writer must be held.
+        
+        Raises:
+            OperationalError: no room has been available within '.block_timeout_s'.
+        '''
+        self.blocked_count += 1
+        timeout_s = self.block_timeout_s
+        deadline = None if timeout_s is None else monotonic() + timeout_s
+        while self._held_rows >= self.max_buffered_rows:
+            remaining_s = None if deadline is None else deadline - monotonic()
+            if remaining_s is not None and remaining_s <= 0.0:
+                raise OperationalError( f"buffered writer full for more than {timeout_s:.3f} s" )
+            if self._buffers and self._flush_lock.acquire( blocking=False ):
+                self._condition.release()
+                try:
+                    self._flush_locked( None, 'size' )
+                finally:
+                    self._flush_lock.release()
+                    self._condition.acquire()
+            else:
+                self._condition.wait( remaining_s )
+
+
+#=============================================================================
+class _TableBuffer:
+    """The class of the buffers of the rows inserted into a table.
+    """
+    __slots__ = ( 'operation', 'rows', 'bytes' )
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, key: TableKey, values_count: int) -> None:
+        table, columns = key
+        columns_list = '' if columns is None else f" ({', '.join(columns)})"
+        self.operation = f"INSERT INTO {table}{columns_list} VALUES ({', '.join(['%s'] * values_count)})"
+        self.rows: List[Sequence] = []
+        self.bytes = 0
+
+
+#=============================================================================
+class _FlushTimer( RepeatedTimer ):
+    """The class of the timers of the periodic flushes of buffered writers.
+    """
+    #-------------------------------------------------------------------------
+    def process(self) -> None:
+        self.args[0]._flush( None, 'tick' )
+
+
+#=====   end of   Libs.ObjectSqlLib.buffered_writer   =====#
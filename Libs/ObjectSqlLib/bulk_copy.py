@@ -0,0 +1,209 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the bulk copies of CSV streams into tables  and
+#  of tables into CSV streams.
+#
+# Input streams are consumed in fixed-size buffers and output  streams
+# are written with fixed-size buffers,  so that the memory  used  by
+# copies does not depend on the size of the copied data.  Drivers that
+# provide a native bulk copy (e.g. COPY ... FROM STDIN with PostgreSQL)
+# get the buffers of CSV text as they are read.  Other drivers get the
+# parsed rows inserted with the batching engine (see module batching).
+#
+
+#=============================================================================
+import csv
+import io
+from itertools import chain
+from time      import perf_counter
+from typing    import ForwardRef, Iterable, Iterator, Optional, Sequence, Union
+
+from .batching import BatchReport, execute_batched
+
+
+#=============================================================================
+CursorRef = ForwardRef( "Cursor" )
+
+Dialect = Union[ str, csv.Dialect, type ]
+Stream  = Union[ io.TextIOBase, Iterable[str], Iterable[Sequence] ]
+
+
+#=============================================================================
+def copy_from(cursor     : CursorRef,
+              table      : str,
+              stream     : Stream,
+              columns    : Optional[Sequence[str]] = None,
+              dialect    : Dialect = 'excel',
+              header     : bool = False,
+              null       : str = '',
+              buffer_size: int = 1 << 16,
+              max_rows   : int = 1000,
+              max_bytes  : Optional[int] = 1 << 20) -> BatchReport:
+    '''Copies the rows of a CSV stream into a table.
+    
+    See Cursor.copy_from().
+    '''
+    source = iter( stream )  if not hasattr( stream, 'read' ) else None
+    first = next( source, None ) if source is not None else None
+    
+    if source is None or isinstance( first, str ):
+        ## text input: CSV lines are read in buffers of buffer_size characters
+        lines = _lines( stream, buffer_size ) if source is None else chain( (first,), source )
+        if header:
+            names = next( csv.reader(lines, dialect), None )
+            columns = columns or names
+        report = cursor._copy_from_native( table, columns, _buffers(lines, buffer_size), dialect, null )
+        if report is not None:
+            return report
+        rows = ( [None if value == null else value for value in row] for row in csv.reader(lines, dialect) if row )
+    
+    else:
+        ## rows input
+        rows = chain( (first,), source ) if first is not None else iter( () )
+        if header:
+            columns = columns or next( rows, None )
+        report = cursor._copy_from_native( table, columns, _csv_buffers(rows, dialect, null, buffer_size),
+                                           dialect, null )
+        if report is not None:
+            return report
+    
+    first_row = next( rows, None )
+    if first_row is None:
+        cursor._row_count = 0
+        return BatchReport()
+    
+    columns_list = f" ({', '.join(columns)})" if columns else ''
+    placeholders = ', '.join( ['%s'] * len(first_row) )
+    return execute_batched( cursor, f"INSERT INTO {table}{columns_list} VALUES ({placeholders})",
+                            chain((first_row,), rows), max_rows, max_bytes )
+
+
+#-------------------------------------------------------------------------
+def copy_to(cursor     : CursorRef,
+            table      : str,
+            stream     : io.TextIOBase,
+            columns    : Optional[Sequence[str]] = None,
+            dialect    : Dialect = 'excel',
+            header     : bool = False,
+            null       : str = '',
+            buffer_size: int = 1 << 16,
+            query      : Optional[str] = None) -> BatchReport:
+    '''Copies the rows of a table, or of a query, into a CSV stream.
+    
+    See Cursor.copy_to().
+    '''
+    report = BatchReport()
+    cursor.execute( query or f"SELECT {', '.join(columns) if columns else '*'} FROM {table}" )
+    
+    buffer = io.StringIO()
+    writer = csv.writer( buffer, dialect )
+    if header:
+        writer.writerow( [d[0] for d in cursor.description] )
+    
+    batch_size = max( 1, cursor.arraysize, buffer_size // 64 )
+    buffered_rows = 0
+    start = perf_counter()
+    while True:
+        rows = cursor.fetchmany( batch_size )
+        if not rows:
+            break
+        if null:
+            rows = ( [null if value is None else value for value in row] for row in rows )
+        for row in rows:
+            writer.writerow( row )
+            buffered_rows += 1
+        if buffer.tell() >= buffer_size:
+            report.add( buffered_rows, _flush(buffer, stream), perf_counter() - start )
+            buffered_rows = 0
+            start = perf_counter()
+    
+    if buffer.tell() > 0:
+        report.add( buffered_rows, _flush(buffer, stream), perf_counter() - start )
+    cursor._row_count = report.rows
+    return report
+
+
+#-------------------------------------------------------------------------
+def _buffers(lines: Iterator[str], buffer_size: int) -> Iterator[str]:
+    '''Yields buffers of about buffer_size characters made of whole lines.
+    '''
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append( line )
+        size += len( line )
+        if size >= buffer_size:
+            yield ''.join( buffer )
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join( buffer )
+
+#-------------------------------------------------------------------------
+def _csv_buffers(rows: Iterator[Sequence], dialect: Dialect, null: str, buffer_size: int) -> Iterator[str]:
+    '''Yields buffers of about buffer_size characters of CSV text encoding rows.
+    '''
+    buffer = io.StringIO()
+    writer = csv.writer( buffer, dialect )
+    for row in rows:
+        writer.writerow( [null if value is None else value for value in row] )
+        if buffer.tell() >= buffer_size:
+            yield buffer.getvalue()
+            buffer.seek( 0 )
+            buffer.truncate()
+    if buffer.tell() > 0:
+        yield buffer.getvalue()
+
+#-------------------------------------------------------------------------
+def _flush(buffer: io.StringIO, stream: io.TextIOBase) -> int:
+    '''Writes a buffer into a stream, empties it and returns the count of written characters.
+    '''
+    text = buffer.getvalue()
+    stream.write( text )
+    buffer.seek( 0 )
+    buffer.truncate()
+    return len( text )
+
+#-------------------------------------------------------------------------
+def _lines(stream: io.TextIOBase, buffer_size: int) -> Iterator[str]:
+    '''Yields the lines of a text stream read in buffers of buffer_size characters.
+    
+    Lines keep their terminating newline, as module csv expects.
+    '''
+    tail = ''
+    while True:
+        buffer = stream.read( buffer_size )
+        if not buffer:
+            break
+        data = tail + buffer
+        start = 0
+        end = data.find( '\n' )
+        while end >= 0:
+            yield data[ start:end + 1 ]
+            start = end + 1
+            end = data.find( '\n', start )
+        tail = data[ start: ]
+    if tail:
+        yield tail
+
+
+#=====   end of   Libs.ObjectSqlLib.bulk_copy   =====#
@@ -0,0 +1,172 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the columnar layout of results sets.
+#
+# Rows are transposed into one typed buffer per column: 'array.array'
+# for numeric columns and lists of Python objects for the other ones,
+# or NumPy arrays on demand. NULL values are flagged in null masks.
+#
+
+#=============================================================================
+from array  import array
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from . import DATETIME, NUMBER, ROWID, NotSupportedError, type_matches
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+#=============================================================================
+class Column( NamedTuple ):
+    """The class of columns of results sets.
+    
+    Attributes:
+        name: str
+            The name of the column, as found in the cursor description.
+        type_code: object
+            The type code of the column, as found in the cursor description.
+        values: Union[array, list, numpy.ndarray]
+            The values of the column. Numeric columns are stored in 
+            array.array of typecode 'q' (64-bit integers) or 'd'  (do-
+            uble  floats)  while  other  columns  are lists of Python
+            objects.  NULL values are replaced with 0 in numeric  col-
+            umns and are kept as None in other columns.
+        null_mask: Union[bytearray, numpy.ndarray]
+            One byte per value, set to 1 for NULL values and to 0 for
+            other values.
+    """
+    name     : str
+    type_code: object
+    values   : Union[array, list, 'numpy.ndarray']
+    null_mask: Union[bytearray, 'numpy.ndarray']
+
+
+#=============================================================================
+def rows_to_columns(rows       : Sequence[Tuple],
+                    description: Optional[Sequence[Tuple]],
+                    as_numpy   : bool = False             ) -> List[Column]:
+    '''Transposes rows into typed columns.
+    
+    Columns described with type codes NUMBER or ROWID and columns with
+    an undefined type code (i.e. None) are converted  to  array.array 
+    when  all  their  values are 64-bit integers,  or floats and inte-
+    gers that doubles represent exactly.  Other columns - e.g. Decimal
+    ones - are kept as lists of Python objects, with no loss of preci-
+    sion.
+    
+    Args:
+        rows: Sequence[Tuple]
+            The rows to transpose, as returned by '.fetch*()'.
+        description: Sequence[Tuple]
+            The description of the columns, as returned by cursors
+            property '.description'.  May be None if rows are empty.
+        as_numpy: bool
+            Set this to True to get NumPy arrays rather than array.array
+            and lists. Defaults to False.
+    
+    Returns:
+        The list of columns, in the order of the description.
+    
+    Raises:
+        NotSupportedError: NumPy arrays are requested while NumPy is
+            not installed.
+    '''
+    if as_numpy and numpy is None:
+        raise NotSupportedError( "columnar fetch as NumPy arrays needs NumPy to be installed" )
+    if description is None:
+        return []
+    
+    columns_values = list( zip(*rows) ) if rows else [ () ] * len( description )
+    
+    columns = []
+    for descr, values in zip( description, columns_values ):
+        name, type_code = descr[0], descr[1]
+        if type_code is None or type_matches( type_code, NUMBER ) or type_matches( type_code, ROWID ):
+            values, null_mask = _numeric_values( values )
+        else:
+            null_mask = _null_mask( values )
+            values = list( values )
+        
+        if as_numpy:
+            values, null_mask = _to_numpy( values, null_mask, type_code )
+        columns.append( Column(name, type_code, values, null_mask) )
+    
+    return columns
+
+
+#-------------------------------------------------------------------------
+def _null_mask(values: Sequence) -> bytearray:
+    '''Returns the null mask of a column.
+    '''
+    if None not in values:
+        return bytearray( len(values) )
+    return bytearray( v is None for v in values )
+
+
+#-------------------------------------------------------------------------
+def _numeric_values(values: Sequence) -> Tuple[Union[array, list], bytearray]:
+    '''Converts the values of a column into a typed array, when possible.
+    
+    Columns which contain non-numeric values,  Decimals or integers
+    that neither 64-bit integers nor doubles represent exactly are re-
+    turned as lists.
+    '''
+    null_mask = _null_mask( values )
+    if any( null_mask ):
+        filled = [ 0 if v is None else v for v in values ]
+    else:
+        filled = values
+    
+    ## the common cases get converted by the C code of module array
+    try:
+        return array( 'q', filled ), null_mask
+    except (TypeError, OverflowError):
+        pass
+    if all( type(v) is float or (isinstance(v, int) and -_MAX_EXACT_INT <= v <= _MAX_EXACT_INT) for v in filled ):
+        return array( 'd', filled ), null_mask
+    return list( values ), null_mask
+
+
+#-------------------------------------------------------------------------
+_MAX_EXACT_INT = 1 << 53    ## the largest magnitude of the integers all represented by doubles
+
+
+#-------------------------------------------------------------------------
+def _to_numpy(values: Union[array, list], null_mask: bytearray, type_code: object) -> tuple:
+    '''Converts the buffers of a column into NumPy arrays.
+    
+    Typed arrays are wrapped with no copy.
+    '''
+    mask = numpy.frombuffer( null_mask, dtype=numpy.bool_ )
+    if isinstance( values, array ):
+        return numpy.frombuffer( values, dtype=numpy.int64 if values.typecode == 'q' else numpy.float64 ), mask
+    if type_matches( type_code, DATETIME ) and not mask.any():
+        return numpy.array( values, dtype='datetime64[us]' ), mask
+    return numpy.array( values, dtype=object ), mask
+
+
+#=====   end of   Libs.ObjectSqlLib.columnar   =====#
@@ -24,7 +24,8 @@ SOFTWARE.
 from typing import Optional
 
 from Utils.decorators import abstract
-from .                import Cursor, warning
+from .                import Cursor, NotSupportedError, StatementCache, warning
+from .memory_budget   import MemoryBudget
 
 
 #=============================================================================
@@ -38,6 +39,9 @@ class Connection:
       - .__init__()
       - .__del__()
       - .cursor()
+      - ._cancel()
+      - ._prepare_statement()
+      - ._release_statement()
     
     It conforms to PEP 249 - Python Database API Specification v2.0.
     The docstrings are copies of text published at:
@@ -129,6 +133,54 @@ class Connection:
         '''
         return Cursor( self )
 
+    #-------------------------------------------------------------------------
+    @property
+    def buffered_bytes(self) -> int:
+        '''The live count of the bytes buffered by the cursors charged to the memory budget of this connection.
+        
+        This is not part of PEP 249. When the budget is shared by many
+        connections, this is the count of all of them.
+        '''
+        return self.memory_budget.buffered_bytes
+
+    #-------------------------------------------------------------------------
+    @property
+    def memory_budget(self) -> MemoryBudget:
+        '''The memory budget of the rows buffered by the cursors of this connection.
+        
+        This is not part of PEP 249.  The default budget is created  on
+        first access with no maximum count of bytes,  so that buffered
+        bytes are counted but not limited.  It may be replaced with a
+        budget shared by many connections,  e.g. the ones of a worker.
+        Replace it while no cursor buffers rows.
+        '''
+        try:
+            return self._memory_budget
+        except AttributeError:
+            self._memory_budget = MemoryBudget()
+            return self._memory_budget
+        
+    @memory_budget.setter
+    def memory_budget(self, budget: MemoryBudget) -> None:
+        self._memory_budget = budget
+
+    #-------------------------------------------------------------------------
+    @property
+    def statement_cache(self) -> StatementCache:
+        '''The LRU cache of the prepared statements of this connection.
+        
+        This is not part of PEP 249. The cache is created on first access
+        with '.STATEMENT_CACHE_SIZE' entries at most. Its counters  of
+        hits, misses and evictions are available as properties of  the
+        returned cache.  Concrete drivers should clear it when closing
+        the connection.
+        '''
+        try:
+            return self._statement_cache
+        except AttributeError:
+            self._statement_cache = StatementCache( self.STATEMENT_CACHE_SIZE, self._release_statement )
+            return self._statement_cache
+
     #-------------------------------------------------------------------------
     @abstract
     def rollback(self) -> None:
@@ -155,6 +207,60 @@ class Connection:
         '''
         ...
 
+    #-------------------------------------------------------------------------
+    def _cancel(self) -> None:
+        '''Cancels the operation currently running on this connection, if any.
+        
+        This is not part of PEP 249.  It may be called from any thread
+        (see module statement_timeout), so that the thread running the
+        operation gets an error from the driver.  Concrete drivers should
+        overwrite this method.
+        
+        Raises:
+            NotSupportedError: in this base class.
+        '''
+        raise NotSupportedError( f"{type(self).__name__} cannot cancel running operations" )
+
+    #-------------------------------------------------------------------------
+    def _prepare_statement(self, operation: str) -> object:
+        '''Prepares an operation once for it to be bound many times.
+        
+        This is not part of PEP 249.  It is called by cursors  on  the
+        misses  of the statement cache (see Cursor._prepared()).  Conc-
+        rete drivers should overwrite this method  to  parse  the  op-
+        eration or to prepare it on the server side.  In this base class
+        the operation text is returned unchanged.
+        
+        Args:
+            operation: str
+                The text of the operation to prepare.
+        
+        Returns:
+            The prepared form of the operation, as used by the driver.
+        '''
+        return operation
+
+    #-------------------------------------------------------------------------
+    def _release_statement(self, operation: str, prepared: object) -> None:
+        '''Releases a prepared statement evicted from the statement cache.
+        
+        This is not part of PEP 249.  Concrete drivers should overwrite
+        this method when prepared statements hold resources (e.g.  ser-
+        ver-side statements to be deallocated). Does nothing in this base
+        class.
+        
+        Args:
+            operation: str
+                The text of the evicted operation.
+            prepared: object
+                The prepared form of the operation.
+        '''
+        pass
+
+    #-------------------------------------------------------------------------
+    # Class data
+    STATEMENT_CACHE_SIZE = 128  # the default maximum count of prepared statements per connection
+
 
 #=============================================================================
 ## PEP 249: Optional DB API Extensions
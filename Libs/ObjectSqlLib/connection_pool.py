@@ -0,0 +1,335 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines pools of connections.
+#
+# Pools keep a set of opened connections that threads may check out
+# and return once done with them.  This avoids paying the connection
+# setup for every worker thread, while every connection is used by a
+# single thread at a time.
+#
+
+#=============================================================================
+from collections import deque
+from contextlib  import contextmanager
+from threading   import Condition
+from time        import monotonic
+from typing      import Callable, Iterator, Optional
+
+from . import Connection, Error, InterfaceError, NotSupportedError, OperationalError, ProgrammingError
+
+
+#=============================================================================
+class ConnectionPool:
+    """The class of pools of connections.
+    
+    A pool wraps the creation of any concrete  Connection  subclass.
+    It  opens  '.min_size'  connections  at construction time and no
+    more than '.max_size' connections at any time. Threads check out
+    connections  with  method  '.acquire()'  and  give them back with
+    method '.release()',  or preferably use  the  context  manager
+    returned by method '.connection()'.
+    
+    Pools are thread safe.  A checked out connection belongs to  the
+    sole  thread that acquired it until it is released.  Pending tr-
+    ansactions are rolled back when connections are released.
+    
+    Usage:
+        pool = ConnectionPool( lambda: MyConnection('my_dsn'), 2, 16 )
+        with pool.connection() as cnx:
+            cursor = cnx.cursor()
+            ...
+        pool.close()
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, connect  : Callable[[], Connection],
+                       min_size : int = 1,
+                       max_size : int = 8,
+                       timeout_s: Optional[float] = 30.0,
+                       validate : Optional[Callable[[Connection], bool]] = None) -> None:
+        '''Constructor.
+        
+        Args:
+            connect: Callable[[], Connection]
+                A function that returns a  new  opened  connection 
+                each time it is called.
+            min_size: int
+                The count of connections that are opened  at  pool
+                creation. Defaults to 1.
+            max_size: int
+                The maximum count of connections opened at the same
+                time by this pool. Defaults to 8.
+            timeout_s: float
+                The default interval of time,  expressed as a fract-
+                ional value of seconds, to wait for a connection to
+                be available when checking out. May be None, in which
+                case checkouts wait forever. Defaults to 30.0.
+            validate: Callable[[Connection], bool]
+                A function that returns True when the passed  conn-
+                ection  is still usable. It is called on every check
+                out of an idle connection.  Invalid connections  are
+                closed and replaced with new ones.  May be None,  in
+                which case connections are not validated. Defaults
+                to None.
+        '''
+        assert 0 <= min_size <= max_size
+        assert max_size > 0
+        assert timeout_s is None or timeout_s >= 0.0
+        
+        self._connect   = connect
+        self._min_size  = min_size
+        self._max_size  = max_size
+        self._timeout_s = timeout_s
+        self._validate  = validate
+        
+        self._condition = Condition()
+        self._idle      = deque()
+        self._in_use    = set()
+        self._size      = 0      ## count of opened connections, either idle, in use or being opened
+        self._closed    = False
+        
+        for _ in range( min_size ):
+            self._idle.append( self._connect() )
+            self._size += 1
+
+    #-------------------------------------------------------------------------
+    def __enter__(self) -> 'ConnectionPool':
+        '''Enters a runtime context - the pool is closed on exit.
+        '''
+        return self
+
+    #-------------------------------------------------------------------------
+    def __exit__(self, *_args) -> None:
+        '''Exits the runtime context and closes this pool.
+        '''
+        self.close()
+
+    #-------------------------------------------------------------------------
+    @property
+    def idle_count(self) -> int:
+        '''The count of opened connections that are waiting for a checkout.
+        '''
+        return len( self._idle )
+
+    #-------------------------------------------------------------------------
+    @property
+    def in_use_count(self) -> int:
+        '''The count of connections currently checked out.
+        '''
+        return len( self._in_use )
+
+    #-------------------------------------------------------------------------
+    @property
+    def max_size(self) -> int:
+        '''The maximum count of connections that are opened at the same time.
+        '''
+        return self._max_size
+
+    #-------------------------------------------------------------------------
+    @property
+    def min_size(self) -> int:
+        '''The count of connections opened at pool creation.
+        '''
+        return self._min_size
+
+    #-------------------------------------------------------------------------
+    @property
+    def size(self) -> int:
+        '''The count of currently opened connections, either idle or in use.
+        '''
+        return self._size
+
+    #-------------------------------------------------------------------------
+    def acquire(self, timeout_s: Optional[float] = -1.0) -> Connection:
+        '''Checks out a connection from this pool.
+        
+        The most recently released connection is returned first, since
+        it is the one with the warmest caches. A new connection is opened
+        when  none is idle and '.max_size' has not been reached.  Other-
+        wise, waits for another thread to release a connection.
+        
+        Args:
+            timeout_s: float
+                The interval of time, expressed as a fractional value
+                of seconds,  to wait for a connection. May be None to
+                wait forever. Defaults to the pool default timeout.
+        
+        Returns:
+            A reference to the checked out connection.
+        
+        Raises:
+            InterfaceError: this pool has been closed.
+            OperationalError: no connection has been available within
+                the specified timeout.
+        '''
+        if timeout_s is not None and timeout_s < 0.0:
+            timeout_s = self._timeout_s
+        deadline = None if timeout_s is None else monotonic() + timeout_s
+        
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise InterfaceError( "connections pool is closed" )
+                if self._idle:
+                    connection = self._idle.pop()
+                    break
+                if self._size < self._max_size:
+                    connection = None
+                    self._size += 1
+                    break
+                if deadline is None:
+                    self._condition.wait()
+                else:
+                    remaining_s = deadline - monotonic()
+                    if remaining_s <= 0.0:
+                        raise OperationalError( f"no pooled connection available within {timeout_s:.3f} s" )
+                    self._condition.wait( remaining_s )
+        
+        ## the opening and the validation of connections may be long: they take place out of the lock
+        try:
+            if connection is None:
+                connection = self._connect()
+            elif self._validate is not None and not self._is_valid( connection ):
+                self._close_quietly( connection )
+                connection = self._connect()
+        except:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        
+        with self._condition:
+            self._in_use.add( connection )
+        return connection
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes this pool.
+        
+        Idle connections are closed immediately. Connections currently
+        checked  out  are  closed  when they are released.  Any further
+        checkout raises InterfaceError.
+        '''
+        with self._condition:
+            self._closed = True
+            idle = list( self._idle )
+            self._idle.clear()
+            self._size -= len( idle )
+            self._condition.notify_all()
+        
+        for connection in idle:
+            self._close_quietly( connection )
+
+    #-------------------------------------------------------------------------
+    @contextmanager
+    def connection(self, timeout_s: Optional[float] = -1.0) -> Iterator[Connection]:
+        '''Returns a context manager that checks out a connection and releases it on exit.
+        
+        Usage:
+            with pool.connection() as cnx:
+                ...
+        
+        Args:
+            timeout_s: float
+                See method '.acquire()'.
+        '''
+        connection = self.acquire( timeout_s )
+        try:
+            yield connection
+        finally:
+            self.release( connection )
+
+    #-------------------------------------------------------------------------
+    def release(self, connection: Connection, discard: bool = False) -> None:
+        '''Gives a checked out connection back to this pool.
+        
+        Any pending transaction on the connection is rolled back.
+        
+        Args:
+            connection: Connection
+                A reference to a connection previously checked  out
+                from this pool.
+            discard: bool
+                Set this to True to close the connection rather than
+                to  keep  it  in  the pool - e.g. once it has raised
+                some OperationalError. Defaults to False.
+        
+        Raises:
+            ProgrammingError: the connection has not been checked out
+                from this pool.
+        '''
+        with self._condition:
+            if connection not in self._in_use:
+                raise ProgrammingError( "released connection has not been checked out from this pool" )
+            self._in_use.remove( connection )
+        
+        keep = not discard and self._reset( connection )
+        
+        with self._condition:
+            pooled = keep and not self._closed
+            if pooled:
+                self._idle.append( connection )
+            else:
+                self._size -= 1
+            self._condition.notify()
+        
+        if not pooled:
+            self._close_quietly( connection )
+
+    #-------------------------------------------------------------------------
+    def _close_quietly(self, connection: Connection) -> None:
+        '''Closes a connection, ignoring any error.
+        '''
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    #-------------------------------------------------------------------------
+    def _is_valid(self, connection: Connection) -> bool:
+        '''Returns True if the checked out connection is still usable.
+        '''
+        try:
+            return bool( self._validate(connection) )
+        except Exception:
+            return False
+
+    #-------------------------------------------------------------------------
+    def _reset(self, connection: Connection) -> bool:
+        '''Rolls back any pending transaction before a connection gets back to the pool.
+        
+        Returns:
+            True if the connection may be reused, or False otherwise.
+        '''
+        try:
+            connection.rollback()
+        except (NotSupportedError, NotImplementedError, AttributeError):
+            ## connections without transactions support are kept as is
+            pass
+        except Error:
+            return False
+        return True
+
+
+#=====   end of   Libs.ObjectSqlLib.connection_pool   =====#
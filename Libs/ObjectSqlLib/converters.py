@@ -0,0 +1,260 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the conversions of the values of results sets.
+#
+# Converters are registered per PEP 249 Type Object (see module db_types).
+# Once per result set,  the description of its columns is compiled into
+# a RowConverter holding one converter per column,  which then converts
+# whole batches of fetched rows column per column.  Columns with no
+# registered converter are left untouched and result sets without any
+# converted column are returned as is.
+#
+# A ConvertingConnection wraps a connection of a concrete driver  and
+# converts the rows fetched by its cursors with a ConverterRegistry.
+#
+
+#=============================================================================
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .         import Connection, Cursor, type_matches
+from .wrappers import ConnectionWrapper, CursorWrapper
+
+
+#=============================================================================
+class RowConverter:
+    """The class of the compiled conversions of the rows of a result set.
+    
+    NULL values are never converted.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, converters: Tuple[Optional[Callable], ...]) -> None:
+        '''Constructor.
+        
+        Args:
+            converters: Tuple[Callable, ...]
+                The converter of every column, or None for the columns
+                which values are not converted.
+        '''
+        self.converters = converters
+        self._converted = tuple( (index, converter) for index, converter in enumerate(converters)
+                                                    if converter is not None )
+
+    #-------------------------------------------------------------------------
+    @property
+    def is_identity(self) -> bool:
+        '''True if no column is converted.
+        '''
+        return not self._converted
+
+    #-------------------------------------------------------------------------
+    def convert(self, rows: List[Tuple]) -> List[Tuple]:
+        '''Converts a batch of rows.
+        
+        Rows are transposed, so that every converted column is converted
+        in a single pass, and then transposed back.
+        
+        Args:
+            rows: List[Tuple]
+                The rows to convert, as fetched from a cursor.
+        
+        Returns:
+            The converted rows, or the same list if no column is  conv-
+            erted.
+        '''
+        if not self._converted or not rows:
+            return rows
+        columns = list( zip(*rows) )
+        for index, converter in self._converted:
+            columns[ index ] = [ None if value is None else converter(value) for value in columns[index] ]
+        return list( zip(*columns) )
+
+    #-------------------------------------------------------------------------
+    def convert_row(self, row: Optional[Tuple]) -> Optional[Tuple]:
+        '''Converts a single row, or returns None if row is None.
+        '''
+        if not self._converted or row is None:
+            return row
+        values = list( row )
+        for index, converter in self._converted:
+            if values[ index ] is not None:
+                values[ index ] = converter( values[index] )
+        return tuple( values )
+
+
+#=============================================================================
+class ConverterRegistry:
+    """The class of registries of converters keyed by PEP 249 Type Objects.
+    
+    A column is converted by the converter of the first registered Type
+    Object its type code matches (see db_types.type_matches()).  Compiled
+    RowConverters are cached per tuple of type codes,  and the cache is
+    cleared on every new registration.
+    
+    Usage:
+        registry = ConverterRegistry()
+        registry.register( NUMBER, decimal.Decimal )
+        cnx = ConvertingConnection( MyConnection('my_dsn'), registry )
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self) -> None:
+        '''Constructor.
+        '''
+        self._converters: Dict[type, Callable] = {}
+        self._compiled: Dict[Tuple, RowConverter] = {}
+
+    #-------------------------------------------------------------------------
+    def __len__(self) -> int:
+        '''Returns the count of registered converters.
+        '''
+        return len( self._converters )
+
+    #-------------------------------------------------------------------------
+    def compile(self, description: Optional[Sequence[Tuple]]) -> RowConverter:
+        '''Returns the converter of the rows of a result set.
+        
+        Args:
+            description: Sequence[Tuple]
+                The description of the columns of the result set,  as
+                returned by cursors property '.description'.  May be
+                None, in which case nothing is converted.
+        '''
+        if description is None:
+            return _IDENTITY
+        type_codes = tuple( descr[1] for descr in description )
+        try:
+            return self._compiled[ type_codes ]
+        except KeyError:
+            row_converter = self._compiled[ type_codes ] = RowConverter( tuple(map(self.converter_of, type_codes)) )
+        except TypeError:
+            ## unhashable type codes are compiled on every result set
+            row_converter = RowConverter( tuple(map(self.converter_of, type_codes)) )
+        return row_converter
+
+    #-------------------------------------------------------------------------
+    def converter_of(self, type_code: object) -> Optional[Callable]:
+        '''Returns the converter of the values of a type code, or None if they are not converted.
+        '''
+        if type_code is None:
+            return None
+        for type_object, converter in self._converters.items():
+            if type_matches( type_code, type_object ):
+                return converter
+        return None
+
+    #-------------------------------------------------------------------------
+    def register(self, type_object: type, converter: Optional[Callable[[object], object]]) -> None:
+        '''Registers the converter of the values of a Type Object.
+        
+        Args:
+            type_object: type
+                One of the Type Objects BINARY, DATETIME, NUMBER, ROWID
+                or STRING, or one of their subclasses.
+            converter: Callable[[object], object]
+                The converter of the non-NULL values of the columns of
+                this Type Object.  May be None, in which case the conv-
+                erter of this Type Object is unregistered.
+        '''
+        if converter is None:
+            self._converters.pop( type_object, None )
+        else:
+            self._converters[ type_object ] = converter
+        self._compiled.clear()
+
+
+#=============================================================================
+class ConvertingConnection( ConnectionWrapper ):
+    """The class of connections which convert the rows fetched by their cursors.
+    
+    Rows with converted columns are returned as tuples,  also when the
+    source cursors fetch lazy rows.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, connection: Connection, registry: ConverterRegistry) -> None:
+        '''Constructor.
+        
+        Args:
+            connection: Connection
+                A reference to the wrapped connection.
+            registry: ConverterRegistry
+                A reference to the converters of the fetched values.
+                May be shared by many connections.
+        '''
+        super().__init__( connection )
+        self.registry = registry
+
+    #-------------------------------------------------------------------------
+    def _wrap_cursor(self, cursor: Cursor) -> Cursor:
+        return ConvertingCursor( self, cursor )
+
+
+#=============================================================================
+class ConvertingCursor( CursorWrapper ):
+    """The class of cursors of converting connections.
+    
+    The row converter of every result set is compiled on its first fetch.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, parent_connection: ConvertingConnection, source: Cursor) -> None:
+        '''Constructor.
+        '''
+        super().__init__( parent_connection, source )
+        self._row_converter = None
+
+    #-------------------------------------------------------------------------
+    def fetchall(self) -> List[Tuple]:
+        return self._converter().convert( super().fetchall() )
+
+    #-------------------------------------------------------------------------
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        return self._converter().convert( super().fetchmany(size) )
+
+    #-------------------------------------------------------------------------
+    def fetchone(self) -> Optional[Tuple]:
+        return self._converter().convert_row( super().fetchone() )
+
+    #-------------------------------------------------------------------------
+    def _converter(self) -> RowConverter:
+        '''Returns the row converter of the current result set.
+        '''
+        if self._row_converter is None:
+            self._row_converter = self._connection.registry.compile( self._source.description )
+        return self._row_converter
+
+    #-------------------------------------------------------------------------
+    def _copy_counts(self) -> None:
+        '''Also drops the row converter of the previous result set after any execution.
+        '''
+        super()._copy_counts()
+        self._row_converter = None
+
+
+#=============================================================================
+_IDENTITY = RowConverter( () )
+
+
+#=====   end of   Libs.ObjectSqlLib.converters   =====#
@@ -21,10 +21,18 @@ SOFTWARE.
 """
 
 #=============================================================================
-from typing import ForwardRef, List, Optional, Tuple, Union
+import io
+import weakref
+from collections import deque
+from typing import ForwardRef, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 from Utils.decorators import abstract
-from . import ExtensionMessages, TYPE, warning
+from . import ExtensionMessages, ProgrammingError, TYPE, warning
+from .batching import BatchReport, execute_batched
+from .bulk_copy import Dialect, Stream, copy_from, copy_to
+from .columnar import Column, rows_to_columns
+from .prefetch import AdaptiveArraySize, PrefetchIterator
+from .statement_batch import ResultSet, Statement, execute_sequentially
 
 
 #=============================================================================
@@ -63,7 +71,12 @@ class Cursor:
         self._row_number = 0
         self._last_row_id = None
         self._array_size = 1
-        self._messages = ExtensionMessages()
+        self._messages: ExtensionMessages = []
+        self._result_sets = deque()   ## the pending result sets of the last batch
+        self._lazy_rows = False
+        self._buffered_bytes = 0      ## charged to the memory budget of the connection
+        self._budget = None           ## the memory budget charged with the buffered bytes
+        self._prefetch_iterator = None  ## a weak reference to the last prefetching iterator
         self._reset_row_descr()
 
     
@@ -105,6 +118,18 @@ class Cursor:
         self._array_size = size
         
         
+    #-------------------------------------------------------------------------
+    @property
+    def buffered_bytes(self) -> int:
+        '''The live count of the bytes of the rows buffered by this cursor.
+        
+        This is not part of PEP 249.  These bytes are charged  to  the
+        memory budget of the connection (see Connection.memory_budget).
+        Drivers which do not buffer result sets keep this count to 0.
+        '''
+        return self._buffered_bytes
+        
+        
     #-------------------------------------------------------------------------
     @property
     def connection(self) -> ConnectionRef:
@@ -173,6 +198,25 @@ class Cursor:
         return self._last_row_id
 
 
+    #-------------------------------------------------------------------------
+    @property
+    def lazy_rows(self) -> bool:
+        '''True if the rows of the next result sets are fetched as lazy rows.
+        
+        This is not part of PEP 249.  Lazy rows are compact row objects
+        over the raw data of rows, which decode a column when it is first
+        accessed. They may be accessed by index, by column name and as
+        attributes named after the columns,  and compare equal to tuples
+        (see module lazy_rows).  Defaults to False, i.e. rows are tuples.
+        Drivers which do not implement lazy rows ignore this attribute.
+        '''
+        return self._lazy_rows
+        
+    @lazy_rows.setter
+    def lazy_rows(self, lazy: bool) -> None:
+        self._lazy_rows = lazy
+
+
     #-------------------------------------------------------------------------
     @property
     def messages(self) -> ExtensionMessages:
@@ -323,6 +367,98 @@ class Cursor:
         ...
     
 
+    #-------------------------------------------------------------------------
+    def copy_from(self, table      : str,
+                        stream     : Stream,
+                        columns    : Optional[Sequence[str]] = None,
+                        dialect    : Dialect = 'excel',
+                        header     : bool = False,
+                        null       : str = '',
+                        buffer_size: int = 1 << 16,
+                        max_rows   : int = 1000,
+                        max_bytes  : Optional[int] = 1 << 20) -> BatchReport:
+        '''Copies the rows of a CSV stream into a table.
+        
+        This is not part of PEP 249. The stream is consumed in buffers of
+        fixed size, so that the used memory does not depend on its size.
+        Drivers with a native bulk copy get the buffers of CSV text (see
+        '._copy_from_native()'). Otherwise rows are inserted with the
+        batching engine, as with '.executemany_batched()'.  The copy is
+        part of the current transaction.
+        
+        Args:
+            table: str
+                The name of the table.
+            stream: Stream
+                A text file-like object,  an iterable of CSV lines or an
+                iterable of rows, generators included.
+            columns: Sequence[str]
+                The names of the copied columns. If None, rows contain
+                all the columns of the table in their order, unless a
+                header provides their names. Defaults to None.
+            dialect: Dialect
+                The CSV dialect of the text, as with module csv.
+                Defaults to 'excel'.
+            header: bool
+                True if the first line or row is a header. Defaults to
+                False.
+            null: str
+                The CSV text of NULL values. Defaults to ''.
+            buffer_size: int
+                The size of the read buffers, in characters. Defaults to
+                64 K.
+            max_rows, max_bytes:
+                The limits of the batches of rows, as with '.executemany_
+                batched()'.
+        
+        Returns:
+            The report of the copy, with its throughput in rows per second.
+        '''
+        return copy_from( self, table, stream, columns, dialect, header, null, buffer_size, max_rows, max_bytes )
+
+
+    #-------------------------------------------------------------------------
+    def copy_to(self, table      : str,
+                      stream     : io.TextIOBase,
+                      columns    : Optional[Sequence[str]] = None,
+                      dialect    : Dialect = 'excel',
+                      header     : bool = False,
+                      null       : str = '',
+                      buffer_size: int = 1 << 16,
+                      query      : Optional[str] = None) -> BatchReport:
+        '''Copies the rows of a table, or of a query, into a CSV stream.
+        
+        This is not part of PEP 249.  Rows are fetched batch after batch
+        and written into the stream with buffers of fixed size.
+        
+        Args:
+            table: str
+                The name of the table.
+            stream: io.TextIOBase
+                The text file-like object the CSV text is written into.
+            columns: Sequence[str]
+                The names of the copied columns, or None for all of them.
+                Defaults to None.
+            dialect: Dialect
+                The CSV dialect of the text. Defaults to 'excel'.
+            header: bool
+                True to write the names of the columns first. Defaults
+                to False.
+            null: str
+                The CSV text of NULL values. Defaults to ''.
+            buffer_size: int
+                The size of the write buffers, in characters. Defaults
+                to 64 K.
+            query: str
+                The query of the copied rows, overriding table and col-
+                umns. Defaults to None.
+        
+        Returns:
+            The report of the copy, with its throughput in rows per second.
+        '''
+        return copy_to( self, table, stream, columns, dialect, header, null, buffer_size, query )
+
+
     #-------------------------------------------------------------------------
     @abstract
     def execute(self, operation: str , *parameters) -> Optional:
@@ -375,6 +511,44 @@ class Cursor:
         ...
     
 
+    #-------------------------------------------------------------------------
+    def execute_batch(self, statements: Iterable[Statement]) -> None:
+        '''Executes a batch of operations, whose result sets are then available one after the other.
+        
+        This is not part of PEP 249.  The result set of the first oper-
+        ation is the current one once the whole batch has been executed.
+        '.nextset()'  skips to the result set of the next operation,  and
+        so on.  The result sets of operations which produce none (e.g.
+        UPDATE) are empty sets:  '.description' is None and '.rowcount'
+        is their count of affected rows.
+        
+        Concrete drivers should overwrite '._execute_batch_native()' to
+        send the whole batch in a single round trip to the database, so
+        that its latency is paid once per batch rather than once per
+        operation.  Otherwise, operations are executed one after the
+        other (see module statement_batch) and drivers must implement
+        '._load_result_set()'.
+        
+        Args:
+            statements: Iterable[Statement]
+                The pairs (operation, parameters) of the batch.  Param-
+                eters may be None for operations without placeholders.
+        
+        Raises:
+            Error: the execution of an operation failed. The following
+                operations are not executed.
+            ProgrammingError: the batch is empty.
+        '''
+        statements = [ (operation, () if parameters is None else parameters) for operation, parameters in statements ]
+        if not statements:
+            raise ProgrammingError( "the batch of operations is empty" )
+        results = self._execute_batch_native( statements )
+        if results is None:
+            results = execute_sequentially( self, statements )
+        self._result_sets = deque( results )
+        self._next_result_set()
+
+
     #-------------------------------------------------------------------------
     @abstract
     def executemany(self, operation: str, seq_of_parameters: tuple ) -> Optional:
@@ -422,6 +596,72 @@ class Cursor:
         '''
         ...
 
+    #-------------------------------------------------------------------------
+    def executemany_batched(self, operation        : str,
+                                  seq_of_parameters: Iterable[Sequence],
+                                  max_rows         : int = 1000,
+                                  max_bytes        : Optional[int] = 1 << 20,
+                                  max_parameters   : int = 32766) -> BatchReport:
+        '''Executes an operation against all the parameters of an iterable, batch after batch.
+        
+        This is not part of PEP 249.  Parameters may be any iterable,
+        generators included.  They are chunked by count of rows and by
+        budget of bytes.  Single-row INSERT ... VALUES (%s, ...) opera-
+        tions are rewritten into multi-row statements,  so that  every
+        chunk costs a single '.execute()'.  Other operations are execu-
+        ted row after row. See module batching.
+        
+        Concrete drivers may implement '.executemany()' with this method.
+        
+        Args:
+            operation: str
+                The operation to execute.
+            seq_of_parameters: Iterable[Sequence]
+                The parameters of the successive rows.
+            max_rows: int
+                The maximum count of rows per batch. Defaults to 1000.
+            max_bytes: int
+                The budget of bytes per batch. May be None. Defaults to
+                1 MB.
+            max_parameters: int
+                The maximum count of parameters per statement of the
+                database. Defaults to 32766.
+        
+        Returns:
+            The report of the per-batch timings.
+        '''
+        return execute_batched( self, operation, seq_of_parameters, max_rows, max_bytes, max_parameters )
+
+
+    #-------------------------------------------------------------------------
+    def fetch_columns(self, size: Optional[int] = None, as_numpy: bool = False) -> List[Column]:
+        '''Fetch the next set of rows of a query result as typed columns.
+        
+        This is not part of PEP 249.  The fetched rows are transposed
+        into one typed buffer per column according to the type  codes
+        of  '.description':  array.array  for numeric columns, lists of
+        Python objects for the other ones,  plus a null mask per column
+        (see module columnar).
+        
+        Concrete drivers may overwrite this method to fill the columns
+        buffers straight from their receive buffers.
+        
+        Args:
+            size: int
+                The count of rows to fetch,  as with  '.fetchmany()'.
+                May be None,  in which case all remaining rows are fe-
+                tched. Defaults to None.
+            as_numpy: bool
+                Set this to True to get NumPy arrays. Defaults to False.
+        
+        Returns:
+            The list of the columns of the fetched rows.  Every column
+            is empty if no more rows are available.
+        '''
+        rows = self.fetchall() if size is None else self.fetchmany( size )
+        return rows_to_columns( rows, self.description, as_numpy )
+
+
     #-------------------------------------------------------------------------
     @abstract
     def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
@@ -473,14 +713,26 @@ class Cursor:
 
 
     #-------------------------------------------------------------------------
-    def __iter__(self) -> CursorRef:
-        '''Returns self to make cursors compatible to the iteration protocol.
+    def __iter__(self) -> PrefetchIterator:
+        '''Returns an iterator over the rows of the current result set.
         
         This is part 1/2 of the implementation of  a  generator  as
-        specifie d in PEP 249 DB-API Extension.  See pending method
+        specified in PEP 249 DB-API Extension.  See pending method
         '.next()'.
+        
+        Rows are prefetched by batches which size gets tuned at runtime
+        with the class settings '.PREFETCH_*' (see '.prefetched()'),  so
+        that plain iterations do not cost one round trip per row.  The
+        batches are fetched synchronously unless '.PREFETCH_IN_BACKGROUND'
+        is set, so that breaking out of an iteration leaves the cursor
+        free for its next execution.  Prefetched rows are read ahead of
+        the position of '.fetch*()'.
+        Concrete drivers which fetch rows locally may overwrite this
+        method to return self,  as wrapping cursors do (see class Cur-
+        sorWrapper).
         '''
         warning( "DB-API extension cursor.__iter__() used" )
+        return self.prefetched()
 
 
     #-------------------------------------------------------------------------
@@ -537,6 +789,48 @@ class Cursor:
         ...
         
 
+    #-------------------------------------------------------------------------
+    def prefetched(self, memory_budget   : Optional[int] = None,
+                         target_latency_s: Optional[float] = None,
+                         background      : Optional[bool] = None) -> PrefetchIterator:
+        '''Returns an iterator over the rows of the current result set, with prefetched batches.
+        
+        This is not part of PEP 249.  Rows are fetched with '.fetchmany()'
+        by batches which size starts at '.arraysize'  (16 at least) and is
+        then  tuned  after  every fetch from the observed width of rows
+        and latency of fetches,  within the budget of memory.  See module
+        prefetch.
+        
+        Args:
+            memory_budget: int
+                The budget of bytes of the prefetched rows. May be None,
+                in which case '.PREFETCH_MEMORY_BUDGET' is used. Defaults
+                to None.
+            target_latency_s: float
+                The targeted duration of single fetches, expressed as a
+                fractional value of seconds. May be None,  in which case
+                '.PREFETCH_TARGET_LATENCY_S' is used. Defaults to None.
+            background: bool
+                Set this to True to get the next batch fetched by a back-
+                ground thread while the current one is consumed.  May be
+                None, in which case '.PREFETCH_IN_BACKGROUND' is used.
+                Defaults to None.
+        
+        Returns:
+            The iterator over the rows.  It gets closed - and its back-
+            ground thread stopped - by the next execution on this cursor,
+            by '.nextset()' and by '.close()'.
+        '''
+        self._stop_prefetch()
+        controller = AdaptiveArraySize(
+            initial_size=max( self._array_size, 16 ),
+            memory_budget=self.PREFETCH_MEMORY_BUDGET if memory_budget is None else memory_budget,
+            target_latency_s=self.PREFETCH_TARGET_LATENCY_S if target_latency_s is None else target_latency_s )
+        iterator = PrefetchIterator( self, controller, self.PREFETCH_IN_BACKGROUND if background is None else background )
+        self._prefetch_iterator = weakref.ref( iterator )
+        return iterator
+
+
     #-------------------------------------------------------------------------
     @abstract
     def scroll(self, value: int, mode: Optional[str] = 'relative') -> None:
@@ -619,6 +913,35 @@ class Cursor:
         self._messages.append( (exc_ref, exc_value) )
 
 
+    #-------------------------------------------------------------------------
+    def _buffer(self, nbytes: int) -> bool:
+        '''Charges newly buffered bytes to the memory budget of the connection.
+        
+        This is not part of PEP 249. It is provided as a convenience for
+        the drivers which buffer result sets.  They should then release
+        their buffered bytes with '._release_buffer()' when they drop rows.
+        
+        Args:
+            nbytes: int
+                The count of bytes which have just been buffered.
+        
+        Returns:
+            True if the budget is kept, or False if it is exceeded, in
+            which case the driver should either stream its result set or
+            release its rows and raise the error of the budget.
+        '''
+        budget = self._connection.memory_budget
+        if budget is not self._budget:
+            ## the budget of the connection has been replaced: moves the buffered bytes to the new one
+            if self._budget is not None:
+                self._budget.release( self._buffered_bytes )
+            nbytes += self._buffered_bytes
+            self._buffered_bytes = 0
+            self._budget = budget
+        self._buffered_bytes += nbytes
+        return budget.charge( nbytes )
+
+
     #-------------------------------------------------------------------------
     def _clear_messages(self) -> None:
         '''Clears the list of messages received from the DB interface.
@@ -629,6 +952,142 @@ class Cursor:
         del self._messages[:]
 
 
+    #-------------------------------------------------------------------------
+    def _copy_from_native(self, table  : str,
+                                columns: Optional[Sequence[str]],
+                                buffers: Iterator[str],
+                                dialect: Dialect,
+                                null   : str) -> Optional[BatchReport]:
+        '''Copies buffers of CSV text into a table with the native bulk copy of the database.
+        
+        This is not part of PEP 249.  It is called by '.copy_from()'.
+        Concrete drivers should overwrite this method when their data-
+        base provides a bulk copy. In this base class nothing is copied
+        and None is returned, so that '.copy_from()' falls back to batched
+        inserts.
+        
+        Args:
+            table: str
+                The name of the table.
+            columns: Sequence[str]
+                The names of the copied columns, or None for all of them.
+            buffers: Iterator[str]
+                The buffers of CSV text, made of whole lines.
+            dialect: Dialect
+                The CSV dialect of the text.
+            null: str
+                The CSV text of NULL values.
+        
+        Returns:
+            The report of the copy, or None if the database provides no
+            bulk copy.
+        '''
+        return None
+
+
+    #-------------------------------------------------------------------------
+    def _execute_batch_native(self, statements: List[Statement]) -> Optional[List[ResultSet]]:
+        '''Executes a batch of operations with the native support of the database, if any.
+        
+        This is not part of PEP 249.  Concrete drivers which can send a
+        whole batch of operations in a single round trip should over-
+        write this method. Returns None in this base class, in which case
+        operations are executed one after the other.
+        
+        Args:
+            statements: List[Statement]
+                The pairs (operation, parameters) of the batch.
+        
+        Returns:
+            The result sets of the operations, or None if the database
+            provides no native batches.
+        '''
+        return None
+
+
+    #-------------------------------------------------------------------------
+    @abstract
+    def _load_result_set(self, result_set: ResultSet) -> None:
+        '''Makes a buffered result set of a batch the current result set of this cursor.
+        
+        This is not part of PEP 249. It is called by '.execute_batch()'
+        and '._next_result_set()'.
+        
+        MUST BE IMPLEMENTED in inheriting classes which support batches
+        of operations.
+        '''
+        ...
+
+
+    #-------------------------------------------------------------------------
+    def _next_result_set(self) -> Optional[bool]:
+        '''Makes the next pending result set of a batch the current one.
+        
+        This is not part of PEP 249. It is provided as a convenience for
+        the implementations of '.nextset()',  which should call it first
+        when '._result_sets' is not empty. Implementations of '.execute*()'
+        should clear '._result_sets'.
+        
+        Returns:
+            True, or None if no result set is pending.
+        '''
+        if not self._result_sets:
+            return None
+        self._load_result_set( self._result_sets.popleft() )
+        return True
+
+
+    #-------------------------------------------------------------------------
+    def _prepared(self, operation: str) -> object:
+        '''Returns the prepared form of an operation, from the statement cache of the connection.
+        
+        This is not part of PEP 249. It is provided as a convenience for
+        the implementations of the '.execute*()' methods: operations are
+        prepared once per connection with Connection._prepare_statement()
+        and then reused while they stay in cache.
+        
+        Args:
+            operation: str
+                The text of the operation.
+        '''
+        connection = self._connection
+        return connection.statement_cache.get_or_prepare( operation, connection._prepare_statement )
+
+
+    #-------------------------------------------------------------------------
+    def _release_buffer(self, nbytes: Optional[int] = None) -> None:
+        '''Releases buffered bytes from the memory budget of the connection.
+        
+        This is not part of PEP 249 (see '._buffer()').
+        
+        Args:
+            nbytes: int
+                The count of released bytes, or None to release all the
+                bytes buffered by this cursor. Defaults to None.
+        '''
+        if nbytes is None:
+            nbytes = self._buffered_bytes
+        if nbytes:
+            self._buffered_bytes -= nbytes
+            self._budget.release( nbytes )
+
+
+    #-------------------------------------------------------------------------
+    def _stop_prefetch(self) -> None:
+        '''Closes the last prefetching iterator over this cursor, if it is still alive.
+        
+        This is not part of PEP 249.  It gets called by the executions,
+        '.nextset()' and '.close()' of cursors which may get iterated
+        with '.prefetched()', so that no background fetch runs concurrent-
+        ly with them.
+        '''
+        if self._prefetch_iterator is not None:
+            iterator = self._prefetch_iterator()
+            self._prefetch_iterator = None
+            if iterator is not None:
+                iterator.close()
+
+
     #-------------------------------------------------------------------------
     def _reset_row_descr(self) -> None:
         '''Resets the fetched last row description.
@@ -648,5 +1107,8 @@ class Cursor:
     #-------------------------------------------------------------------------
     # Class data
     NO_ROW_COUNT = -1  # Future versions of the DB API specification (i.e. PEP 249) could redefine None instead of -1.
+    PREFETCH_IN_BACKGROUND    = False    # set this to True to get iterations fetching their next batch in a background thread
+    PREFETCH_MEMORY_BUDGET    = 8 << 20  # the default budget of bytes of the rows prefetched by iterations
+    PREFETCH_TARGET_LATENCY_S = 0.050    # the default targeted duration of the fetches of iterations
     
 #=====   end of   Libs.ObjectSqlLib.cursor   =====#
@@ -22,6 +22,9 @@ SOFTWARE.
 
 #=============================================================================
 import datetime
+import sys
+import time
+from typing import List, Sequence, Union
 
 from Utils.decorators import abstract
 
@@ -67,10 +70,44 @@ class STRING( TYPE ):
 
 
 #------------------------------------------------------------------------------
-def Binary(string) -> bytes:
+def type_matches(type_code: object, type_object: type) -> bool:
+    '''Returns True if a description type code corresponds to a Type Object.
+    
+    This is not part of PEP 249. Type codes may be the Type Objects of
+    this module, their subclasses or any object that compares equal to
+    them, as PEP 249 requires.
+    
+    Args:
+        type_code: object
+            The type_code item of a column description.
+        type_object: type
+            One of the Type Objects BINARY, DATETIME, NUMBER, ROWID
+            or STRING.
+    '''
+    if type_code is type_object:
+        return True
+    if isinstance( type_code, type ):
+        return issubclass( type_code, type_object )
+    return type_code is not None and type_code == type_object
+
+
+#------------------------------------------------------------------------------
+def Binary(string: object) -> Union[bytes, memoryview]:
     '''Constructs an object capable of holding a binary (long) string value.
+    
+    Strings are encoded in 'utf-8'. Objects supporting the buffer  pro-
+    tocol (bytes, bytearray, mmap, NumPy arrays, ...)  are  wrapped  in
+    flat memoryviews of their bytes, with no copy - call '.tobytes()' on
+    them to get an owned copy.  Notice: BINARY values may be  returned
+    by drivers as memoryviews as well (e.g. over their receive buffer).
+    
+    Raises:
+        TypeError: string is neither a str nor a buffer.
     '''
-    return string.encode()  ## notice: defautls encoding is 'utf-8'
+    if isinstance( string, str ):
+        return string.encode()
+    view = memoryview( string )
+    return view if view.format == 'B' and view.ndim == 1 else view.cast( 'B' )
 
 
 def Date(year: int, month: int, day: int) -> datetime.date:
@@ -79,7 +116,7 @@ def Date(year: int, month: int, day: int) -> datetime.date:
     return datetime.date(year, month, day)
     
 
-def DateFromTicks(self, ticks: float) -> datetime.date:
+def DateFromTicks(ticks: float) -> datetime.date:
     '''Constructs an object holding a date value from the given ticks value.
     
     Args:
@@ -95,14 +132,14 @@ def Time(hour: int, minute: int, second: int) -> datetime.time:
     return datetime.time( hour, minute, second )
 
 
-def TimeFromTicks(self, ticks: float) -> datetime.time:
+def TimeFromTicks(ticks: float) -> datetime.time:
     '''Constructs an object holding a time value from the given ticks value.
     
     Args:
         ticks: float
             The number of seconds since the epoch - i.e. 1970-01-01.
     '''
-    return datetime.time.fromtimestamp( ticks )
+    return datetime.datetime.fromtimestamp( ticks ).time()
 
 
 def Timestamp(year: int, month: int, day,
@@ -112,7 +149,7 @@ def Timestamp(year: int, month: int, day,
     return  datetime.datetime( year, month, day, hour, minute, second )
 
 
-def TimestampFromTicks(self, ticks: float) -> datetime.datetime:
+def TimestampFromTicks(ticks: float) -> datetime.datetime:
     '''Constructs an object holding a time stamp value from the given ticks value.
     
     Args:
@@ -122,4 +159,65 @@ def TimestampFromTicks(self, ticks: float) -> datetime.datetime:
     return datetime.datetime.fromtimestamp( ticks )
 
 
+#------------------------------------------------------------------------------
+## Vectorized variants of the *FromTicks() constructors - not part of PEP 249.
+#  Sequences of ticks get lists of Python objects.  NumPy arrays of ticks
+#  get NumPy arrays converted in a single pass:  'datetime64[D]' for dates,
+#  'datetime64[us]' for time stamps and 'timedelta64[us]' since midnight
+#  for times.  As with the scalar constructors, values are in local time.
+
+def DatesFromTicks(ticks: Union[Sequence[float], 'numpy.ndarray']) -> Union[List[datetime.date], 'numpy.ndarray']:
+    '''Constructs the date values of a sequence or of a NumPy array of ticks values.
+    '''
+    numpy = _numpy_of( ticks )
+    if numpy is None:
+        return list( map(datetime.date.fromtimestamp, ticks) )
+    return _local_microseconds( ticks, numpy ).astype( 'datetime64[us]' ).astype( 'datetime64[D]' )
+
+
+def TimesFromTicks(ticks: Union[Sequence[float], 'numpy.ndarray']) -> Union[List[datetime.time], 'numpy.ndarray']:
+    '''Constructs the time values of a sequence or of a NumPy array of ticks values.
+    '''
+    numpy = _numpy_of( ticks )
+    if numpy is None:
+        return [ datetime.datetime.fromtimestamp(t).time() for t in ticks ]
+    return ( _local_microseconds(ticks, numpy) % 86_400_000_000 ).astype( 'timedelta64[us]' )
+
+
+def TimestampsFromTicks(ticks: Union[Sequence[float], 'numpy.ndarray']) -> Union[List[datetime.datetime], 'numpy.ndarray']:
+    '''Constructs the time stamp values of a sequence or of a NumPy array of ticks values.
+    '''
+    numpy = _numpy_of( ticks )
+    if numpy is None:
+        return list( map(datetime.datetime.fromtimestamp, ticks) )
+    return _local_microseconds( ticks, numpy ).astype( 'datetime64[us]' )
+
+
+def _local_microseconds(ticks: 'numpy.ndarray', numpy) -> 'numpy.ndarray':
+    '''Returns the local times of an array of ticks, as int64 counts of microseconds since the epoch.
+    
+    The UTC offsets of time zones with daylight saving time are  eval-
+    uated per value.
+    '''
+    seconds = numpy.asarray( ticks, dtype=numpy.float64 )
+    if time.daylight:
+        offsets = numpy.fromiter( (time.localtime(t).tm_gmtoff for t in seconds.ravel().tolist()),
+                                  dtype=numpy.float64, count=seconds.size ).reshape( seconds.shape )
+    else:
+        offsets = -time.timezone
+    return numpy.round( (seconds + offsets) * 1e6 ).astype( numpy.int64 )
+
+
+def _numpy_of(ticks: object) -> object:
+    '''Returns module numpy if ticks is a NumPy array, or None otherwise.
+    
+    NumPy is never imported here: NumPy arrays can only be passed once
+    the caller has imported it.
+    '''
+    numpy = sys.modules.get( 'numpy' )
+    if numpy is not None and isinstance( ticks, numpy.ndarray ):
+        return numpy
+    return None
+
+
 #=====   end of   Libs.ObjectSqlLib.db_types   =====#
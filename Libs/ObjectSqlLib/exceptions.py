@@ -110,4 +110,21 @@ class NotSupportedError( DatabaseError ):
     pass
 
 
+#=============================================================================
+## Next warnings are not part of PEP 249.  They are appended with their
+#  message to the list '.messages' of cursors.
+#
+
+class SlowStatementWarning( Warning ):
+    '''Warning reported when the execution of a statement lasts longer than a configured threshold.
+    '''
+    pass
+
+
+class QueryTimingWarning( Warning ):
+    '''Warning reporting the timing of a query run by a parallel executor (see module parallel).
+    '''
+    pass
+
+
 #=====   end of   Libs.ObjectSqlLib.exceptions   =====#
@@ -21,10 +21,105 @@ SOFTWARE.
 """
 
 #=============================================================================
-from typing import List, Tuple
+## This module defines the messages of cursors (PEP 249 DB-API Extension).
+#
+# Messages are pairs (exception class, value).  The values of the warn-
+# ings defined by this library (see module exceptions) may be records
+# of diagnostics rather than plain strings, e.g. SlowStatement ones.
+#
+
+#=============================================================================
+import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 ExtensionMessages = List[ Tuple[Exception, object] ]
 '''The class of lists of messages that conforms with PEP 249 DB-API Extension.
 '''
 
+
+#=============================================================================
+class SlowStatement( NamedTuple ):
+    """The class of the diagnostics of slow statements.
+    
+    They are the values of the SlowStatementWarning messages of cursors
+    and the entries of slow-query logs (see module slow_query_log). Their
+    string is the text of the warning.
+    
+    Attributes:
+        operation: str
+            The text of the executed operation.
+        parameters: object
+            The parameters of the execution, or None.
+        duration_s: float
+            The duration of the execution, expressed as  a  fractional
+            value of seconds.
+        threshold_s: float
+            The configured threshold which has been exceeded.
+        timestamp: float
+            The end time of the execution, in seconds since the epoch.
+        rowcount: int
+            The count of rows affected by the execution, or -1.
+        plan: list
+            The query plan of the operation, as rows of EXPLAIN,  or
+            None if it has not been captured.
+        explain_error: str
+            The error which prevented the capture of the plan, or None.
+    """
+    operation    : str
+    parameters   : object
+    duration_s   : float
+    threshold_s  : float
+    timestamp    : float
+    rowcount     : int = -1
+    plan         : Optional[list] = None
+    explain_error: Optional[str] = None
+    
+    #-------------------------------------------------------------------------
+    def __str__(self) -> str:
+        return f"statement executed in {self.duration_s:.6f} s (threshold {self.threshold_s:.6f} s): {self.operation}"
+    
+    #-------------------------------------------------------------------------
+    def to_dict(self) -> Dict:
+        '''Returns these diagnostics with their time stamp in ISO 8601 format.
+        '''
+        entry = self._asdict()
+        entry[ 'timestamp' ] = datetime.datetime.fromtimestamp( self.timestamp ).isoformat()
+        return entry
+
+
+#=============================================================================
+class QueryTiming( NamedTuple ):
+    """The class of the timings of queries run by parallel executors.
+    
+    They are the values of the QueryTimingWarning messages of the query
+    results (see module parallel).
+    
+    Attributes:
+        connect_s: float
+            The duration of the opening of the connection, in seconds.
+        execute_s: float
+            The duration of the execution, in seconds.
+        fetch_s: float
+            The duration of the fetch of the rows, in seconds.
+        worker: str
+            The name of the thread or of the process which ran the query.
+    """
+    connect_s: float
+    execute_s: float
+    fetch_s  : float
+    worker   : str
+    
+    #-------------------------------------------------------------------------
+    def __str__(self) -> str:
+        return ( f"query run by {self.worker} in {self.total_s:.6f} s (connect {self.connect_s:.6f} s, "
+                 f"execute {self.execute_s:.6f} s, fetch {self.fetch_s:.6f} s)" )
+    
+    #-------------------------------------------------------------------------
+    @property
+    def total_s(self) -> float:
+        '''The whole duration of the query, in seconds.
+        '''
+        return self.connect_s + self.execute_s + self.fetch_s
+
+
 #=====   end of   Libs.ObjectSqlLib.extension_messages   =====#
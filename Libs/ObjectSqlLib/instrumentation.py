@@ -0,0 +1,425 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the instrumentation of connections and cursors.
+#
+# An InstrumentedConnection wraps a connection of a concrete driver. Its
+# cursors record, per normalized statement, the latencies of executions
+# and of fetches,  the counts of fetched and affected rows and the esti-
+# mated count of transferred bytes.  Latencies are recorded in fixed-
+# memory  HDR-style  histograms.  The whole instrumentation may be ex-
+# ported as a dict or a JSON snapshot.  When it is disabled,  its cost
+# is the one of a single test per call.  Slow executions may be logged
+# with their query plan into a SlowQueryLog (see module slow_query_log).
+#
+
+#=============================================================================
+import json
+from array  import array
+from time   import perf_counter, time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .                   import Connection, Cursor, SlowStatementWarning
+from .batching           import parameters_size
+from .extension_messages import SlowStatement
+from .slow_query_log     import SlowQueryLog
+from .sql_analysis       import is_read_only, normalize_statement
+from .statement_batch    import Statement
+from .wrappers           import ConnectionWrapper, CursorWrapper
+
+
+#=============================================================================
+class LatencyHistogram:
+    """The class of fixed-memory histograms of latencies.
+    
+    Latencies are recorded in microseconds into log-linear buckets, as
+    HDR histograms do:  values below 32 us get their own bucket,  while
+    every further power of two is split into 16 linear buckets.  The
+    relative error on recorded values is then below 6.25 %,  and values
+    up to 2^36 us (about 19 hours) fit into 528 buckets,  i.e. 4 KB.
+    Larger values are recorded into the last bucket.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self) -> None:
+        '''Constructor.
+        '''
+        self._counts = array( 'Q', bytes(8 * self._BUCKETS_COUNT) )
+        self.count = 0
+        self.sum_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    #-------------------------------------------------------------------------
+    def percentile(self, p: float) -> int:
+        '''Returns the upper bound of the bucket of the p-th percentile, in microseconds.
+        
+        Args:
+            p: float
+                The percentile, in range [0.0, 100.0].
+        '''
+        assert 0.0 <= p <= 100.0
+        if self.count == 0:
+            return 0
+        rank = max( 1, round(p / 100.0 * self.count) )
+        cumulated = 0
+        for index, count in enumerate( self._counts ):
+            cumulated += count
+            if cumulated >= rank:
+                return min( self._bucket_upper_bound(index), self.max_us )
+        return self.max_us
+
+    #-------------------------------------------------------------------------
+    def record(self, duration_s: float) -> None:
+        '''Records a latency.
+        
+        Args:
+            duration_s: float
+                The latency, expressed as a fractional value of seconds.
+        '''
+        value = int( duration_s * 1_000_000 )
+        if value < 32:
+            index = value if value >= 0 else 0
+        else:
+            shift = value.bit_length() - 5
+            index = min( 16 + 16 * shift + (value >> shift) - 16, self._BUCKETS_COUNT - 1 )
+        self._counts[ index ] += 1
+        self.count += 1
+        self.sum_us += value
+        if self.min_us is None or value < self.min_us:
+            self.min_us = value
+        if value > self.max_us:
+            self.max_us = value
+
+    #-------------------------------------------------------------------------
+    def to_dict(self) -> Dict:
+        '''Returns a snapshot of this histogram.
+        
+        Latencies are expressed in microseconds. Buckets are listed as
+        pairs (upper bound, count) of their non-empty buckets.
+        '''
+        return { 'count'  : self.count,
+                 'min_us' : self.min_us or 0,
+                 'max_us' : self.max_us,
+                 'mean_us': self.sum_us / self.count if self.count else 0.0,
+                 'p50_us' : self.percentile( 50.0 ),
+                 'p90_us' : self.percentile( 90.0 ),
+                 'p99_us' : self.percentile( 99.0 ),
+                 'p999_us': self.percentile( 99.9 ),
+                 'buckets': [ (self._bucket_upper_bound(i), c) for i, c in enumerate(self._counts) if c ] }
+
+    #-------------------------------------------------------------------------
+    def _bucket_upper_bound(self, index: int) -> int:
+        '''Returns the greatest value, in microseconds, recorded into a bucket.
+        '''
+        if index < 32:
+            return index
+        shift, sub_bucket = divmod( index - 16, 16 )
+        return ((sub_bucket + 17) << shift) - 1
+
+    #-------------------------------------------------------------------------
+    # Class data
+    _BUCKETS_COUNT = 32 + 16 * 31
+
+
+#=============================================================================
+class StatementStats:
+    """The class of statistics of a normalized statement.
+    
+    '.rows_affected' counts the rows of the operations which are not read-
+    only (see function sql_analysis.is_read_only()).
+    """
+    #-------------------------------------------------------------------------
+    def __init__(self, read_only: Optional[bool] = None) -> None:
+        '''Constructor.
+        
+        Args:
+            read_only: bool
+                True if the statement only reads data,  or None if it is
+                not known, e.g. for statistics shared by many statements,
+                in which case every execution is analyzed. Defaults to None.
+        '''
+        self.read_only = read_only
+        self.executions = 0
+        self.errors = 0
+        self.rows_fetched = 0
+        self.rows_affected = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.execute_latency = LatencyHistogram()
+        self.fetch_latency = LatencyHistogram()
+
+    #-------------------------------------------------------------------------
+    def to_dict(self) -> Dict:
+        '''Returns a snapshot of these statistics.
+        '''
+        return { 'executions'     : self.executions,
+                 'errors'         : self.errors,
+                 'rows_fetched'   : self.rows_fetched,
+                 'rows_affected'  : self.rows_affected,
+                 'bytes_sent'     : self.bytes_sent,
+                 'bytes_received' : self.bytes_received,
+                 'execute_latency': self.execute_latency.to_dict(),
+                 'fetch_latency'  : self.fetch_latency.to_dict() }
+
+
+#=============================================================================
+class Instrumentation:
+    """The class of instrumentations of connections.
+    
+    Statistics are kept per normalized statement (see function
+    sql_analysis.normalize_statement()).  At most '.max_statements'
+    statements are tracked,  further ones being aggregated under the
+    key OTHER_STATEMENTS, so that memory stays bounded.
+    
+    Executions that last longer than '.slow_threshold_s' seconds are
+    reported in the messages of their cursor as SlowStatementWarning,
+    with a SlowStatement as value.  They are also recorded into '.slow_
+    query_log' when it is set, with the plan of their operation.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, enabled         : bool = True,
+                       slow_threshold_s: Optional[float] = None,
+                       max_statements  : int = 1000,
+                       slow_query_log  : Optional[SlowQueryLog] = None) -> None:
+        '''Constructor.
+        
+        Args:
+            enabled: bool
+                Set this to False to create a disabled instrumentation.
+                Defaults to True.
+            slow_threshold_s: float
+                The duration of executions,  expressed as a fractional
+                value of seconds, above which a SlowStatementWarning is
+                reported. May be None for no report. Defaults to None.
+            max_statements: int
+                The maximum count of tracked normalized statements.
+                Defaults to 1000.
+            slow_query_log: SlowQueryLog
+                The log of the executions which last longer than  the
+                slow threshold. May be None. Defaults to None.
+        '''
+        assert max_statements > 0
+        self.enabled = enabled
+        self.slow_threshold_s = slow_threshold_s
+        self.max_statements = max_statements
+        self.slow_query_log = slow_query_log
+        self.statements: Dict[str, StatementStats] = {}
+
+    #-------------------------------------------------------------------------
+    def reset(self) -> None:
+        '''Drops all recorded statistics.
+        '''
+        self.statements = {}
+
+    #-------------------------------------------------------------------------
+    def snapshot(self) -> Dict[str, Dict]:
+        '''Returns a snapshot of the statistics of all statements, keyed by normalized statement.
+        '''
+        return { statement: stats.to_dict() for statement, stats in self.statements.items() }
+
+    #-------------------------------------------------------------------------
+    def stats_for(self, operation: str) -> StatementStats:
+        '''Returns the statistics of the normalized form of an operation.
+        '''
+        statement = normalize_statement( operation )
+        try:
+            return self.statements[ statement ]
+        except KeyError:
+            if len( self.statements ) >= self.max_statements:
+                return self.statements.setdefault( self.OTHER_STATEMENTS, StatementStats() )
+            return self.statements.setdefault( statement, StatementStats(is_read_only(operation)) )
+
+    #-------------------------------------------------------------------------
+    def to_json(self, indent: Optional[int] = None) -> str:
+        '''Returns a JSON snapshot of the statistics of all statements.
+        '''
+        return json.dumps( self.snapshot(), indent=indent )
+
+    #-------------------------------------------------------------------------
+    # Class data
+    OTHER_STATEMENTS = '<other statements>'
+
+
+#=============================================================================
+class InstrumentedConnection( ConnectionWrapper ):
+    """The class of instrumented connections.
+    
+    Instrumented connections wrap a connection of a concrete driver.
+    Their cursors record their activity into '.instrumentation'.
+    
+    Usage:
+        cnx = InstrumentedConnection( MyConnection('my_dsn'), Instrumentation(slow_threshold_s=0.5) )
+        ...
+        print( cnx.instrumentation.to_json(indent=2) )
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, connection     : Connection,
+                       instrumentation: Optional[Instrumentation] = None) -> None:
+        '''Constructor.
+        
+        Args:
+            connection: Connection
+                A reference to the wrapped connection.
+            instrumentation: Instrumentation
+                A reference to the instrumentation which records the
+                activity of the cursors. May be shared by many connect-
+                ions of a same thread. May be None, in which case a new
+                enabled one is created. Defaults to None.
+        '''
+        super().__init__( connection )
+        self.instrumentation = Instrumentation() if instrumentation is None else instrumentation
+
+    #-------------------------------------------------------------------------
+    def _wrap_cursor(self, cursor: Cursor) -> Cursor:
+        return InstrumentedCursor( self, cursor )
+
+
+#=============================================================================
+class InstrumentedCursor( CursorWrapper ):
+    """The class of cursors of instrumented connections.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, parent_connection: InstrumentedConnection, source: Cursor) -> None:
+        '''Constructor.
+        '''
+        super().__init__( parent_connection, source )
+        self._stats = None
+
+    #-------------------------------------------------------------------------
+    def execute(self, operation: str, *parameters) -> Optional:
+        instrumentation = self._connection.instrumentation
+        if not instrumentation.enabled:
+            self._stats = None
+            return super().execute( operation, *parameters )
+        
+        self._stats = stats = instrumentation.stats_for( operation )
+        if parameters:
+            stats.bytes_sent += parameters_size( parameters[0] )
+        start = perf_counter()
+        try:
+            result = super().execute( operation, *parameters )
+        except Exception:
+            stats.errors += 1
+            raise
+        self._record_execution( instrumentation, stats, operation, parameters[0] if parameters else None,
+                                perf_counter() - start )
+        return result
+
+    #-------------------------------------------------------------------------
+    def execute_batch(self, statements: Iterable[Statement]) -> None:
+        '''Executes a batch of operations, which are not instrumented one by one.
+        '''
+        self._stats = None
+        super().execute_batch( statements )
+
+    #-------------------------------------------------------------------------
+    def executemany(self, operation: str, seq_of_parameters: tuple) -> Optional:
+        instrumentation = self._connection.instrumentation
+        if not instrumentation.enabled:
+            self._stats = None
+            return super().executemany( operation, seq_of_parameters )
+        
+        self._stats = stats = instrumentation.stats_for( operation )
+        start = perf_counter()
+        try:
+            result = super().executemany( operation, seq_of_parameters )
+        except Exception:
+            stats.errors += 1
+            raise
+        self._record_execution( instrumentation, stats, operation, None, perf_counter() - start, False )
+        return result
+
+    #-------------------------------------------------------------------------
+    def fetchall(self) -> List[Tuple]:
+        if self._stats is None:
+            return self._source.fetchall()
+        start = perf_counter()
+        rows = self._source.fetchall()
+        self._record_fetch( rows, perf_counter() - start )
+        return rows
+
+    #-------------------------------------------------------------------------
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        size = self._array_size if size is None else size
+        if self._stats is None:
+            return self._source.fetchmany( size )
+        start = perf_counter()
+        rows = self._source.fetchmany( size )
+        self._record_fetch( rows, perf_counter() - start )
+        return rows
+
+    #-------------------------------------------------------------------------
+    def fetchone(self) -> Optional[Tuple]:
+        if self._stats is None:
+            return self._source.fetchone()
+        start = perf_counter()
+        row = self._source.fetchone()
+        self._record_fetch( () if row is None else (row,), perf_counter() - start )
+        return row
+
+    #-------------------------------------------------------------------------
+    def _record_execution(self, instrumentation: Instrumentation,
+                                stats          : StatementStats,
+                                operation      : str,
+                                parameters     : object,
+                                duration_s     : float,
+                                explain        : bool = True) -> None:
+        '''Records an execution and reports it if it is slow.
+        
+        Slow executions are recorded into the slow-query log of the
+        instrumentation, if any,  with the plan of their operation un-
+        less explain is False.
+        '''
+        stats.executions += 1
+        stats.execute_latency.record( duration_s )
+        if self._row_count is not None and self._row_count > 0:
+            read_only = stats.read_only
+            if read_only is None:
+                read_only = is_read_only( operation )
+            if not read_only:
+                stats.rows_affected += self._row_count
+        threshold_s = instrumentation.slow_threshold_s
+        if threshold_s is not None and duration_s > threshold_s:
+            rowcount = -1 if self._row_count is None else self._row_count
+            log = instrumentation.slow_query_log
+            if log is None:
+                slow = SlowStatement( operation, parameters, duration_s, threshold_s, time(), rowcount )
+            else:
+                slow = log.record( operation, parameters, duration_s, threshold_s, rowcount, explain )
+            self._messages.append( (SlowStatementWarning, slow) )
+
+    #-------------------------------------------------------------------------
+    def _record_fetch(self, rows: List[Tuple], duration_s: float) -> None:
+        '''Records a fetch.
+        '''
+        stats = self._stats
+        stats.fetch_latency.record( duration_s )
+        stats.rows_fetched += len( rows )
+        stats.bytes_received += sum( parameters_size(row) for row in rows )
+
+
+#=====   end of   Libs.ObjectSqlLib.instrumentation   =====#
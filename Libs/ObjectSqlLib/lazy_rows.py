@@ -0,0 +1,195 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the lazy rows of result sets.
+#
+# Lazy rows are compact row objects over the raw data of rows as recei-
+# ved from the database.  A column is decoded when it is first accessed
+# and its value is then cached in a slot of the row. Rows may be accessed
+# by index, by column name and as attributes named after the columns.
+#
+# The classes of lazy rows are created per list of column names and of
+# decoders,  and cached (see lazy_row_class()).  Drivers may inherit from
+# LazyRow to decode the raw layout of their rows (see Cursor.lazy_rows).
+#
+
+#=============================================================================
+from functools import lru_cache
+from typing    import Callable, Iterator, List, Optional, Tuple, Union
+
+
+#=============================================================================
+class LazyRow:
+    """The base class of lazy rows.
+    
+    In this base class, the raw data of a row is the sequence  of  the
+    raw values of its columns,  which are decoded with the decoders of
+    the class,  if any.  Inheriting classes may overwrite  '._decode()'
+    and '._decode_all()' for other layouts of raw data.
+    
+    Lazy rows compare equal to the tuples of their values.  They are
+    pickled as such tuples.
+    
+    Names of columns which are also names of attributes of lazy rows
+    (e.g. 'keys') are accessed by subscription only:  row['keys'].
+    """
+    __slots__ = ( '_raw', )
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, raw: object) -> None:
+        '''Constructor.
+        
+        Args:
+            raw: object
+                The raw data of the row.
+        '''
+        self._raw = raw
+
+    #-------------------------------------------------------------------------
+    def __eq__(self, other: object) -> bool:
+        if isinstance( other, (tuple, LazyRow) ):
+            return tuple( self ) == tuple( other )
+        return NotImplemented
+
+    #-------------------------------------------------------------------------
+    def __getattr__(self, name: str) -> object:
+        try:
+            index = self._names[ name ]
+        except KeyError:
+            raise AttributeError( f"row has no column '{name}'" ) from None
+        return self._value( index )
+
+    #-------------------------------------------------------------------------
+    def __getitem__(self, key: Union[int, slice, str]) -> object:
+        if isinstance( key, str ):
+            try:
+                return self._value( self._names[key] )
+            except KeyError:
+                raise KeyError( f"row has no column '{key}'" ) from None
+        if isinstance( key, slice ):
+            return tuple( self )[ key ]
+        count = len( self._names_list )
+        if key < 0:
+            key += count
+        if not 0 <= key < count:
+            raise IndexError( "row index out of range" )
+        return self._value( key )
+
+    #-------------------------------------------------------------------------
+    def __hash__(self) -> int:
+        return hash( tuple(self) )
+
+    #-------------------------------------------------------------------------
+    def __iter__(self) -> Iterator[object]:
+        return iter( self._decode_all() )
+
+    #-------------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len( self._names_list )
+
+    #-------------------------------------------------------------------------
+    def __reduce__(self) -> Tuple:
+        return ( tuple, (tuple(self),) )
+
+    #-------------------------------------------------------------------------
+    def __repr__(self) -> str:
+        return f"LazyRow({', '.join(f'{name}={value!r}' for name, value in zip(self._names_list, self))})"
+
+    #-------------------------------------------------------------------------
+    def keys(self) -> List[str]:
+        '''Returns the names of the columns of this row.
+        '''
+        return list( self._names_list )
+
+    #-------------------------------------------------------------------------
+    def _decode(self, index: int) -> object:
+        '''Decodes the value of a column from the raw data of this row.
+        '''
+        return self._decoders[ index ]( self._raw[index] )
+
+    #-------------------------------------------------------------------------
+    def _decode_all(self) -> Tuple:
+        '''Returns the values of all the columns of this row.
+        '''
+        if self._decoders is None:
+            return tuple( self._raw )
+        return tuple( self._value(index) for index in range(len(self._names_list)) )
+
+    #-------------------------------------------------------------------------
+    def _value(self, index: int) -> object:
+        '''Returns the value of a column, decoded on first access and then cached.
+        '''
+        if self._decoders is None:
+            return self._raw[ index ]
+        cache = self._cache_slots[ index ]
+        try:
+            return cache.__get__( self )
+        except AttributeError:
+            value = self._decode( index )
+            cache.__set__( self, value )
+            return value
+
+    #-------------------------------------------------------------------------
+    # Class data - set per class of lazy rows by lazy_row_class()
+    _names: dict = {}                   ## column name -> index of the first column with that name
+    _names_list: Tuple[str, ...] = ()
+    _decoders: Optional[Tuple[Optional[Callable], ...]] = None
+    _cache_slots: Tuple = ()            ## member descriptors of the caches of decoded values
+
+
+#=============================================================================
+@lru_cache( maxsize=256 )
+def lazy_row_class(names   : Tuple[str, ...],
+                   decoders: Optional[Tuple[Optional[Callable], ...]] = None,
+                   base    : type = LazyRow) -> type:
+    '''Returns the class of the lazy rows with given columns.
+    
+    Classes are cached per arguments.  Every class gets one slot per
+    column to cache the decoded values, unless decoders is None.
+    
+    Args:
+        names: Tuple[str, ...]
+            The names of the columns, as in Cursor.description.
+        decoders: Tuple[Callable, ...]
+            The decoders of the raw values of the columns.  May be None
+            if the raw values are the values, in which case the lazy
+            rows only provide the access by names.  Defaults to None.
+        base: type
+            LazyRow or one of its inheriting classes. Defaults to
+            LazyRow.
+    
+    Returns:
+        The class of the lazy rows, whose constructor gets the raw data
+        of a row.
+    '''
+    slots = () if decoders is None else tuple( f'_v{index}' for index in range(len(names)) )
+    row_class = type( base.__name__, (base,), {
+                      '__slots__'  : slots,
+                      '_names'     : { name: index for index, name in reversed(list(enumerate(names))) },
+                      '_names_list': tuple( names ),
+                      '_decoders'  : decoders } )
+    row_class._cache_slots = tuple( row_class.__dict__[slot] for slot in slots )
+    return row_class
+
+
+#=====   end of   Libs.ObjectSqlLib.lazy_rows   =====#
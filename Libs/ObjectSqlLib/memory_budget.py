@@ -0,0 +1,172 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the memory budgets of the rows buffered by cursors.
+#
+# Every connection charges the bytes of the rows its cursors buffer to a
+# MemoryBudget (see Connection.memory_budget), which may be shared by the
+# connections of a worker. Its gauge of buffered bytes is live:  cursors
+# release their bytes as soon as their rows are dropped.
+#
+# Cursors whose buffered rows exceed the budget either degrade to stre-
+# aming their result set with '.fetchmany()' or raise OperationalError,
+# according to the policy of the budget.  Drivers which do not buffer
+# result sets only check that '.fetchall()' keeps within the budget.
+#
+
+#=============================================================================
+from threading import Lock
+from typing    import Dict, Optional, Sequence, Tuple
+
+from .         import OperationalError
+from .batching import parameters_size
+
+
+#=============================================================================
+class MemoryBudget:
+    """The class of memory budgets of buffered rows.
+    
+    The budget is checked by cursors after they have buffered rows, so
+    that it may be exceeded by the last buffered chunk of rows. Budgets
+    are thread safe.
+    
+    Usage:
+        budget = MemoryBudget( 256 << 20, on_exceeded='stream' )
+        for cnx in worker_connections:
+            cnx.memory_budget = budget
+        ...
+        print( budget.buffered_bytes, budget.peak_bytes )
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, max_bytes  : Optional[int] = None,
+                       on_exceeded: str = 'stream') -> None:
+        '''Constructor.
+        
+        Args:
+            max_bytes: int
+                The maximum count of bytes buffered by the cursors of
+                the charged connections. May be None for no  budget,
+                in which case bytes are only counted. Defaults to None.
+            on_exceeded: str
+                'stream' to have cursors stream their result  set  when
+                it exceeds the budget,  or 'raise' to have them raise
+                OperationalError. Defaults to 'stream'.
+        '''
+        assert max_bytes is None or max_bytes > 0
+        assert on_exceeded in ( 'raise', 'stream' )
+        self.max_bytes = max_bytes
+        self.on_exceeded = on_exceeded
+        self._lock = Lock()
+        self._buffered_bytes = 0
+        self._peak_bytes = 0
+        self.exceeded_count = 0
+
+    #-------------------------------------------------------------------------
+    @property
+    def buffered_bytes(self) -> int:
+        '''The live count of the bytes buffered by the charged cursors.
+        '''
+        return self._buffered_bytes
+
+    #-------------------------------------------------------------------------
+    @property
+    def is_limited(self) -> bool:
+        '''True if this budget has a maximum count of bytes.
+        '''
+        return self.max_bytes is not None
+
+    #-------------------------------------------------------------------------
+    @property
+    def peak_bytes(self) -> int:
+        '''The maximum count of buffered bytes ever reached.
+        '''
+        return self._peak_bytes
+
+    #-------------------------------------------------------------------------
+    def charge(self, nbytes: int) -> bool:
+        '''Charges newly buffered bytes.
+        
+        Args:
+            nbytes: int
+                The count of bytes which have just been buffered.
+        
+        Returns:
+            True if the buffered bytes keep within the budget, or False
+            otherwise, in which case the charged cursor should release
+            its bytes or stop buffering.
+        '''
+        with self._lock:
+            self._buffered_bytes += nbytes
+            if self._buffered_bytes > self._peak_bytes:
+                self._peak_bytes = self._buffered_bytes
+            if self.max_bytes is None or self._buffered_bytes <= self.max_bytes:
+                return True
+            self.exceeded_count += 1
+            return False
+
+    #-------------------------------------------------------------------------
+    def error(self, what: str) -> OperationalError:
+        '''Returns the error raised by cursors which exceed this budget.
+        
+        Args:
+            what: str
+                The description of what exceeded the budget.
+        '''
+        return OperationalError( f"{what} exceeds the memory budget of {self.max_bytes} bytes "
+                                 f"({self._buffered_bytes} bytes buffered) - "
+                                 "fetch it with '.fetchmany()' or raise the budget" )
+
+    #-------------------------------------------------------------------------
+    def release(self, nbytes: int) -> None:
+        '''Releases bytes which are not buffered anymore.
+        '''
+        if nbytes:
+            with self._lock:
+                self._buffered_bytes -= nbytes
+
+    #-------------------------------------------------------------------------
+    def to_dict(self) -> Dict:
+        '''Returns a snapshot of this budget.
+        '''
+        return { 'max_bytes'     : self.max_bytes,
+                 'on_exceeded'   : self.on_exceeded,
+                 'buffered_bytes': self._buffered_bytes,
+                 'peak_bytes'    : self._peak_bytes,
+                 'exceeded'      : self.exceeded_count }
+
+
+#=============================================================================
+def rows_size(rows: Sequence[Tuple]) -> int:
+    '''Returns an estimation of the size in bytes of rows of Python values.
+    
+    Drivers which know the size of the rows they receive should  charge
+    that size rather than this estimation (see parameters_size()).
+    '''
+    return sum( parameters_size(row) for row in rows ) + _ROW_OVERHEAD * len( rows )
+
+
+_ROW_OVERHEAD = 64  # estimated size of the tuple of a row, in bytes
+
+
+#=====   end of   Libs.ObjectSqlLib.memory_budget   =====#
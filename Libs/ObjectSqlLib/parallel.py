@@ -0,0 +1,209 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the parallel execution of independent queries.
+#
+# Function run_queries() runs every query on its own connection, opened
+# by a factory of connections,  in a pool of threads or of processes.
+# Threads suit drivers which release the GIL while they wait for their
+# database,  e.g. network ones.  Processes suit queries whose results
+# are costly to decode, at the cost of pickling them back.
+#
+# The results of the queries are buffered by the workers and yielded as
+# they complete,  or in the order of the queries.  Every result carries
+# the messages of the cursor which ran its query,  extended with the
+# timing of the query (QueryTimingWarning) and with the error which in-
+# terrupted it, if any: errors do not stop the other queries.
+#
+
+#=============================================================================
+import os
+import threading
+from concurrent.futures import as_completed, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from time               import perf_counter
+from typing             import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .                   import Connection, QueryTimingWarning
+from .extension_messages import ExtensionMessages, QueryTiming
+from .statement_batch    import ResultSet, Statement
+
+
+#=============================================================================
+class QueryResult( ResultSet ):
+    """The class of the buffered results of queries run in parallel.
+    
+    Attributes:
+        index: int
+            The index of the query in the sequence of queries.
+        operation: str
+            The text of the query.
+        parameters: Sequence
+            The parameters of the query, or None.
+        messages: ExtensionMessages
+            The messages of the cursor which ran the query, followed by
+            its timing and by its error, if any.
+        timing: QueryTiming
+            The timing of the query.
+        error: Exception
+            The error which interrupted the query, or None.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, index     : int,
+                       operation : str,
+                       parameters: Optional[Sequence]) -> None:
+        '''Constructor.
+        '''
+        super().__init__( None, None )
+        self.index = index
+        self.operation = operation
+        self.parameters = parameters
+        self.messages: ExtensionMessages = []
+        self.timing: Optional[QueryTiming] = None
+        self.error: Optional[Exception] = None
+
+
+#=============================================================================
+def run_queries(connect_factory: Callable[[], Connection],
+                queries        : Iterable[Union[str, Statement]],
+                workers        : int = 4,
+                ordered        : bool = False,
+                processes      : bool = False) -> Iterator[QueryResult]:
+    '''Runs independent queries in parallel, each one on its own connection.
+    
+    This is not part of PEP 249.  The results are yielded as soon as
+    they are available.  Closing the returned iterator before its end
+    cancels the queries which have not started yet.
+    
+    Usage:
+        for result in run_queries( lambda: MyConnection('my_dsn'), report_queries, workers=8 ):
+            if result.error is None:
+                print( result.index, result.fetchall() )
+    
+    Args:
+        connect_factory: Callable[[], Connection]
+            The function which opens the connection of every query.  With
+            processes, it must be picklable, e.g. a module-level function
+            or a functools.partial() of a connection class.
+        queries: Iterable[Union[str, Statement]]
+            The queries, as texts or as pairs (operation, parameters).
+        workers: int
+            The count of threads or of processes running the queries.
+            Defaults to 4.
+        ordered: bool
+            Set this to True for the results to be yielded in the order
+            of the queries rather than in their order of completion. De-
+            faults to False.
+        processes: bool
+            Set this to True to run the queries in a pool of processes
+            rather than of threads. Defaults to False.
+    
+    Returns:
+        An iterator over the results of the queries.
+    '''
+    assert workers > 0
+    statements = [ (query, None) if isinstance(query, str) else tuple(query) for query in queries ]
+    return _results( connect_factory, statements, workers, ordered, processes )
+
+
+#-------------------------------------------------------------------------
+def _results(connect_factory: Callable[[], Connection],
+             statements     : List[Statement],
+             workers        : int,
+             ordered        : bool,
+             processes      : bool) -> Iterator[QueryResult]:
+    '''Submits the queries and yields their results.
+    '''
+    if processes:
+        executor = ProcessPoolExecutor( min(workers, len(statements) or 1) )
+    else:
+        executor = ThreadPoolExecutor( min(workers, len(statements) or 1), thread_name_prefix='query' )
+    try:
+        futures: List[Future] = [ executor.submit(_run_query, connect_factory, index, operation, parameters, processes)
+                                  for index, (operation, parameters) in enumerate(statements) ]
+        for future in ( futures if ordered else as_completed(futures) ):
+            yield future.result()
+    finally:
+        executor.shutdown( wait=True, cancel_futures=True )
+
+
+#-------------------------------------------------------------------------
+def _run_query(connect_factory: Callable[[], Connection],
+               index          : int,
+               operation      : str,
+               parameters     : Optional[Sequence],
+               owned_values   : bool) -> QueryResult:
+    '''Runs a query on a new connection and buffers its result, in a worker.
+    
+    Errors are captured into the result rather than raised.  When owned_
+    values is True,  memoryviews are copied into bytes,  so that results
+    can be pickled back from processes.
+    '''
+    result = QueryResult( index, operation, parameters )
+    worker = f"process {os.getpid()}" if owned_values else threading.current_thread().name
+    times = [ perf_counter() ]
+    connection = cursor = None
+    try:
+        connection = connect_factory()
+        times.append( perf_counter() )
+        cursor = connection.cursor()
+        if parameters is None:
+            cursor.execute( operation )
+        else:
+            cursor.execute( operation, parameters )
+        times.append( perf_counter() )
+        result.description = cursor.description
+        result.row_count = cursor.rowcount
+        if result.description is not None:
+            rows = cursor.fetchall()
+            result.rows = [ _owned(row) for row in rows ] if owned_values else rows
+        times.append( perf_counter() )
+    except Exception as e:
+        result.error = e
+        times.append( perf_counter() )  ## the duration of the failed step
+    finally:
+        if cursor is not None:
+            result.messages += cursor._messages
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception as e:
+                if result.error is None:
+                    result.error = e
+    
+    times += [ times[-1] ] * ( 4 - len(times) )
+    result.timing = QueryTiming( times[1] - times[0], times[2] - times[1], times[3] - times[2], worker )
+    result.messages.append( (QueryTimingWarning, result.timing) )
+    if result.error is not None:
+        result.messages.append( (type(result.error), result.error) )
+    return result
+
+
+#-------------------------------------------------------------------------
+def _owned(row: Sequence) -> Tuple:
+    '''Returns a row with its memoryviews copied into bytes.
+    '''
+    return tuple( value.tobytes() if isinstance(value, memoryview) else value for value in row )
+
+
+#=====   end of   Libs.ObjectSqlLib.parallel   =====#
@@ -0,0 +1,293 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the prefetching of rows behind cursors iterations.
+#
+# Rows are fetched by batches with '.fetchmany()'.  The size of batches
+# is tuned at runtime by an adaptive controller from the observed width
+# of rows and latency of fetches,  within a budget of memory.  Batches
+# may be fetched by a background thread, which overlaps the fetching of
+# the next batch with the processing of the current one by the consumer.
+#
+
+#=============================================================================
+import threading
+import weakref
+from collections import deque
+from queue       import Queue
+from time        import perf_counter
+from typing      import ForwardRef, List, Optional, Tuple
+
+from .batching import parameters_size
+
+
+#=============================================================================
+CursorRef = ForwardRef( "Cursor" )
+
+
+#=============================================================================
+class AdaptiveArraySize:
+    """The class of controllers of the size of fetched batches.
+    
+    Batches grow twice as large after every fetch which lasts less than
+    the  target  latency,  so  that the cost of round trips to the data-
+    base gets amortized over more rows.  They shrink proportionally when
+    fetches  last longer, so that first rows keep coming promptly.  They
+    are capped in any case so that the prefetched batches - the consumed
+    one, the queued one and the one being fetched - fit in the budget of
+    memory, according to the mean width of the fetched rows.
+    """
+    #-------------------------------------------------------------------------
+    def __init__(self, initial_size     : int = 16,
+                       min_size         : int = 1,
+                       max_size         : int = 10_000,
+                       memory_budget    : int = 8 << 20,
+                       target_latency_s : float = 0.050) -> None:
+        '''Constructor.
+        
+        Args:
+            initial_size: int
+                The size of the first batch. Defaults to 16.
+            min_size: int
+                The minimal size of batches. Defaults to 1.
+            max_size: int
+                The maximal size of batches. Defaults to 10,000.
+            memory_budget: int
+                The budget of bytes for the prefetched rows. Defaults to
+                8 MB.
+            target_latency_s: float
+                The targeted duration of single fetches, expressed as a
+                fractional value of seconds. Defaults to 50 ms.
+        '''
+        assert 0 < min_size <= max_size
+        assert memory_budget > 0 and target_latency_s > 0.0
+        self.min_size = min_size
+        self.max_size = max_size
+        self.memory_budget = memory_budget
+        self.target_latency_s = target_latency_s
+        self.row_width = None   ## mean width of rows, in bytes
+        self._size = min( max(initial_size, min_size), max_size )
+
+    #-------------------------------------------------------------------------
+    @property
+    def size(self) -> int:
+        '''The count of rows of the next batch to fetch.
+        '''
+        return self._size
+
+    #-------------------------------------------------------------------------
+    def update(self, rows: List[Tuple], duration_s: float) -> int:
+        '''Tunes the size of batches from the observations of a fetch.
+        
+        Args:
+            rows: List[Tuple]
+                The fetched rows.
+            duration_s: float
+                The duration of the fetch, expressed as a fractional val-
+                ue of seconds.
+        
+        Returns:
+            The count of rows of the next batch to fetch.
+        '''
+        if rows:
+            width = sum( parameters_size(row) for row in rows ) / len( rows )
+            self.row_width = width if self.row_width is None else 0.75 * self.row_width + 0.25 * width
+            
+            if duration_s < self.target_latency_s:
+                size = 2 * self._size
+            else:
+                size = int( self._size * self.target_latency_s / duration_s )
+            
+            memory_cap = int( self.memory_budget / (3 * max(self.row_width, 1.0)) )
+            self._size = max( self.min_size, min(size, self.max_size, memory_cap) )
+        return self._size
+
+
+#=============================================================================
+class PrefetchIterator:
+    """The class of iterators over the rows of cursors, with prefetched batches.
+    
+    Rows are fetched from the cursor with '.fetchmany()',  by batches of
+    the size provided by an adaptive controller.  With a background
+    thread, the next batch is fetched while the consumer iterates over
+    the current one. The thread is stopped once the result set is ex-
+    hausted or when the iterator gets closed.
+    
+    Notice: the cursor must not be used by the consumer while it gets
+    iterated with a background thread.  Close the iterator - or use it
+    as a context manager - before breaking out of an iteration to exe-
+    cute another operation with the same cursor. Cursors close their
+    last iterator on their next execution,  '.nextset()' or '.close()'
+    (see 'Cursor.prefetched()').  The thread only holds a weak refer-
+    ence to the iterator,  which then gets closed once it is garbage
+    collected.
+    
+    Usage:
+        cursor.execute( "SELECT ..." )
+        with cursor.prefetched( memory_budget=1 << 20 ) as rows:
+            for row in rows:
+                ...
+    """
+    #-------------------------------------------------------------------------
+    def __init__(self, cursor    : CursorRef,
+                       controller: Optional[AdaptiveArraySize] = None,
+                       background: bool = False) -> None:
+        '''Constructor.
+        
+        Args:
+            cursor: Cursor
+                A reference to the iterated cursor.
+            controller: AdaptiveArraySize
+                The controller of the size of batches. May be None,  in
+                which case a controller with default settings is created
+                with the cursor's arraysize as initial size.  Defaults
+                to None.
+            background: bool
+                Set this to True to get batches fetched by a background
+                thread, or to False to get them fetched synchronously on
+                demand. Defaults to False.
+        '''
+        self.controller = controller or AdaptiveArraySize( initial_size=max(cursor.arraysize, 16) )
+        self.fetches_count = 0
+        self.rows_count = 0
+        self.wait_s = 0.0   ## the cumulated time the consumer waited for batches
+        self._cursor = cursor
+        self._batch = deque()
+        self._exhausted = False
+        self._stop = threading.Event()
+        self._queue = None
+        self._thread = None
+        if background:
+            self._queue = Queue( maxsize=1 )
+            self._thread = threading.Thread( target=_prefetch, name='prefetch', daemon=True,
+                                             args=(weakref.ref(self), self._queue, self._stop) )
+            self._thread.start()
+
+    #-------------------------------------------------------------------------
+    def __del__(self) -> None:
+        self.close()
+
+    #-------------------------------------------------------------------------
+    def __enter__(self) -> 'PrefetchIterator':
+        return self
+
+    #-------------------------------------------------------------------------
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    #-------------------------------------------------------------------------
+    def __iter__(self) -> 'PrefetchIterator':
+        return self
+
+    #-------------------------------------------------------------------------
+    def __next__(self) -> Tuple:
+        '''Returns the next row, or raises StopIteration when the result set is exhausted.
+        
+        Raises:
+            Error: the fetching of a batch failed. The error is re-raised
+                in the thread of the consumer.
+        '''
+        if not self._batch:
+            if self._exhausted:
+                raise StopIteration
+            start = perf_counter()
+            rows = self._next_batch()
+            self.wait_s += perf_counter() - start
+            if not rows:
+                self.close()
+                raise StopIteration
+            self._batch = deque( rows )
+        return self._batch.popleft()
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Stops the prefetching and drops the prefetched rows.
+        
+        Waits for the completion of the pending fetch,  if any,  so that
+        the cursor can be used again once this method returns.
+        '''
+        self._exhausted = True
+        self._batch.clear()
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            ## the thread may drop the last reference to this iterator and get it deleted
+            while thread.is_alive() and thread is not threading.current_thread():
+                ## unblocks the prefetching thread if it is waiting for room in the queue
+                while not self._queue.empty():
+                    self._queue.get_nowait()
+                thread.join( 0.010 )
+            self._thread = None
+
+    #-------------------------------------------------------------------------
+    def _fetch(self) -> List[Tuple]:
+        '''Fetches the next batch of rows and tunes the size of batches.
+        '''
+        start = perf_counter()
+        rows = self._cursor.fetchmany( self.controller.size )
+        self.controller.update( rows, perf_counter() - start )
+        self.fetches_count += 1
+        self.rows_count += len( rows )
+        return rows
+
+    #-------------------------------------------------------------------------
+    def _next_batch(self) -> List[Tuple]:
+        '''Returns the next batch of rows, either fetched in background or now.
+        '''
+        if self._queue is None:
+            return self._fetch()
+        rows = self._queue.get()
+        if isinstance( rows, BaseException ):
+            self.close()
+            raise rows
+        return rows
+
+
+#-------------------------------------------------------------------------
+def _prefetch(iterator_ref: weakref.ref, queue: Queue, stop: threading.Event) -> None:
+    '''Fetches the batches of rows of an iterator in its background thread.
+    
+    Args:
+        iterator_ref: weakref.ref
+            A weak reference to the iterator,  so that the thread does not
+            keep it alive once the consumer dropped it.
+        queue: Queue
+            The queue of the fetched batches (or of the raised exception).
+        stop: threading.Event
+            The event set when the iterator gets closed.
+    '''
+    while not stop.is_set():
+        iterator = iterator_ref()
+        if iterator is None:
+            return
+        try:
+            rows = iterator._fetch()
+        except BaseException as e:
+            rows = e
+        del iterator
+        queue.put( rows )
+        if not rows or isinstance( rows, BaseException ):
+            return
+
+
+#=====   end of   Libs.ObjectSqlLib.prefetch   =====#
@@ -0,0 +1,475 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the opt-in cache of queries results.
+#
+# A CachingConnection wraps a connection of a concrete driver. Results
+# of read-only operations executed with its cursors are cached, keyed by
+# operation and parameters.  Cached entries expire after a TTL and the
+# least recently used ones are evicted when the cache exceeds its budget
+# of bytes.  DML operations executed on the same connection invalidate
+# the entries that read the modified tables, and commits and rollbacks
+# flush the whole cache.  Cache hits are served through the usual
+# '.fetch*()' methods.
+#
+
+#=============================================================================
+from collections import OrderedDict
+from time        import monotonic
+from typing      import Callable, FrozenSet, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .                import Connection, Cursor, ProgrammingError
+from .batching        import BatchReport, parameters_size
+from .sql_analysis    import is_read_only, read_tables, written_table
+from .statement_batch import Statement
+from .wrappers        import ConnectionWrapper, CursorWrapper
+
+
+#=============================================================================
+class CachedResult( NamedTuple ):
+    """The class of cached results sets.
+    """
+    description: Tuple
+    rows       : Tuple[Tuple]
+    row_count  : int
+    tables     : FrozenSet[str]
+    size       : int
+    expires_at : float
+
+
+#=============================================================================
+class ResultCache:
+    """The class of caches of queries results.
+    
+    Entries expire '.ttl_s' seconds after they have been cached. The
+    least recently used entries are evicted when the  cumulated  est-
+    imated size of the cached rows exceeds '.max_bytes'.  Entries are
+    indexed  by the tables they read,  so that they can be invalidated
+    table per table.
+    
+    Notice: as connections, results caches are not thread safe.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, max_bytes: int = 64 << 20,
+                       ttl_s    : float = 60.0,
+                       clock    : Callable[[], float] = monotonic) -> None:
+        '''Constructor.
+        
+        Args:
+            max_bytes: int
+                The budget of bytes of this cache. Defaults to 64 MB.
+            ttl_s: float
+                The time to live of entries,  expressed as a fractional
+                value of seconds. Defaults to 60.0.
+            clock: Callable[[], float]
+                The clock of the cache. Defaults to time.monotonic.
+        '''
+        assert max_bytes > 0
+        assert ttl_s > 0.0
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._tables_keys = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    #-------------------------------------------------------------------------
+    def __len__(self) -> int:
+        '''Returns the count of cached results.
+        '''
+        return len( self._entries )
+
+    #-------------------------------------------------------------------------
+    @property
+    def bytes(self) -> int:
+        '''The cumulated estimated size of the cached results.
+        '''
+        return self._bytes
+
+    #-------------------------------------------------------------------------
+    def clear(self) -> None:
+        '''Flushes the whole cache.
+        '''
+        self._entries.clear()
+        self._tables_keys.clear()
+        self._bytes = 0
+
+    #-------------------------------------------------------------------------
+    def get(self, key: Hashable) -> Optional[CachedResult]:
+        '''Returns the cached result for this key, or None if it is not cached or has expired.
+        '''
+        entry = self._entries.get( key )
+        if entry is None or entry.expires_at <= self._clock():
+            if entry is not None:
+                self._remove( key )
+            self.misses += 1
+            return None
+        self._entries.move_to_end( key )
+        self.hits += 1
+        return entry
+
+    #-------------------------------------------------------------------------
+    def invalidate_tables(self, tables: FrozenSet[str]) -> None:
+        '''Removes the cached results that read any of the specified tables.
+        '''
+        for table in tables:
+            for key in list( self._tables_keys.get(table, ()) ):
+                self._remove( key )
+                self.invalidations += 1
+
+    #-------------------------------------------------------------------------
+    def put(self, key        : Hashable,
+                  description: Tuple,
+                  rows       : List[Tuple],
+                  row_count  : int,
+                  tables     : FrozenSet[str]) -> bool:
+        '''Caches a results set.
+        
+        Least recently used entries are evicted if needed.
+        
+        Args:
+            key: Hashable
+                The key of the result, as returned by 'result_key()'.
+            description: Tuple
+                The description of the columns of the result.
+            rows: List[Tuple]
+                The rows of the result.
+            row_count: int
+                The rowcount of the operation.
+            tables: FrozenSet[str]
+                The names of the tables read by the operation.
+        
+        Returns:
+            True if the result has been cached, or False if it is
+            larger than the whole budget of this cache.
+        '''
+        size = sum( parameters_size(row) + self._ROW_OVERHEAD for row in rows )
+        if size > self.max_bytes:
+            return False
+        if key in self._entries:
+            self._remove( key )
+        while self._bytes + size > self.max_bytes:
+            self._remove( next(iter(self._entries)) )
+        
+        self._entries[ key ] = CachedResult( description, tuple(rows), row_count, tables,
+                                             size, self._clock() + self.ttl_s )
+        self._bytes += size
+        for table in tables:
+            self._tables_keys.setdefault( table, set() ).add( key )
+        return True
+
+    #-------------------------------------------------------------------------
+    def _remove(self, key: Hashable) -> None:
+        '''Removes an entry and its tables index.
+        '''
+        entry = self._entries.pop( key )
+        self._bytes -= entry.size
+        for table in entry.tables:
+            keys = self._tables_keys[ table ]
+            keys.discard( key )
+            if not keys:
+                del self._tables_keys[ table ]
+
+    #-------------------------------------------------------------------------
+    # Class data
+    _ROW_OVERHEAD = 64  # estimated size of the tuple of a row, in bytes
+
+
+#=============================================================================
+class CachingConnection( ConnectionWrapper ):
+    """The class of connections with a cache of queries results.
+    
+    Caching connections wrap a connection of a  concrete driver.  The
+    cursors they create cache the results of read-only operations. The
+    whole cache is flushed on '.commit()' and '.rollback()'.
+    
+    Notice: modifications made by other connections are not seen by the
+    cache before entries expire or the cache gets flushed.
+    
+    Usage:
+        cnx = CachingConnection( MyConnection('my_dsn'), ttl_s=30.0 )
+        cursor = cnx.cursor()
+        cursor.execute( "SELECT ..." )   ## served from cache when run again
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, connection: Connection,
+                       max_bytes : int = 64 << 20,
+                       ttl_s     : float = 60.0) -> None:
+        '''Constructor.
+        
+        Args:
+            connection: Connection
+                A reference to the wrapped connection.
+            max_bytes: int
+                The budget of bytes of the cache. Defaults to 64 MB.
+            ttl_s: float
+                The time to live of cached results, expressed as a
+                fractional value of seconds. Defaults to 60.0.
+        '''
+        super().__init__( connection )
+        self.result_cache = ResultCache( max_bytes, ttl_s )
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes the wrapped connection and flushes the cache.
+        '''
+        self.result_cache.clear()
+        super().close()
+
+    #-------------------------------------------------------------------------
+    def commit(self) -> None:
+        '''Commits the pending transaction and flushes the cache.
+        '''
+        try:
+            self._wrapped.commit()
+        finally:
+            self.result_cache.clear()
+
+    #-------------------------------------------------------------------------
+    def rollback(self) -> None:
+        '''Rolls back the pending transaction and flushes the cache.
+        '''
+        try:
+            self._wrapped.rollback()
+        finally:
+            self.result_cache.clear()
+
+    #-------------------------------------------------------------------------
+    def _wrap_cursor(self, cursor: Cursor) -> Cursor:
+        return CachingCursor( self, cursor )
+
+
+#=============================================================================
+class CachingCursor( CursorWrapper ):
+    """The class of cursors of caching connections.
+    
+    Results of read-only operations are fetched entirely at execution
+    time and cached.  Cached results are then served by the '.fetch*()'
+    methods  with no access to the database.  Other operations are dele-
+    gated to the wrapped cursor after the invalidation of the cached
+    results they may modify.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, parent_connection: CachingConnection, source: Cursor) -> None:
+        '''Constructor.
+        
+        Args:
+            parent_connection: CachingConnection
+                A reference to the caching connection of this cursor.
+            source: Cursor
+                A reference to the wrapped cursor.
+        '''
+        super().__init__( parent_connection, source )
+        self._result = None
+
+    #-------------------------------------------------------------------------
+    @property
+    def description(self) -> Optional[Tuple]:
+        '''The description of the columns of the current result set.
+        '''
+        return self._source.description if self._result is None else self._result.description
+
+    #-------------------------------------------------------------------------
+    @property
+    def rownumber(self) -> int:
+        return self._source.rownumber if self._result is None else self._row_number
+
+    #-------------------------------------------------------------------------
+    def callproc(self, proc_name: str, *parameters) -> Optional:
+        '''Calls a stored database procedure - which flushes the cache since procedures may modify any table.
+        '''
+        self._stop_prefetch()
+        self._result = None
+        self._connection.result_cache.clear()
+        return super().callproc( proc_name, *parameters )
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes this cursor and the wrapped one.
+        '''
+        self._stop_prefetch()
+        self._result = None
+        super().close()
+
+    #-------------------------------------------------------------------------
+    def execute(self, operation: str, *parameters) -> Optional:
+        '''Executes an operation, or serves its result from the cache.
+        '''
+        self._stop_prefetch()
+        cache = self._connection.result_cache
+        self._result = None
+        
+        if not is_read_only( operation ):
+            self._invalidate( cache, operation )
+            return super().execute( operation, *parameters )
+        
+        key = result_key( operation, parameters[0] if parameters else None )
+        if key is None:
+            return super().execute( operation, *parameters )
+        
+        result = cache.get( key )
+        if result is None:
+            super().execute( operation, *parameters )
+            description = self._source.description
+            if description is None:
+                return None
+            rows = self._source.fetchall()
+            tables = read_tables( operation )
+            cache.put( key, description, rows, self._row_count, tables )
+            result = CachedResult( description, tuple(rows), self._row_count, tables, 0, 0.0 )
+        
+        self._result = result
+        self._row_count = result.row_count
+        self._row_number = 0
+        return None
+
+    #-------------------------------------------------------------------------
+    def execute_batch(self, statements: Iterable[Statement]) -> None:
+        '''Executes a batch of operations after the invalidation of the cached results they may modify.
+        
+        Result sets of batches are never served from nor put into the
+        cache.
+        '''
+        self._stop_prefetch()
+        statements = list( statements )
+        cache = self._connection.result_cache
+        self._result = None
+        for operation, _ in statements:
+            if not is_read_only( operation ):
+                self._invalidate( cache, operation )
+        super().execute_batch( statements )
+
+    #-------------------------------------------------------------------------
+    def executemany(self, operation: str, seq_of_parameters: tuple) -> Optional:
+        '''Executes an operation against all the parameters, after the invalidation of the cache.
+        '''
+        self._stop_prefetch()
+        self._result = None
+        self._invalidate( self._connection.result_cache, operation )
+        return super().executemany( operation, seq_of_parameters )
+
+    #-------------------------------------------------------------------------
+    def fetchall(self) -> List[Tuple]:
+        if self._result is None:
+            return self._source.fetchall()
+        rows = list( self._result.rows[self._row_number:] )
+        self._row_number += len( rows )
+        return rows
+
+    #-------------------------------------------------------------------------
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        size = self._array_size if size is None else size
+        if self._result is None:
+            return self._source.fetchmany( size )
+        rows = list( self._result.rows[self._row_number:self._row_number + size] )
+        self._row_number += len( rows )
+        return rows
+
+    #-------------------------------------------------------------------------
+    def fetchone(self) -> Optional[Tuple]:
+        if self._result is None:
+            return self._source.fetchone()
+        if self._row_number >= len( self._result.rows ):
+            return None
+        self._row_number += 1
+        return self._result.rows[ self._row_number - 1 ]
+
+    #-------------------------------------------------------------------------
+    def nextset(self) -> Optional[bool]:
+        self._stop_prefetch()
+        if self._result is None:
+            return super().nextset()
+        self._result = None
+        return None
+
+    #-------------------------------------------------------------------------
+    def scroll(self, value: int, mode: Optional[str] = 'relative') -> None:
+        if self._result is None:
+            return self._source.scroll( value, mode )
+        if mode not in ('relative', 'absolute'):
+            raise ProgrammingError( f"scroll mode '{mode}' is neither 'relative' nor 'absolute'" )
+        position = self._row_number + value if mode == 'relative' else value
+        if not 0 <= position <= len( self._result.rows ):
+            raise IndexError( f"scroll to row {position} out of result set" )
+        self._row_number = position
+
+    #-------------------------------------------------------------------------
+    def _copy_from_native(self, table  : str,
+                                columns: Optional[Sequence[str]],
+                                buffers: Iterator[str],
+                                dialect: object,
+                                null   : str) -> Optional[BatchReport]:
+        '''Runs the native bulk copy of the source cursor, after the invalidation of the copied table.
+        '''
+        self._result = None
+        self._invalidate( self._connection.result_cache, f"INSERT INTO {table} DEFAULT VALUES" )
+        return super()._copy_from_native( table, columns, buffers, dialect, null )
+
+    #-------------------------------------------------------------------------
+    def _invalidate(self, cache: ResultCache, operation: str) -> None:
+        '''Invalidates the cached results that a non read-only operation may modify.
+        '''
+        table = written_table( operation )
+        if table is None:
+            cache.clear()
+        else:
+            cache.invalidate_tables( frozenset((table,)) )
+
+
+#=============================================================================
+def result_key(operation: str, parameters: object) -> Optional[Hashable]:
+    '''Returns the cache key of an operation and its parameters.
+    
+    Args:
+        operation: str
+            The text of the operation.
+        parameters: object
+            The parameters of the operation - a sequence,  a mapping or
+            None.
+    
+    Returns:
+        The key, or None if the parameters are not hashable, in which
+        case the result cannot be cached.  Keys hold the type of every
+        parameter,  since equal values of distinct types - e.g. 1, 1.0
+        and True - may not give the same results.
+    '''
+    if parameters is None:
+        key = (operation, None)
+    elif isinstance( parameters, dict ):
+        key = (operation, tuple(sorted( (name, type(value), value) for name, value in parameters.items() )))
+    else:
+        key = (operation, tuple( (type(value), value) for value in parameters ))
+    try:
+        hash( key )
+    except TypeError:
+        return None
+    return key
+
+
+#=====   end of   Libs.ObjectSqlLib.result_cache   =====#
@@ -0,0 +1,426 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the read/write routing of operations over a
+#  primary database and its read replicas.
+#
+# A RoutingConnection wraps a connection to the primary database and
+# connections to its replicas.  Read-only operations executed with its
+# cursors are sent to the replicas, either to the one with the least
+# outstanding requests or round-robin.  Writes, and any operation of a
+# pending transaction, are sent to the primary.  Reads also stay on the
+# primary for a while after the commit of writes, so that clients read
+# their own writes whatever the replication lag.
+#
+
+#=============================================================================
+from time   import monotonic, perf_counter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .                import Connection, Cursor
+from .batching        import BatchReport
+from .instrumentation import LatencyHistogram
+from .memory_budget   import MemoryBudget
+from .sql_analysis    import is_read_only
+from .statement_batch import Statement
+from .wrappers        import ConnectionWrapper, CursorWrapper
+
+
+#=============================================================================
+class NodeStats:
+    """The class of statistics of the load of a node, i.e. the primary or a replica.
+    """
+    #-------------------------------------------------------------------------
+    def __init__(self) -> None:
+        '''Constructor.
+        '''
+        self.reads = 0
+        self.writes = 0
+        self.errors = 0
+        self.outstanding = 0    ## count of result sets not consumed yet
+        self.latency = LatencyHistogram()
+
+    #-------------------------------------------------------------------------
+    def to_dict(self) -> Dict:
+        '''Returns a snapshot of these statistics.
+        '''
+        return { 'reads'      : self.reads,
+                 'writes'     : self.writes,
+                 'errors'     : self.errors,
+                 'outstanding': self.outstanding,
+                 'latency'    : self.latency.to_dict() }
+
+
+#=============================================================================
+class RoutingConnection( ConnectionWrapper ):
+    """The class of connections routing operations over a primary and its read replicas.
+    
+    Read-only operations (see function sql_analysis.is_read_only()) are
+    executed on a replica chosen according to '.policy':
+      - 'least_outstanding': the replica with the least result sets not
+        consumed yet, the least loaded one on ties;
+      - 'round_robin': every replica in turn.
+    
+    Every other operation is executed on the primary and opens a trans-
+    action there: until its commit or rollback, reads are executed on
+    the primary too.  After the commit of writes, reads keep on being
+    executed on the primary for '.sticky_s' seconds, so that they see
+    the committed writes even though replicas lag behind.  Replicas get
+    rolled back once they have no result set outstanding, and on every
+    commit or rollback, so that reads do not leave them in a transaction.
+    
+    The load of every node is available in '.primary_stats' and '.rep-
+    lica_stats', or as a whole with '.snapshot()'.
+    
+    Notice: as connections, routing connections are not thread safe.
+    
+    Usage:
+        cnx = RoutingConnection( MyConnection('primary_dsn'),
+                                 [MyConnection('replica_1_dsn'), MyConnection('replica_2_dsn')] )
+        cursor = cnx.cursor()
+        cursor.execute( "SELECT ..." )      ## on a replica
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, primary : Connection,
+                       replicas: Sequence[Connection],
+                       policy  : str = 'least_outstanding',
+                       sticky_s: float = 1.0,
+                       clock   : Callable[[], float] = monotonic) -> None:
+        '''Constructor.
+        
+        Args:
+            primary: Connection
+                A reference to the connection to the primary database.
+            replicas: Sequence[Connection]
+                The connections to the read replicas. May be empty,  in
+                which case every operation is executed on the primary.
+            policy: str
+                Either 'least_outstanding' or 'round_robin'.  Defaults
+                to 'least_outstanding'.
+            sticky_s: float
+                The duration,  expressed as a fractional value of sec-
+                onds,  during which reads stay on the primary after the
+                commit of writes. Defaults to 1.0.
+            clock: Callable[[], float]
+                The clock of the stickiness. Defaults to time.monotonic.
+        '''
+        assert policy in self.POLICIES
+        assert sticky_s >= 0.0
+        super().__init__( primary )
+        self.replicas = list( replicas )
+        self.policy = policy
+        self.sticky_s = sticky_s
+        self.primary_stats = NodeStats()
+        self.replica_stats = [ NodeStats() for _ in self.replicas ]
+        self._clock = clock
+        self._in_transaction = False
+        self._sticky_until = None
+        self._next_replica = 0
+
+    #-------------------------------------------------------------------------
+    @property
+    def in_transaction(self) -> bool:
+        '''True if writes are pending on the primary, i.e. neither committed nor rolled back.
+        '''
+        return self._in_transaction
+
+    #-------------------------------------------------------------------------
+    @property
+    def memory_budget(self) -> MemoryBudget:
+        '''The memory budget of the primary, which is also set on every replica.
+        '''
+        return self._wrapped.memory_budget
+    
+    @memory_budget.setter
+    def memory_budget(self, budget: MemoryBudget) -> None:
+        for connection in [ self._wrapped ] + self.replicas:
+            connection.memory_budget = budget
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes the connections to the primary and to the replicas.
+        '''
+        for replica in self.replicas:
+            replica.close()
+        self.replicas = []
+        super().close()
+
+    #-------------------------------------------------------------------------
+    def commit(self) -> None:
+        '''Commits the pending transaction on the primary.
+        
+        Reads are then routed to the primary for '.sticky_s' seconds if
+        the transaction wrote data.  The read transactions of replicas
+        are rolled back.
+        '''
+        self._wrapped.commit()
+        if self._in_transaction:
+            self._in_transaction = False
+            self._sticky_until = self._clock() + self.sticky_s
+        self._end_reads()
+
+    #-------------------------------------------------------------------------
+    def rollback(self) -> None:
+        '''Rolls back the pending transaction on the primary and the read transactions of replicas.
+        '''
+        self._wrapped.rollback()
+        self._in_transaction = False
+        self._end_reads()
+
+    #-------------------------------------------------------------------------
+    def snapshot(self) -> Dict:
+        '''Returns a snapshot of the load of the primary and of every replica.
+        '''
+        return { 'primary' : self.primary_stats.to_dict(),
+                 'replicas': [ stats.to_dict() for stats in self.replica_stats ] }
+
+    #-------------------------------------------------------------------------
+    def _cancel(self) -> None:
+        '''Cancels the operations currently running on the primary and on every replica.
+        '''
+        for connection in [ self._wrapped ] + self.replicas:
+            connection._cancel()
+
+    #-------------------------------------------------------------------------
+    def _end_reads(self, node: Optional[int] = None) -> None:
+        '''Rolls back the read transactions of replicas.
+        
+        Args:
+            node: int
+                1 + the index of the replica to roll back, or None to roll
+                back every replica. Defaults to None.
+        '''
+        replicas = self.replicas if node is None else self.replicas[ node - 1:node ]
+        for replica in replicas:
+            replica.rollback()
+
+    #-------------------------------------------------------------------------
+    def _route(self, read_only: bool) -> int:
+        '''Returns the index of the node on which an operation gets executed.
+        
+        Args:
+            read_only: bool
+                True if the operation only reads data.
+        
+        Returns:
+            0 for the primary, or 1 + the index of the replica.
+        '''
+        if not read_only:
+            self._in_transaction = True
+            return 0
+        if not self.replicas or self._in_transaction:
+            return 0
+        if self._sticky_until is not None:
+            if self._clock() < self._sticky_until:
+                return 0
+            self._sticky_until = None
+        
+        if self.policy == 'round_robin':
+            index = self._next_replica
+            self._next_replica = (index + 1) % len( self.replicas )
+        else:
+            index = min( range(len(self.replica_stats)),
+                         key=lambda i: (self.replica_stats[i].outstanding, self.replica_stats[i].reads) )
+        return 1 + index
+
+    #-------------------------------------------------------------------------
+    def _stats_of(self, node: int) -> NodeStats:
+        '''Returns the statistics of a node.
+        '''
+        return self.primary_stats if node == 0 else self.replica_stats[ node - 1 ]
+
+    #-------------------------------------------------------------------------
+    def _wrap_cursor(self, cursor: Cursor) -> Cursor:
+        return RoutingCursor( self, cursor )
+
+    #-------------------------------------------------------------------------
+    # Class data
+    POLICIES = ( 'least_outstanding', 'round_robin' )
+
+
+#=============================================================================
+class RoutingCursor( CursorWrapper ):
+    """The class of cursors of routing connections.
+    
+    Routing cursors hold one cursor per node they have executed opera-
+    tions on. The source cursor is the one of the node of the last exe-
+    cution, from which the results are fetched.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, parent_connection: RoutingConnection, primary_cursor: Cursor) -> None:
+        '''Constructor.
+        
+        Args:
+            parent_connection: RoutingConnection
+                A reference to the routing connection of this cursor.
+            primary_cursor: Cursor
+                A reference to a cursor of the primary connection.
+        '''
+        super().__init__( parent_connection, primary_cursor )
+        self._cursors = { 0: primary_cursor }
+        self._node = 0
+        self._outstanding = False
+
+    #-------------------------------------------------------------------------
+    @property
+    def lazy_rows(self) -> bool:
+        '''True if rows are fetched as lazy rows,  which is set on the cursors of every node (see Cursor.lazy_rows).
+        '''
+        return self._lazy_rows
+    
+    @lazy_rows.setter
+    def lazy_rows(self, lazy: bool) -> None:
+        self._lazy_rows = lazy
+        for cursor in self._cursors.values():
+            cursor.lazy_rows = lazy
+
+    #-------------------------------------------------------------------------
+    @property
+    def node(self) -> int:
+        '''The node of the last execution: 0 for the primary, or 1 + the index of the replica.
+        '''
+        return self._node
+
+    #-------------------------------------------------------------------------
+    def callproc(self, proc_name: str, *parameters) -> Optional:
+        return self._routed( None, super().callproc, proc_name, *parameters )
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes the cursors of every node.
+        '''
+        self._stop_prefetch()
+        self._release()
+        for cursor in self._cursors.values():
+            cursor.close()
+        self._cursors = {}
+        self._source = None
+
+    #-------------------------------------------------------------------------
+    def execute(self, operation: str, *parameters) -> Optional:
+        return self._routed( operation, super().execute, operation, *parameters )
+
+    #-------------------------------------------------------------------------
+    def execute_batch(self, statements: Iterable[Statement]) -> None:
+        '''Executes a batch of operations on a replica if they are all read-only, or on the primary.
+        '''
+        statements = list( statements )
+        read_only = all( is_read_only(operation) for operation, _ in statements )
+        self._routed( statements[0][0] if read_only and statements else None, super().execute_batch, statements )
+
+    #-------------------------------------------------------------------------
+    def executemany(self, operation: str, seq_of_parameters: tuple) -> Optional:
+        return self._routed( operation, super().executemany, operation, seq_of_parameters )
+
+    #-------------------------------------------------------------------------
+    def fetchall(self) -> List[Tuple]:
+        rows = self._source.fetchall()
+        self._release()
+        return rows
+
+    #-------------------------------------------------------------------------
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        size = self._array_size if size is None else size
+        rows = self._source.fetchmany( size )
+        if len( rows ) < size:
+            self._release()
+        return rows
+
+    #-------------------------------------------------------------------------
+    def fetchone(self) -> Optional[Tuple]:
+        row = self._source.fetchone()
+        if row is None:
+            self._release()
+        return row
+
+    #-------------------------------------------------------------------------
+    def _copy_from_native(self, table  : str,
+                                columns: Optional[Sequence[str]],
+                                buffers: Iterator[str],
+                                dialect: object,
+                                null   : str) -> Optional[BatchReport]:
+        return self._routed( None, super()._copy_from_native, table, columns, buffers, dialect, null )
+
+    #-------------------------------------------------------------------------
+    def _release(self) -> None:
+        '''Releases the current result set, which is not outstanding anymore.
+        
+        The replica of the result set gets rolled back once none of its
+        result sets is outstanding.
+        '''
+        if self._outstanding:
+            connection = self._connection
+            stats = connection._stats_of( self._node )
+            stats.outstanding -= 1
+            self._outstanding = False
+            if self._node and not stats.outstanding:
+                connection._end_reads( self._node )
+
+    #-------------------------------------------------------------------------
+    def _routed(self, operation: Optional[str], method: Callable, *args) -> object:
+        '''Runs a method of CursorWrapper on the cursor of the node the operation is routed to.
+        
+        Args:
+            operation: str
+                The text of the operation, or None for operations which
+                are not statements (e.g. stored procedures, bulk copies)
+                and which are then routed to the primary.
+            method: Callable
+                The method to run, which delegates to the source cursor.
+            args:
+                The arguments of the method.
+        '''
+        self._stop_prefetch()
+        self._release()
+        connection = self._connection
+        read_only = operation is not None and is_read_only( operation )
+        node = connection._route( read_only )
+        
+        cursor = self._cursors.get( node )
+        if cursor is None:
+            cursor = self._cursors[ node ] = connection.replicas[ node - 1 ].cursor()
+            cursor.lazy_rows = self._lazy_rows
+        self._source = cursor
+        self._messages = cursor._messages
+        self._node = node
+        
+        stats = connection._stats_of( node )
+        start = perf_counter()
+        try:
+            result = method( *args )
+        except Exception:
+            stats.errors += 1
+            raise
+        stats.latency.record( perf_counter() - start )
+        if not read_only:
+            stats.writes += 1
+        else:
+            stats.reads += 1
+            stats.outstanding += 1
+            self._outstanding = True
+        return result
+
+
+#=====   end of   Libs.ObjectSqlLib.routing   =====#
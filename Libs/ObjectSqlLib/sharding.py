@@ -0,0 +1,1043 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines hash-sharded connections.
+#
+# A ShardedConnection partitions the rows of its sharded tables over
+# several connections, named shards, according to the hash of a shard
+# key column per table.  Operations which pin a single value of the
+# shard key - INSERTs and WHERE key = ... conditions - are routed to a
+# single shard.  Other operations are run on every shard in parallel on
+# a pool of threads and their result sets are merged: concatenated,
+# k-way merged for ORDER BY, and combined for the aggregates COUNT, SUM,
+# MIN and MAX.  Tables which are not sharded are replicated on every
+# shard.
+#
+
+#=============================================================================
+import heapq
+import re
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools          import lru_cache
+from itertools          import chain, islice
+from typing             import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .                import Connection, Cursor, NotSupportedError, OperationalError, ProgrammingError
+from .batching        import BatchReport
+from .memory_budget   import MemoryBudget
+from .sql_analysis    import is_read_only, read_tables, written_table
+from .statement_batch import ResultSet
+
+
+#=============================================================================
+def shard_of(value: object, shards_count: int) -> int:
+    '''Returns the index of the shard of a value of a shard key.
+    
+    Values are hashed from their text form with CRC-32,  so that hashes
+    are stable across processes and that 42 and '42' share their shard.
+    
+    Args:
+        value: object
+            The value of the shard key.
+        shards_count: int
+            The count of shards.
+    '''
+    return zlib.crc32( str(value).encode() ) % shards_count
+
+
+#=============================================================================
+class ShardedConnection( Connection ):
+    """The class of connections to hash-sharded databases.
+    
+    Every shard is a connection of a concrete driver to a database with
+    the same schema.  '.shard_keys' maps the names of the sharded tables
+    to the name of their shard key column:  rows of these tables are
+    stored in the shard of the value of their key (see function shard_-
+    of()).  Other tables are replicated on every shard: their writes are
+    run on every shard and their reads on the first one only.
+    
+    Operations are routed to a single shard when they pin a single value
+    of the key of a single sharded table,  i.e. INSERT ... (columns) VAL-
+    UES (...) operations and operations with a top-level WHERE key = ...
+    condition not combined with OR.  Other operations are run on every
+    shard in parallel.  See class ShardedCursor for the merging of their
+    result sets.
+    
+    Notice: commits and rollbacks are run on every shard, but they are
+    not atomic across shards. Use a TPCCoordinator over two-phase commit
+    connections for atomic commits.
+    
+    Usage:
+        cnx = ShardedConnection( [MyConnection('shard_0_dsn'), MyConnection('shard_1_dsn')],
+                                 {'results': 'race_id'} )
+        cursor = cnx.cursor()
+        cursor.execute( "SELECT * FROM results WHERE race_id = %s", (42,) )    ## on a single shard
+        cursor.execute( "SELECT * FROM results ORDER BY time" )                ## on every shard
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, shards     : Sequence[Connection],
+                       shard_keys : Dict[str, str],
+                       max_workers: Optional[int] = None,
+                       nulls_first: bool = True) -> None:
+        '''Constructor.
+        
+        Args:
+            shards: Sequence[Connection]
+                The connections to the shards. Their order defines the
+                placement of rows and must never change.
+            shard_keys: Dict[str, str]
+                The names of the shard key columns, keyed by the names
+                of the sharded tables.
+            max_workers: int
+                The maximum count of threads running operations on the
+                shards.  May be None,  in which case there is one thread
+                per shard. Defaults to None.
+            nulls_first: bool
+                True if NULL values come first in ascending orders of the
+                databases of the shards (e.g. SQLite, MySQL),  or False
+                if they come last (e.g. PostgreSQL, Oracle). This is used
+                to merge ordered result sets. Defaults to True.
+        '''
+        assert len( shards ) > 0
+        self.shards = list( shards )
+        self.shard_keys = { table.lower(): key for table, key in shard_keys.items() }
+        self.nulls_first = nulls_first
+        self._executor = ThreadPoolExecutor( max_workers or len(self.shards), thread_name_prefix='shard' )
+
+    #-------------------------------------------------------------------------
+    @property
+    def memory_budget(self) -> MemoryBudget:
+        '''The memory budget of the first shard, which is also set on every other shard.
+        '''
+        return self.shards[0].memory_budget
+    
+    @memory_budget.setter
+    def memory_budget(self, budget: MemoryBudget) -> None:
+        for shard in self.shards:
+            shard.memory_budget = budget
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes the connections to every shard.
+        '''
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        for shard in self.shards:
+            shard.close()
+        self.shards = []
+
+    #-------------------------------------------------------------------------
+    def commit(self) -> None:
+        '''Commits the pending transaction on every shard.
+        '''
+        self._run_on_shards( lambda index: self.shards[index].commit() )
+
+    #-------------------------------------------------------------------------
+    def cursor(self) -> Cursor:
+        return ShardedCursor( self )
+
+    #-------------------------------------------------------------------------
+    def rollback(self) -> None:
+        '''Rolls back the pending transaction on every shard.
+        '''
+        self._run_on_shards( lambda index: self.shards[index].rollback() )
+
+    #-------------------------------------------------------------------------
+    def _cancel(self) -> None:
+        '''Cancels the operations currently running on every shard.
+        '''
+        for shard in self.shards:
+            shard._cancel()
+
+    #-------------------------------------------------------------------------
+    def _key_reference(self, operation: str) -> Optional['_KeyReference']:
+        '''Returns the reference to the value of the shard key pinned by an operation.
+        
+        Returns:
+            The reference to the value of the shard key, or None if the
+            operation does not pin a single value of the key of a single
+            sharded table.
+        
+        Raises:
+            NotSupportedError: the operation modifies the shard key of
+                rows, which would move them to another shard.
+            ProgrammingError: the operation inserts rows into a sharded
+                table without providing their shard key.
+        '''
+        table = written_table( operation )
+        if table is None:
+            tables = [ t for t in read_tables(operation) if t in self.shard_keys ]
+            if len( tables ) != 1:
+                return None
+            table = tables[ 0 ]
+        key = self.shard_keys.get( table )
+        if key is None:
+            return None
+        
+        reference = _key_reference( operation, key )
+        if reference is None and _INSERT_KEYWORD.match( operation ):
+            raise ProgrammingError( f"rows inserted into sharded table '{table}' must provide shard key '{key}'" )
+        return reference
+
+    #-------------------------------------------------------------------------
+    def _run_on_shards(self, action : Callable[[int], object],
+                             indexes: Optional[Iterable[int]] = None) -> List[object]:
+        '''Runs an action on shards in parallel.
+        
+        Args:
+            action: Callable[[int], object]
+                The action, which gets the index of its shard as argument.
+            indexes: Iterable[int]
+                The indexes of the shards. May be None for every shard.
+                Defaults to None.
+        
+        Returns:
+            The results of the action, in the order of the indexes.
+        
+        Raises:
+            Exception: the first exception raised by the action,  once
+                it has completed on every shard.
+        '''
+        indexes = range( len(self.shards) ) if indexes is None else list( indexes )
+        if len( indexes ) == 1:
+            return [ action(indexes[0]) ]
+        futures = [ self._executor.submit(action, index) for index in indexes ]
+        errors = [ future.exception() for future in futures ]
+        for error in errors:
+            if error is not None:
+                raise error
+        return [ future.result() for future in futures ]
+
+    #-------------------------------------------------------------------------
+    def _shard_of_parameters(self, reference: '_KeyReference', parameters: Sequence) -> int:
+        '''Returns the index of the shard pinned by a reference to the shard key and by parameters.
+        '''
+        value = reference.literal if reference.parameter is None else parameters[ reference.parameter ]
+        return shard_of( value, len(self.shards) )
+
+
+#=============================================================================
+class ShardedCursor( Cursor ):
+    """The class of cursors of sharded connections.
+    
+    Sharded cursors hold one cursor per shard.  Results sets of oper-
+    ations run on every shard are merged as follows:
+      - SELECT ... ORDER BY: the sorted result sets of the shards are
+        k-way merged as they are fetched. ORDER BY expressions must be
+        selected columns;
+      - SELECT with COUNT, SUM, TOTAL, MIN or MAX aggregates, grouped or
+        not: the partial aggregates of the shards are combined per group
+        of the GROUP BY columns, which must be selected columns.  Other
+        aggregates and HAVING clauses are not supported;
+      - SELECT DISTINCT: duplicates across shards are dropped;
+      - LIMIT n [OFFSET m]: every shard returns n + m rows at most and
+        the limit is applied to the merged result set;
+      - any other SELECT: the result sets of the shards are chained.
+    
+    '.description'  is the one of the first shard, and it is checked to
+    be the same on every shard.  '.rowcount' is the total of the row co-
+    unts of the shards, or the count of merged aggregated rows, or -1
+    when it cannot be determined.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, parent_connection: ShardedConnection) -> None:
+        '''Constructor.
+        
+        Args:
+            parent_connection: ShardedConnection
+                The connection which creates this cursor.
+        '''
+        super().__init__( parent_connection )
+        self._cursors = [ shard.cursor() for shard in parent_connection.shards ]
+        self._description = None
+        self._rows = iter( () )
+
+    #-------------------------------------------------------------------------
+    def __iter__(self) -> 'ShardedCursor':
+        return self
+
+    #-------------------------------------------------------------------------
+    def __next__(self) -> Tuple:
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    #-------------------------------------------------------------------------
+    @property
+    def description(self) -> Optional[Tuple]:
+        '''The description of the columns of the current merged result set.
+        '''
+        return self._description
+
+    #-------------------------------------------------------------------------
+    def callproc(self, proc_name: str, *parameters) -> Optional:
+        '''Stored procedures cannot be routed to shards.
+        
+        Raises:
+            NotSupportedError: always.
+        '''
+        raise NotSupportedError( "stored procedures cannot be called on sharded connections" )
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes the cursors of every shard.
+        '''
+        for cursor in self._cursors:
+            cursor.close()
+        self._cursors = []
+        self._rows = iter( () )
+
+    #-------------------------------------------------------------------------
+    def execute(self, operation: str, *parameters) -> None:
+        '''Executes an operation on its shard, or on every shard.
+        
+        Raises:
+            NotSupportedError: the result sets of the shards cannot be
+                merged, or the operation modifies shard keys.
+            OperationalError: the shards return result sets with diff-
+                erent descriptions.
+            ProgrammingError: a row is inserted into a sharded table with-
+                out its shard key.
+        '''
+        self._reset()
+        connection = self._connection
+        parameters = parameters[0] if parameters else ()
+        reference = connection._key_reference( operation )
+        read_only = is_read_only( operation )
+        
+        if reference is not None:
+            indexes = [ connection._shard_of_parameters(reference, parameters) ]
+        elif read_only and not read_tables( operation ) & connection.shard_keys.keys():
+            indexes = [ 0 ]     ## replicated tables only
+        else:
+            indexes = range( len(self._cursors) )
+        
+        if len( indexes ) == 1 or not read_only:
+            self._run( indexes, lambda index: self._cursors[index].execute(operation, parameters) )
+            if len( indexes ) == 1:
+                self._last_row_id = self._cursors[ indexes[0] ]._last_row_id
+        else:
+            self._scatter_query( operation, parameters )
+
+    #-------------------------------------------------------------------------
+    def executemany(self, operation: str, seq_of_parameters: Iterable[Sequence]) -> None:
+        '''Executes an operation against all parameters, grouped per shard.
+        
+        Parameters are grouped per shard when they provide the shard key.
+        Otherwise, the operation is executed against all parameters on
+        its shard or on every shard.
+        '''
+        self._reset()
+        self._run_grouped( operation, seq_of_parameters, lambda cursor, group: cursor.executemany(operation, group) )
+
+    #-------------------------------------------------------------------------
+    def executemany_batched(self, operation        : str,
+                                  seq_of_parameters: Iterable[Sequence],
+                                  max_rows         : int = 1000,
+                                  max_bytes        : Optional[int] = 1 << 20,
+                                  max_parameters   : int = 32766) -> BatchReport:
+        '''Executes an operation against all parameters, grouped per shard and then batched on every shard.
+        
+        See Cursor.executemany_batched().
+        '''
+        self._reset()
+        reports = self._run_grouped( operation, seq_of_parameters,
+                                     lambda cursor, group: cursor.executemany_batched(operation, group, max_rows,
+                                                                                       max_bytes, max_parameters) )
+        report = BatchReport()
+        for shard_report in reports:
+            report.batches += shard_report.batches
+        return report
+
+    #-------------------------------------------------------------------------
+    def fetchall(self) -> List[Tuple]:
+        '''Fetches all the remaining rows of the current merged result set.
+        
+        Raises:
+            ProgrammingError: no result set is available.
+        '''
+        self._check_result_set()
+        rows = list( self._rows )
+        self._row_number += len( rows )
+        return rows
+
+    #-------------------------------------------------------------------------
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        '''Fetches the next rows of the current merged result set.
+        
+        Raises:
+            ProgrammingError: no result set is available.
+        '''
+        self._check_result_set()
+        rows = list( islice(self._rows, self._array_size if size is None else size) )
+        self._row_number += len( rows )
+        return rows
+
+    #-------------------------------------------------------------------------
+    def fetchone(self) -> Optional[Tuple]:
+        '''Fetches the next row of the current merged result set, or None when it is exhausted.
+        
+        Raises:
+            ProgrammingError: no result set is available.
+        '''
+        self._check_result_set()
+        row = next( self._rows, None )
+        if row is not None:
+            self._row_number += 1
+        return row
+
+    #-------------------------------------------------------------------------
+    def next(self) -> Tuple:
+        return self.__next__()
+
+    #-------------------------------------------------------------------------
+    def nextset(self) -> Optional[bool]:
+        '''Skips to the next result set of a batch, or skips the remaining rows of the current merged result set.
+        
+        Returns:
+            True if the result set of the next operation of a batch is
+            now the current one, or None since merged operations produce
+            one result set at most.
+        
+        Raises:
+            ProgrammingError: the last operation produced no result set.
+        '''
+        if self._result_sets:
+            return self._next_result_set()
+        self._check_result_set()
+        self._rows = iter( () )
+        return None
+
+    #-------------------------------------------------------------------------
+    def scroll(self, value: int, mode: Optional[str] = 'relative') -> None:
+        '''Scrolls forward in the current merged result set.
+        
+        Raises:
+            IndexError: the scroll would leave the result set.
+            NotSupportedError: the scroll is backward.
+            ProgrammingError: mode is neither 'relative' nor 'absolute'.
+        '''
+        if mode == 'absolute':
+            value -= self._row_number
+        elif mode != 'relative':
+            raise ProgrammingError( f"unknown scroll mode '{mode}'" )
+        
+        if value < 0:
+            raise NotSupportedError( "merged result sets cannot be scrolled backward" )
+        if value > 0 and len( self.fetchmany(value) ) < value:
+            raise IndexError( "scroll out of the result set" )
+
+    #-------------------------------------------------------------------------
+    def setinputsizes(self, sizes: Tuple) -> None:
+        for cursor in self._cursors:
+            cursor.setinputsizes( sizes )
+
+    #-------------------------------------------------------------------------
+    def setoutputsize(self, size: int, column_index: Optional[int] = None) -> None:
+        for cursor in self._cursors:
+            cursor.setoutputsize( size, column_index )
+
+    #-------------------------------------------------------------------------
+    def _check_result_set(self) -> None:
+        '''Raises ProgrammingError if the last operation produced no result set.
+        '''
+        if self._description is None:
+            raise ProgrammingError( "no result set is available" )
+
+    #-------------------------------------------------------------------------
+    def _describe(self, indexes: Iterable[int]) -> None:
+        '''Sets the description of the merged result set from the cursors of shards.
+        
+        Raises:
+            OperationalError: the shards return result sets with diff-
+                erent columns.
+        '''
+        descriptions = [ self._cursors[index].description for index in indexes ]
+        names = { tuple(d[0] for d in description) if description else None for description in descriptions }
+        if len( names ) > 1:
+            raise OperationalError( f"shards returned result sets with different columns: {sorted(map(str, names))}" )
+        self._description = descriptions[ 0 ]
+
+    #-------------------------------------------------------------------------
+    def _load_result_set(self, result_set: ResultSet) -> None:
+        '''Makes a buffered result set of a batch the current result set.
+        '''
+        self._description = result_set.description
+        self._rows = iter( result_set.rows or () )
+        self._row_count = result_set.row_count
+        self._last_row_id = result_set.last_row_id
+        self._row_number = 0
+
+    #-------------------------------------------------------------------------
+    def _merged_rows(self, query: '_Query', indexes: Sequence[int]) -> Iterator[Tuple]:
+        '''Returns the iterator over the merged rows of the result sets of the shards.
+        '''
+        streams = [ _stream(self._cursors[index], self.FETCH_SIZE) for index in indexes ]
+        names = [ d[0] for d in self._description ]
+        sort_key = None if not query.order_by else _sort_key( query.order_positions(names), self._connection.nulls_first )
+        
+        if query.aggregates is not None:
+            positions = query.aggregates_positions( names )
+            rows = _aggregated( chain(*streams), query.group_positions(names), positions )
+            if sort_key is not None:
+                rows.sort( key=sort_key )
+            self._row_count = len( rows )
+            rows = iter( rows )
+        elif sort_key is not None:
+            rows = heapq.merge( *streams, key=sort_key )
+        else:
+            rows = chain( *streams )
+        
+        if query.distinct and query.aggregates is None:
+            rows = _distinct( rows )
+        if query.limit is not None or query.offset:
+            rows = islice( rows, query.offset, None if query.limit is None else query.offset + query.limit )
+        return rows
+
+    #-------------------------------------------------------------------------
+    def _reset(self) -> None:
+        '''Drops the current result set and the messages of the last operation.
+        '''
+        self._messages.clear()
+        self._result_sets.clear()
+        self._description = None
+        self._rows = iter( () )
+        self._row_count = self.NO_ROW_COUNT
+        self._row_number = 0
+        self._last_row_id = None
+
+    #-------------------------------------------------------------------------
+    def _run(self, indexes: Sequence[int], action: Callable[[int], object]) -> List[object]:
+        '''Runs an action on shards in parallel and sets the counts and the description of the results.
+        
+        Args:
+            indexes: Sequence[int]
+                The indexes of the shards.
+            action: Callable[[int], object]
+                The action, which gets the index of its shard as argument.
+        '''
+        cursors = self._cursors
+        results = self._connection._run_on_shards( action, indexes )
+        
+        row_count = 0
+        for index in indexes:
+            cursor = cursors[ index ]
+            self._messages += cursor._messages
+            count = cursor._row_count
+            row_count = -1 if row_count < 0 or count is None or count < 0 else row_count + count
+        self._row_count = row_count
+        
+        self._describe( indexes )
+        if self._description is not None:
+            self._rows = chain.from_iterable( _stream(cursors[index], self.FETCH_SIZE) for index in indexes )
+        return results
+
+    #-------------------------------------------------------------------------
+    def _run_grouped(self, operation        : str,
+                           seq_of_parameters: Iterable[Sequence],
+                           action           : Callable[[Cursor, List[Sequence]], object]) -> List[object]:
+        '''Runs an action against groups of parameters on their shards in parallel.
+        
+        Parameters are grouped per shard when they provide the shard key.
+        Otherwise, all of them are run on the shard pinned by the oper-
+        ation, or on every shard.
+        '''
+        connection = self._connection
+        reference = connection._key_reference( operation )
+        
+        if reference is None:
+            group = list( seq_of_parameters )
+            groups = { index: group for index in range(len(self._cursors)) }
+        elif reference.parameter is None:
+            groups = { connection._shard_of_parameters(reference, ()): list(seq_of_parameters) }
+        else:
+            groups = {}
+            for parameters in seq_of_parameters:
+                groups.setdefault( connection._shard_of_parameters(reference, parameters), [] ).append( parameters )
+        
+        return self._run( sorted(groups), lambda index: action(self._cursors[index], groups[index]) )
+
+    #-------------------------------------------------------------------------
+    def _scatter_query(self, operation: str, parameters: Sequence) -> None:
+        '''Runs a query on every shard in parallel and merges their result sets.
+        '''
+        query = _Query.parse( operation, parameters )
+        indexes = range( len(self._cursors) )
+        self._run( indexes, lambda index: self._cursors[index].execute(query.shard_operation, query.shard_parameters) )
+        if self._description is not None:
+            if query.limit is not None or query.distinct:
+                self._row_count = self.NO_ROW_COUNT
+            self._rows = self._merged_rows( query, indexes )
+
+    #-------------------------------------------------------------------------
+    # Class data
+    FETCH_SIZE = 1000   # the count of rows fetched at a time from the cursors of shards
+
+
+#=============================================================================
+class _KeyReference( NamedTuple ):
+    """The class of references to the value of the shard key pinned by operations.
+    """
+    parameter: Optional[int]    ## the index of the parameter which is the value, if any
+    literal  : object           ## the literal value otherwise
+
+
+#=============================================================================
+class _Query:
+    """The class of analyzed queries to be run on every shard.
+    """
+    #-------------------------------------------------------------------------
+    def __init__(self) -> None:
+        self.aggregates = None      ## the aggregate functions of the selected columns, if any
+        self.distinct = False
+        self.group_by = []          ## the expressions of the GROUP BY clause
+        self.items = []             ## the texts of the selected columns
+        self.limit = None
+        self.offset = 0
+        self.order_by = []          ## pairs (expression, descending)
+        self.shard_operation = ''
+        self.shard_parameters = ()
+
+    #-------------------------------------------------------------------------
+    @classmethod
+    def parse(cls, operation: str, parameters: Sequence) -> '_Query':
+        '''Analyzes a query and rewrites it to be run on every shard.
+        
+        Raises:
+            NotSupportedError: the result sets of the shards cannot be
+                merged.
+        '''
+        query = cls()
+        masked = _masked( operation )
+        if _SET_OPERATOR.search( masked ):
+            raise NotSupportedError( "UNION, INTERSECT and EXCEPT queries cannot be merged across shards" )
+        
+        select = _SELECT.search( masked )
+        from_ = None if select is None else _FROM.search( masked, select.end() )
+        if from_ is not None:
+            spans = _split( masked, select.end(), from_.start() )
+            query.distinct = select.group( 1 ) is not None
+            query.items = [ operation[start:end].strip() for start, end in spans ]
+            query.aggregates = _aggregates( query.items, [masked[start:end] for start, end in spans] )
+            group = _GROUP_BY.search( masked, from_.end() )
+            if group is not None:
+                clause_end = _CLAUSE_END.search( masked, group.end() )
+                group_end = len( masked.rstrip('; \t\r\n') ) if clause_end is None else clause_end.start()
+                query.group_by = [ operation[start:end].strip() for start, end in _split(masked, group.end(), group_end) ]
+                if query.aggregates is None:
+                    query.aggregates = [ None ] * len( query.items )
+            if query.aggregates is not None and _HAVING.search( masked ):
+                raise NotSupportedError( "HAVING clauses cannot be merged across shards" )
+        
+        ## trailing ORDER BY and LIMIT clauses
+        tail = _LIMIT.search( masked )
+        tail_start = len( masked ) if tail is None else tail.start()
+        order = _ORDER_BY.search( masked, 0, tail_start )
+        if order is not None:
+            for start, end in _split( masked, order.end(), tail_start ):
+                item = _ORDER_ITEM.match( operation[start:end].strip() )
+                if item is None:
+                    raise NotSupportedError( f"ORDER BY item '{operation[start:end].strip()}' cannot be merged across shards" )
+                query.order_by.append( (item.group(1), (item.group(2) or '').upper() == 'DESC') )
+        
+        ## placeholders of the dropped tail are the last ones
+        cut = tail_start if query.aggregates is None or order is None else order.start()
+        kept_count = len( parameters ) - _placeholders_count( operation[cut:] )
+        query.shard_parameters = tuple( parameters[:kept_count] )
+        query.shard_operation = operation[ :cut ]
+        if tail is not None:
+            values = iter( parameters[_placeholders_count(operation[:tail.start()]):] )
+            query.limit = int( next(values) if tail.group(1) == '%s' else tail.group(1) )
+            if tail.group( 2 ) is not None:
+                query.offset = int( next(values) if tail.group(2) == '%s' else tail.group(2) )
+            if query.aggregates is None:
+                query.shard_operation += f" LIMIT {query.limit + query.offset}"
+        return query
+
+    #-------------------------------------------------------------------------
+    def aggregates_positions(self, names: List[str]) -> List[Tuple[int, Optional[Callable]]]:
+        '''Returns the pairs (position, combining function) of the selected columns.
+        
+        Raises:
+            NotSupportedError: the selected columns cannot be matched
+                with the columns of the result set.
+        '''
+        if len( self.aggregates ) != len( names ):
+            raise NotSupportedError( "aggregated queries must select explicit columns to be merged across shards" )
+        return list( enumerate(self.aggregates) )
+
+    #-------------------------------------------------------------------------
+    def group_positions(self, names: List[str]) -> List[int]:
+        '''Returns the positions of the columns of the GROUP BY clause.
+        
+        Raises:
+            NotSupportedError: a GROUP BY expression is not a selected
+                non-aggregated column.
+        '''
+        names = [ _identifier(name) for name in names ]
+        items = [ _identifier(_ALIAS.sub('', item)) for item in self.items ]
+        positions = []
+        for expression in self.group_by:
+            position = _position( expression, names, items )
+            if not 0 <= position < len( self.aggregates ) or self.aggregates[ position ] is not None:
+                raise NotSupportedError( f"GROUP BY expression '{expression}' must be a selected column "
+                                         "to be merged across shards" )
+            positions.append( position )
+        return positions
+
+    #-------------------------------------------------------------------------
+    def order_positions(self, names: List[str]) -> List[Tuple[int, bool]]:
+        '''Returns the pairs (position, descending) of the columns of the ORDER BY clause.
+        
+        Raises:
+            NotSupportedError: an ORDER BY expression is not a selected
+                column.
+        '''
+        names = [ _identifier(name) for name in names ]
+        items = [ _identifier(_ALIAS.sub('', item)) for item in self.items ]
+        if len( items ) != len( names ):
+            items = names
+        positions = []
+        for expression, descending in self.order_by:
+            position = _position( expression, names, items )
+            if not 0 <= position < len( names ):
+                raise NotSupportedError( f"ORDER BY expression '{expression}' must be a selected column "
+                                         "to be merged across shards" )
+            positions.append( (position, descending) )
+        return positions
+
+
+#=============================================================================
+class _SortKey:
+    """The class of keys of the k-way merge of ordered result sets.
+    
+    Columns may be sorted in ascending or descending order, and NULL
+    values come either first or last in ascending order.
+    """
+    __slots__ = ( 'values', 'order' )
+    
+    def __init__(self, values: Tuple, order: Tuple[Tuple[bool, bool]]) -> None:
+        self.values = values
+        self.order = order      ## pairs (descending, nulls_first) per value
+    
+    def __lt__(self, other: '_SortKey') -> bool:
+        for a, b, (descending, nulls_first) in zip( self.values, other.values, self.order ):
+            if a == b:
+                continue
+            if a is None:
+                return nulls_first != descending
+            if b is None:
+                return nulls_first == descending
+            return a > b if descending else a < b
+        return False
+
+
+#=============================================================================
+def _aggregated(rows          : Iterator[Tuple],
+                keys_positions: List[int],
+                positions     : List[Tuple[int, Optional[Callable]]]) -> List[Tuple]:
+    '''Combines the partial aggregates of rows, grouped by the columns of the GROUP BY clause.
+    '''
+    aggregates = [ (position, combine) for position, combine in positions if combine is not None ]
+    groups = {}
+    for row in rows:
+        key = tuple( row[position] for position in keys_positions )
+        group = groups.get( key )
+        if group is None:
+            groups[ key ] = list( row )
+        else:
+            for position, combine in aggregates:
+                group[ position ] = combine( group[position], row[position] )
+    return [ tuple(group) for group in groups.values() ]
+
+
+#-------------------------------------------------------------------------
+def _aggregates(items: List[str], masked_items: List[str]) -> Optional[List[Optional[Callable]]]:
+    '''Returns the combining functions of the selected columns, None for non-aggregated ones.
+    
+    Returns:
+        The list of the combining functions, or None if no column is an
+        aggregate.
+    
+    Raises:
+        NotSupportedError: an aggregate cannot be combined across shards.
+    '''
+    aggregates = []
+    for item, masked in zip( items, masked_items ):
+        match = _AGGREGATE_ITEM.match( masked )
+        function = None if match is None else match.group( 1 ).upper()
+        if function in _COMBINE and not _DISTINCT_ARGUMENT.search( item ):
+            aggregates.append( _COMBINE[function] )
+        elif _AGGREGATE_CALL.search( masked ):
+            raise NotSupportedError( f"aggregate expression '{item}' cannot be merged across shards" )
+        else:
+            aggregates.append( None )
+    return aggregates if any( aggregates ) else None
+
+
+#-------------------------------------------------------------------------
+def _distinct(rows: Iterator[Tuple]) -> Iterator[Tuple]:
+    '''Yields the rows that have not been yielded yet.
+    '''
+    seen = set()
+    for row in rows:
+        if row not in seen:
+            seen.add( row )
+            yield row
+
+
+#-------------------------------------------------------------------------
+def _identifier(text: str) -> str:
+    '''Normalizes an identifier or an expression for comparisons.
+    '''
+    return _WHITESPACES.sub( '', text ).strip( '"`[]' ).replace( '"', '' ).lower()
+
+
+#-------------------------------------------------------------------------
+def _inner_split(operation: str, start: int, end: int) -> List[Tuple[int, int]]:
+    '''Returns the spans of the comma-separated items of a parenthesized list of an operation.
+    
+    Args:
+        operation: str
+            The text of the operation.
+        start, end: int
+            The span of the contents of the list, parentheses excluded.
+    '''
+    return [ (start + a, start + b) for a, b in _split(_masked(operation[start:end]), 0, end - start) ]
+
+
+#-------------------------------------------------------------------------
+@lru_cache( maxsize=1024 )
+def _key_reference(operation: str, key: str) -> Optional[_KeyReference]:
+    '''Returns the reference to the value of a shard key pinned by an operation, or None.
+    
+    Raises:
+        NotSupportedError: the operation modifies the shard key.
+    '''
+    masked = _masked( operation )
+    
+    insert = _INSERT.match( masked )
+    if insert is not None:
+        columns = [ _identifier(operation[start:end]) for start, end in _inner_split(operation, *insert.span('columns')) ]
+        values = _inner_split( operation, *insert.span('values') )
+        if len( columns ) != len( values ) or key.lower() not in columns:
+            return None
+        start, end = values[ columns.index(key.lower()) ]
+        return _reference_of( operation, start, end )
+    
+    where = _WHERE.search( masked )
+    where_start = len( masked ) if where is None else where.start()
+    set_clause = _SET.search( masked, 0, where_start )
+    if set_clause is not None and _key_assignment( key ).search( masked, set_clause.end(), where_start ):
+        raise NotSupportedError( f"shard key '{key}' cannot be modified" )
+    if where is None:
+        return None
+    end = _CLAUSE_END.search( masked, where.end() )
+    end = len( masked ) if end is None else end.start()
+    if _OR.search( masked, where.end(), end ):
+        return None
+    condition = _key_condition( key ).search( masked, where.end(), end )
+    return None if condition is None else _reference_of( operation, *condition.span(1) )
+
+
+#-------------------------------------------------------------------------
+@lru_cache( maxsize=64 )
+def _key_assignment(key: str) -> re.Pattern:
+    return re.compile( rf"(?<![\w.]){_QUALIFIER}{re.escape(key)}[\"`\]]?\s*=", re.IGNORECASE )
+
+@lru_cache( maxsize=64 )
+def _key_condition(key: str) -> re.Pattern:
+    return re.compile( rf"(?<![\w.]){_QUALIFIER}{re.escape(key)}[\"`\]]?\s*=\s*(%s|'_*'|[-+]?\d+(?:\.\d+)?)(?![\w.])",
+                       re.IGNORECASE )
+
+
+#-------------------------------------------------------------------------
+def _masked(operation: str) -> str:
+    '''Masks the contents of parentheses and of string literals.
+    
+    The masked text has the same length as the operation:  characters
+    in parentheses are replaced with spaces and characters of string
+    literals with '_', so that clauses and literals of the top level of
+    the operation can be searched for in it.
+    '''
+    masked = []
+    depth = 0
+    in_literal = False
+    for c in operation:
+        if in_literal:
+            in_literal = c != "'"
+            masked.append( '_' if in_literal else c )
+        elif c == "'":
+            in_literal = True
+            masked.append( c if depth == 0 else ' ' )
+        elif c == '(':
+            masked.append( c if depth == 0 else ' ' )
+            depth += 1
+        elif c == ')':
+            depth = max( depth - 1, 0 )
+            masked.append( c if depth == 0 else ' ' )
+        else:
+            masked.append( c if depth == 0 else ' ' )
+    return ''.join( masked )
+
+
+#-------------------------------------------------------------------------
+def _placeholders_count(text: str) -> int:
+    '''Returns the count of %s placeholders in a text.
+    '''
+    return sum( 1 for token in _FORMAT_TOKENS.findall(text) if token == '%s' )
+
+
+#-------------------------------------------------------------------------
+def _position(expression: str, names: List[str], items: List[str]) -> int:
+    '''Returns the position of the column of an ORDER BY expression, or -1 if it is not selected.
+    
+    Expressions are either positions (from 1), names of columns of the
+    result set or selected expressions, possibly qualified.
+    '''
+    if expression.isdigit():
+        return int( expression ) - 1
+    expression = _identifier( expression )
+    for candidates in ( names, items ):
+        for candidate in ( expression, expression.split('.')[-1] ):
+            if candidate in candidates:
+                return candidates.index( candidate )
+    return -1
+
+
+#-------------------------------------------------------------------------
+def _reference_of(operation: str, start: int, end: int) -> Optional[_KeyReference]:
+    '''Returns the reference to the value of a shard key from its text in an operation.
+    '''
+    text = operation[ start:end ].strip()
+    if text == '%s':
+        return _KeyReference( _placeholders_count(operation[:start]), None )
+    if text.startswith( "'" ) and text.endswith( "'" ) and len( text ) >= 2:
+        return _KeyReference( None, text[1:-1].replace("''", "'") )
+    try:
+        return _KeyReference( None, int(text) )
+    except ValueError:
+        pass
+    try:
+        return _KeyReference( None, float(text) )
+    except ValueError:
+        return None
+
+
+#-------------------------------------------------------------------------
+def _sort_key(positions: List[Tuple[int, bool]], nulls_first: bool) -> Callable[[Tuple], _SortKey]:
+    '''Returns the function which gets the sort key of rows.
+    '''
+    order = tuple( (descending, nulls_first) for _, descending in positions )
+    columns = [ position for position, _ in positions ]
+    return lambda row: _SortKey( tuple(row[c] for c in columns), order )
+
+
+#-------------------------------------------------------------------------
+def _split(masked: str, start: int, end: int) -> List[Tuple[int, int]]:
+    '''Returns the spans of the top-level comma-separated items of a region of a masked text.
+    '''
+    spans = []
+    for index in range( start, end ):
+        if masked[ index ] == ',':
+            spans.append( (start, index) )
+            start = index + 1
+    spans.append( (start, end) )
+    return spans
+
+
+#-------------------------------------------------------------------------
+def _stream(cursor: Cursor, size: int) -> Iterator[Tuple]:
+    '''Yields the rows of the result set of a cursor, fetched by batches.
+    '''
+    while True:
+        rows = cursor.fetchmany( size )
+        if not rows:
+            return
+        yield from rows
+
+
+#-------------------------------------------------------------------------
+def _max(a: object, b: object) -> object:
+    return b if a is None else a if b is None else max( a, b )
+
+def _min(a: object, b: object) -> object:
+    return b if a is None else a if b is None else min( a, b )
+
+def _sum(a: object, b: object) -> object:
+    return b if a is None else a if b is None else a + b
+
+
+#-------------------------------------------------------------------------
+_COMBINE = { 'COUNT': _sum, 'SUM': _sum, 'TOTAL': _sum, 'MIN': _min, 'MAX': _max }
+
+_QUALIFIER = r'(?:[\w"`\[\]]+\.)?["`\[]?'
+
+_AGGREGATE_CALL = re.compile( r'\b(?:COUNT|SUM|TOTAL|MIN|MAX|AVG|GROUP_CONCAT|STRING_AGG|ARRAY_AGG)\s*\(', re.IGNORECASE )
+
+_AGGREGATE_ITEM = re.compile( r'\s*(\w+)\s*\(\s*\)\s*(?:(?:AS\s+)?[\w"`\[\]]+\s*)?$', re.IGNORECASE )
+
+_ALIAS = re.compile( r'\s+AS\s+[\w"`\[\]]+\s*$', re.IGNORECASE )
+
+_CLAUSE_END = re.compile( r'\b(?:GROUP\s+BY|HAVING|ORDER\s+BY|LIMIT|OFFSET|RETURNING|WINDOW)\b', re.IGNORECASE )
+
+_DISTINCT_ARGUMENT = re.compile( r'\(\s*DISTINCT\b', re.IGNORECASE )
+
+_FORMAT_TOKENS = re.compile( r'%%|%s' )
+
+_FROM = re.compile( r'\bFROM\b', re.IGNORECASE )
+
+_GROUP_BY = re.compile( r'\bGROUP\s+BY\b', re.IGNORECASE )
+
+_HAVING = re.compile( r'\bHAVING\b', re.IGNORECASE )
+
+_INSERT = re.compile( r'\s*INSERT\s+(?:OR\s+\w+\s+)?INTO\s+[\w."`\[\]]+\s*\((?P<columns>[^)]*)\)\s*'
+                      r'VALUES\s*\((?P<values>[^)]*)\)\s*;?\s*$', re.IGNORECASE )
+
+_INSERT_KEYWORD = re.compile( r'\s*INSERT\b', re.IGNORECASE )
+
+_LIMIT = re.compile( r'\bLIMIT\s+(%s|\d+)(?:\s+OFFSET\s+(%s|\d+))?\s*;?\s*$', re.IGNORECASE )
+
+_OR = re.compile( r'\bOR\b', re.IGNORECASE )
+
+_ORDER_BY = re.compile( r'\bORDER\s+BY\b', re.IGNORECASE )
+
+_ORDER_ITEM = re.compile( r'(.+?)(?:\s+(ASC|DESC))?$', re.IGNORECASE | re.DOTALL )
+
+_SELECT = re.compile( r'\bSELECT\s+(DISTINCT\s+)?(?:ALL\s+)?', re.IGNORECASE )
+
+_SET = re.compile( r'\bSET\b', re.IGNORECASE )
+
+_SET_OPERATOR = re.compile( r'\b(?:UNION|INTERSECT|EXCEPT)\b', re.IGNORECASE )
+
+_WHERE = re.compile( r'\bWHERE\b', re.IGNORECASE )
+
+_WHITESPACES = re.compile( r'\s+' )
+
+
+#=====   end of   Libs.ObjectSqlLib.sharding   =====#
@@ -0,0 +1,270 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the logs of slow statements.
+#
+# A SlowQueryLog is given to the instrumentation of connections (see mod-
+# ule instrumentation).  Every execution which lasts longer than the
+# threshold of the instrumentation is recorded with its parameters and,
+# when the log has a side connection,  with the query plan of its oper-
+# ation.  The plan is captured by re-issuing the operation prefixed with
+# EXPLAIN on the side connection, so that the transaction of the slow
+# statement is left untouched. The plans of a same normalized statement
+# are captured once per '.explain_interval_s' seconds at most.
+#
+# Records are appended as JSON lines to a file which is rotated as log-
+# ging.handlers.RotatingFileHandler does: once it would exceed '.max_
+# bytes', it is renamed with suffix '.1', former backups being shifted
+# up to suffix '.backup_count'.  The same records are reported as the
+# values of the SlowStatementWarning messages of the cursors.
+#
+
+#=============================================================================
+import datetime
+import json
+import os
+import time
+from threading import Lock
+from typing    import Callable, Dict, List, Optional, TextIO, Tuple
+
+from .                   import Connection, Error
+from .extension_messages import SlowStatement
+from .sql_analysis       import normalize_statement
+
+
+#=============================================================================
+class SlowQueryLog:
+    """The class of rotating JSON-lines logs of slow statements.
+    
+    Logs may be shared by the instrumentations of many connections and
+    threads. Records are serialized by a lock, which also serializes the
+    use of the side connection.
+    
+    Usage:
+        log = SlowQueryLog( 'slow_queries.jsonl', lambda: MyConnection('my_dsn') )
+        cnx = InstrumentedConnection( MyConnection('my_dsn'),
+                                      Instrumentation(slow_threshold_s=0.5, slow_query_log=log) )
+        ...
+        log.close()
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, path              : str,
+                       explain_connect   : Optional[Callable[[], Connection]] = None,
+                       explain_prefix    : str = 'EXPLAIN ',
+                       explain_interval_s: float = 60.0,
+                       max_bytes         : int = 10 << 20,
+                       backup_count      : int = 5) -> None:
+        '''Constructor.
+        
+        Args:
+            path: str
+                The path of the log file.  It is created on the first
+                record, or appended to if it exists.
+            explain_connect: Callable[[], Connection]
+                The function which opens the side connection on which
+                plans are captured,  on the first slow statement.  It
+                should connect to the same database as the instrumented
+                connections. May be None, in which case no plan is cap-
+                tured. Defaults to None.
+            explain_prefix: str
+                The prefix of operations which gets their plan, e.g.
+                'EXPLAIN QUERY PLAN ' with SQLite. Defaults to 'EXPLAIN '.
+            explain_interval_s: float
+                The minimum delay between two captures of the plan of a
+                same normalized statement, in seconds. Records in between
+                get the last captured plan. Defaults to 60 seconds.
+            max_bytes: int
+                The size of the log file above which it is rotated.  De-
+                faults to 10 MB.
+            backup_count: int
+                The count of kept rotated files. Defaults to 5.
+        '''
+        assert max_bytes > 0
+        assert backup_count >= 0
+        assert explain_interval_s >= 0.0
+        self.path = path
+        self.explain_prefix = explain_prefix
+        self.explain_interval_s = explain_interval_s
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.records_count = 0
+        self.explains_count = 0
+        self._explain_connect = explain_connect
+        self._explain_connection = None
+        self._plans: Dict[str, Tuple[float, Optional[list], Optional[str]]] = {}
+        self._file: Optional[TextIO] = None
+        self._lock = Lock()
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes the log file and the side connection.
+        
+        The log may still be used: they are opened again on next record.
+        '''
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._explain_connection is not None:
+                self._explain_connection.close()
+                self._explain_connection = None
+
+    #-------------------------------------------------------------------------
+    def record(self, operation  : str,
+                     parameters : object,
+                     duration_s : float,
+                     threshold_s: float,
+                     rowcount   : int = -1,
+                     explain    : bool = True) -> SlowStatement:
+        '''Records a slow statement, with the plan of its operation.
+        
+        Args:
+            operation: str
+                The text of the slow operation.
+            parameters: object
+                The parameters of the execution, or None.
+            duration_s: float
+                The duration of the execution, in seconds.
+            threshold_s: float
+                The exceeded threshold, in seconds.
+            rowcount: int
+                The count of affected rows, or -1. Defaults to -1.
+            explain: bool
+                Set this to False for the plan not to be captured, e.g.
+                for executions of many sets of parameters. Defaults to
+                True.
+        
+        Returns:
+            The logged record.
+        '''
+        with self._lock:
+            plan = explain_error = None
+            if explain and self._explain_connect is not None:
+                plan, explain_error = self._plan_of( operation, parameters )
+            slow = SlowStatement( operation, parameters, duration_s, threshold_s, time.time(),
+                                  rowcount, plan, explain_error )
+            self._write( json.dumps(slow.to_dict(), default=_jsonable) + '\n' )
+            self.records_count += 1
+        return slow
+
+    #-------------------------------------------------------------------------
+    def _explain(self, operation: str, parameters: object) -> List:
+        '''Returns the rows of the plan of an operation, captured on the side connection.
+        
+        The transaction opened by EXPLAIN on the side connection, if any,
+        is rolled back.
+        '''
+        if self._explain_connection is None:
+            self._explain_connection = self._explain_connect()
+        cursor = self._explain_connection.cursor()
+        try:
+            if parameters is None:
+                cursor.execute( self.explain_prefix + operation )
+            else:
+                cursor.execute( self.explain_prefix + operation, parameters )
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+            self._explain_connection.rollback()
+        return [ row[0] if len(row) == 1 else list(row) for row in rows ]
+
+    #-------------------------------------------------------------------------
+    def _plan_of(self, operation: str, parameters: object) -> Tuple[Optional[list], Optional[str]]:
+        '''Returns the plan of an operation and the error which prevented its capture.
+        
+        Plans are captured at most once per '.explain_interval_s' per
+        normalized statement.  Errors are not raised: the side connec-
+        tion is dropped on errors other than the database ones.
+        '''
+        statement = normalize_statement( operation )
+        now = time.monotonic()
+        try:
+            time_s, plan, error = self._plans[ statement ]
+            if now - time_s < self.explain_interval_s:
+                return plan, error
+        except KeyError:
+            pass
+        
+        plan = error = None
+        try:
+            plan = self._explain( operation, parameters )
+            self.explains_count += 1
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if not isinstance( e, Error ) and self._explain_connection is not None:
+                try:
+                    self._explain_connection.close()
+                except Exception:
+                    pass
+                self._explain_connection = None
+        if len( self._plans ) >= self.MAX_PLANS:
+            self._plans.clear()
+        self._plans[ statement ] = ( now, plan, error )
+        return plan, error
+
+    #-------------------------------------------------------------------------
+    def _rotate(self) -> None:
+        '''Renames the log file with suffix '.1', shifting the former backups.
+        '''
+        self._file.close()
+        self._file = None
+        if self.backup_count == 0:
+            os.remove( self.path )
+            return
+        for index in range( self.backup_count - 1, 0, -1 ):
+            source = f"{self.path}.{index}"
+            if os.path.exists( source ):
+                os.replace( source, f"{self.path}.{index + 1}" )
+        os.replace( self.path, f"{self.path}.1" )
+
+    #-------------------------------------------------------------------------
+    def _write(self, line: str) -> None:
+        '''Appends a line to the log file, rotating it first if it would exceed '.max_bytes'.
+        '''
+        if self._file is None:
+            self._file = open( self.path, 'a', encoding='utf-8' )
+        data_size = len( line.encode('utf-8') )
+        if self._file.tell() > 0 and self._file.tell() + data_size > self.max_bytes:
+            self._rotate()
+            self._file = open( self.path, 'a', encoding='utf-8' )
+        self._file.write( line )
+        self._file.flush()
+
+    #-------------------------------------------------------------------------
+    # Class data
+    MAX_PLANS = 1000  # the maximum count of normalized statements whose last plan is kept
+
+
+#-------------------------------------------------------------------------
+def _jsonable(value: object) -> object:
+    '''Returns the JSON-serializable form of a parameter value.
+    '''
+    if isinstance( value, (bytes, bytearray, memoryview) ):
+        return bytes( value ).hex()
+    if isinstance( value, (datetime.date, datetime.time) ):
+        return value.isoformat()
+    return str( value )
+
+
+#=====   end of   Libs.ObjectSqlLib.slow_query_log   =====#
@@ -0,0 +1,156 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines a lightweight analysis of SQL operations.
+#
+# It is not a SQL parser.  It classifies operations as read-only or not
+# and finds the tables they read or write,  erring on the safe side: a
+# table that cannot be found for sure is reported as unknown (None).
+#
+
+#=============================================================================
+import re
+from functools import lru_cache
+from typing    import FrozenSet, Optional
+
+
+#=============================================================================
+def is_read_only(operation: str) -> bool:
+    '''Returns True if the operation only reads data.
+    
+    Read-only operations are SELECT operations,  possibly  preceded
+    by  WITH  clauses,  that neither lock rows (FOR UPDATE/SHARE) nor
+    create tables (SELECT ... INTO) nor embed data-modifying state-
+    ments.
+    
+    Args:
+        operation: str
+            The text of the operation.
+    '''
+    match = _FIRST_KEYWORD.match( operation )
+    if match is None:
+        return False
+    keyword = match.group( 1 ).upper()
+    if keyword not in ('SELECT', 'WITH', 'VALUES'):
+        return False
+    return _NOT_READ_ONLY.search( operation ) is None
+
+
+#-------------------------------------------------------------------------
+@lru_cache( maxsize=1024 )
+def normalize_statement(operation: str) -> str:
+    '''Returns the normalized form of an operation.
+    
+    Operations which only differ by their literal values,  their pla-
+    ceholders or their whitespaces share the same normalized form:
+    literals and placeholders are replaced with '?',  lists of them are
+    collapsed into a single one (e.g. IN (?, ?, ?) becomes IN (?) and
+    multi-row VALUES become single-row ones) and whitespaces are coll-
+    apsed.
+    
+    Args:
+        operation: str
+            The text of the operation.
+    '''
+    normalized = _STRING_LITERAL.sub( '?', operation )
+    normalized = _PLACEHOLDER.sub( '?', normalized )
+    normalized = _NUMBER_LITERAL.sub( '?', normalized )
+    normalized = _WHITESPACES.sub( ' ', normalized ).strip().rstrip( ';' ).rstrip()
+    normalized = _VALUES_LIST.sub( '?', normalized )
+    return _TUPLES_LIST.sub( r'\1', normalized )
+
+
+#-------------------------------------------------------------------------
+def read_tables(operation: str) -> FrozenSet[str]:
+    '''Returns the names of the tables read by an operation.
+    
+    Names are lower-cased,  unquoted and stripped from their schema
+    qualifier.
+    
+    Args:
+        operation: str
+            The text of the operation.
+    '''
+    tables = set()
+    for match in _READ_TABLES.finditer( operation ):
+        for item in match.group( 1 ).split( ',' ):
+            tables.add( _table_name(item.split()[0]) )
+    return frozenset( tables )
+
+
+#-------------------------------------------------------------------------
+def written_table(operation: str) -> Optional[str]:
+    '''Returns the name of the table modified by a DML operation.
+    
+    Args:
+        operation: str
+            The text of the operation.
+    
+    Returns:
+        The lower-cased, unquoted and unqualified name of the table
+        modified by an INSERT, UPDATE, DELETE, REPLACE, TRUNCATE or
+        MERGE operation, or None if the operation is not one of them
+        or if its target table cannot be determined.
+    '''
+    match = _WRITTEN_TABLE.match( operation )
+    return None if match is None else _table_name( match.group(1) )
+
+
+#-------------------------------------------------------------------------
+def _table_name(identifier: str) -> str:
+    '''Normalizes a table identifier.
+    '''
+    return identifier.split( '.' )[ -1 ].strip( '"`[]' ).lower()
+
+
+#-------------------------------------------------------------------------
+_IDENTIFIER = r'[\w."`\[\]]+'
+
+_FIRST_KEYWORD = re.compile( r'\s*\(*\s*(\w+)' )
+
+_NOT_READ_ONLY = re.compile( r'\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE)\b|\bINTO\b|\b(?:INSERT|UPDATE|DELETE|MERGE)\b',
+                             re.IGNORECASE )
+
+_TABLE_ALIAS = r'(?:\s+(?:AS\s+)?(?!(?:JOIN|INNER|LEFT|RIGHT|FULL|CROSS|NATURAL|ON|USING|WHERE|GROUP|ORDER|LIMIT)\b)\w+)?'
+
+_READ_TABLES = re.compile( rf'\b(?:FROM|JOIN)\s+({_IDENTIFIER}{_TABLE_ALIAS}(?:\s*,\s*{_IDENTIFIER}{_TABLE_ALIAS})*)',
+                           re.IGNORECASE )
+
+_NUMBER_LITERAL = re.compile( r'(?<![\w.$])[-+]?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?\b' )
+
+_PLACEHOLDER = re.compile( r'%\(\w+\)s|%s|(?<!:):\w+|\$\d+|\?' )
+
+_STRING_LITERAL = re.compile( r"'(?:[^']|'')*'" )
+
+_TUPLES_LIST = re.compile( r'(\([?, ]*\))(?:\s*,\s*\([?, ]*\))+' )
+
+_VALUES_LIST = re.compile( r'\?(?:\s*,\s*\?)+' )
+
+_WHITESPACES = re.compile( r'\s+' )
+
+_WRITTEN_TABLE = re.compile( rf'\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|'
+                             rf'DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?|MERGE\s+INTO)\s+(?:ONLY\s+)?({_IDENTIFIER})',
+                             re.IGNORECASE )
+
+
+#=====   end of   Libs.ObjectSqlLib.sql_analysis   =====#
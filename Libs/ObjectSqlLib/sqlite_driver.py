@@ -0,0 +1,498 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the reference driver of this library over  the
+#  built-in module sqlite3.
+#
+#  It implements the whole interface of classes Connection and Cursor
+#  with as little work as possible on top of sqlite3, so that its gap
+#  with raw sqlite3 measures the cost of the abstraction layer  itself
+#  (see script _benchmarks/bench_sqlite_driver.py).
+#
+#  Operations are expressed with paramstyle 'format' and translated
+#  into sqlite3 paramstyle 'qmark' once per connection  thanks  to  the
+#  statement cache.  sqlite3 exceptions are translated into the excep-
+#  tions of this library.
+#
+
+#=============================================================================
+import sqlite3
+from typing import Callable, List, Optional, Tuple
+
+from .binding         import compile_operation
+from .lazy_rows       import lazy_row_class
+from .memory_budget   import rows_size
+from .statement_batch import ResultSet
+
+from . import (Connection, Cursor, DatabaseError, DataError, Error, IntegrityError,
+               InterfaceError, InternalError, NotSupportedError, OperationalError,
+               ProgrammingError)
+
+
+#=============================================================================
+class SQLiteConnection( Connection ):
+    """The class of connections to SQLite databases.
+    """
+    #-------------------------------------------------------------------------
+    def __init__(self, _dsn     : str = ':memory:',
+                       _user    : Optional[str] = None,
+                       _password: Optional[str] = None,
+                       _host    : Optional[str] = None,
+                       _database: Optional[str] = None,
+                       **sqlite_kwargs ) -> None:
+        '''Constructor.
+        
+        Args:
+            _dsn: str
+                The path to the database file,  or a 'file:' URI  with
+                keyword argument 'uri=True'. Defaults to ':memory:', an
+                in-memory database.
+            _user, _password, _host, _database:
+                Ignored, SQLite has no server.
+            sqlite_kwargs:
+                Keyword arguments passed to sqlite3.connect().  Conn-
+                ections  may be used by many threads one after the other
+                (see ConnectionPool),  so  'check_same_thread' defaults
+                to False.
+        
+        Raises:
+            OperationalError: the database cannot be opened.
+        '''
+        sqlite_kwargs.setdefault( 'check_same_thread', False )
+        try:
+            self._db = sqlite3.connect( _dsn, **sqlite_kwargs )
+        except sqlite3.Error as e:
+            raise _translated( e ) from e
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes this connection. Does nothing if it is already closed.
+        '''
+        if getattr( self, '_db', None ) is not None:
+            self.statement_cache.clear()
+            self._db.close()
+
+    #-------------------------------------------------------------------------
+    def commit(self) -> None:
+        '''Commits any pending transaction.
+        '''
+        try:
+            self._db.commit()
+        except sqlite3.Error as e:
+            raise _translated( e ) from e
+
+    #-------------------------------------------------------------------------
+    def create_function(self, name: str, params_count: int, function: Callable) -> None:
+        '''Registers a Python function as an SQL function of this connection.
+        
+        This is not part of PEP 249.  Registered functions  are  also
+        the procedures that may be called with Cursor.callproc().
+        
+        Args:
+            name: str
+                The SQL name of the function.
+            params_count: int
+                The count of parameters of the function, or -1 for any
+                count.
+            function: Callable
+                The Python function.
+        '''
+        self._db.create_function( name, params_count, function )
+
+    #-------------------------------------------------------------------------
+    def cursor(self) -> 'SQLiteCursor':
+        '''Returns a new cursor on this connection.
+        
+        Raises:
+            ProgrammingError: this connection is closed.
+        '''
+        try:
+            return SQLiteCursor( self )
+        except sqlite3.Error as e:
+            raise _translated( e ) from e
+
+    #-------------------------------------------------------------------------
+    @property
+    def in_transaction(self) -> bool:
+        '''True if a transaction is pending on this connection.
+        
+        This is not part of PEP 249.
+        '''
+        return self._db.in_transaction
+
+    #-------------------------------------------------------------------------
+    def rollback(self) -> None:
+        '''Rolls back any pending transaction.
+        '''
+        try:
+            self._db.rollback()
+        except sqlite3.Error as e:
+            raise _translated( e ) from e
+
+    #-------------------------------------------------------------------------
+    def _cancel(self) -> None:
+        '''Interrupts the operation currently running on this connection, which then raises OperationalError.
+        '''
+        try:
+            self._db.interrupt()
+        except sqlite3.ProgrammingError:
+            pass  ## the connection is closed, and so is any of its operations
+
+    #-------------------------------------------------------------------------
+    def _prepare_statement(self, operation: str) -> str:
+        '''Translates paramstyle 'format' into paramstyle 'qmark'.
+        
+        As with any paramstyle 'format' driver, '%%' stands for a
+        single '%' everywhere in operations, literals included.
+        '''
+        return compile_operation( operation ).translated( 'qmark' )
+
+
+#=============================================================================
+class SQLiteCursor( Cursor ):
+    """The class of cursors on SQLite databases.
+    
+    Result sets are forward-only in SQLite:  backward scrolls raise
+    NotSupportedError. Every operation produces at most one result set.
+    Batches of operations are executed one after the other  and  their
+    result sets are buffered. SQLite decodes the values of rows itself:
+    lazy rows only provide the access by names of columns.
+    SQLite streams result sets, so only '.fetchall()' buffers rows: it
+    raises OperationalError when they exceed a limited memory budget.
+    '.rowcount' is -1 after SELECT statements, since SQLite does not
+    count their rows before they are all fetched.
+    """
+    #-------------------------------------------------------------------------
+    def __init__(self, parent_connection: SQLiteConnection) -> None:
+        '''Constructor.
+        
+        Args:
+            parent_connection: SQLiteConnection
+                The connection which creates this cursor.
+        '''
+        super().__init__( parent_connection )
+        self._sqlite_cursor = self._cursor = parent_connection._db.cursor()  # may be replaced by the buffered results of batches
+        self._row_class = None
+
+    #-------------------------------------------------------------------------
+    def __iter__(self) -> 'SQLiteCursor':
+        return self
+
+    #-------------------------------------------------------------------------
+    def __next__(self) -> Tuple:
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    #-------------------------------------------------------------------------
+    @property
+    def description(self) -> Optional[Tuple]:
+        '''The description of the columns of the current result set.
+        
+        Only the names of the columns are known:  SQLite columns have
+        no types, so type codes are None.
+        '''
+        return self._cursor.description
+
+    #-------------------------------------------------------------------------
+    def callproc(self, proc_name: str, *parameters) -> Tuple:
+        '''Calls an SQL function registered with SQLiteConnection.create_function().
+        
+        SQLite has no stored procedures.  Their call is emulated  with
+        a one-row result set which single column contains the value
+        returned by the called function.
+        
+        Args:
+            proc_name: str
+                The name of the function.
+            parameters: Sequence
+                The values of the arguments of the function.
+        
+        Returns:
+            A copy of the sequence of parameters, which are input-only.
+        '''
+        params = tuple( parameters[0] ) if parameters else ()
+        placeholders = ', '.join( ['%s'] * len(params) )
+        self.execute( f"SELECT {proc_name}({placeholders})", params )
+        return params
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes this cursor. Does nothing if it is already closed.
+        '''
+        if getattr( self, '_sqlite_cursor', None ) is not None:
+            try:
+                self._sqlite_cursor.close()
+            except sqlite3.ProgrammingError:
+                pass  ## the connection is already closed, and so is this cursor
+
+    #-------------------------------------------------------------------------
+    def execute(self, operation: str, *parameters) -> None:
+        '''Prepares and executes an operation.
+        
+        Args:
+            operation: str
+                The operation, with paramstyle 'format'.
+            parameters: Sequence
+                The values bound to the placeholders of the operation.
+        '''
+        if self._messages:
+            del self._messages[:]
+        if self._result_sets:
+            self._result_sets.clear()
+        cursor = self._cursor = self._sqlite_cursor
+        try:
+            cursor.execute( self._prepared(operation), parameters[0] if parameters else () )
+        except sqlite3.Error as e:
+            raise _translated( e ) from e
+        self._row_count = cursor.rowcount
+        self._last_row_id = cursor.lastrowid
+        self._row_number = 0
+        self._set_row_class()
+
+    #-------------------------------------------------------------------------
+    def executemany(self, operation: str, seq_of_parameters: tuple) -> None:
+        '''Prepares an operation and executes it against all sequences of parameters.
+        
+        '.rowcount' is then the total count of affected rows.
+        '''
+        if self._messages:
+            del self._messages[:]
+        if self._result_sets:
+            self._result_sets.clear()
+        cursor = self._cursor = self._sqlite_cursor
+        try:
+            cursor.executemany( self._prepared(operation), seq_of_parameters )
+        except sqlite3.Error as e:
+            raise _translated( e ) from e
+        self._row_count = cursor.rowcount
+        self._last_row_id = cursor.lastrowid
+        self._row_number = 0
+        self._set_row_class()
+
+    #-------------------------------------------------------------------------
+    def fetchall(self) -> List[Tuple]:
+        '''Fetches all the remaining rows of the current result set.
+        
+        Raises:
+            OperationalError: the rows exceed the memory budget of the
+                connection. The rows fetched before are lost.
+            ProgrammingError: no result set is available.
+        '''
+        try:
+            if self._connection.memory_budget.is_limited:
+                rows = self._fetchall_within_budget()
+            else:
+                rows = self._cursor.fetchall()
+        except sqlite3.Error as e:
+            raise _translated( e ) from e
+        if rows:
+            self._row_number += len( rows )
+            if self._row_class is not None:
+                rows = list( map(self._row_class, rows) )
+        else:
+            self._check_result_set()
+        return rows
+
+    #-------------------------------------------------------------------------
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        '''Fetches the next rows of the current result set.
+        
+        Args:
+            size: int
+                The maximum count of fetched rows. Defaults to '.arraysize'.
+        
+        Raises:
+            ProgrammingError: no result set is available.
+        '''
+        try:
+            rows = self._cursor.fetchmany( self._array_size if size is None else size )
+        except sqlite3.Error as e:
+            raise _translated( e ) from e
+        if rows:
+            self._row_number += len( rows )
+            if self._row_class is not None:
+                rows = list( map(self._row_class, rows) )
+        else:
+            self._check_result_set()
+        return rows
+
+    #-------------------------------------------------------------------------
+    def fetchone(self) -> Optional[Tuple]:
+        '''Fetches the next row of the current result set, or None when it is exhausted.
+        
+        Raises:
+            ProgrammingError: no result set is available.
+        '''
+        try:
+            row = self._cursor.fetchone()
+        except sqlite3.Error as e:
+            raise _translated( e ) from e
+        if row is None:
+            self._check_result_set()
+        else:
+            self._row_number += 1
+            if self._row_class is not None:
+                row = self._row_class( row )
+        return row
+
+    #-------------------------------------------------------------------------
+    def next(self) -> Tuple:
+        '''Returns the next row of the current result set.
+        
+        Raises:
+            StopIteration: the result set is exhausted.
+        '''
+        return self.__next__()
+
+    #-------------------------------------------------------------------------
+    def nextset(self) -> Optional[bool]:
+        '''Skips to the result set of the next operation of a batch.
+        
+        SQLite operations produce one result set at most,  so  there  is
+        no next one out of batches.
+        
+        Returns:
+            True if the result set of the next operation of a batch is
+            now the current one, or None otherwise.
+        
+        Raises:
+            ProgrammingError: the last operation produced no result set
+                and was not part of a batch.
+        '''
+        if self._result_sets:
+            return self._next_result_set()
+        if not isinstance( self._cursor, ResultSet ):
+            self._check_result_set()
+        return None
+
+    #-------------------------------------------------------------------------
+    def scroll(self, value: int, mode: Optional[str] = 'relative') -> None:
+        '''Scrolls forward in the current result set.
+        
+        Raises:
+            IndexError: the scroll would leave the result set.
+            NotSupportedError: the scroll is backward.
+            ProgrammingError: mode is neither 'relative' nor 'absolute'.
+        '''
+        if mode == 'absolute':
+            value -= self._row_number
+        elif mode != 'relative':
+            raise ProgrammingError( f"unknown scroll mode '{mode}'" )
+        
+        if value < 0:
+            raise NotSupportedError( "SQLite result sets cannot be scrolled backward" )
+        if value > 0 and len( self.fetchmany(value) ) < value:
+            raise IndexError( "scroll out of the result set" )
+
+    #-------------------------------------------------------------------------
+    def setinputsizes(self, sizes: Tuple) -> None:
+        '''Does nothing: SQLite does not predefine memory areas for parameters.
+        '''
+        pass
+
+    #-------------------------------------------------------------------------
+    def setoutputsize(self, size: int, column_index: Optional[int] = None) -> None:
+        '''Does nothing: SQLite does not predefine buffers for columns.
+        '''
+        pass
+
+    #-------------------------------------------------------------------------
+    def _check_result_set(self) -> None:
+        '''Raises ProgrammingError if the last operation produced no result set.
+        '''
+        if self._cursor.description is None:
+            raise ProgrammingError( "no result set is available" )
+
+    #-------------------------------------------------------------------------
+    def _fetchall_within_budget(self) -> List[Tuple]:
+        '''Fetches all the remaining rows by chunks, charging them to the memory budget of the connection.
+        
+        The rows are released from the budget once returned.
+        '''
+        rows = []
+        try:
+            while True:
+                chunk = self._cursor.fetchmany( self.FETCHALL_CHUNK_ROWS )
+                if not chunk:
+                    return rows
+                rows += chunk
+                if not self._buffer( rows_size(chunk) ):
+                    self._row_number += len( rows )
+                    raise self._connection.memory_budget.error( "the result set fetched with '.fetchall()'" )
+        finally:
+            self._release_buffer()
+
+    #-------------------------------------------------------------------------
+    def _load_result_set(self, result_set: ResultSet) -> None:
+        '''Makes a buffered result set of a batch the current result set.
+        '''
+        self._cursor = result_set
+        self._row_count = result_set.row_count
+        self._last_row_id = result_set.last_row_id
+        self._row_number = 0
+        self._set_row_class()
+
+    #-------------------------------------------------------------------------
+    def _set_row_class(self) -> None:
+        '''Sets the class of the lazy rows of the current result set, or None for tuples.
+        '''
+        description = self._cursor.description
+        if self._lazy_rows and description is not None:
+            self._row_class = lazy_row_class( tuple(d[0] for d in description) )
+        else:
+            self._row_class = None
+
+    #-------------------------------------------------------------------------
+    # Class data
+    FETCHALL_CHUNK_ROWS = 1000  # the count of rows per chunk of '.fetchall()' within a limited memory budget
+
+
+#=============================================================================
+_SQLITE_ERRORS = {
+    sqlite3.DataError        : DataError,
+    sqlite3.IntegrityError   : IntegrityError,
+    sqlite3.InterfaceError   : InterfaceError,
+    sqlite3.InternalError    : InternalError,
+    sqlite3.NotSupportedError: NotSupportedError,
+    sqlite3.OperationalError : OperationalError,
+    sqlite3.ProgrammingError : ProgrammingError,
+    sqlite3.DatabaseError    : DatabaseError,
+    sqlite3.Error            : Error,
+}
+
+
+#-------------------------------------------------------------------------
+def _translated(error: sqlite3.Error) -> Error:
+    '''Returns the exception of this library corresponding to an sqlite3 one.
+    '''
+    for error_type in type( error ).__mro__:
+        try:
+            return _SQLITE_ERRORS[ error_type ]( *error.args )
+        except KeyError:
+            continue
+    return Error( *error.args )
+
+
+#=====   end of   Libs.ObjectSqlLib.sqlite_driver   =====#
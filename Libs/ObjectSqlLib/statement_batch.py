@@ -0,0 +1,141 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the result sets of batches of operations.
+#
+# Batches of operations are executed with 'Cursor.execute_batch()'. Their
+# result sets are buffered, so that they can be exposed one after the
+# other through '.nextset()' and '.fetch*()' once the whole batch has run.
+# Drivers which cannot send a whole batch in a single round trip execute
+# its operations sequentially with function execute_sequentially().
+#
+
+#=============================================================================
+from typing import ForwardRef, List, Optional, Sequence, Tuple
+
+
+#=============================================================================
+CursorRef = ForwardRef( "Cursor" )
+
+Statement = Tuple[ str, Optional[Sequence] ]
+
+
+#=============================================================================
+class ResultSet:
+    """The class of buffered result sets of the operations of batches.
+    
+    Result sets provide '.fetchone()', '.fetchmany()' and '.fetchall()'
+    over their buffered rows, so that drivers may serve them as they
+    serve the cursors of their database.
+    
+    Attributes:
+        description: Tuple
+            The description of the columns, as in Cursor.description, or
+            None if the operation produced no result set.
+        rows: List[Tuple]
+            The rows of the result set, or None if the operation produced
+            no result set.
+        row_count: int
+            The count of rows produced or affected by the operation, or
+            -1 if it is not known.
+        last_row_id: object
+            The id of the last modified row, if any.
+    """
+    __slots__ = ( 'description', 'rows', 'row_count', 'last_row_id', '_position' )
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, description: Optional[Tuple],
+                       rows       : Optional[List[Tuple]],
+                       row_count  : int = -1,
+                       last_row_id: object = None) -> None:
+        '''Constructor.
+        '''
+        self.description = description
+        self.rows = rows
+        self.row_count = row_count
+        self.last_row_id = last_row_id
+        self._position = 0
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Drops the buffered rows.
+        '''
+        self.rows = None if self.rows is None else []
+
+    #-------------------------------------------------------------------------
+    def fetchall(self) -> List[Tuple]:
+        return self.fetchmany( len(self.rows) if self.rows else 0 )
+
+    #-------------------------------------------------------------------------
+    def fetchmany(self, size: int) -> List[Tuple]:
+        if not self.rows:
+            return []
+        start = self._position
+        rows = self.rows[ start:start + size ]
+        self._position = start + len( rows )
+        return rows
+
+    #-------------------------------------------------------------------------
+    def fetchone(self) -> Optional[Tuple]:
+        if not self.rows or self._position >= len( self.rows ):
+            return None
+        self._position += 1
+        return self.rows[ self._position - 1 ]
+
+
+#=============================================================================
+def execute_sequentially(cursor: CursorRef, statements: Sequence[Statement]) -> List[ResultSet]:
+    '''Executes the operations of a batch one after the other and buffers their result sets.
+    
+    This is the execution of batches for the drivers which cannot send
+    them in a single round trip (see Cursor.execute_batch()).  Result
+    sets are entirely fetched before the next operation is executed.
+    The messages of every operation are kept in the messages of the
+    cursor.
+    
+    Args:
+        cursor: Cursor
+            A reference to the cursor which executes the operations.
+        statements: Sequence[Statement]
+            The pairs (operation, parameters) of the batch.
+    
+    Returns:
+        The result sets of the operations, in their order.
+    
+    Raises:
+        Error: the execution of an operation failed. The following oper-
+            ations are not executed.
+    '''
+    results = []
+    messages = []
+    for operation, parameters in statements:
+        cursor.execute( operation, parameters )
+        description = cursor.description
+        rows = None if description is None else cursor.fetchall()
+        results.append( ResultSet(description, rows, cursor._row_count, cursor._last_row_id) )
+        messages += cursor._messages
+    cursor._messages[:] = messages
+    return results
+
+
+#=====   end of   Libs.ObjectSqlLib.statement_batch   =====#
@@ -0,0 +1,213 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the caches of prepared statements.
+#
+# Drivers parse or prepare an operation once, keep its prepared form in
+# the statement cache of the connection and then bind it many times with
+# different parameters.
+#
+
+#=============================================================================
+from collections import OrderedDict
+from typing      import Callable, Optional
+
+
+#=============================================================================
+class StatementCache:
+    """The class of LRU caches of prepared statements.
+    
+    Prepared statements are keyed by the text of their operation.  At
+    most  '.max_size' statements are kept in cache.  When a statement 
+    has to be added to a full cache, the least recently used statement
+    is evicted and passed to the eviction callback,  which  gives  the
+    drivers a chance to release the related resources (e.g. a server-
+    side prepared statement).
+    
+    Counts of hits, misses and evictions are maintained.
+    
+    Notice: as connections, statement caches are not thread safe.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, max_size: int = 128,
+                       on_evict: Optional[Callable[[str, object], None]] = None) -> None:
+        '''Constructor.
+        
+        Args:
+            max_size: int
+                The maximum count of  prepared  statements  kept  in 
+                this cache. Must be greater than 0. Defaults to 128.
+            on_evict: Callable[[str, object], None]
+                The function that is called with the  operation  and
+                its  prepared form each time a prepared statement is
+                removed from this cache.  May be None.  Defaults  to
+                None.
+        '''
+        assert max_size > 0
+        self._max_size = max_size
+        self._on_evict = on_evict
+        self._statements = OrderedDict()
+        self.reset_counters()
+
+    #-------------------------------------------------------------------------
+    def __contains__(self, operation: str) -> bool:
+        '''Returns True if the operation is cached. Counters and LRU order are left unchanged.
+        '''
+        return operation in self._statements
+
+    #-------------------------------------------------------------------------
+    def __len__(self) -> int:
+        '''Returns the count of cached prepared statements.
+        '''
+        return len( self._statements )
+
+    #-------------------------------------------------------------------------
+    @property
+    def evictions(self) -> int:
+        '''The count of prepared statements evicted to make room for new ones.
+        '''
+        return self._evictions
+
+    #-------------------------------------------------------------------------
+    @property
+    def hits(self) -> int:
+        '''The count of lookups that found the operation in cache.
+        '''
+        return self._hits
+
+    #-------------------------------------------------------------------------
+    @property
+    def max_size(self) -> int:
+        '''The maximum count of prepared statements kept in this cache.
+        '''
+        return self._max_size
+
+    #-------------------------------------------------------------------------
+    @property
+    def misses(self) -> int:
+        '''The count of lookups that did not find the operation in cache.
+        '''
+        return self._misses
+
+    #-------------------------------------------------------------------------
+    def clear(self) -> None:
+        '''Removes all prepared statements from this cache.
+        
+        The eviction callback is called for every removed statement.
+        Evictions counter is not modified.
+        '''
+        while self._statements:
+            self._remove_lru()
+
+    #-------------------------------------------------------------------------
+    def get(self, operation: str) -> Optional[object]:
+        '''Returns the prepared form of an operation, or None if it is not cached.
+        
+        Args:
+            operation: str
+                The text of the operation.
+        '''
+        try:
+            prepared = self._statements[ operation ]
+        except KeyError:
+            self._misses += 1
+            return None
+        self._statements.move_to_end( operation )
+        self._hits += 1
+        return prepared
+
+    #-------------------------------------------------------------------------
+    def get_or_prepare(self, operation: str, prepare: Callable[[str], object]) -> object:
+        '''Returns the prepared form of an operation, preparing and caching it on a miss.
+        
+        Args:
+            operation: str
+                The text of the operation.
+            prepare: Callable[[str], object]
+                The function that prepares the operation. It is
+                called on cache misses only.
+        '''
+        statements = self._statements
+        try:
+            prepared = statements[ operation ]
+        except KeyError:
+            self._misses += 1
+            prepared = prepare( operation )
+            self.put( operation, prepared )
+            return prepared
+        statements.move_to_end( operation )
+        self._hits += 1
+        return prepared
+
+    #-------------------------------------------------------------------------
+    def put(self, operation: str, prepared: object) -> None:
+        '''Adds a prepared statement to this cache, evicting the least recently used one if cache is full.
+        
+        Args:
+            operation: str
+                The text of the operation.
+            prepared: object
+                The prepared form of the operation.
+        '''
+        if operation in self._statements:
+            self._statements.move_to_end( operation )
+        elif len( self._statements ) >= self._max_size:
+            self._remove_lru()
+            self._evictions += 1
+        self._statements[ operation ] = prepared
+
+    #-------------------------------------------------------------------------
+    def reset_counters(self) -> None:
+        '''Resets the counts of hits, misses and evictions.
+        '''
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    #-------------------------------------------------------------------------
+    def resize(self, max_size: int) -> None:
+        '''Modifies the maximum count of prepared statements in this cache.
+        
+        Least recently used statements are evicted if needed.
+        
+        Args:
+            max_size: int
+                The new maximum size. Must be greater than 0.
+        '''
+        assert max_size > 0
+        self._max_size = max_size
+        while len( self._statements ) > max_size:
+            self._remove_lru()
+            self._evictions += 1
+
+    #-------------------------------------------------------------------------
+    def _remove_lru(self) -> None:
+        '''Removes the least recently used statement and calls the eviction callback.
+        '''
+        operation, prepared = self._statements.popitem( last=False )
+        if self._on_evict is not None:
+            self._on_evict( operation, prepared )
+
+
+#=====   end of   Libs.ObjectSqlLib.statement_cache   =====#
@@ -0,0 +1,384 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the timeouts of the operations of cursors.
+#
+# A TimeoutConnection wraps a connection of a concrete driver.  Every
+# execution and every fetch of its cursors arms a deadline,  which is
+# disarmed as soon as the call returns.  The deadlines of all the cur-
+# sors are watched by a single shared StatementWatchDog, which keeps
+# them in a heap and checks its top at every tick: thousands of concur-
+# rent operations cost no more threads than a single one. On expiry,
+# the watchdog cancels the operation through the driver (see method
+# Connection._cancel()),  so that the blocked call returns, and the
+# cursor then raises OperationalError.
+#
+
+#=============================================================================
+import heapq
+from itertools import count
+from threading import Event, Lock
+from time      import monotonic
+from typing    import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from Utils.watchdog   import WatchDog
+from .                import Connection, Cursor, OperationalError
+from .batching        import BatchReport
+from .statement_batch import Statement
+from .wrappers        import ConnectionWrapper, CursorWrapper
+
+
+#=============================================================================
+class Deadline:
+    """The class of the deadlines armed on a statement watchdog.
+    
+    Attributes:
+        time_s: float
+            The monotonic time of the expiry.
+        timeout_s: float
+            The timeout which has been armed.
+        expired: bool
+            True once the watchdog has expired this deadline.
+        cancel_error: Exception
+            The error raised by the cancellation of the operation,  or
+            None.
+    """
+    __slots__ = ( 'time_s', 'timeout_s', 'expired', 'cancel_error', '_cancel', '_disarmed', '_cancelled' )
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, timeout_s: float, cancel: Callable[[], None]) -> None:
+        '''Constructor.
+        '''
+        self.time_s = monotonic() + timeout_s
+        self.timeout_s = timeout_s
+        self.expired = False
+        self.cancel_error = None
+        self._cancel = cancel
+        self._disarmed = False
+        self._cancelled = Event()
+
+    #-------------------------------------------------------------------------
+    def wait_cancelled(self, timeout_s: Optional[float] = None) -> bool:
+        '''Waits until the cancellation of the operation of an expired deadline has been sent.
+        
+        Returns:
+            True, or False if the wait timed out.
+        '''
+        return self._cancelled.wait( timeout_s )
+
+
+#=============================================================================
+class StatementWatchDog( WatchDog ):
+    """The class of the watchdogs of the deadlines of operations.
+    
+    Deadlines are kept in a heap.  The watchdog awakes every '.resolu-
+    tion_s' seconds and expires the deadlines at the top of the heap
+    whose time has come. Disarmed deadlines are dropped lazily,  when
+    they reach the top of the heap or when they get the majority of it.
+    Expired deadlines get their cancel function called from the thread
+    of the watchdog.
+    
+    A single watchdog, returned by 'shared_watchdog()', is shared by all
+    the timeout connections which are not given one of their own.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, resolution_s: float = 0.005,
+                       name        : Optional[str] = 'statement-watchdog') -> None:
+        '''Constructor.
+        
+        Args:
+            resolution_s: float
+                The period of the checks of the deadlines,  in seconds.
+                Timeouts expire up to this period late.  Defaults to 5
+                milliseconds.
+            name: str
+                The name of the thread of this watchdog. Defaults to
+                'statement-watchdog'.
+        '''
+        self.resolution_s = resolution_s
+        self.expired_count = 0
+        self._heap = []
+        self._disarmed_count = 0
+        self._sequence = count()
+        self._lock = Lock()
+        super().__init__( resolution_s, name )
+        self._prepare_timer()
+
+    #-------------------------------------------------------------------------
+    def __len__(self) -> int:
+        '''Returns the count of the armed deadlines.
+        '''
+        return len( self._heap ) - self._disarmed_count
+
+    #-------------------------------------------------------------------------
+    def arm(self, timeout_s: float, cancel: Callable[[], None]) -> Deadline:
+        '''Arms a new deadline.
+        
+        Args:
+            timeout_s: float
+                The delay before the expiry of the deadline, in seconds.
+            cancel: Callable[[], None]
+                The function called on expiry, which cancels the operat-
+                ion.
+        
+        Returns:
+            The armed deadline, to be disarmed once the operation has
+            completed.
+        '''
+        deadline = Deadline( timeout_s, cancel )
+        with self._lock:
+            heapq.heappush( self._heap, (deadline.time_s, next(self._sequence), deadline) )
+        return deadline
+
+    #-------------------------------------------------------------------------
+    def disarm(self, deadline: Deadline) -> bool:
+        '''Disarms a deadline.
+        
+        Returns:
+            True if the deadline had already expired, in which case the
+            cancellation of its operation is sent before returning.
+        '''
+        with self._lock:
+            if not deadline.expired:
+                deadline._disarmed = True
+                self._disarmed_count += 1
+                if self._disarmed_count > 64 and 2 * self._disarmed_count > len( self._heap ):
+                    self._heap = [ entry for entry in self._heap if not entry[2]._disarmed ]
+                    heapq.heapify( self._heap )
+                    self._disarmed_count = 0
+                return False
+        deadline.wait_cancelled()
+        return True
+
+    #-------------------------------------------------------------------------
+    def reset(self) -> None:
+        '''Restarts the checks of the deadlines, which are kept armed.
+        '''
+        self.repeat_timer.stop()
+        self.repeat_timer = self._RepeatedTimer( self._period_s, self._name )
+        self._prepare_timer()
+        self.start()
+
+    #-------------------------------------------------------------------------
+    def _expire(self) -> None:
+        '''Expires the deadlines whose time has come and cancels their operations.
+        '''
+        now = monotonic()
+        expired = []
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                deadline = heapq.heappop( heap )[2]
+                if deadline._disarmed:
+                    self._disarmed_count -= 1
+                else:
+                    deadline.expired = True
+                    expired.append( deadline )
+            self.expired_count += len( expired )
+        
+        for deadline in expired:
+            try:
+                deadline._cancel()
+            except Exception as e:
+                deadline.cancel_error = e
+            deadline._cancelled.set()
+
+    #-------------------------------------------------------------------------
+    def _prepare_timer(self) -> None:
+        '''Links the repeated timer of this watchdog to its deadlines.
+        '''
+        self.repeat_timer.watchdog = self
+        self.repeat_timer.daemon = True
+
+    #-------------------------------------------------------------------------
+    class _RepeatedTimer( WatchDog._RepeatedTimer ):
+        '''The internal repeated timer, which checks the deadlines.
+        '''
+        #-------------------------------------------------------------------------
+        def process(self) -> None:
+            self.watchdog._expire()
+
+
+#-------------------------------------------------------------------------
+def shared_watchdog() -> StatementWatchDog:
+    '''Returns the statement watchdog shared by the timeout connections, started on first call.
+    '''
+    global _shared_watchdog
+    with _shared_lock:
+        if _shared_watchdog is None:
+            _shared_watchdog = StatementWatchDog()
+            _shared_watchdog.start()
+        return _shared_watchdog
+
+_shared_watchdog: Optional[StatementWatchDog] = None
+_shared_lock = Lock()
+
+
+#=============================================================================
+class TimeoutConnection( ConnectionWrapper ):
+    """The class of connections which operations time out.
+    
+    Timeout connections wrap a connection of a concrete driver.  Each
+    execution and each fetch of their cursors is cancelled once it has
+    run for more than the timeout of the cursor,  which is initialized
+    with '.timeout_s' and may then be set per cursor or per operation.
+    The cancelled call raises OperationalError, which is also appended
+    to the messages of the cursor.
+    
+    The wrapped driver must implement Connection._cancel().
+    
+    Usage:
+        cnx = TimeoutConnection( MyConnection('my_dsn'), timeout_s=30.0 )
+        cursor = cnx.cursor()
+        cursor.timeout_s = 0.5     ## for the next operations of this cursor
+        cursor.execute( "SELECT ..." )
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, connection: Connection,
+                       timeout_s : Optional[float] = None,
+                       watchdog  : Optional[StatementWatchDog] = None) -> None:
+        '''Constructor.
+        
+        Args:
+            connection: Connection
+                A reference to the wrapped connection.
+            timeout_s: float
+                The default timeout of the operations of the cursors,  in
+                seconds, or None for no timeout. Defaults to None.
+            watchdog: StatementWatchDog
+                A reference to the started watchdog of the deadlines.  May
+                be None,  in which case the shared one is used.  Defaults
+                to None.
+        '''
+        super().__init__( connection )
+        self.timeout_s = timeout_s
+        self.watchdog = shared_watchdog() if watchdog is None else watchdog
+
+    #-------------------------------------------------------------------------
+    def _wrap_cursor(self, cursor: Cursor) -> Cursor:
+        return TimeoutCursor( self, cursor )
+
+
+#=============================================================================
+class TimeoutCursor( CursorWrapper ):
+    """The class of cursors of timeout connections.
+    
+    Attributes:
+        timeout_s: float
+            The timeout of the next operations of this cursor, in seconds,
+            or None for no timeout.
+        timeouts_count: int
+            The count of the operations of this cursor which timed out.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, parent_connection: TimeoutConnection, source: Cursor) -> None:
+        '''Constructor.
+        '''
+        super().__init__( parent_connection, source )
+        self.timeout_s = parent_connection.timeout_s
+        self.timeouts_count = 0
+
+    #-------------------------------------------------------------------------
+    def callproc(self, proc_name: str, *parameters) -> Optional:
+        return self._timed( super().callproc, proc_name, *parameters )
+
+    #-------------------------------------------------------------------------
+    def execute(self, operation: str, *parameters) -> Optional:
+        return self._timed( super().execute, operation, *parameters )
+
+    #-------------------------------------------------------------------------
+    def execute_batch(self, statements: Iterable[Statement]) -> None:
+        self._timed( super().execute_batch, statements )
+
+    #-------------------------------------------------------------------------
+    def executemany(self, operation: str, seq_of_parameters: tuple) -> Optional:
+        return self._timed( super().executemany, operation, seq_of_parameters )
+
+    #-------------------------------------------------------------------------
+    def fetchall(self) -> List[Tuple]:
+        return self._timed( super().fetchall )
+
+    #-------------------------------------------------------------------------
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        return self._timed( super().fetchmany, size )
+
+    #-------------------------------------------------------------------------
+    def fetchone(self) -> Optional[Tuple]:
+        return self._timed( super().fetchone )
+
+    #-------------------------------------------------------------------------
+    def nextset(self) -> Optional[bool]:
+        return self._timed( super().nextset )
+
+    #-------------------------------------------------------------------------
+    def scroll(self, value: int, mode: Optional[str] = 'relative') -> None:
+        self._timed( super().scroll, value, mode )
+
+    #-------------------------------------------------------------------------
+    def _copy_from_native(self, table  : str,
+                                columns: Optional[Sequence[str]],
+                                buffers: Iterator[str],
+                                dialect: object,
+                                null   : str) -> Optional[BatchReport]:
+        return self._timed( super()._copy_from_native, table, columns, buffers, dialect, null )
+
+    #-------------------------------------------------------------------------
+    def _timed(self, method: Callable, *args) -> object:
+        '''Runs a method of CursorWrapper under the watch of a deadline.
+        
+        Raises:
+            OperationalError: the deadline expired and the operation has
+                been cancelled.
+        '''
+        timeout_s = self.timeout_s
+        if timeout_s is None:
+            return method( *args )
+        
+        watchdog = self._connection.watchdog
+        deadline = watchdog.arm( timeout_s, self._connection._cancel )
+        try:
+            result = method( *args )
+        except Exception as e:
+            if watchdog.disarm( deadline ):
+                raise self._timed_out( deadline ) from e
+            raise
+        if watchdog.disarm( deadline ):
+            raise self._timed_out( deadline )
+        return result
+
+    #-------------------------------------------------------------------------
+    def _timed_out(self, deadline: Deadline) -> OperationalError:
+        '''Records the expiry of a deadline and returns the error to be raised.
+        '''
+        self.timeouts_count += 1
+        text = f"operation cancelled after its timeout of {deadline.timeout_s:g} s"
+        if deadline.cancel_error is not None:
+            text += f" (the cancellation failed: {deadline.cancel_error})"
+        self._messages.append( (OperationalError, text) )
+        return OperationalError( text )
+
+
+#=====   end of   Libs.ObjectSqlLib.statement_timeout   =====#
@@ -0,0 +1,353 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines streaming cursors with windowed scroll support.
+#
+# Streaming cursors wrap forward-only cursors of concrete drivers. They
+# keep a single window of rows in memory and spill every window to a
+# temporary spool file, which is memory-mapped to read windows back on
+# scrolls. Relative and absolute scrolls then work over results sets of
+# any size with a fixed memory ceiling.
+#
+
+#=============================================================================
+import mmap
+import pickle
+import tempfile
+from array    import array
+from bisect   import bisect_right
+from typing   import Iterable, List, Optional, Sequence, Tuple
+
+from .                import Cursor, ProgrammingError, warning
+from .statement_batch import Statement
+
+
+#=============================================================================
+class StreamingCursor( Cursor ):
+    """The class of bounded-memory streaming cursors.
+    
+    A streaming cursor wraps a cursor of a concrete driver,  named the
+    source  cursor  here.  Rows are pulled from the source cursor with
+    '.fetchmany()' by windows of '.window_size' rows and only the
+    current window is kept in memory.  Every window is appended to a
+    temporary spool file when it is pulled, so that scrolling back
+    reads it from the memory-mapped spool rather than from the data-
+    base.
+    
+    The memory footprint is the one of a single window plus 16 bytes
+    per window for the index of the spool file.
+    
+    Usage:
+        cursor = StreamingCursor( cnx.cursor(), window_size=10_000 )
+        cursor.execute( "SELECT ..." )
+        cursor.scroll( 1_000_000, mode='absolute' )
+        row = cursor.fetchone()
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, source     : Cursor,
+                       window_size: int = 1000,
+                       spool_dir  : Optional[str] = None) -> None:
+        '''Constructor.
+        
+        Args:
+            source: Cursor
+                A reference to the wrapped cursor of a concrete driver.
+            window_size: int
+                The count of rows per window. Defaults to 1000.
+            spool_dir: str
+                The path to the directory of the temporary spool files.
+                May be None for the default temporary directory. Defaults
+                to None.
+        '''
+        assert window_size > 0
+        super().__init__( source._connection )
+        self._source = source
+        self._window_size = window_size
+        self._spool_dir = spool_dir
+        self._spool = None
+        self._mmap = None
+        self._reset_stream()
+
+    #-------------------------------------------------------------------------
+    def __iter__(self) -> Cursor:
+        '''Returns self to make cursors compatible to the iteration protocol.
+        '''
+        return self
+
+    #-------------------------------------------------------------------------
+    def __next__(self) -> Tuple:
+        '''Returns the next row, or raises StopIteration when the result set is exhausted.
+        '''
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    #-------------------------------------------------------------------------
+    @property
+    def description(self) -> Optional[Tuple]:
+        '''The description of the columns of the results set, as provided by the source cursor.
+        '''
+        return self._source.description
+
+    #-------------------------------------------------------------------------
+    @property
+    def spooled_rows_count(self) -> int:
+        '''The count of rows pulled from the source cursor and spooled so far.
+        '''
+        return self._pulled_count
+
+    #-------------------------------------------------------------------------
+    @property
+    def window_size(self) -> int:
+        '''The count of rows per window.
+        '''
+        return self._window_size
+
+    #-------------------------------------------------------------------------
+    def callproc(self, proc_name: str, *parameters) -> Optional:
+        '''Calls a stored database procedure with the given name.
+        
+        The result set of the procedure, if any, gets streamed.
+        '''
+        self._reset_stream()
+        result = self._source.callproc( proc_name, *parameters )
+        self._row_count = self._source._row_count
+        return result
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes this cursor, its spool file and the source cursor.
+        '''
+        self._close_spool()
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+    #-------------------------------------------------------------------------
+    def execute(self, operation: str, *parameters) -> Optional:
+        '''Executes an operation with the source cursor and resets the streaming of its result set.
+        '''
+        self._reset_stream()
+        result = self._source.execute( operation, *parameters )
+        self._row_count = self._source._row_count
+        self._last_row_id = self._source._last_row_id
+        return result
+
+    #-------------------------------------------------------------------------
+    def execute_batch(self, statements: Iterable[Statement]) -> None:
+        '''Executes a batch of operations with the source cursor and resets the streaming of its result set.
+        '''
+        self._reset_stream()
+        self._source.execute_batch( statements )
+        self._row_count = self._source._row_count
+        self._last_row_id = self._source._last_row_id
+
+    #-------------------------------------------------------------------------
+    def executemany(self, operation: str, seq_of_parameters: tuple) -> Optional:
+        '''Executes an operation with the source cursor against all the parameters.
+        '''
+        self._reset_stream()
+        result = self._source.executemany( operation, seq_of_parameters )
+        self._row_count = self._source._row_count
+        return result
+
+    #-------------------------------------------------------------------------
+    def fetchall(self) -> List[Tuple]:
+        '''Fetch all (remaining) rows of a query result.
+        
+        Notice: the returned list holds all the remaining rows in memory.
+        Prefer iterations or '.fetchmany()' over large results sets.
+        '''
+        rows = []
+        while True:
+            batch = self.fetchmany( self._window_size )
+            if not batch:
+                return rows
+            rows += batch
+
+    #-------------------------------------------------------------------------
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        '''Fetch the next set of rows of a query result.
+        '''
+        size = self._array_size if size is None else size
+        rows = []
+        while len( rows ) < size and self._has_row( self._row_number ):
+            window = self._load_window_of( self._row_number )
+            start = self._row_number - self._windows_first_rows[ self._window_index ]
+            taken = window[ start:start + size - len(rows) ]
+            rows += taken
+            self._row_number += len( taken )
+        return rows
+
+    #-------------------------------------------------------------------------
+    def fetchone(self) -> Optional[Tuple]:
+        '''Fetch the next row of a query result set.
+        '''
+        if not self._has_row( self._row_number ):
+            return None
+        window = self._load_window_of( self._row_number )
+        row = window[ self._row_number - self._windows_first_rows[self._window_index] ]
+        self._row_number += 1
+        return row
+
+    #-------------------------------------------------------------------------
+    def next(self) -> Tuple:
+        '''Returns the next row from the currently executing SQL statement.
+        '''
+        warning( "DB-API extension cursor.next() used" )
+        return self.__next__()
+
+    #-------------------------------------------------------------------------
+    def nextset(self) -> Optional[bool]:
+        '''Makes the source cursor skip to its next available set, which gets streamed.
+        '''
+        self._reset_stream()
+        result = self._source.nextset()
+        self._row_count = self._source._row_count
+        return result
+
+    #-------------------------------------------------------------------------
+    def scroll(self, value: int, mode: Optional[str] = 'relative') -> None:
+        '''Scrolls the cursor in the result set to a new position according to mode.
+        
+        Forward scrolls pull (and spool) the rows from the source cursor
+        up to the new position. Backward scrolls are served by the spool
+        file.
+        
+        Args:
+            value: int
+                The offset to the current position if mode is relative,
+                or the new absolute position otherwise.
+            mode: str
+                Either 'relative' or 'absolute'. Defaults to 'relative'.
+        
+        Raises:
+            IndexError: the scroll would leave the result set. The curs-
+                or position is left unchanged.
+            ProgrammingError: mode is neither 'relative' nor 'absolute'.
+        '''
+        warning( "DB-API extension Cursor.scroll() used" )
+        if mode == 'relative':
+            position = self._row_number + value
+        elif mode == 'absolute':
+            position = value
+        else:
+            raise ProgrammingError( f"scroll mode '{mode}' is neither 'relative' nor 'absolute'" )
+        
+        ## the position after the last row is valid: next fetches return no row
+        if position < 0 or (position > 0 and not self._has_row(position - 1)):
+            raise IndexError( f"scroll to row {position} out of result set" )
+        self._row_number = position
+
+    #-------------------------------------------------------------------------
+    def setinputsizes(self, sizes: tuple) -> None:
+        self._source.setinputsizes( sizes )
+
+    #-------------------------------------------------------------------------
+    def setoutputsize(self, size: int, column_index: Optional[int] = None) -> None:
+        self._source.setoutputsize( size, column_index )
+
+    #-------------------------------------------------------------------------
+    def _close_spool(self) -> None:
+        '''Closes the memory map and the spool file - which deletes it.
+        '''
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+    #-------------------------------------------------------------------------
+    def _has_row(self, index: int) -> bool:
+        '''Returns True if the row at this index exists, pulling windows from the source cursor as needed.
+        '''
+        while index >= self._pulled_count and not self._exhausted:
+            self._pull_window()
+        return index < self._pulled_count
+
+    #-------------------------------------------------------------------------
+    def _load_window_of(self, index: int) -> List[Tuple]:
+        '''Returns the window that contains the row at this index, reading it from the spool if needed.
+        '''
+        window_index = bisect_right( self._windows_first_rows, index ) - 1
+        if window_index != self._window_index:
+            start = self._windows_offsets[ window_index ]
+            end = self._windows_offsets[ window_index + 1 ]
+            if self._mmap is None or len( self._mmap ) < end:
+                if self._mmap is not None:
+                    self._mmap.close()
+                self._spool.flush()
+                self._mmap = mmap.mmap( self._spool.fileno(), 0, access=mmap.ACCESS_READ )
+            self._window = pickle.loads( self._mmap[start:end] )
+            self._window_index = window_index
+        return self._window
+
+    #-------------------------------------------------------------------------
+    def _pull_window(self) -> None:
+        '''Pulls the next window of rows from the source cursor and appends it to the spool file.
+        '''
+        rows = self._source.fetchmany( self._window_size )
+        if not rows:
+            self._exhausted = True
+            return
+        rows = [ _owned(row) for row in rows ]   ## memoryviews cannot be pickled
+        
+        if self._spool is None:
+            self._spool = tempfile.TemporaryFile( dir=self._spool_dir )
+        self._spool.seek( 0, 2 )
+        pickle.dump( rows, self._spool, pickle.HIGHEST_PROTOCOL )
+        self._windows_offsets.append( self._spool.tell() )
+        self._windows_first_rows.append( self._pulled_count )
+        
+        self._pulled_count += len( rows )
+        self._window = rows
+        self._window_index = len( self._windows_first_rows ) - 1
+
+    #-------------------------------------------------------------------------
+    def _reset_stream(self) -> None:
+        '''Drops the streamed result set, if any.
+        '''
+        self._close_spool()
+        self._windows_offsets = array( 'Q', [0] )   ## offsets of windows in spool file, plus end offset
+        self._windows_first_rows = array( 'Q' )      ## index of the first row of every window
+        self._window = []
+        self._window_index = -1
+        self._pulled_count = 0
+        self._row_number = 0
+        self._exhausted = False
+
+
+#=============================================================================
+def _owned(row: Sequence) -> Sequence:
+    '''Returns a row with its memoryviews copied into bytes, or the row itself if it has none.
+    '''
+    for value in row:
+        if isinstance( value, memoryview ):
+            return tuple( v.tobytes() if isinstance(v, memoryview) else v for v in row )
+    return row
+
+
+#=====   end of   Libs.ObjectSqlLib.streaming_cursor   =====#
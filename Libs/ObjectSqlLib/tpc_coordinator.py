@@ -0,0 +1,390 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the coordinators of two-phase commits.
+#
+# A coordinator drives a global transaction over N branches, i.e. N TPC
+# connections. Both phases of the commit run on all branches in parallel
+# so that the commit latency tracks the slowest branch rather than the
+# sum of all branches.  Commit decisions are written to an append-only
+# decision log before the second phase starts, with fsyncs batched over
+# concurrent transactions, so that in-doubt transactions can be finished
+# by '.recover()' after a crash.  Transactions with no logged decision
+# are presumed aborted.
+#
+
+#=============================================================================
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading          import Condition
+from typing             import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .               import OperationalError, ProgrammingError, TPCConnection
+from .tpc_connection import XID
+
+
+#=============================================================================
+class TPCDecisionLog:
+    """The class of append-only logs of two-phase commits decisions.
+    
+    Every record is a JSON line.  '.append()' returns once its record
+    is durably written.  Records appended concurrently by many threads
+    are written and fsync'ed together (group commit): the first waiting
+    thread flushes the records of all the others.  When the write of a
+    group fails, its error is raised in every thread of the group.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, path: str) -> None:
+        '''Constructor.
+        
+        Args:
+            path: str
+                The path to the log file. It is created if it does not
+                exist yet, otherwise records are appended to it.
+        '''
+        self.path = path
+        self._file = open( path, 'a', encoding='utf-8' )
+        self._condition = Condition()
+        self._pending: List[str] = []
+        self._next_seq = 1
+        self._settled_seq = 0   ## the last seq which write either succeeded or failed
+        self._errors: Dict[int, BaseException] = {}   ## the errors of the failed writes, by seq
+        self._torn = False      ## True if the last write failed, maybe leaving a partial line
+        self._flushing = False
+        self.fsyncs_count = 0
+
+    #-------------------------------------------------------------------------
+    def append(self, record: Dict) -> None:
+        '''Appends a record to this log and waits until it is durably written.
+        
+        Args:
+            record: Dict
+                The record, which must be JSON serializable.
+        
+        Raises:
+            OSError: the write of the group of the record failed.  The
+                record may not be durable.
+        '''
+        line = json.dumps( record ) + '\n'
+        with self._condition:
+            self._pending.append( line )
+            seq = self._next_seq
+            self._next_seq += 1
+            
+            while self._settled_seq < seq:
+                if self._flushing:
+                    self._condition.wait()
+                    continue
+                
+                self._flushing = True
+                lines, self._pending = self._pending, []
+                first_seq = self._settled_seq + 1
+                flushed_seq = self._next_seq - 1
+                if self._torn:
+                    lines.insert( 0, '\n' )   ## isolates the partial line of the failed write
+                self._condition.release()
+                error = None
+                try:
+                    self._file.write( ''.join(lines) )
+                    self._file.flush()
+                    os.fsync( self._file.fileno() )
+                except BaseException as e:
+                    error = e
+                finally:
+                    self._condition.acquire()
+                    self._flushing = False
+                    self._condition.notify_all()
+                self._settled_seq = flushed_seq
+                self._torn = error is not None
+                if error is None:
+                    self.fsyncs_count += 1
+                else:
+                    for failed_seq in range( first_seq, flushed_seq + 1 ):
+                        if failed_seq != seq:
+                            self._errors[ failed_seq ] = error
+                    raise error
+            
+            error = self._errors.pop( seq, None )
+            if error is not None:
+                raise error
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes this log.
+        '''
+        self._file.close()
+
+    #-------------------------------------------------------------------------
+    def decisions(self) -> Dict[Tuple[int, str], str]:
+        '''Returns the decisions of the transactions that are not done yet.
+        
+        Returns:
+            A dictionary which keys are pairs (format id, hexadecimal
+            global transaction id) and which values are 'commit'.
+        '''
+        decisions = {}
+        with open( self.path, 'r', encoding='utf-8' ) as log_file:
+            for line in log_file:
+                try:
+                    record = json.loads( line )
+                except ValueError:
+                    continue  ## a torn last line: its transaction is not durably decided
+                key = (record['format_id'], record['gtrid'])
+                if record['decision'] == 'done':
+                    decisions.pop( key, None )
+                else:
+                    decisions[ key ] = record['decision']
+        return decisions
+
+
+#=============================================================================
+class TPCCoordinator:
+    """The class of coordinators of two-phase commits over many branches.
+    
+    Usage:
+        coordinator = TPCCoordinator( [cnx_1, cnx_2, cnx_3], 'tpc.log' )
+        coordinator.begin( b'my transaction id' )
+        ... work on cnx_1, cnx_2 and cnx_3 ...
+        coordinator.commit()
+        ...
+        coordinator.close()
+    
+    After a crash,  a new coordinator over the same branches  and  the
+    same decision log calls '.recover()' to finish in-doubt transactions.
+    This must be done at startup,  before its first transaction,  while
+    no other coordinator runs transactions with the same format id on
+    these branches:  recovery rolls back all the prepared transactions
+    without logged decision, including the ones still being committed.
+    Coordinators which run concurrently must then use distinct format
+    ids.
+    
+    Notice: every branch connection is used by one thread at a time,
+    but not always by the same thread.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, branches : Sequence[TPCConnection],
+                       log_path : str,
+                       format_id: int = 0,
+                       max_workers: Optional[int] = None) -> None:
+        '''Constructor.
+        
+        Args:
+            branches: Sequence[TPCConnection]
+                The connections of the branches of the global transac-
+                tions, in a stable order: the branch qualifier of each
+                connection is its index in this sequence.
+            log_path: str
+                The path to the decision log file.
+            format_id: int
+                The format id of the transaction ids. Defaults to 0.
+            max_workers: int
+                The count of threads that run the branches in parallel.
+                May be None for one thread per branch. Defaults to None.
+        '''
+        assert len( branches ) > 0
+        self.branches = list( branches )
+        self.format_id = format_id
+        self.log = TPCDecisionLog( log_path )
+        self._executor = ThreadPoolExecutor( max_workers or len(self.branches),
+                                             thread_name_prefix='tpc-branch' )
+        self._gtrid = None
+        self._started = False   ## True once a global transaction has begun
+
+    #-------------------------------------------------------------------------
+    def __enter__(self) -> 'TPCCoordinator':
+        return self
+
+    #-------------------------------------------------------------------------
+    def __exit__(self, *_args) -> None:
+        self.close()
+
+    #-------------------------------------------------------------------------
+    def begin(self, global_transaction_id: bytes) -> None:
+        '''Begins a global transaction on every branch.
+        
+        Args:
+            global_transaction_id: bytes
+                The global transaction id, no longer than 64 bytes.
+        
+        Raises:
+            ProgrammingError: a global transaction is already pending.
+        '''
+        if self._gtrid is not None:
+            raise ProgrammingError( "a global TPC transaction is already pending" )
+        for index, branch in enumerate( self.branches ):
+            branch.tpc_begin( self._xid(branch, global_transaction_id, index) )
+        self._gtrid = global_transaction_id
+        self._started = True
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Stops the threads of this coordinator and closes its decision log.
+        
+        Branch connections are left open.
+        '''
+        self._executor.shutdown()
+        self.log.close()
+
+    #-------------------------------------------------------------------------
+    def commit(self) -> None:
+        '''Commits the pending global transaction.
+        
+        Phase 1 prepares all branches in parallel.  If any branch fails
+        to prepare, all branches are rolled back and the error is raised.
+        Otherwise the commit decision is durably logged and  phase  2
+        commits all branches in parallel.  If the decision fails to be
+        logged, all branches are rolled back and the error is raised.
+        
+        Raises:
+            ProgrammingError: no global transaction is pending.
+            DatabaseError: a branch failed to prepare, the global trans-
+                action has been rolled back.
+            OSError: the decision failed to be logged,  the global trans-
+                action has been rolled back.
+            OperationalError: some branches failed to commit after the
+                commit decision was logged. The transaction is commit-
+                ted and these branches are in doubt until '.recover()'
+                completes them.
+        '''
+        gtrid = self._pending_gtrid()
+        
+        errors = self._run_on_branches( lambda branch: branch.tpc_prepare() )
+        if errors:
+            self._run_on_branches( lambda branch: branch.tpc_rollback() )
+            self._gtrid = None
+            raise errors[0][1]
+        
+        try:
+            self.log.append( self._record(gtrid, 'commit') )
+        except BaseException:
+            self._run_on_branches( lambda branch: branch.tpc_rollback() )
+            raise
+        finally:
+            self._gtrid = None
+        
+        errors = self._run_on_branches( lambda branch: branch.tpc_commit() )
+        if errors:
+            raise OperationalError( f"global transaction {gtrid.hex()} is committed but branches "
+                                    f"{[index for index, _ in errors]} are in doubt: {errors[0][1]}" )
+        self.log.append( self._record(gtrid, 'done') )
+
+    #-------------------------------------------------------------------------
+    def recover(self) -> List[XID]:
+        '''Finishes the in-doubt transactions of all branches.
+        
+        Prepared branches of transactions which commit decision has been
+        logged are committed.  The other ones are rolled back (presumed
+        abort). Only transaction ids with the format id of this coordin-
+        ator are considered.
+        
+        This is a startup procedure (see class TPCCoordinator): no other
+        coordinator may run transactions with this format id on these
+        branches meanwhile.
+        
+        Returns:
+            The list of the transaction ids that have been finished.
+        
+        Raises:
+            ProgrammingError: this coordinator has already begun a global
+                transaction.
+        '''
+        if self._started:
+            raise ProgrammingError( "TPC recovery must run before the first global transaction of the coordinator" )
+        decisions = self.log.decisions()
+        finished = []
+        committed_gtrids = set()
+        
+        for branch in self.branches:
+            for xid in branch.tpc_recover():
+                if xid[0] != self.format_id:
+                    continue
+                key = (xid[0], xid[1].hex())
+                if decisions.get( key ) == 'commit':
+                    branch.tpc_commit( xid )
+                    committed_gtrids.add( xid[1] )
+                else:
+                    branch.tpc_rollback( xid )
+                finished.append( xid )
+        
+        for gtrid_hex in { key[1] for key in decisions }:
+            self.log.append( self._record(bytes.fromhex(gtrid_hex), 'done') )
+        return finished
+
+    #-------------------------------------------------------------------------
+    def rollback(self) -> None:
+        '''Rolls back the pending global transaction on all branches in parallel.
+        
+        Raises:
+            ProgrammingError: no global transaction is pending.
+            DatabaseError: some branch failed to roll back.
+        '''
+        self._pending_gtrid()
+        self._gtrid = None
+        errors = self._run_on_branches( lambda branch: branch.tpc_rollback() )
+        if errors:
+            raise errors[0][1]
+
+    #-------------------------------------------------------------------------
+    def _pending_gtrid(self) -> bytes:
+        '''Returns the id of the pending global transaction.
+        '''
+        if self._gtrid is None:
+            raise ProgrammingError( "no global TPC transaction is pending" )
+        return self._gtrid
+
+    #-------------------------------------------------------------------------
+    def _record(self, gtrid: bytes, decision: str) -> Dict:
+        '''Returns a record of the decision log.
+        '''
+        return { 'format_id': self.format_id,
+                 'gtrid'    : gtrid.hex(),
+                 'branches' : len( self.branches ),
+                 'decision' : decision }
+
+    #-------------------------------------------------------------------------
+    def _run_on_branches(self, action: Callable[[TPCConnection], None]) -> List[Tuple[int, Exception]]:
+        '''Runs an action on all branches in parallel.
+        
+        Returns:
+            The list of pairs (branch index, raised exception) of the
+            branches on which the action failed.
+        '''
+        futures = [ self._executor.submit(action, branch) for branch in self.branches ]
+        errors = []
+        for index, future in enumerate( futures ):
+            error = future.exception()
+            if error is not None:
+                errors.append( (index, error) )
+        return errors
+
+    #-------------------------------------------------------------------------
+    def _xid(self, branch: TPCConnection, gtrid: bytes, index: int) -> XID:
+        '''Returns the transaction id of a branch.
+        '''
+        return branch.xid( self.format_id, gtrid, str(index).encode() )
+
+
+#=====   end of   Libs.ObjectSqlLib.tpc_coordinator   =====#
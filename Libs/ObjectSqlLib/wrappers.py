@@ -0,0 +1,275 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the base classes of wrapping connections and cursors.
+#
+# Wrappers are concrete Connection and Cursor classes that delegate every
+# PEP 249 method to a connection or a cursor of a concrete driver.  They
+# are the base classes of the extensions of this library that add some
+# behaviour on top of any driver (caching,  instrumentation,  etc.)  by
+# overwriting the sole methods they are interested in.  Wrappers may be
+# stacked.
+#
+
+#=============================================================================
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .                import Connection, Cursor
+from .batching        import BatchReport
+from .memory_budget   import MemoryBudget
+from .statement_batch import Statement
+
+
+#=============================================================================
+class ConnectionWrapper( Connection ):
+    """The base class of connections that wrap a connection of a concrete driver.
+    
+    Cursors created by wrapping connections are created by the wrapped
+    connection and then wrapped with method '._wrap_cursor()',  which
+    should be overwritten in inheriting classes.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, connection: Connection) -> None:
+        '''Constructor.
+        
+        Args:
+            connection: Connection
+                A reference to the wrapped connection.
+        '''
+        self._wrapped = connection
+
+    #-------------------------------------------------------------------------
+    @property
+    def memory_budget(self) -> MemoryBudget:
+        return self._wrapped.memory_budget
+    
+    @memory_budget.setter
+    def memory_budget(self, budget: MemoryBudget) -> None:
+        self._wrapped.memory_budget = budget
+
+    #-------------------------------------------------------------------------
+    @property
+    def wrapped(self) -> Connection:
+        '''The wrapped connection.
+        '''
+        return self._wrapped
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes the wrapped connection.
+        '''
+        if self._wrapped is not None:
+            self._wrapped.close()
+            self._wrapped = None
+
+    #-------------------------------------------------------------------------
+    def commit(self) -> None:
+        self._wrapped.commit()
+
+    #-------------------------------------------------------------------------
+    def cursor(self) -> Cursor:
+        '''Returns a new cursor of the wrapped connection, wrapped with '._wrap_cursor()'.
+        '''
+        return self._wrap_cursor( self._wrapped.cursor() )
+
+    #-------------------------------------------------------------------------
+    def rollback(self) -> None:
+        self._wrapped.rollback()
+
+    #-------------------------------------------------------------------------
+    def _cancel(self) -> None:
+        self._wrapped._cancel()
+
+    #-------------------------------------------------------------------------
+    def _wrap_cursor(self, cursor: Cursor) -> Cursor:
+        '''Wraps a cursor of the wrapped connection.
+        
+        Returns a CursorWrapper in this base class.
+        '''
+        return CursorWrapper( self, cursor )
+
+
+#=============================================================================
+class CursorWrapper( Cursor ):
+    """The base class of cursors that wrap a cursor of a concrete driver.
+    
+    Every method is delegated to the wrapped cursor, named the source
+    cursor  here.  The  rowcount  and  last row id of the source cursor
+    are copied after each execution.  Wrappers share the list of messages
+    of their source cursor.  Iterations fetch their rows with '.fetchone()'
+    of the wrapper, so that they share the position of its '.fetch*()'
+    methods. Use '.prefetched()' to iterate with prefetched batches.
+    """
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, parent_connection: Connection, source: Cursor) -> None:
+        '''Constructor.
+        
+        Args:
+            parent_connection: Connection
+                A reference to the wrapping connection of this cursor.
+            source: Cursor
+                A reference to the wrapped cursor.
+        '''
+        super().__init__( parent_connection )
+        self._source = source
+        self._messages = source._messages
+
+    #-------------------------------------------------------------------------
+    def __iter__(self) -> 'CursorWrapper':
+        return self
+
+    #-------------------------------------------------------------------------
+    def __next__(self) -> Tuple:
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    #-------------------------------------------------------------------------
+    @property
+    def buffered_bytes(self) -> int:
+        return self._source.buffered_bytes
+
+    #-------------------------------------------------------------------------
+    @property
+    def description(self) -> Optional[Tuple]:
+        return self._source.description
+
+    #-------------------------------------------------------------------------
+    @property
+    def lazy_rows(self) -> bool:
+        return self._source.lazy_rows
+    
+    @lazy_rows.setter
+    def lazy_rows(self, lazy: bool) -> None:
+        self._source.lazy_rows = lazy
+
+    #-------------------------------------------------------------------------
+    @property
+    def rownumber(self) -> int:
+        return self._source.rownumber
+
+    #-------------------------------------------------------------------------
+    @property
+    def source(self) -> Cursor:
+        '''The wrapped cursor.
+        '''
+        return self._source
+
+    #-------------------------------------------------------------------------
+    def callproc(self, proc_name: str, *parameters) -> Optional:
+        self._stop_prefetch()
+        result = self._source.callproc( proc_name, *parameters )
+        self._copy_counts()
+        return result
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes the source cursor.
+        '''
+        self._stop_prefetch()
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+    #-------------------------------------------------------------------------
+    def execute(self, operation: str, *parameters) -> Optional:
+        self._stop_prefetch()
+        result = self._source.execute( operation, *parameters )
+        self._copy_counts()
+        return result
+
+    #-------------------------------------------------------------------------
+    def execute_batch(self, statements: Iterable[Statement]) -> None:
+        self._stop_prefetch()
+        self._source.execute_batch( statements )
+        self._copy_counts()
+
+    #-------------------------------------------------------------------------
+    def executemany(self, operation: str, seq_of_parameters: tuple) -> Optional:
+        self._stop_prefetch()
+        result = self._source.executemany( operation, seq_of_parameters )
+        self._copy_counts()
+        return result
+
+    #-------------------------------------------------------------------------
+    def fetchall(self) -> List[Tuple]:
+        return self._source.fetchall()
+
+    #-------------------------------------------------------------------------
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        return self._source.fetchmany( self._array_size if size is None else size )
+
+    #-------------------------------------------------------------------------
+    def fetchone(self) -> Optional[Tuple]:
+        return self._source.fetchone()
+
+    #-------------------------------------------------------------------------
+    def next(self) -> Tuple:
+        '''Returns the next row of the current result set.
+        
+        Raises:
+            StopIteration: the result set is exhausted.
+        '''
+        return self.__next__()
+
+    #-------------------------------------------------------------------------
+    def nextset(self) -> Optional[bool]:
+        self._stop_prefetch()
+        result = self._source.nextset()
+        self._copy_counts()
+        return result
+
+    #-------------------------------------------------------------------------
+    def scroll(self, value: int, mode: Optional[str] = 'relative') -> None:
+        return self._source.scroll( value, mode )
+
+    #-------------------------------------------------------------------------
+    def setinputsizes(self, sizes: tuple) -> None:
+        self._source.setinputsizes( sizes )
+
+    #-------------------------------------------------------------------------
+    def setoutputsize(self, size: int, column_index: Optional[int] = None) -> None:
+        self._source.setoutputsize( size, column_index )
+
+    #-------------------------------------------------------------------------
+    def _copy_counts(self) -> None:
+        '''Copies the rowcount and the last row id of the source cursor after an execution.
+        '''
+        self._row_count = self._source._row_count
+        self._last_row_id = self._source._last_row_id
+
+    #-------------------------------------------------------------------------
+    def _copy_from_native(self, table  : str,
+                                columns: Optional[Sequence[str]],
+                                buffers: Iterator[str],
+                                dialect: object,
+                                null   : str) -> Optional[BatchReport]:
+        report = self._source._copy_from_native( table, columns, buffers, dialect, null )
+        self._copy_counts()
+        return report
+
+
+#=====   end of   Libs.ObjectSqlLib.wrappers   =====#
@@ -0,0 +1,122 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This script compares the rows of a wide result set decoded into tuples
+#  as they are received with the same rows buffered as lazy rows,  whose
+#  columns are decoded on their first access only.
+#
+#  The DataRow messages of the result set are built in memory, so that
+#  only the decoding and the buffering of rows are measured.  Memory is
+#  the size of the buffered rows, as traced by tracemalloc in a separate
+#  run since tracing slows allocations down.
+#
+
+#=============================================================================
+import datetime
+import tracemalloc
+from time   import perf_counter
+from typing import Callable, List, Tuple
+
+from Libs.ObjectSqlLib.lazy_rows      import lazy_row_class
+from SubProjects.PostgreSQL           import pg_protocol as pgp
+from SubProjects.PostgreSQL.pg_cursor import PGLazyRow
+
+
+#=============================================================================
+ROWS_COUNT = 50_000
+COLUMNS_OIDS = [ pgp.INT8_OID, pgp.TEXT_OID, pgp.FLOAT8_OID, pgp.TIMESTAMP_OID, pgp.BOOL_OID ] * 4
+
+
+#=============================================================================
+def data_rows() -> List[memoryview]:
+    '''Returns the bodies of the DataRow messages of the benchmarked result set.
+    '''
+    values = { pgp.INT8_OID     : 123_456_789,
+               pgp.TEXT_OID     : 'Marianne Vos - Rabo-Liv Women Cycling Team',
+               pgp.FLOAT8_OID   : 98.5,
+               pgp.TIMESTAMP_OID: datetime.datetime(2020, 7, 14, 12, 30),
+               pgp.BOOL_OID     : True }
+    parts = [ len(COLUMNS_OIDS).to_bytes(2, 'big') ]
+    for oid in COLUMNS_OIDS:
+        data = pgp.ENCODERS[ oid ]( values[oid] )
+        parts += [ len(data).to_bytes(4, 'big'), data ]
+    body = b''.join( parts )
+    return [ memoryview(bytearray(body)) for _ in range(ROWS_COUNT) ]
+
+#-------------------------------------------------------------------------
+def tuples_case(bodies: List[memoryview]) -> list:
+    decoders = [ pgp.DECODERS[oid] for oid in COLUMNS_OIDS ]
+    return [ pgp.parse_data_row(body, decoders) for body in bodies ]
+
+def lazy_rows_case(bodies: List[memoryview]) -> list:
+    row_class = lazy_row_class( tuple(f'c{i}' for i in range(len(COLUMNS_OIDS))),
+                                tuple(pgp.DECODERS[oid] for oid in COLUMNS_OIDS),
+                                PGLazyRow )
+    return [ row_class(bytes(body)) for body in bodies ]
+
+#-------------------------------------------------------------------------
+def read_two_columns(rows: list) -> None:
+    for row in rows:
+        row[0], row[1]
+
+def read_all_columns(rows: list) -> None:
+    for row in rows:
+        tuple( row )
+
+#-------------------------------------------------------------------------
+def measure(case: Callable, read: Callable, bodies: List[memoryview]) -> Tuple[float, float]:
+    '''Returns the duration in seconds of the fetching and the reading of rows, and the size in MB of the rows.
+    '''
+    start = perf_counter()
+    read( case(bodies) )
+    duration_s = perf_counter() - start
+    
+    tracemalloc.start()
+    rows = case( bodies )
+    read( rows )
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return duration_s, size / 1e6
+
+
+#=============================================================================
+if __name__ == '__main__':
+    """Script description.
+    """
+    #-------------------------------------------------------------------------
+    bodies = data_rows()
+    print( f"{ROWS_COUNT} rows of {len(COLUMNS_OIDS)} columns\n" )
+    print( "case            read           duration ms        rows/s   memory MB" )
+    for name, case in ( ('tuples'   , tuples_case   ),
+                        ('lazy rows', lazy_rows_case) ):
+        for read_name, read in ( ('2 columns'  , read_two_columns),
+                                 ('all columns', read_all_columns) ):
+            case( bodies[:100] )  ## warms up the cache of lazy row classes
+            duration_s, size_mb = measure( case, read, bodies )
+            print( f"{name:15s} {read_name:14s} {duration_s * 1e3:11.1f} {ROWS_COUNT / duration_s:13,.0f} {size_mb:11.1f}" )
+    
+    print( '\n-- done!' )
+
+
+#=====   end of   SubProjects.PostgreSQL._benchmarks.bench_lazy_rows   =====#
@@ -0,0 +1,483 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+import csv
+import decimal
+import io
+import mmap
+import struct
+import time
+from array import array
+
+import pytest
+
+from Libs.ObjectSqlLib import (BINARY, Binary, ConverterRegistry, ConvertingConnection, InstrumentedConnection,
+                               IntegrityError, MemoryBudget, NUMBER, OperationalError, ProgrammingError, RoutingConnection,
+                               STRING, StreamingCursor, TimeoutConnection, TPCCoordinator, TPCDecisionLog)
+from SubProjects.PostgreSQL import FakePGServer, PGConnection
+from SubProjects.PostgreSQL.pg_protocol import DECODERS, NUMERIC_OID, UUID_OID
+
+
+#=============================================================================
+class Semicolon( csv.excel ):
+    delimiter = ';'
+
+
+#-------------------------------------------------------------------------
+def _failing_rows():
+    yield (1, 'a', 'b')
+    raise ValueError( "broken input" )
+
+
+#-------------------------------------------------------------------------
+@pytest.fixture
+def server():
+    with FakePGServer() as server:
+        yield server
+
+
+#=============================================================================
+def test_types_and_description(server):
+    cnx = PGConnection( server.dsn )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE riders (id INTEGER, name TEXT, score REAL, photo BLOB)" )
+    cursor.execute( "INSERT INTO riders VALUES (%s, %s, %s, %s)", (1, 'Marianne', 98.5, b'\x00\xff') )
+    assert cursor.rowcount == 1 and cursor.description is None
+    cursor.execute( "INSERT INTO riders VALUES (%s, %s, %s, NULL)", (2, "Lotte's", 97.0) )
+    
+    cursor.execute( "SELECT id, name, score, photo FROM riders WHERE name LIKE '%%e%%' ORDER BY id" )
+    assert [ (d[0], d[1]) for d in cursor.description ] == [ ('id', NUMBER), ('name', STRING),
+                                                              ('score', NUMBER), ('photo', BINARY) ]
+    assert cursor.rowcount == 2
+    assert cursor.fetchone() == (1, 'Marianne', 98.5, b'\x00\xff')
+    cursor.scroll( -1 )
+    assert [ row[0] for row in cursor ] == [ 1, 2 ]
+    assert cursor.fetchone() is None and cursor.rownumber == 2
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_pipelining(server):
+    cnx = PGConnection( server.dsn )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE results (rank INTEGER, bib INTEGER)" )
+    cnx.commit()
+    
+    server.latency_s = 0.02
+    round_trips = cnx.round_trips
+    start = time.perf_counter()
+    cursor.executemany( "INSERT INTO results VALUES (%s, %s)", [(i, 100 + i) for i in range(50)] )
+    assert time.perf_counter() - start < 10 * server.latency_s
+    assert cnx.round_trips == round_trips + 1 and cursor.rowcount == 50
+    
+    cursor.PIPELINE_DEPTH = 20
+    cursor.executemany( "INSERT INTO results VALUES (%s, %s)", [(i, 200 + i) for i in range(50)] )
+    assert cnx.round_trips == round_trips + 4 and cursor.rowcount == 50
+    server.latency_s = 0.0
+    
+    cursor.execute( "SELECT COUNT(*) FROM results" )
+    assert cursor.fetchall() == [ (100,) ]
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_execute_batch(server):
+    cnx = PGConnection( server.dsn )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE results (rank INTEGER, bib INTEGER)" )
+    cursor.executemany( "INSERT INTO results VALUES (%s, %s)", [(i, 100 + i) for i in range(10)] )
+    cnx.commit()
+    
+    batch = [ ("SELECT bib FROM results WHERE rank < %s ORDER BY rank", (i,)) for i in range(18) ]
+    batch[ 1:1 ] = [ ("UPDATE results SET bib = bib + 1 WHERE rank < %s", (5,)),
+                     ("SELECT COUNT(*) FROM results", None) ]
+    server.latency_s = 0.02
+    round_trips = cnx.round_trips
+    start = time.perf_counter()
+    cursor.execute_batch( batch )
+    assert time.perf_counter() - start < 10 * server.latency_s
+    assert cnx.round_trips == round_trips + 1
+    server.latency_s = 0.0
+    
+    assert cursor.fetchall() == []
+    assert cursor.nextset() and cursor.description is None and cursor.rowcount == 5
+    assert cursor.nextset() and cursor.fetchone() == (10,)
+    for i in range(1, 18):
+        assert cursor.nextset() is True
+        assert cursor.rowcount == min( i, 10 )
+        assert [ row[0] for row in cursor.fetchall() ] == [ 101 + r if r < 5 else 100 + r for r in range(min(i, 10)) ]
+    assert cursor.nextset() is None
+    
+    with pytest.raises( ProgrammingError ):
+        cursor.execute_batch( [("SELECT 1", None), ("SELECT * FROM unknown_table", None)] )
+    cnx.rollback()
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_lazy_rows(server):
+    cnx = PGConnection( server.dsn )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE riders (id INTEGER, name TEXT, score REAL, photo BLOB)" )
+    cursor.executemany( "INSERT INTO riders VALUES (%s, %s, %s, %s)", [(1, 'Marianne', 98.5, None),
+                                                                       (2, "Lotte's", 97.0, b'\x01')] )
+    cursor.lazy_rows = True
+    cursor.execute( "SELECT id, name, score, photo FROM riders ORDER BY id" )
+    row = cursor.fetchone()
+    assert not hasattr( row, '_v1' )
+    assert row.name == 'Marianne' and row['score'] == 98.5 and row[-1] is None
+    assert hasattr( row, '_v1' ) and not hasattr( row, '_v0' )
+    assert row == (1, 'Marianne', 98.5, None) and row.keys() == [ 'id', 'name', 'score', 'photo' ]
+    assert cursor.fetchall() == [ (2, "Lotte's", 97.0, b'\x01') ]
+    
+    cursor.execute_batch( [("SELECT name FROM riders WHERE id = %s", (2,))] )
+    assert cursor.fetchone().name == "Lotte's"
+    cursor.lazy_rows = False
+    cursor.execute( "SELECT id FROM riders ORDER BY id" )
+    assert type( cursor.fetchone() ) is tuple
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_converted_rows(server):
+    registry = ConverterRegistry()
+    registry.register( NUMBER, decimal.Decimal )
+    cnx = ConvertingConnection( PGConnection(server.dsn), registry )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE riders (id INTEGER, name TEXT)" )
+    cursor.executemany( "INSERT INTO riders VALUES (%s, %s)", [(1, 'Marianne'), (None, 'Lotte')] )
+    cursor.execute( "SELECT id, name FROM riders ORDER BY name" )
+    assert cursor.fetchone() == ( None, 'Lotte' )
+    row = cursor.fetchall()[0]
+    assert row == ( 1, 'Marianne' ) and type( row[0] ) is decimal.Decimal
+    cursor.execute( "SELECT name FROM riders WHERE id = %s", (1,) )
+    assert cursor.fetchmany( 2 ) == [ ('Marianne',) ]
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_binary_values(server, tmp_path):
+    cnx = PGConnection( server.dsn )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE photos (id INTEGER, data BLOB)" )
+    large = bytearray( range(256) ) * 256
+    path = tmp_path / 'photo.bin'
+    path.write_bytes( b'\x89PNG' * 1000 )
+    with open( path, 'rb' ) as file, mmap.mmap( file.fileno(), 0, access=mmap.ACCESS_READ ) as mapped:
+        cursor.executemany( "INSERT INTO photos VALUES (%s, %s)",
+                            [(1, Binary(b'\x00\xff')), (2, large), (3, mapped), (4, array('H', [1, 2]))] )
+    
+    cursor.execute( "SELECT data FROM photos ORDER BY id" )
+    values = [ row[0] for row in cursor.fetchall() ]
+    assert all( type(v) is memoryview and v.readonly for v in values )
+    assert [ v.tobytes() for v in values ] == [ b'\x00\xff', bytes(large), b'\x89PNG' * 1000, array('H', [1, 2]).tobytes() ]
+    cursor.lazy_rows = True
+    cursor.execute( "SELECT data FROM photos WHERE id = %s", (1,) )
+    assert cursor.fetchone().data == b'\x00\xff'
+    
+    ## streaming cursors spool the values of binary columns as bytes
+    cursor.lazy_rows = False
+    streaming = StreamingCursor( cursor, window_size=2 )
+    streaming.execute( "SELECT id, data FROM photos ORDER BY id" )
+    assert [ row[0] for row in streaming.fetchall() ] == [ 1, 2, 3, 4 ]
+    streaming.scroll( 0, 'absolute' )
+    assert streaming.fetchone() == (1, b'\x00\xff')
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_types_without_binary_decoder(server):
+    server.column_types[ 'token' ] = UUID_OID
+    cnx = PGConnection( server.dsn )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE sessions (id INTEGER, token TEXT, data BLOB, score REAL)" )
+    token = '6f1c2e0a-4b7d-4c1e-9a55-0d3c2b1a0f9e'
+    cursor.execute( "INSERT INTO sessions VALUES (%s, %s, %s, %s)", (1, token, Binary(b'\x00\xff'), 0.5) )
+    
+    ## text format for all columns first, then binary format but for the uuid column
+    for _ in range( 2 ):
+        cursor.execute( "SELECT id, token, data, score FROM sessions" )
+        (id_, value, data, score), = cursor.fetchall()
+        assert (id_, value, data.tobytes(), score) == (1, token, b'\x00\xff', 0.5) and type( data ) is memoryview
+    assert cursor._prepared( "SELECT id, token, data, score FROM sessions" ).result_format == ( 1, 0, 1, 1 )
+    
+    cursor.lazy_rows = True
+    cursor.execute( "SELECT id, token, data, score FROM sessions" )
+    assert cursor.fetchone().token == token
+    cursor.lazy_rows = False
+    cursor.execute_batch( [("SELECT token FROM sessions WHERE id = %s", (1,))] * 2 )
+    assert cursor.fetchall() == [ (token,) ]
+    assert cursor.nextset() and cursor.fetchall() == [ (token,) ]
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def _numeric(sign: int, weight: int, dscale: int, *digits: int) -> memoryview:
+    '''Returns a NUMERIC value in binary format.
+    '''
+    return memoryview( struct.pack(f'>hhHh{len(digits)}H', len(digits), weight, sign, dscale, *digits) )
+
+
+#-------------------------------------------------------------------------
+def test_numeric_values():
+    decode = DECODERS[ NUMERIC_OID ]
+    assert str( decode(_numeric(0x0000, 0, 2, 12, 3400)) ) == '12.34'
+    assert str( decode(_numeric(0x4000, 1, 0, 1)) ) == '-10000'
+    assert str( decode(_numeric(0x0000, -1, 5, 1200)) ) == '0.12000'
+    assert str( decode(_numeric(0x0000, 0, 0)) ) == '0'
+    ## beyond the 28 digits of the default context of decimal
+    digits = [ 1234, 5678, 9012, 3456, 7890, 1234, 5678, 9012, 3456, 7890 ]
+    assert str( decode(_numeric(0x0000, 4, 20, *digits)) ) == '12345678901234567890.12345678901234567890'
+    assert decode( _numeric(0xD000, 0, 0) ) == decimal.Decimal( 'Infinity' )
+    assert decode( _numeric(0xF000, 0, 0) ) == decimal.Decimal( '-Infinity' )
+    assert decode( _numeric(0xC000, 0, 0) ).is_nan()
+
+
+#-------------------------------------------------------------------------
+def test_memory_budget(server):
+    cnx = PGConnection( server.dsn )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE samples (id INTEGER, value TEXT)" )
+    cursor.executemany( "INSERT INTO samples VALUES (%s, %s)", [(i, 'x' * 100) for i in range(5000)] )
+    cursor.execute( "SELECT id, value FROM samples" )   ## in text format: the columns are not known yet
+    cursor.execute( "SELECT id, value FROM samples" )
+    assert cursor.buffered_bytes == cnx.buffered_bytes == 590_000
+    
+    cnx.memory_budget = budget = MemoryBudget( 300_000 )
+    cursor.execute( "SELECT id, value FROM samples ORDER BY id" )
+    assert cursor.rowcount == -1 and 300_000 < budget.buffered_bytes < 400_000
+    ids = []
+    while True:
+        rows = cursor.fetchmany( 700 )
+        if not rows:
+            break
+        ids += [ row[0] for row in rows ]
+        assert budget.buffered_bytes < 400_000
+    assert ids == list( range(5000) ) and cursor.rowcount == 5000 and cursor.rownumber == 5000
+    
+    cursor.execute( "SELECT id, value FROM samples ORDER BY id" )
+    with pytest.raises( OperationalError, match="'.fetchall\\(\\)'" ):
+        cursor.fetchall()
+    cursor.execute( "SELECT id, value FROM samples ORDER BY id" )
+    cursor.fetchmany( 4000 )
+    assert len( cursor.fetchall() ) == 1000
+    cursor.execute( "SELECT id FROM samples" )
+    assert cursor.rowcount == 5000 and len( cursor.fetchall() ) == 5000
+    
+    budget.on_exceeded = 'raise'
+    with pytest.raises( OperationalError, match="memory budget of 300000 bytes" ):
+        cursor.execute( "SELECT id, value FROM samples" )
+    with pytest.raises( OperationalError ):
+        cursor.execute_batch( [("SELECT id, value FROM samples", None)] )
+    cursor.execute( "SELECT id, value FROM samples WHERE id < 1500" )
+    assert cursor.rowcount == 1500 and len( cursor.fetchall() ) == 1500
+    
+    ## the bytes of the rows are released with the rows
+    cursor.execute( "SELECT id, value FROM samples WHERE id < 1000" )
+    assert 0 < cursor.buffered_bytes == budget.buffered_bytes
+    with pytest.raises( ProgrammingError ):
+        cursor.execute( "SELECT * FROM no_such_table" )
+    assert cursor.description is None and cursor.buffered_bytes == budget.buffered_bytes == 0
+    cnx.rollback()
+    cursor.close()
+    assert budget.buffered_bytes == 0
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_copy_from(server):
+    cnx = PGConnection( server.dsn )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE results (rank INTEGER, name TEXT, team TEXT)" )
+    cnx.commit()
+    
+    round_trips = cnx.round_trips
+    text = 'rank;name;team\n1;"Vos; Marianne";\n' + ''.join( f"{i};rider {i};team {i % 7}\n" for i in range(2, 3001) )
+    report = cursor.copy_from( 'results', io.StringIO(text), header=True, dialect=Semicolon, buffer_size=1024 )
+    assert report.rows == 3000 and cursor.rowcount == 3000
+    assert cnx.round_trips == round_trips + 1
+    cnx.commit()
+    
+    with pytest.raises( ValueError ):
+        cursor.copy_from( 'results', _failing_rows() )
+    cnx.rollback()
+    
+    cursor.execute( "SELECT name, team FROM results WHERE rank = 1" )
+    assert cursor.fetchall() == [ ('Vos; Marianne', None) ]
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_transactions_and_errors(server):
+    cnx = PGConnection( server.dsn )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE teams (id INTEGER PRIMARY KEY, name TEXT)" )
+    cnx.commit()
+    
+    cursor.execute( "INSERT INTO teams VALUES (%s, %s)", (1, 'SD Worx') )
+    assert cnx.in_transaction
+    cnx.rollback()
+    assert not cnx.in_transaction
+    
+    cursor.execute( "INSERT INTO teams VALUES (%s, %s)", (1, 'Movistar') )
+    with pytest.raises( IntegrityError ):
+        cursor.execute( "INSERT INTO teams VALUES (%s, %s)", (1, 'Trek') )
+    with pytest.raises( OperationalError ):  ## the transaction is aborted
+        cursor.execute( "SELECT * FROM teams" )
+    cnx.rollback()
+    
+    with pytest.raises( ProgrammingError ):
+        cursor.execute( "SELECT * FROM no_such_table" )
+    cnx.rollback()
+    cursor.execute( "SELECT COUNT(*) FROM teams" )
+    assert cursor.fetchone() == (0,)
+    
+    ## failed executions drop the previous result set
+    cursor.executemany( "INSERT INTO teams VALUES (%s, %s)", [(i, f"team {i}") for i in range(5)] )
+    cursor.execute( "SELECT id FROM teams ORDER BY id" )
+    assert cursor.fetchone() == (0,)
+    with pytest.raises( ProgrammingError ):
+        cursor.execute( "SELECT * FROM no_such_table" )
+    assert cursor.description is None
+    with pytest.raises( ProgrammingError ):
+        cursor.fetchall()
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_routed_reads(server):
+    cnx = RoutingConnection( PGConnection(server.dsn), [PGConnection(server.dsn)], sticky_s=0.0 )
+    replica = cnx.replicas[0]
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE riders (id INTEGER)" )
+    cursor.executemany( "INSERT INTO riders VALUES (%s)", [(i,) for i in range(10)] )
+    cnx.commit()
+    
+    ## replicas are rolled back once their result sets are consumed
+    cursor.execute( "SELECT id FROM riders" )
+    other = cnx.cursor()
+    other.execute( "SELECT COUNT(*) FROM riders" )
+    assert cursor.node == other.node == 1 and replica.in_transaction
+    assert other.fetchall() == [ (10,) ]
+    assert replica.in_transaction
+    assert len( cursor.fetchall() ) == 10
+    assert not replica.in_transaction
+    
+    ## and on every commit or rollback
+    for end in (cnx.commit, cnx.rollback):
+        cursor.execute( "SELECT id FROM riders" )
+        assert replica.in_transaction
+        end()
+        assert not replica.in_transaction
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_instrumented_rowcounts(server):
+    cnx = InstrumentedConnection( PGConnection(server.dsn) )
+    cursor = cnx.cursor()
+    cursor.execute( "CREATE TABLE riders (id INTEGER)" )
+    cursor.executemany( "INSERT INTO riders VALUES (%s)", [(i,) for i in range(10)] )
+    cursor.execute( "UPDATE riders SET id = id + 1 WHERE id < %s", (3,) )
+    cursor.execute( "SELECT id FROM riders" )
+    assert cursor.rowcount == 10 and len( cursor.fetchall() ) == 10
+    
+    ## the rows of read-only operations are fetched, not affected
+    stats = cnx.instrumentation
+    assert stats.stats_for( "INSERT INTO riders VALUES (%s)" ).rows_affected == 10
+    assert stats.stats_for( "UPDATE riders SET id = id + 1 WHERE id < %s" ).rows_affected == 3
+    assert stats.stats_for( "SELECT id FROM riders" ).rows_affected == 0
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_statement_timeout(server):
+    cnx = TimeoutConnection( PGConnection(server.dsn), timeout_s=0.05 )
+    cursor = cnx.cursor()
+    with pytest.raises( OperationalError ) as error:
+        cursor.execute( "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c" )
+    assert error.value.__cause__.sqlstate == '57014'
+    assert cursor.messages[-1][0] is OperationalError
+    cnx.rollback()
+    
+    cursor.execute( "SELECT 1" )
+    assert cursor.fetchall() == [ (1,) ]
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_statements_eviction(server):
+    cnx = PGConnection( server.dsn )
+    cnx.STATEMENT_CACHE_SIZE = 2
+    cursor = cnx.cursor()
+    for _ in range( 3 ):
+        for i in range( 4 ):
+            cursor.execute( f"SELECT {i} + %s", (i,) )
+            assert cursor.fetchone() == (2 * i,)
+    assert cnx.statement_cache.evictions >= 10
+    cnx.close()
+
+
+#-------------------------------------------------------------------------
+def test_authentication():
+    with FakePGServer( password='secret' ) as server:
+        cnx = PGConnection( server.dsn, _password='secret' )
+        cnx.close()
+        with pytest.raises( OperationalError ):
+            PGConnection( server.dsn, _password='wrong' )
+
+
+#-------------------------------------------------------------------------
+def test_tpc_recovery(tmp_path):
+    with FakePGServer() as server_1, FakePGServer() as server_2:
+        for server in ( server_1, server_2 ):
+            setup = PGConnection( server.dsn )
+            setup.cursor().execute( "CREATE TABLE stages (id INTEGER)" )
+            setup.commit()
+            setup.close()
+        
+        ## the coordinator crashes right after having logged its commit decision
+        cnx_1, cnx_2 = PGConnection( server_1.dsn ), PGConnection( server_2.dsn )
+        for index, cnx in enumerate( (cnx_1, cnx_2) ):
+            cnx.tpc_begin( (0, b'stage 1', str(index).encode()) )
+            cnx.cursor().execute( "INSERT INTO stages VALUES (%s)", (1,) )
+            cnx.tpc_prepare()
+        log = TPCDecisionLog( str(tmp_path / 'tpc.log') )
+        log.append( {'format_id': 0, 'gtrid': b'stage 1'.hex(), 'branches': 2, 'decision': 'commit'} )
+        log.close()
+        cnx_1.close()
+        cnx_2.close()
+        
+        cnx_1, cnx_2 = PGConnection( server_1.dsn ), PGConnection( server_2.dsn )
+        assert cnx_1.tpc_recover() == [ (0, b'stage 1', b'0') ]
+        with TPCCoordinator( [cnx_1, cnx_2], str(tmp_path / 'tpc.log') ) as coordinator:
+            assert len( coordinator.recover() ) == 2
+        for cnx in ( cnx_1, cnx_2 ):
+            assert cnx.tpc_recover() == []
+            cursor = cnx.cursor()
+            cursor.execute( "SELECT id FROM stages" )
+            assert cursor.fetchall() == [ (1,) ]
+            cnx.close()
+
+
+#=====   end of   SubProjects.PostgreSQL._tests.test_pg_driver   =====#
@@ -0,0 +1,614 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines an in-process fake PostgreSQL server for tests.
+#
+#  It speaks the frontend/backend protocol version 3.0 on a local TCP
+#  port and runs the SQL statements it receives on an in-memory SQLite
+#  database shared by all its sessions.  SQL statements must then be
+#  valid SQLite ones.  Transactions, prepared transactions (TPC), the
+#  extended query protocol and pipelining behave as with a real server,
+#  and a simulated network latency is paid once per round-trip, i.e.
+#  once per Sync or simple Query message.
+#
+#  CancelRequests interrupt the statement running in their session.
+#  Executions limited to a count of rows suspend their portal.
+#  Parameters are expected in text format with unspecified types,  as
+#  sent by PGConnection,  but binary ones which are bytea.  Results are sent in binary format for types
+#  int8, float8, text and bytea, inferred from the SQLite values.
+#  Result formats are honoured per column, and the types of columns can
+#  be set by name (see FakePGServer.column_types).
+#
+
+#=============================================================================
+import csv
+import hashlib
+import io
+import os
+import re
+import socket
+import sqlite3
+import time
+import uuid
+from threading import Lock, Thread
+from typing    import Dict, List, Optional, Sequence, Tuple, Union
+
+from . import pg_protocol as pgp
+
+
+#=============================================================================
+class FakePGServer:
+    """The class of in-process fake PostgreSQL servers over SQLite.
+    
+    Usage:
+        with FakePGServer( latency_s=0.005 ) as server:
+            cnx = PGConnection( server.dsn )
+            ...
+    """
+    #-------------------------------------------------------------------------
+    def __init__(self, latency_s: float = 0.0, password: Optional[str] = None) -> None:
+        '''Constructor. Starts listening on a free local TCP port.
+        
+        Args:
+            latency_s: float
+                The simulated latency of every round-trip, in seconds.
+                Defaults to 0.0.
+            password: str
+                The password of every user, checked with md5 authenti-
+                cation. May be None for trust authentication. Defaults
+                to None.
+        '''
+        self.latency_s = latency_s
+        self.password = password
+        self.round_trips = 0
+        self.column_types: Dict[str, int] = {}  ## the type OIDs of columns by name, rather than inferred ones
+        
+        self._db_uri = f"file:fake_pg_{os.getpid()}_{id(self)}?mode=memory&cache=shared"
+        self._keeper = self.new_db()  ## keeps the in-memory database alive
+        self._prepared: Dict[str, sqlite3.Connection] = {}
+        self._lock = Lock()
+        self._sessions: List[socket.socket] = []
+        self._backends: Dict[int, Tuple[int, '_Session']] = {}  ## backend pid -> (secret key, session)
+        
+        self._listener = socket.create_server( ('127.0.0.1', 0) )
+        self.host, self.port = self._listener.getsockname()[:2]
+        self._thread = Thread( target=self._serve, name='fake-pg-server', daemon=True )
+        self._thread.start()
+
+    #-------------------------------------------------------------------------
+    def __enter__(self) -> 'FakePGServer':
+        return self
+
+    #-------------------------------------------------------------------------
+    def __exit__(self, *_args) -> None:
+        self.close()
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Stops this server and closes all its sessions.
+        '''
+        self._listener.close()
+        with self._lock:
+            for session_socket in self._sessions:
+                session_socket.close()
+            for db in self._prepared.values():
+                db.close()
+            self._prepared.clear()
+        self._keeper.close()
+
+    #-------------------------------------------------------------------------
+    @property
+    def dsn(self) -> str:
+        '''The connection string to this server.
+        '''
+        return f"host={self.host} port={self.port} user=tester dbname=fake"
+
+    #-------------------------------------------------------------------------
+    def new_db(self) -> sqlite3.Connection:
+        '''Returns a new connection to the SQLite database of this server.
+        '''
+        return sqlite3.connect( self._db_uri, uri=True, isolation_level=None, check_same_thread=False )
+
+    #-------------------------------------------------------------------------
+    def _serve(self) -> None:
+        '''Accepts connections until this server is closed.
+        '''
+        while True:
+            try:
+                session_socket, _ = self._listener.accept()
+            except OSError:
+                return
+            with self._lock:
+                self._sessions.append( session_socket )
+            Thread( target=_Session(self, session_socket).run, daemon=True ).start()
+
+
+#=============================================================================
+class _Session:
+    """The class of the sessions of fake servers, one per client connection.
+    """
+    #-------------------------------------------------------------------------
+    def __init__(self, server: FakePGServer, session_socket: socket.socket) -> None:
+        self.server = server
+        self.socket = session_socket
+        self.reader = pgp.MessageReader( session_socket )
+        self.db = server.new_db()
+        self.failed = False           # True once an error occurred in a transaction block
+        self.skip_until_sync = False  # True once an error occurred in an extended query
+        self.statements: Dict[str, str] = {}
+        self.portals: Dict[str, list] = {}
+        self.out: List[bytes] = []
+        self.backend_pid = None
+
+    #-------------------------------------------------------------------------
+    def run(self) -> None:
+        '''Serves the client until it terminates its connection.
+        '''
+        try:
+            if self._startup():
+                while self._dispatch( *self.reader.read_message() ):
+                    pass
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with self.server._lock:
+                self.server._backends.pop( self.backend_pid, None )
+            self.db.close()
+            self.socket.close()
+
+    #-------------------------------------------------------------------------
+    def _dispatch(self, msg_type: bytes, body: memoryview) -> bool:
+        '''Processes one frontend message. Returns False on termination.
+        '''
+        if msg_type == b'X':
+            return False
+        if msg_type == b'S':
+            self.skip_until_sync = False
+            self._ready()
+        elif msg_type == b'Q':
+            self._simple_query( bytes(body[:-1]).decode() )
+            self._ready()
+        elif msg_type == b'H':
+            self._flush()
+        elif not self.skip_until_sync:
+            try:
+                if msg_type == b'P':
+                    self._parse( bytes(body) )
+                elif msg_type == b'B':
+                    self._bind( bytes(body) )
+                elif msg_type == b'D':
+                    self._describe( bytes(body) )
+                elif msg_type == b'E':
+                    self._execute( bytes(body) )
+                elif msg_type == b'C':
+                    kind, name = bytes( body[:1] ), pgp.parse_strings( body[1:] )[0]
+                    (self.statements if kind == b'S' else self.portals).pop( name, None )
+                    self._send( b'3', b'' )
+            except _PGError as e:
+                self._error( e )
+                self.skip_until_sync = True
+        return True
+
+    #-------------------------------------------------------------------------
+    def _bind(self, body: bytes) -> None:
+        portal, statement = body.split( b'\0', 2 )[:2]
+        pos = len( portal ) + len( statement ) + 2
+        formats_count = int.from_bytes( body[pos:pos + 2], 'big' )
+        formats = [ int.from_bytes(body[p:p + 2], 'big') for p in range(pos + 2, pos + 2 + 2 * formats_count, 2) ]
+        pos += 2 + 2 * formats_count
+        params_count = int.from_bytes( body[pos:pos + 2], 'big' )
+        pos += 2
+        params = []
+        for i in range( params_count ):
+            length = int.from_bytes( body[pos:pos + 4], 'big', signed=True )
+            pos += 4
+            if length < 0:
+                params.append( None )
+            elif formats and formats[ i if len(formats) > 1 else 0 ] == pgp.BINARY_FORMAT:
+                params.append( body[pos:pos + length] )  ## binary parameters are bytea ones
+                pos += length
+            else:
+                params.append( _decode_param(body[pos:pos + length].decode()) )
+                pos += length
+        results_count = int.from_bytes( body[pos:pos + 2], 'big' )
+        result_formats = [ int.from_bytes(body[p:p + 2], 'big') for p in range(pos + 2, pos + 2 + 2 * results_count, 2) ]
+        
+        try:
+            query = self.statements[ statement.decode() ]
+        except KeyError:
+            raise _PGError( '26000', f'prepared statement "{statement.decode()}" does not exist' ) from None
+        if portal and portal.decode() in self.portals:
+            raise _PGError( '42P03', f'cursor "{portal.decode()}" already exists' )
+        ## query, params, result, count of sent rows, result formats
+        self.portals[ portal.decode() ] = [ query, params, None, 0, result_formats ]
+        self._send( b'2', b'' )
+
+    #-------------------------------------------------------------------------
+    def _copy_in(self, statement: str) -> str:
+        '''Runs a COPY ... FROM STDIN (FORMAT csv) and returns its tag.
+        '''
+        if self.failed:
+            raise _PGError( '25P02', 'current transaction is aborted, commands ignored until end of transaction block' )
+        match = _COPY_FROM_STDIN.match( statement )
+        table, columns = match.group( 1 ), match.group( 2 )
+        options = { name.upper(): value.replace("''", "'") for name, value in _COPY_OPTION.findall(statement) }
+        null = options.get( 'NULL', '' )
+        
+        self._send( b'G', b'\0\0\0' )  ## text format, no column formats
+        self._flush()
+        chunks = []
+        while True:
+            msg_type, body = self.reader.read_message()
+            if msg_type == b'd':
+                chunks.append( bytes(body) )
+            elif msg_type == b'c':
+                break
+            elif msg_type == b'f':
+                raise _PGError( '57014', f"COPY from stdin failed: {bytes(body[:-1]).decode()}" )
+        
+        reader = csv.reader( io.StringIO(b''.join(chunks).decode(), newline=''),
+                             delimiter=options.get('DELIMITER', ','), quotechar=options.get('QUOTE', '"') )
+        rows = [ [None if value == null else value for value in row] for row in reader if row ]
+        if not rows:
+            return 'COPY 0'
+        columns_list = f" ({columns})" if columns else ''
+        try:
+            self.db.executemany( f"INSERT INTO {table}{columns_list} VALUES ({', '.join(['?'] * len(rows[0]))})", rows )
+        except sqlite3.Error as e:
+            raise _PGError( _sqlstate_of(e), str(e) ) from None
+        return f'COPY {len(rows)}'
+
+    #-------------------------------------------------------------------------
+    def _describe(self, body: bytes) -> None:
+        kind, name = body[:1], body[1:-1].decode()
+        if kind == b'S':
+            query = self.statements[ name ]
+            count = max( (int(n) for n in re.findall(r'\$(\d+)', query)), default=0 )
+            self._send( b't', count.to_bytes(2, 'big') + b'\0\0\0\0' * count )
+            self._send( b'n', b'' )
+        else:
+            columns, _, _ = self._portal_result( name )
+            if columns is None:
+                self._send( b'n', b'' )
+            else:
+                self._send( b'T', _row_description(columns, self.portals[name][4]) )
+
+    #-------------------------------------------------------------------------
+    def _error(self, error: '_PGError') -> None:
+        if self.db.in_transaction:
+            self.failed = True
+        self._send( b'E', b'SERROR\0VERROR\0C' + error.sqlstate.encode() + b'\0M' + str(error).encode() + b'\0\0' )
+
+    #-------------------------------------------------------------------------
+    def _execute(self, body: bytes) -> None:
+        name, max_rows = body.split( b'\0', 1 )
+        name, max_rows = name.decode(), int.from_bytes( max_rows[:4], 'big', signed=True )
+        columns, rows, tag = self._portal_result( name )
+        portal = self.portals[ name ]
+        if columns is not None:
+            start = portal[ 3 ]
+            end = len( rows ) if max_rows <= 0 else min( start + max_rows, len(rows) )
+            for row in rows[start:end]:
+                self._send( b'D', _data_row(row, columns, portal[4]) )
+            if max_rows > 0 and end - start == max_rows:
+                portal[ 3 ] = end
+                self._send( b's', b'' )  ## PortalSuspended
+                return
+            if start > 0:
+                tag = f"{tag.rsplit(' ', 1)[0]} {end - start}"
+        self._send( b'C', tag.encode() + b'\0' )
+        portal[ 2 ], portal[ 3 ] = None, 0  ## a new Execute of the portal runs its query again
+
+    #-------------------------------------------------------------------------
+    def _flush(self) -> None:
+        if self.server.latency_s:
+            time.sleep( self.server.latency_s )
+        self.socket.sendall( b''.join(self.out) )
+        self.out.clear()
+
+    #-------------------------------------------------------------------------
+    def _parse(self, body: bytes) -> None:
+        name, query = body.split( b'\0', 2 )[:2]
+        name = name.decode()
+        if name and name in self.statements:
+            raise _PGError( '42P05', f'prepared statement "{name}" already exists' )
+        self.statements[ name ] = query.decode()
+        self._send( b'1', b'' )
+
+    #-------------------------------------------------------------------------
+    def _portal_result(self, name: str) -> tuple:
+        '''Runs the query of a portal once and returns its result.
+        '''
+        try:
+            portal = self.portals[ name ]
+        except KeyError:
+            raise _PGError( '34000', f'portal "{name}" does not exist' ) from None
+        if portal[2] is None:
+            portal[2] = self._run( portal[0], portal[1] )
+        return portal[2]
+
+    #-------------------------------------------------------------------------
+    def _ready(self) -> None:
+        status = b'E' if self.failed else b'T' if self.db.in_transaction else b'I'
+        self._send( b'Z', status )
+        with self.server._lock:
+            self.server.round_trips += 1
+        self._flush()
+
+    #-------------------------------------------------------------------------
+    def _run(self, query: str, params: list) -> Tuple[Optional[list], list, str]:
+        '''Runs one SQL statement.
+        
+        Returns:
+            The columns (name, type OID) of its result set or None, the
+            rows of the result set and the tag of the command.
+        '''
+        words = query.strip().rstrip( ';' ).split()
+        command = ' '.join( words[:2] ).upper()
+        first = words[0].upper() if words else ''
+        
+        if first in ('COMMIT', 'END', 'ROLLBACK', 'ABORT') and command not in ('COMMIT PREPARED', 'ROLLBACK PREPARED'):
+            if self.db.in_transaction:
+                self.db.execute( 'ROLLBACK' if self.failed or first in ('ROLLBACK', 'ABORT') else 'COMMIT' )
+            tag = 'ROLLBACK' if self.failed or first in ('ROLLBACK', 'ABORT') else 'COMMIT'
+            self.failed = False
+            return None, [], tag
+        
+        if self.failed:
+            raise _PGError( '25P02', 'current transaction is aborted, commands ignored until end of transaction block' )
+        
+        if first in ('BEGIN', 'START'):
+            if not self.db.in_transaction:
+                self.db.execute( 'BEGIN' )
+            return None, [], 'BEGIN'
+        
+        if command == 'PREPARE TRANSACTION':
+            gid = _gid_of( query )
+            with self.server._lock:
+                if gid in self.server._prepared:
+                    raise _PGError( '42710', f'transaction identifier "{gid}" is already in use' )
+                self.server._prepared[ gid ] = self.db
+            self.db = self.server.new_db()
+            return None, [], 'PREPARE TRANSACTION'
+        
+        if command in ('COMMIT PREPARED', 'ROLLBACK PREPARED'):
+            if self.db.in_transaction:
+                raise _PGError( '25001', f'{command} cannot run inside a transaction block' )
+            gid = _gid_of( query )
+            with self.server._lock:
+                db = self.server._prepared.pop( gid, None )
+            if db is None:
+                raise _PGError( '42704', f'prepared transaction with identifier "{gid}" does not exist' )
+            db.execute( 'COMMIT' if first == 'COMMIT' else 'ROLLBACK' )
+            db.close()
+            return None, [], command
+        
+        if 'PG_PREPARED_XACTS' in query.upper():
+            with self.server._lock:
+                rows = [ (gid,) for gid in self.server._prepared ]
+            return [ ('gid', pgp.TEXT_OID) ], rows, f'SELECT {len(rows)}'
+        
+        try:
+            cursor = self.db.execute( _PARAM.sub(r'?\1', query), params )
+            rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            raise _PGError( _sqlstate_of(e), str(e) ) from None
+        
+        if cursor.description is not None:
+            column_types = self.server.column_types
+            columns = [ (d[0], column_types.get(d[0]) or _type_oid(rows, i)) for i, d in enumerate(cursor.description) ]
+            return columns, rows, f'SELECT {len(rows)}'
+        if first == 'INSERT':
+            return None, [], f'INSERT 0 {cursor.rowcount}'
+        if first in ('UPDATE', 'DELETE'):
+            return None, [], f'{first} {cursor.rowcount}'
+        return None, [], command
+
+    #-------------------------------------------------------------------------
+    def _send(self, msg_type: bytes, body: bytes) -> None:
+        self.out.append( pgp.message(msg_type, body) )
+
+    #-------------------------------------------------------------------------
+    def _simple_query(self, text: str) -> None:
+        '''Runs the statements of a simple query, until the first error.
+        '''
+        for statement in ( s for s in _STATEMENT.findall(text) if s.strip() ):
+            try:
+                if _COPY_FROM_STDIN.match( statement ):
+                    columns, rows, tag = None, [], self._copy_in( statement )
+                else:
+                    columns, rows, tag = self._run( statement, [] )
+            except _PGError as e:
+                self._error( e )
+                return
+            if columns is not None:
+                self._send( b'T', _row_description(columns, pgp.TEXT_FORMAT) )
+                for row in rows:
+                    self._send( b'D', _data_row(row, columns, pgp.TEXT_FORMAT) )
+            self._send( b'C', tag.encode() + b'\0' )
+
+    #-------------------------------------------------------------------------
+    def _startup(self) -> bool:
+        '''Runs the startup phase of the session. Returns False if the client gave up.
+        '''
+        body = self.reader.read_startup()
+        version = int.from_bytes( body[:4], 'big' )
+        if version == pgp.SSL_REQUEST_CODE:
+            self.socket.sendall( b'N' )
+            body = self.reader.read_startup()
+            version = int.from_bytes( body[:4], 'big' )
+        if version == pgp.CANCEL_REQUEST_CODE:
+            backend_pid, secret_key = pgp.parse_backend_key_data( body[4:12] )
+            with self.server._lock:
+                key, session = self.server._backends.get( backend_pid, (None, None) )
+            if key == secret_key:
+                session.db.interrupt()
+            return False
+        if version != pgp.PROTOCOL_VERSION:
+            return False
+        strings = pgp.parse_strings( body[4:] )
+        params = dict( zip(strings[0::2], strings[1::2]) )
+        
+        if self.server.password is not None:
+            salt = os.urandom( 4 )
+            self.socket.sendall( pgp.message(b'R', (5).to_bytes(4, 'big') + salt) )
+            msg_type, answer = self.reader.read_message()
+            inner = hashlib.md5( (self.server.password + params.get('user', '')).encode() ).hexdigest()
+            expected = b'md5' + hashlib.md5( inner.encode() + salt ).hexdigest().encode()
+            if msg_type != b'p' or bytes( answer[:-1] ) != expected:
+                self._error( _PGError('28P01', f'password authentication failed for user "{params.get("user")}"') )
+                self._flush()
+                return False
+        
+        self._send( b'R', b'\0\0\0\0' )
+        for name, value in ( ('server_version', '16.0 (fake)'), ('client_encoding', 'UTF8'),
+                             ('DateStyle', 'ISO, MDY'), ('integer_datetimes', 'on') ):
+            self._send( b'S', name.encode() + b'\0' + value.encode() + b'\0' )
+        secret_key = int.from_bytes( os.urandom(4), 'big', signed=True )
+        with self.server._lock:
+            self.backend_pid = len( self.server._sessions )
+            self.server._backends[ self.backend_pid ] = ( secret_key, self )
+        self._send( b'K', self.backend_pid.to_bytes(4, 'big') + secret_key.to_bytes(4, 'big', signed=True) )
+        self._send( b'Z', b'I' )
+        self._flush()
+        return True
+
+
+#=============================================================================
+class _PGError( Exception ):
+    """The errors reported to clients, with their SQLSTATE code."""
+    def __init__(self, sqlstate: str, message: str) -> None:
+        super().__init__( message )
+        self.sqlstate = sqlstate
+
+
+#=============================================================================
+_COPY_FROM_STDIN = re.compile( r'\s*COPY\s+(\w+)\s*(?:\(([^)]*)\))?\s+FROM\s+STDIN', re.IGNORECASE )
+_COPY_OPTION     = re.compile( r"(DELIMITER|QUOTE|NULL)\s+'((?:[^']|'')*)'", re.IGNORECASE )
+_PARAM           = re.compile( r'\$(\d+)' )
+_STATEMENT       = re.compile( r"(?:'(?:[^']|'')*'|[^;'])+" )
+_GID             = re.compile( r"'((?:[^']|'')*)'" )
+
+_TYPE_SIZES = { pgp.INT8_OID: 8, pgp.FLOAT8_OID: 8 }
+_ENCODERS = { **pgp.ENCODERS, pgp.UUID_OID: lambda value: uuid.UUID( value ).bytes }
+
+
+#-------------------------------------------------------------------------
+def _data_row(row: tuple, columns: list, result_format: Union[int, Sequence[int]]) -> bytes:
+    parts = [ len(row).to_bytes(2, 'big') ]
+    for value, (_, oid), value_format in zip( row, columns, _formats(result_format, len(columns)) ):
+        if value is None:
+            parts.append( b'\xff\xff\xff\xff' )
+            continue
+        if value_format == pgp.BINARY_FORMAT:
+            data = _ENCODERS[ oid ]( float(value) if oid == pgp.FLOAT8_OID else value )
+        elif isinstance( value, bytes ):
+            data = b'\\x' + value.hex().encode()
+        else:
+            data = str( value ).encode()
+        parts.append( len(data).to_bytes(4, 'big') )
+        parts.append( data )
+    return b''.join( parts )
+
+#-------------------------------------------------------------------------
+def _decode_param(text: str) -> object:
+    '''Decodes a text-format parameter. Numbers and bytea values are converted as the server would infer them.
+    '''
+    if text.startswith( '\\x' ):
+        try:
+            return bytes.fromhex( text[2:] )
+        except ValueError:
+            return text
+    try:
+        number = int( text )
+        return number if str( number ) == text else text
+    except ValueError:
+        pass
+    try:
+        number = float( text )
+        return number if repr( number ) == text else text
+    except ValueError:
+        return text
+
+#-------------------------------------------------------------------------
+def _gid_of(query: str) -> str:
+    match = _GID.search( query )
+    if match is None:
+        raise _PGError( '42601', 'syntax error: missing transaction identifier' )
+    return match.group( 1 ).replace( "''", "'" )
+
+#-------------------------------------------------------------------------
+def _formats(result_format: Union[int, Sequence[int]], count: int) -> Sequence[int]:
+    '''Returns the formats of count columns, from the result format codes of a Bind message or a single format.
+    '''
+    if isinstance( result_format, int ):
+        return [ result_format ] * count
+    if len( result_format ) == 1:
+        return result_format * count
+    if not result_format:
+        return [ pgp.TEXT_FORMAT ] * count
+    if len( result_format ) != count:
+        raise _PGError( '08P01', f'bind message has {len(result_format)} result formats but query has {count} columns' )
+    return result_format
+
+#-------------------------------------------------------------------------
+def _row_description(columns: list, result_format: Union[int, Sequence[int]]) -> bytes:
+    parts = [ len(columns).to_bytes(2, 'big') ]
+    for (name, oid), value_format in zip( columns, _formats(result_format, len(columns)) ):
+        parts.append( name.encode() + b'\0' + b'\0\0\0\0\0\0' + oid.to_bytes(4, 'big')
+                      + _TYPE_SIZES.get(oid, -1).to_bytes(2, 'big', signed=True)
+                      + b'\xff\xff\xff\xff' + value_format.to_bytes(2, 'big') )
+    return b''.join( parts )
+
+#-------------------------------------------------------------------------
+def _sqlstate_of(error: sqlite3.Error) -> str:
+    message = str( error )
+    if isinstance( error, sqlite3.IntegrityError ):
+        return '23502' if 'NOT NULL' in message else '23505'
+    if 'no such table' in message:
+        return '42P01'
+    if 'no such column' in message:
+        return '42703'
+    if 'syntax error' in message or 'incomplete input' in message:
+        return '42601'
+    if 'locked' in message:
+        return '55P03'
+    if 'interrupted' in message:
+        return '57014'
+    return 'XX000'
+
+#-------------------------------------------------------------------------
+def _type_oid(rows: list, index: int) -> int:
+    '''Returns the type OID of a column, inferred from its values.
+    '''
+    types = { type(row[index]) for row in rows if row[index] is not None }
+    if types and types <= { int }:
+        return pgp.INT8_OID
+    if types and types <= { int, float }:
+        return pgp.FLOAT8_OID
+    if types == { bytes }:
+        return pgp.BYTEA_OID
+    return pgp.TEXT_OID
+
+
+#=====   end of   SubProjects.PostgreSQL.fake_server   =====#
@@ -0,0 +1,612 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the connections to PostgreSQL servers.
+#
+#  They speak the frontend/backend protocol version 3.0 directly  over
+#  TCP, with no other dependency than the standard library. Statements
+#  are run with the extended query protocol and their results are re-
+#  ceived in binary format,  but the first one of every statement and
+#  the columns of types with no binary decoder which are received in
+#  text format (see PGStatement).  All the messages of a round-trip
+#  are sent at once before one Sync (pipelining), e.g. the implicit
+#  BEGIN of a transaction, the Parse of a new statement and its Bind/
+#  Execute.
+#
+
+#=============================================================================
+import base64
+import getpass
+import hashlib
+import socket
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from Libs.ObjectSqlLib import (DatabaseError, DataError, IntegrityError, InterfaceError,
+                               InternalError, NotSupportedError, OperationalError,
+                               ProgrammingError, TPCConnection)
+from Libs.ObjectSqlLib.binding        import compile_operation
+from Libs.ObjectSqlLib.tpc_connection import XID
+from .           import pg_protocol as pgp
+from .pg_cursor import PGCursor
+
+
+#=============================================================================
+class PGStatement:
+    """The class of the prepared statements of a connection, named on the server side.
+    
+    The result format of statements is text until the columns of their
+    result set are known, from their first execution (see pgp.result_for-
+    mats_of()).
+    """
+    __slots__ = ( 'name', 'query', 'parsed', 'result_format' )
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, name: str, query: str) -> None:
+        self.name = name
+        self.query = query
+        self.parsed = False
+        self.result_format: Union[int, Tuple[int, ...]] = pgp.TEXT_FORMAT
+
+
+#=============================================================================
+class PGResult:
+    """The class of the results of the executions of portals.
+    """
+    __slots__ = ( 'columns', 'rows', 'row_count', 'command', 'size', 'suspended' )
+    
+    #-------------------------------------------------------------------------
+    def __init__(self, columns: Optional[List[Tuple[str, int, int, int]]] = None) -> None:
+        self.columns = columns
+        self.rows: List[tuple] = []
+        self.row_count = -1
+        self.command = ''
+        self.size = 0            # the count of bytes of the received rows
+        self.suspended = False   # True if the portal has more rows to fetch
+
+
+#=============================================================================
+class PGConnection( TPCConnection ):
+    """The class of connections to PostgreSQL servers.
+    
+    Authentication methods trust, password and md5 are supported.
+    SCRAM authentication and SSL are not.
+    """
+    #-------------------------------------------------------------------------
+    def __init__(self, _dsn     : Optional[str] = None,
+                       _user    : Optional[str] = None,
+                       _password: Optional[str] = None,
+                       _host    : Optional[str] = None,
+                       _database: Optional[str] = None,
+                       port     : int = 5432,
+                       connect_timeout_s: Optional[float] = None ) -> None:
+        '''Constructor.
+        
+        Args:
+            _dsn: str
+                A libpq-like connection string of keyword=value items,
+                e.g. "host=localhost port=5432 dbname=cycling user=me".
+                Keywords host, port, dbname, user and password are used.
+                Explicit arguments override the items of this string.
+            _user: str
+                The user name. Defaults to the name of the OS user.
+            _password: str
+                The password of the user, if the server requests one.
+            _host: str
+                The host name of the server. Defaults to 'localhost'.
+            _database: str
+                The database name. Defaults to the user name.
+            port: int
+                The TCP port of the server. Defaults to 5432.
+            connect_timeout_s: float
+                The timeout of the connection to the server, in seconds.
+                None means no timeout. Defaults to None.
+        
+        Raises:
+            OperationalError: the connection to the server failed.
+            NotSupportedError: the server requests an unsupported  au-
+                thentication method.
+        '''
+        self._socket = None
+        dsn = _parse_dsn( _dsn )
+        host = _host or dsn.get( 'host', 'localhost' )
+        port = int( dsn.get('port', port) )
+        user = _user or dsn.get( 'user' ) or getpass.getuser()
+        self._password = _password or dsn.get( 'password' )
+        database = _database or dsn.get( 'dbname', user )
+        
+        self.parameters: Dict[str, str] = {}  # the run-time parameters reported by the server
+        self.backend_pid = None
+        self._secret_key = None
+        self._status = b'I'
+        self._pending_closes: List[bytes] = []
+        self._statements_count = 0
+        self._xid: Optional[XID] = None
+        self._tpc_prepared = False
+        self.round_trips = 0
+        self._address = ( host, port )
+        self._connect_timeout_s = connect_timeout_s
+        
+        try:
+            self._socket = socket.create_connection( (host, port), connect_timeout_s )
+            self._socket.settimeout( None )
+            self._socket.setsockopt( socket.IPPROTO_TCP, socket.TCP_NODELAY, 1 )
+        except OSError as e:
+            raise OperationalError( f"cannot connect to {host}:{port} - {e}" ) from e
+        self._reader = pgp.MessageReader( self._socket )
+        self._startup( user, database )
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes this connection. Pending transactions are rolled back by the server.
+        '''
+        if self._socket is not None:
+            self.statement_cache.clear()
+            try:
+                self._socket.sendall( pgp.TERMINATE )
+            except OSError:
+                pass
+            self._socket.close()
+            self._socket = None
+
+    #-------------------------------------------------------------------------
+    def commit(self) -> None:
+        '''Commits the pending transaction.
+        
+        Raises:
+            ProgrammingError: a TPC transaction is pending.
+        '''
+        self._check_no_tpc( 'commit' )
+        if self._status != b'I':
+            self._simple_query( 'COMMIT' )
+
+    #-------------------------------------------------------------------------
+    def cursor(self) -> 'PGCursor':
+        '''Returns a new cursor on this connection.
+        
+        Raises:
+            InterfaceError: this connection is closed.
+        '''
+        if self._socket is None:
+            raise InterfaceError( "connection is closed" )
+        return PGCursor( self )
+
+    #-------------------------------------------------------------------------
+    @property
+    def in_transaction(self) -> bool:
+        '''True if a transaction is pending on this connection.
+        
+        This is not part of PEP 249.
+        '''
+        return self._status != b'I'
+
+    #-------------------------------------------------------------------------
+    def rollback(self) -> None:
+        '''Rolls back the pending transaction.
+        
+        Raises:
+            ProgrammingError: a TPC transaction is pending.
+        '''
+        self._check_no_tpc( 'rollback' )
+        if self._status != b'I':
+            self._simple_query( 'ROLLBACK' )
+
+    #-------------------------------------------------------------------------
+    def tpc_begin(self, xid: XID) -> None:
+        '''Begins a TPC transaction with the given transaction id.
+        
+        Raises:
+            ProgrammingError: a transaction is already pending.
+        '''
+        if self._status != b'I' or self._xid is not None:
+            raise ProgrammingError( "tpc_begin() must be called outside of any transaction" )
+        self._xid = xid
+        self._tpc_prepared = False
+
+    #-------------------------------------------------------------------------
+    def tpc_commit(self, xid: Optional[XID] = None) -> None:
+        '''Commits a TPC transaction.
+        
+        With no argument, commits the TPC transaction started with
+        '.tpc_begin()', in one phase if it has not been prepared.  With
+        a transaction id, commits that prepared transaction (recovery).
+        '''
+        self._end_tpc( 'COMMIT', xid )
+
+    #-------------------------------------------------------------------------
+    def tpc_prepare(self) -> None:
+        '''Performs the first phase of the TPC transaction started with '.tpc_begin()'.
+        
+        Raises:
+            ProgrammingError: no TPC transaction is pending.
+        '''
+        if self._xid is None:
+            raise ProgrammingError( "tpc_prepare() must be called after tpc_begin()" )
+        begin = 'BEGIN; ' if self._status == b'I' else ''
+        self._simple_query( f"{begin}PREPARE TRANSACTION '{_gid(self._xid)}'" )
+        self._tpc_prepared = True
+
+    #-------------------------------------------------------------------------
+    def tpc_recover(self) -> List[XID]:
+        '''Returns the ids of the transactions prepared on the server, as created by this driver.
+        '''
+        cursor = self.cursor()
+        was_idle = self._status == b'I'
+        cursor.execute( "SELECT gid FROM pg_prepared_xacts WHERE database = current_database()" )
+        xids = [ xid for xid in (_xid_of(gid) for gid, in cursor.fetchall()) if xid is not None ]
+        cursor.close()
+        if was_idle and self._xid is None:
+            self.rollback()
+        return xids
+
+    #-------------------------------------------------------------------------
+    def tpc_rollback(self, xid: Optional[XID] = None) -> None:
+        '''Rolls back a TPC transaction.
+        
+        With no argument, rolls back the TPC transaction started with
+        '.tpc_begin()', whether it has been prepared or not. With a
+        transaction id, rolls back that prepared transaction (recovery).
+        '''
+        self._end_tpc( 'ROLLBACK', xid )
+
+    #-------------------------------------------------------------------------
+    def _begin_messages(self) -> List[bytes]:
+        '''Returns the messages that begin a transaction if none is pending.
+        
+        Autocommit is off, as PEP 249 requires: the first statement
+        run outside of a transaction begins a new one, within the same
+        pipeline.
+        '''
+        if self._status != b'I':
+            return []
+        return [ pgp.parse('', 'BEGIN'), pgp.bind('', '', (), pgp.BINARY_FORMAT), pgp.execute('') ]
+
+    #-------------------------------------------------------------------------
+    def _cancel(self) -> None:
+        '''Requests the server to cancel the operation currently running on this connection.
+        
+        The CancelRequest is sent on a new connection to the server, as
+        the protocol requires. The running operation then fails with
+        SQLSTATE 57014 (query_canceled). The server may ignore requests
+        that arrive once the operation has completed.
+        
+        Raises:
+            OperationalError: the server cannot be reached.
+        '''
+        if self._socket is None or self.backend_pid is None:
+            return
+        try:
+            with socket.create_connection( self._address, self._connect_timeout_s ) as cancel_socket:
+                cancel_socket.sendall( pgp.cancel_request(self.backend_pid, self._secret_key) )
+        except OSError as e:
+            raise OperationalError( f"cannot send a cancel request to {self._address[0]}:{self._address[1]} - {e}" ) from e
+
+    #-------------------------------------------------------------------------
+    def _check_no_tpc(self, method: str) -> None:
+        if self._xid is not None:
+            raise ProgrammingError( f"{method}() cannot be called while a TPC transaction is pending" )
+
+    #-------------------------------------------------------------------------
+    def _end_tpc(self, command: str, xid: Optional[XID]) -> None:
+        '''Commits or rolls back a TPC transaction.
+        '''
+        if xid is not None:
+            if self._status != b'I':
+                raise ProgrammingError( f"tpc_{command.lower()}(xid) must be called outside of any transaction" )
+            self._simple_query( f"{command} PREPARED '{_gid(xid)}'" )
+            return
+        
+        if self._xid is None:
+            raise ProgrammingError( f"tpc_{command.lower()}() must be called after tpc_begin()" )
+        try:
+            if self._tpc_prepared:
+                self._simple_query( f"{command} PREPARED '{_gid(self._xid)}'" )
+            elif self._status != b'I':
+                self._simple_query( command )
+        finally:
+            self._xid = None
+            self._tpc_prepared = False
+
+    #-------------------------------------------------------------------------
+    def _exchange(self, messages: Sequence[Union[bytes, List[object]]],
+                        parsed_statements: Sequence[Optional[PGStatement]] = (),
+                        syncs_count: int = 1,
+                        text_rows: bool = False,
+                        raw_rows: bool = False,
+                        copy_data: Optional[Iterator[bytes]] = None,
+                        columns: Optional[List[Tuple[str, int, int, int]]] = None) -> Tuple[List[PGResult], List[Dict[str, str]]]:
+        '''Sends messages at once and receives all their responses.
+        
+        This is the single round-trip to the server of every operation.
+        
+        Args:
+            messages: Sequence[Union[bytes, List[object]]]
+                The messages to send, ending with Sync ones or being simple
+                queries. Messages may be lists of buffers (see pgp.bind()).
+            parsed_statements: Sequence[PGStatement]
+                The statements parsed by the Parse messages of this round-
+                trip, in order, or None for unnamed ones.  They are marked
+                as parsed as soon as the server has parsed them.
+            syncs_count: int
+                The count of ReadyForQuery messages to wait for.
+            text_rows: bool
+                True if rows are received in text format (simple queries).
+            raw_rows: bool
+                True if rows are kept as the raw bodies of their  DataRow
+                messages, to be decoded later (see PGLazyRow).
+            copy_data: Iterator[bytes]
+                The data sent when the server is ready for a COPY ... FROM
+                STDIN, or None. Defaults to None.
+            columns: List[Tuple[str, int, int, int]]
+                The columns of the rows of a suspended portal, which  are
+                not described again by the server when the execution of
+                the portal resumes, or None. Defaults to None.
+        
+        Returns:
+            The list of the results of the executed portals  and  the list
+            of the notices sent by the server.
+        
+        Raises:
+            InterfaceError: the connection is closed.
+            OperationalError: the connection has been lost.
+            DatabaseError: the server reported an error. Its subclass
+                depends on the SQLSTATE code of the error.
+        '''
+        if self._socket is None:
+            raise InterfaceError( "connection is closed" )
+        
+        results: List[PGResult] = []
+        notices: List[Dict[str, str]] = []
+        error = None
+        parsed_index = 0
+        result = PGResult( columns )
+        decoders = None if columns is None else _decoders_of( columns, text_rows )
+        
+        try:
+            self._send( messages )
+            self.round_trips += 1
+            
+            read_message = self._reader.read_message
+            while syncs_count:
+                msg_type, body = read_message()
+                if msg_type == b'D':
+                    result.size += len( body )
+                    if raw_rows:
+                        result.rows.append( bytes(body) )
+                    elif decoders is not None:
+                        result.rows.append( pgp.parse_data_row(body, decoders) )
+                elif msg_type == b'C':
+                    result.command, result.row_count = pgp.parse_command_complete( body )
+                    results.append( result )
+                    result = PGResult()
+                    decoders = None
+                elif msg_type == b'T':
+                    result.columns = pgp.parse_row_description( body )
+                    decoders = _decoders_of( result.columns, text_rows )
+                elif msg_type == b'1':
+                    statement = parsed_statements[ parsed_index ]
+                    if statement is not None:
+                        statement.parsed = True
+                    parsed_index += 1
+                elif msg_type == b'Z':
+                    self._status = bytes( body[:1] )
+                    syncs_count -= 1
+                elif msg_type == b'G':
+                    error = self._send_copy_data( copy_data )
+                elif msg_type == b'I':
+                    results.append( result )
+                    result = PGResult()
+                elif msg_type == b's':
+                    result.suspended = True
+                    results.append( result )
+                    result = PGResult()
+                    decoders = None
+                elif msg_type == b'E':
+                    if error is None:
+                        error = _error_of( pgp.parse_fields(body) )
+                elif msg_type == b'N':
+                    notices.append( pgp.parse_fields(body) )
+                elif msg_type == b'S':
+                    name, value = pgp.parse_strings( body )
+                    self.parameters[ name ] = value
+                ## else: BindComplete, CloseComplete, NoData, ParameterDescription, ...
+        except OSError as e:
+            self._socket.close()
+            self._socket = None
+            raise OperationalError( f"connection to the server lost - {e}" ) from e
+        
+        if error is not None:
+            raise error
+        return results, notices
+
+    #-------------------------------------------------------------------------
+    def _prepare_statement(self, operation: str) -> PGStatement:
+        '''Translates paramstyle 'format' into PostgreSQL $n placeholders and names the statement.
+        
+        The statement is parsed on the server by the first round-trip
+        that uses it.
+        '''
+        self._statements_count += 1
+        return PGStatement( f'osl_{self._statements_count}', compile_operation(operation).translated('dollar') )
+
+    #-------------------------------------------------------------------------
+    def _release_statement(self, operation: str, prepared: PGStatement) -> None:
+        '''Deallocates an evicted statement on the server with the next round-trip.
+        '''
+        if prepared.parsed:
+            self._pending_closes.append( pgp.close(b'S', prepared.name) )
+
+    #-------------------------------------------------------------------------
+    def _send(self, messages: Sequence[Union[bytes, List[object]]]) -> None:
+        '''Sends the pending Close messages and messages at once.
+        
+        The memoryviews of the messages built as lists of buffers  (see
+        pgp.bind()) are sent on their own rather than copied, when they
+        are at least '.SEND_VIEW_MIN_BYTES' long.  The other buffers are
+        joined.  Notice: TCP_NODELAY is set on the socket, so that the
+        split data is not delayed.
+        '''
+        pending = self._pending_closes
+        for message in messages:
+            if not isinstance( message, list ):
+                pending.append( message )
+                continue
+            for buffer in message:
+                if isinstance( buffer, memoryview ) and len( buffer ) >= self.SEND_VIEW_MIN_BYTES:
+                    self._socket.sendall( b''.join(pending) )
+                    pending.clear()
+                    self._socket.sendall( buffer )
+                else:
+                    pending.append( buffer )
+        self._socket.sendall( b''.join(pending) )
+        pending.clear()
+
+    #-------------------------------------------------------------------------
+    def _send_copy_data(self, copy_data: Optional[Iterator[bytes]]) -> Optional[Exception]:
+        '''Sends the data of a COPY ... FROM STDIN, without waiting for any answer.
+        
+        Returns:
+            The exception raised while the data were produced, if any. The
+            copy is then failed on the server side.
+        '''
+        try:
+            for data in copy_data or ():
+                self._socket.sendall( pgp.copy_data(data) )
+        except OSError:
+            raise
+        except Exception as e:
+            self._socket.sendall( pgp.copy_fail(f"{type(e).__name__}: {e}") )
+            return e
+        self._socket.sendall( pgp.COPY_DONE )
+        return None
+
+    #-------------------------------------------------------------------------
+    def _simple_query(self, text: str) -> List[PGResult]:
+        '''Runs a simple query, which may contain many SQL statements.
+        '''
+        return self._exchange( [pgp.query(text)], text_rows=True )[0]
+
+    #-------------------------------------------------------------------------
+    def _startup(self, user: str, database: str) -> None:
+        '''Runs the startup phase of the connection, including authentication.
+        '''
+        self._socket.sendall( pgp.startup({'user': user, 'database': database,
+                                           'client_encoding': 'UTF8', 'DateStyle': 'ISO'}) )
+        while True:
+            msg_type, body = self._reader.read_message()
+            if msg_type == b'R':
+                self._authenticate( user, bytes(body) )
+            elif msg_type == b'S':
+                name, value = pgp.parse_strings( body )
+                self.parameters[ name ] = value
+            elif msg_type == b'K':
+                self.backend_pid, self._secret_key = pgp.parse_backend_key_data( body )
+            elif msg_type == b'E':
+                error = _error_of( pgp.parse_fields(body) )
+                self.close()
+                raise OperationalError( *error.args )
+            elif msg_type == b'Z':
+                self._status = bytes( body[:1] )
+                return
+
+    #-------------------------------------------------------------------------
+    def _authenticate(self, user: str, body: bytes) -> None:
+        '''Answers an authentication request of the server.
+        '''
+        code = int.from_bytes( body[:4], 'big' )
+        if code == 0:
+            return
+        if code in (3, 5) and self._password is None:
+            raise OperationalError( "the server requests a password" )
+        if code == 3:
+            self._socket.sendall( pgp.password(self._password.encode()) )
+        elif code == 5:
+            inner = hashlib.md5( (self._password + user).encode() ).hexdigest()
+            self._socket.sendall( pgp.password(b'md5' + hashlib.md5(inner.encode() + body[4:8]).hexdigest().encode()) )
+        else:
+            self.close()
+            raise NotSupportedError( f"authentication method {code} is not supported" )
+
+    #-------------------------------------------------------------------------
+    # Class data
+    SEND_VIEW_MIN_BYTES = 1 << 14  # the minimum size of the binary parameters sent with no copy
+
+
+#=============================================================================
+_SQLSTATE_CLASSES = {
+    '0A': NotSupportedError,
+    '08': OperationalError,
+    '22': DataError,
+    '23': IntegrityError,
+    '25': OperationalError,
+    '40': OperationalError,
+    '42': ProgrammingError,
+    '53': OperationalError,
+    '57': OperationalError,
+    'XX': InternalError,
+}
+
+
+#-------------------------------------------------------------------------
+def _decode_text(data: memoryview) -> str:
+    return str( data, 'utf-8' )
+
+#-------------------------------------------------------------------------
+def _decoders_of(columns: List[Tuple[str, int, int, int]], text_rows: bool) -> list:
+    '''Returns the decoders of the values of columns.
+    '''
+    return [ _decode_text if text_rows else pgp.decoder_of(oid, value_format) for _, oid, _, value_format in columns ]
+
+#-------------------------------------------------------------------------
+def _error_of(fields: Dict[str, str]) -> DatabaseError:
+    '''Returns the exception corresponding to the fields of an ErrorResponse message.
+    '''
+    sqlstate = fields.get( 'C', 'XX000' )
+    error = _SQLSTATE_CLASSES.get( sqlstate[:2], DatabaseError )( f"{fields.get('M', '')} (SQLSTATE {sqlstate})" )
+    error.sqlstate = sqlstate
+    return error
+
+#-------------------------------------------------------------------------
+def _gid(xid: XID) -> str:
+    '''Returns the PostgreSQL transaction identifier of a TPC transaction id.
+    '''
+    format_id, gtrid, bqual = xid
+    return f"{format_id}_{base64.b64encode(gtrid).decode()}_{base64.b64encode(bqual).decode()}"
+
+#-------------------------------------------------------------------------
+def _parse_dsn(dsn: Optional[str]) -> Dict[str, str]:
+    '''Returns the items of a connection string of keyword=value items.
+    '''
+    return dict( item.split('=', 1) for item in dsn.split() ) if dsn else {}
+
+#-------------------------------------------------------------------------
+def _xid_of(gid: str) -> Optional[XID]:
+    '''Returns the TPC transaction id of a PostgreSQL transaction identifier, or None if it was not created by this driver.
+    '''
+    try:
+        format_id, gtrid, bqual = gid.split( '_' )
+        return (int(format_id), base64.b64decode(gtrid, validate=True), base64.b64decode(bqual, validate=True))
+    except ValueError:
+        return None
+
+
+#=====   end of   SubProjects.PostgreSQL.pg_connection   =====#
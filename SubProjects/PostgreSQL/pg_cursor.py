@@ -0,0 +1,634 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the cursors on PostgreSQL connections.
+#
+
+#=============================================================================
+import csv
+import struct
+from collections import deque
+from time        import perf_counter
+from typing      import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from Libs.ObjectSqlLib                 import Cursor, InterfaceError, ProgrammingError
+from Libs.ObjectSqlLib.batching        import BatchReport
+from Libs.ObjectSqlLib.lazy_rows       import LazyRow, lazy_row_class
+from Libs.ObjectSqlLib.statement_batch import ResultSet, Statement
+from .                          import pg_protocol as pgp
+
+
+#=============================================================================
+class PGCursor( Cursor ):
+    """The class of cursors on PostgreSQL connections.
+    
+    Every execution is one round-trip to the server.  Results are re-
+    ceived in binary format - but for the columns of types with no bi-
+    nary decoder (see PGStatement) - and buffered in the cursor, so
+    that result sets may be scrolled in both directions.
+
+    '.executemany()' pipelines the executions of its operation, with at
+    most '.PIPELINE_DEPTH' of them per round-trip.  '.execute_batch()'
+    sends all the operations of a batch in a single round-trip.
+
+    With '.lazy_rows' set,  the raw DataRow messages are buffered  and
+    columns are decoded on their first access only (see PGLazyRow).
+
+    The bytes of the received rows are charged to the memory budget of
+    the connection.  When it is limited,  '.execute()' fetches its rows
+    by chunks of '.CHUNK_ROWS' rows through a named portal and stops
+    buffering them once the budget is exceeded. The cursor then either
+    streams the rest of its result set, one chunk at a time, or raises
+    OperationalError, according to the policy of the budget.  While
+    streaming,  '.rowcount' is -1 until the last chunk,  scrolls are
+    limited to the buffered rows and '.fetchall()' raises Operational-
+    Error if the rest of the result set exceeds the budget. The result
+    sets of batches are not streamed: batches exceeding the budget raise
+    OperationalError.
+
+    bytea values are returned as memoryviews on the received  messages,
+    with no copy.  Call '.tobytes()' on them to get owned copies,  e.g.
+    to keep a few small values of a large result set. Parameters may be
+    any object supporting the buffer protocol (bytearray, mmap,  NumPy
+    arrays, ...), sent as bytea with no copy (see pgp.encode_param()).
+    """
+    #-------------------------------------------------------------------------
+    def __init__(self, parent_connection) -> None:
+        '''Constructor.
+        
+        Args:
+            parent_connection: PGConnection
+                The connection which creates this cursor.
+        '''
+        super().__init__( parent_connection )
+        self._description = None
+        self._rows: List[tuple] = []
+        self._closed = False
+        self._portal = f'osl_portal_{id(self):x}'  # the portal of the result sets fetched by chunks
+        self._chunked = False
+        self._suspended = False     # True if the portal has more rows to fetch
+        self._streaming = False     # True once the result set exceeds the memory budget
+        self._columns = None        # the columns of the rows of the portal
+        self._rows_offset = 0       # the count of the rows dropped while streaming
+        self._chunks = deque()      # the (end index, bytes count) of the buffered chunks of rows
+
+    #-------------------------------------------------------------------------
+    def __iter__(self) -> 'PGCursor':
+        return self
+
+    #-------------------------------------------------------------------------
+    def __next__(self) -> Tuple:
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    #-------------------------------------------------------------------------
+    @property
+    def description(self) -> Optional[Tuple]:
+        '''The description of the columns of the current result set.
+        
+        Type codes are the Type Objects of module db_types, or None for
+        types unknown to this driver.  Internal sizes are the sizes of
+        the types on the server, negative for variable-size ones.
+        '''
+        return self._description
+
+    #-------------------------------------------------------------------------
+    @property
+    def rownumber(self) -> int:
+        '''The 0-based index of this cursor in the current result set, including the rows dropped while streaming.
+        '''
+        return self._rows_offset + self._row_number
+
+    #-------------------------------------------------------------------------
+    def callproc(self, proc_name: str, *parameters) -> Tuple:
+        '''Calls a stored function.
+        
+        Its result set is available through the '.fetch*()' methods.
+        
+        Returns:
+            A copy of the sequence of parameters, which are input-only.
+        '''
+        params = tuple( parameters[0] ) if parameters else ()
+        placeholders = ', '.join( ['%s'] * len(params) )
+        self.execute( f"SELECT * FROM {proc_name}({placeholders})", params )
+        return params
+
+    #-------------------------------------------------------------------------
+    def close(self) -> None:
+        '''Closes this cursor.
+        '''
+        self._closed = True
+        if self._suspended:
+            self._close_portal()
+        self._rows = []
+        self._description = None
+        self._release_buffer()
+
+    #-------------------------------------------------------------------------
+    def execute(self, operation: str, *parameters) -> None:
+        '''Prepares and executes an operation in a single round-trip.
+        
+        Args:
+            operation: str
+                The operation, with paramstyle 'format'.
+            parameters: Sequence
+                The values bound to the placeholders of the operation.
+        '''
+        connection = self._start()
+        statement = self._prepared( operation )
+        params = parameters[0] if parameters else ()
+        self._chunked = connection.memory_budget.is_limited
+        portal = self._portal if self._chunked else ''
+        
+        messages = connection._begin_messages()
+        parsed = [ None ] if messages else []
+        if not statement.parsed:
+            messages.append( pgp.parse(statement.name, statement.query) )
+            parsed.append( statement )
+        if self._chunked:
+            messages.append( pgp.close(b'P', portal) )  ## in case a failed execution left it open
+        messages += [ pgp.bind(portal, statement.name, [pgp.encode_param(p) for p in params], statement.result_format),
+                      pgp.describe(b'P', portal),
+                      pgp.execute(portal, self.CHUNK_ROWS if self._chunked else 0),
+                      pgp.SYNC ]
+        
+        results, notices = connection._exchange( messages, parsed, raw_rows=self._lazy_rows )
+        _learn_result_format( statement, results[-1] )
+        within_budget = self._set_result( results[-1] )
+        self._add_notices( notices )
+        if self._suspended or not within_budget:
+            self._prefetch( within_budget )
+
+    #-------------------------------------------------------------------------
+    def executemany(self, operation: str, seq_of_parameters: Iterable[Sequence]) -> None:
+        '''Prepares an operation and executes it against all sequences of parameters.
+        
+        Executions are pipelined: the  Bind/Execute  messages  of  up  to
+        '.PIPELINE_DEPTH' executions are sent at once, followed by one
+        Sync, so that the latency of the network is paid once  per
+        pipeline rather than once per execution.  Result sets are dis-
+        carded. '.rowcount' is the total count of affected rows.
+        '''
+        connection = self._start()
+        statement = self._prepared( operation )
+        row_count = 0
+        
+        messages = connection._begin_messages()
+        parsed = [ None ] if messages else []
+        if not statement.parsed:
+            messages.append( pgp.parse(statement.name, statement.query) )
+            parsed.append( statement )
+        
+        depth = 0
+        for params in seq_of_parameters:
+            messages.append( pgp.bind('', statement.name, [pgp.encode_param(p) for p in params], pgp.BINARY_FORMAT) )
+            messages.append( pgp.execute('') )
+            depth += 1
+            if depth == self.PIPELINE_DEPTH:
+                row_count += self._run_pipeline( messages, parsed )
+                messages, parsed, depth = [], [], 0
+        if messages:
+            row_count += self._run_pipeline( messages, parsed )
+        
+        self._row_count = row_count
+        self._description = None
+        self._rows = []
+
+    #-------------------------------------------------------------------------
+    def fetchall(self) -> List[Tuple]:
+        '''Fetches all the remaining rows of the current result set.
+        
+        Raises:
+            ProgrammingError: no result set is available.
+        '''
+        self._check_result_set()
+        while self._suspended:
+            if not self._fetch_chunk():
+                error = self._connection.memory_budget.error( "the rest of the streamed result set fetched with '.fetchall()'" )
+                self._drop_result()
+                raise error
+        rows = self._rows[ self._row_number: ]
+        self._row_number = len( self._rows )
+        return rows
+
+    #-------------------------------------------------------------------------
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        '''Fetches the next rows of the current result set.
+        
+        Args:
+            size: int
+                The maximum count of fetched rows. Defaults to '.arraysize'.
+        
+        Raises:
+            ProgrammingError: no result set is available.
+        '''
+        self._check_result_set()
+        size = self._array_size if size is None else size
+        if self._suspended:
+            self._fill( size )
+        start = self._row_number
+        rows = self._rows[ start:start + size ]
+        self._row_number = start + len( rows )
+        return rows
+
+    #-------------------------------------------------------------------------
+    def fetchone(self) -> Optional[Tuple]:
+        '''Fetches the next row of the current result set, or None when it is exhausted.
+        
+        Raises:
+            ProgrammingError: no result set is available.
+        '''
+        self._check_result_set()
+        if self._suspended:
+            self._fill( 1 )
+        try:
+            row = self._rows[ self._row_number ]
+        except IndexError:
+            return None
+        self._row_number += 1
+        return row
+
+    #-------------------------------------------------------------------------
+    def next(self) -> Tuple:
+        '''Returns the next row of the current result set.
+        
+        Raises:
+            StopIteration: the result set is exhausted.
+        '''
+        return self.__next__()
+
+    #-------------------------------------------------------------------------
+    def nextset(self) -> Optional[bool]:
+        '''Skips to the result set of the next operation of a batch.
+        
+        Every operation produces one result set at most,  so there is
+        no next one out of batches.
+        
+        Returns:
+            True if the result set of the next operation of a batch is
+            now the current one, or None otherwise.
+        
+        Raises:
+            ProgrammingError: the last operation produced no result set.
+        '''
+        if self._result_sets:
+            return self._next_result_set()
+        self._check_result_set()
+        if self._suspended:
+            self._close_portal()
+        self._row_number = len( self._rows )
+        return None
+
+    #-------------------------------------------------------------------------
+    def scroll(self, value: int, mode: Optional[str] = 'relative') -> None:
+        '''Scrolls the cursor in the buffered rows of the current result set.
+        
+        Raises:
+            IndexError: the scroll would leave the buffered rows.
+            ProgrammingError: mode is neither 'relative' nor 'absolute'.
+        '''
+        self._check_result_set()
+        if mode == 'relative':
+            position = self._row_number + value
+        elif mode == 'absolute':
+            position = value - self._rows_offset
+        else:
+            raise ProgrammingError( f"unknown scroll mode '{mode}'" )
+        if not 0 <= position <= len( self._rows ):
+            raise IndexError( "scroll out of the result set" )
+        self._row_number = position
+
+    #-------------------------------------------------------------------------
+    def setinputsizes(self, sizes: Tuple) -> None:
+        '''Does nothing: parameters are sent in text format, their types are inferred by the server.
+        '''
+        pass
+
+    #-------------------------------------------------------------------------
+    def setoutputsize(self, size: int, column_index: Optional[int] = None) -> None:
+        '''Does nothing: results are received by chunks of rows at most, not by columns.
+        '''
+        pass
+
+    #-------------------------------------------------------------------------
+    def _add_notices(self, notices: list) -> None:
+        '''Appends the notices of the server to the messages of this cursor.
+        '''
+        for notice in notices:
+            self._messages.append( (Warning, f"{notice.get('S', 'NOTICE')}: {notice.get('M', '')}") )
+
+    #-------------------------------------------------------------------------
+    def _check_result_set(self) -> None:
+        '''Raises ProgrammingError if the last operation produced no result set.
+        '''
+        if self._description is None:
+            raise ProgrammingError( "no result set is available" )
+
+    #-------------------------------------------------------------------------
+    def _close_portal(self) -> None:
+        '''Closes the named portal of the current result set with the next round-trip.
+        '''
+        self._suspended = False
+        self._connection._pending_closes.append( pgp.close(b'P', self._portal) )
+
+    #-------------------------------------------------------------------------
+    def _copy_from_native(self, table  : str,
+                                columns: Optional[Sequence[str]],
+                                buffers: Iterator[str],
+                                dialect: object,
+                                null   : str) -> BatchReport:
+        '''Copies buffers of CSV text into a table with COPY ... FROM STDIN.
+        
+        The buffers are streamed as CopyData messages with no answer
+        awaited from the server, so that the whole copy costs a single
+        round-trip.
+        '''
+        connection = self._start()
+        dialect = csv.get_dialect( dialect ) if isinstance( dialect, str ) else dialect
+        columns_list = f" ({', '.join(columns)})" if columns else ''
+        begin = 'BEGIN; ' if not connection.in_transaction else ''
+        query = ( f"{begin}COPY {table}{columns_list} FROM STDIN WITH (FORMAT csv, "
+                  f"DELIMITER {_literal(dialect.delimiter)}, QUOTE {_literal(dialect.quotechar)}, "
+                  f"NULL {_literal(null)})" )
+        sent_bytes = [ 0 ]
+        
+        def _encoded():
+            for buffer in buffers:
+                data = buffer.encode()
+                sent_bytes[0] += len( data )
+                yield data
+        
+        start = perf_counter()
+        results, notices = connection._exchange( [pgp.query(query)], text_rows=True, copy_data=_encoded() )
+        report = BatchReport()
+        report.add( results[-1].row_count, sent_bytes[0], perf_counter() - start )
+        
+        self._add_notices( notices )
+        self._row_count = results[-1].row_count
+        self._description = None
+        self._rows = []
+        return report
+
+    #-------------------------------------------------------------------------
+    def _execute_batch_native(self, statements: List[Statement]) -> List[ResultSet]:
+        '''Sends all the operations of a batch in a single round-trip.
+        
+        The Parse/Bind/Describe/Execute messages of  every  operation
+        are sent at once, followed by one Sync:  the batch runs in a
+        single transaction and its first failing operation aborts it.
+        '''
+        connection = self._start()
+        messages = connection._begin_messages()
+        parsed = [ None ] if messages else []
+        executed = []
+        for operation, params in statements:
+            statement = self._prepared( operation )
+            if not statement.parsed and statement not in parsed:
+                messages.append( pgp.parse(statement.name, statement.query) )
+                parsed.append( statement )
+            messages += [ pgp.bind('', statement.name, [pgp.encode_param(p) for p in params], statement.result_format),
+                          pgp.describe(b'P', ''),
+                          pgp.execute('') ]
+            executed.append( statement )
+        messages.append( pgp.SYNC )
+        
+        results, notices = connection._exchange( messages, parsed, raw_rows=self._lazy_rows )
+        for statement, result in zip( executed, results[-len(executed):] ):
+            _learn_result_format( statement, result )
+        self._add_notices( notices )
+        if not self._buffer( sum(result.size for result in results) ):
+            error = connection.memory_budget.error( "the result sets of the batch" )
+            self._release_buffer()
+            raise error
+        return [ ResultSet(_description_of(result), self._rows_of(result), result.row_count)
+                 for result in results[-len(statements):] ]
+
+    #-------------------------------------------------------------------------
+    def _drop_result(self) -> None:
+        '''Drops the current result set and releases its rows from the memory budget.
+        '''
+        if self._suspended:
+            self._close_portal()
+        self._description = None
+        self._rows = []
+        self._row_number = 0
+        self._release_buffer()
+
+    #-------------------------------------------------------------------------
+    def _drop_fetched_chunks(self) -> None:
+        '''Drops the chunks of rows which have all been fetched and releases them from the memory budget.
+        '''
+        dropped = nbytes = 0
+        while self._chunks and self._chunks[0][0] <= self._row_number:
+            dropped, size = self._chunks.popleft()
+            nbytes += size
+        if dropped:
+            del self._rows[ :dropped ]
+            self._row_number -= dropped
+            self._rows_offset += dropped
+            self._chunks = deque( (end - dropped, size) for end, size in self._chunks )
+            self._release_buffer( nbytes )
+
+    #-------------------------------------------------------------------------
+    def _fetch_chunk(self) -> bool:
+        '''Fetches the next chunk of rows of the suspended portal and returns True if they keep within the memory budget.
+        
+        While streaming, the chunks of rows which have all been fetched
+        are dropped first.
+        '''
+        if self._streaming:
+            self._drop_fetched_chunks()
+        
+        results, notices = self._connection._exchange( [pgp.execute(self._portal, self.CHUNK_ROWS), pgp.SYNC],
+                                                       raw_rows=self._lazy_rows, columns=self._columns )
+        self._add_notices( notices )
+        result = results[-1]
+        self._rows += self._rows_of( result )
+        self._chunks.append( (len(self._rows), result.size) )
+        if not result.suspended:
+            self._close_portal()
+            self._row_count = self._rows_offset + len( self._rows )
+        return self._buffer( result.size )
+
+    #-------------------------------------------------------------------------
+    def _fill(self, count: int) -> None:
+        '''Fetches chunks of the suspended portal until count rows are buffered past the current one, or the portal is exhausted.
+        '''
+        while self._suspended and len( self._rows ) - self._row_number < count:
+            self._fetch_chunk()
+
+    #-------------------------------------------------------------------------
+    def _load_result_set(self, result_set: ResultSet) -> None:
+        '''Makes a buffered result set of a batch the current result set.
+        '''
+        self._description = result_set.description
+        self._rows = result_set.rows or []
+        self._row_count = result_set.row_count
+        self._row_number = 0
+        self._rows_offset = 0
+        self._streaming = False
+        self._chunks.clear()
+
+    #-------------------------------------------------------------------------
+    def _run_pipeline(self, messages: List[bytes], parsed: list) -> int:
+        '''Runs one pipeline of '.executemany()' and returns its count of affected rows.
+        '''
+        messages.append( pgp.SYNC )
+        results, notices = self._connection._exchange( messages, parsed )
+        self._add_notices( notices )
+        return sum( result.row_count for result in results if result.row_count > 0 )
+
+    #-------------------------------------------------------------------------
+    def _prefetch(self, within_budget: bool) -> None:
+        '''Buffers the chunks of rows of the suspended portal while the memory budget is kept.
+        
+        Raises:
+            OperationalError: the result set exceeds the memory budget
+                and the policy of the budget is 'raise'.
+        '''
+        while within_budget and self._suspended:
+            within_budget = self._fetch_chunk()
+        if not within_budget:
+            budget = self._connection.memory_budget
+            if budget.on_exceeded == 'raise':
+                error = budget.error( "the result set" )
+                self._drop_result()
+                raise error
+            self._streaming = True
+
+    #-------------------------------------------------------------------------
+    def _rows_of(self, result) -> Optional[list]:
+        '''Returns the rows of a result, as lazy rows if they have been received raw, or None if it has no result set.
+        '''
+        if result.columns is None:
+            return None
+        if not self._lazy_rows:
+            return result.rows
+        row_class = lazy_row_class( tuple(name for name, _, _, _ in result.columns),
+                                    tuple(pgp.decoder_of(oid, value_format) for _, oid, _, value_format in result.columns),
+                                    PGLazyRow )
+        return list( map(row_class, result.rows) )
+
+    #-------------------------------------------------------------------------
+    def _set_result(self, result) -> bool:
+        '''Sets the current result set of this cursor and returns True if it keeps within the memory budget.
+        '''
+        self._description = _description_of( result )
+        self._rows = self._rows_of( result ) or []
+        self._row_count = result.row_count
+        self._row_number = 0
+        self._rows_offset = 0
+        self._streaming = False
+        self._chunks = deque( [(len(self._rows), result.size)] )
+        self._columns = result.columns
+        self._suspended = result.suspended
+        if self._chunked and not self._suspended:
+            self._close_portal()
+        return self._buffer( result.size )
+
+    #-------------------------------------------------------------------------
+    def _start(self):
+        '''Clears the messages and the result set of this cursor before any new operation and returns its connection.
+        
+        Raises:
+            InterfaceError: this cursor is closed.
+        '''
+        if self._closed:
+            raise InterfaceError( "cursor is closed" )
+        if self._messages:
+            del self._messages[:]
+        if self._result_sets:
+            self._result_sets.clear()
+        self._drop_result()
+        return self._connection
+
+    #-------------------------------------------------------------------------
+    # Class data
+    PIPELINE_DEPTH = 1000  # the maximum count of pipelined executions per round-trip
+    CHUNK_ROWS = 1000      # the count of rows per chunk of the result sets fetched within a limited memory budget
+
+
+#=============================================================================
+class PGLazyRow( LazyRow ):
+    """The class of the lazy rows of PostgreSQL result sets.
+    
+    The raw data of these rows is the body of their  DataRow  message:
+    a count of columns followed by the length and the value of every
+    column, with length -1 for NULL values.
+    """
+    __slots__ = ()
+    
+    #-------------------------------------------------------------------------
+    def _decode(self, index: int) -> object:
+        '''Decodes the value of a column, skipping the raw values of the preceding columns.
+        '''
+        raw = self._raw
+        pos = 2
+        for _ in range( index ):
+            length, = self._INT32.unpack_from( raw, pos )
+            pos += 4 + max( length, 0 )
+        length, = self._INT32.unpack_from( raw, pos )
+        if length < 0:
+            return None
+        return self._decoders[ index ]( memoryview(raw)[pos + 4:pos + 4 + length] )
+
+    #-------------------------------------------------------------------------
+    def _decode_all(self) -> Tuple:
+        '''Returns the values of all the columns, decoded in a single pass and then cached.
+        '''
+        values = pgp.parse_data_row( memoryview(self._raw), self._decoders )
+        for cache, value in zip( self._cache_slots, values ):
+            cache.__set__( self, value )
+        return values
+
+    #-------------------------------------------------------------------------
+    # Class data
+    _INT32 = struct.Struct( '>i' )  # the lengths of the raw values of columns
+
+
+#=============================================================================
+def _description_of(result) -> Optional[List[Tuple]]:
+    '''Returns the description of the columns of a result, or None if it has no result set.
+    '''
+    if result.columns is None:
+        return None
+    return [ (name, pgp.TYPE_OBJECTS.get(oid), None, size, None, None, None)
+             for name, oid, size, _ in result.columns ]
+
+#-------------------------------------------------------------------------
+def _learn_result_format(statement, result) -> None:
+    '''Sets the result format of a statement from its first result, once its columns are known.
+    '''
+    if statement.result_format == pgp.TEXT_FORMAT:
+        statement.result_format = pgp.result_formats_of( result.columns )
+
+#-------------------------------------------------------------------------
+def _literal(text: str) -> str:
+    '''Returns an SQL string literal.
+    '''
+    return "'" + text.replace( "'", "''" ) + "'"
+
+
+#=====   end of   SubProjects.PostgreSQL.pg_cursor   =====#
@@ -0,0 +1,527 @@
+"""
+Copyright (c) 2020 Philippe Schmouker
+
+Permission is hereby granted,  free of charge,  to any person obtaining a copy
+of this software and associated documentation files (the "Software"),  to deal
+in the Software without restriction, including  without  limitation the rights
+to use,  copy,  modify,  merge,  publish,  distribute, sublicense, and/or sell
+copies of the Software,  and  to  permit  persons  to  whom  the  Software  is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS",  WITHOUT WARRANTY OF ANY  KIND,  EXPRESS  OR
+IMPLIED,  INCLUDING  BUT  NOT  LIMITED  TO  THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.  IN NO EVENT  SHALL  THE
+AUTHORS  OR  COPYRIGHT  HOLDERS  BE  LIABLE  FOR  ANY CLAIM,  DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT,  TORT OR OTHERWISE, ARISING FROM,
+OUT  OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+#=============================================================================
+## This module defines the messages of the PostgreSQL frontend/backend
+#  protocol, version 3.0, and the codecs of the binary format of values.
+#  Values of the types with no binary decoder are received in text format.
+#
+#  See https://www.postgresql.org/docs/current/protocol.html
+#
+#  Every message but the startup ones starts with one byte that  iden-
+#  tifies its type, followed by its length (including itself, excluding
+#  the type byte) as a 32-bit big-endian integer.
+#
+
+#=============================================================================
+import datetime
+import socket
+import struct
+from decimal import Decimal
+from typing  import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from Libs.ObjectSqlLib import BINARY, DATETIME, NUMBER, ROWID, STRING
+
+
+#=============================================================================
+PROTOCOL_VERSION = 196608  # i.e. 3.0
+SSL_REQUEST_CODE = 80877103
+CANCEL_REQUEST_CODE = 80877102
+
+TEXT_FORMAT   = 0
+BINARY_FORMAT = 1
+
+
+#=============================================================================
+## Type OIDs of the built-in types (see catalog pg_type)
+BOOL_OID        =   16
+BYTEA_OID       =   17
+NAME_OID        =   19
+INT8_OID        =   20
+INT2_OID        =   21
+INT4_OID        =   23
+TEXT_OID        =   25
+OID_OID         =   26
+JSON_OID        =  114
+FLOAT4_OID      =  700
+FLOAT8_OID      =  701
+UNKNOWN_OID     =  705
+BPCHAR_OID      = 1042
+VARCHAR_OID     = 1043
+DATE_OID        = 1082
+TIME_OID        = 1083
+TIMESTAMP_OID   = 1114
+TIMESTAMPTZ_OID = 1184
+NUMERIC_OID     = 1700
+UUID_OID        = 2950
+
+TYPE_OBJECTS: Dict[int, type] = {
+    BOOL_OID       : NUMBER,   BYTEA_OID      : BINARY,   NAME_OID       : STRING,
+    INT8_OID       : NUMBER,   INT2_OID       : NUMBER,   INT4_OID       : NUMBER,
+    TEXT_OID       : STRING,   OID_OID        : ROWID,    JSON_OID       : STRING,
+    FLOAT4_OID     : NUMBER,   FLOAT8_OID     : NUMBER,   UNKNOWN_OID    : STRING,
+    BPCHAR_OID     : STRING,   VARCHAR_OID    : STRING,   DATE_OID       : DATETIME,
+    TIME_OID       : DATETIME, TIMESTAMP_OID  : DATETIME, TIMESTAMPTZ_OID: DATETIME,
+    NUMERIC_OID    : NUMBER,
+}
+
+
+#=============================================================================
+class MessageReader:
+    """The class of buffered readers of the backend messages from a socket.
+    """
+    #-------------------------------------------------------------------------
+    def __init__(self, sock: socket.socket, buffer_size: int = 1 << 16) -> None:
+        '''Constructor.
+        
+        Args:
+            sock: socket.socket
+                The connected socket.
+            buffer_size: int
+                The size of the receive buffer, in bytes. Defaults to 64 KB.
+        '''
+        self._socket = sock
+        self._buffer_size = buffer_size
+        self._buffer = b''
+        self._pos = 0
+
+    #-------------------------------------------------------------------------
+    def read_message(self) -> Tuple[bytes, memoryview]:
+        '''Returns the next message as a pair (type byte, body).
+        
+        The body is a view on the receive buffer, with no copy.
+        
+        Raises:
+            ConnectionError: the connection has been closed by the peer.
+        '''
+        self._fill( 5 )
+        msg_type = self._buffer[ self._pos:self._pos + 1 ]
+        length, = _INT32.unpack_from( self._buffer, self._pos + 1 )
+        self._fill( 1 + length )
+        start = self._pos + 5
+        self._pos += 1 + length
+        return bytes( msg_type ), memoryview( self._buffer )[ start:self._pos ]
+
+    #-------------------------------------------------------------------------
+    def read_startup(self) -> memoryview:
+        '''Returns the body of the next startup message, which has no type byte.
+        '''
+        self._fill( 4 )
+        length, = _INT32.unpack_from( self._buffer, self._pos )
+        self._fill( length )
+        start = self._pos + 4
+        self._pos += length
+        return memoryview( self._buffer )[ start:self._pos ]
+
+    #-------------------------------------------------------------------------
+    def _fill(self, count: int) -> None:
+        '''Ensures that the next count bytes are in buffer.
+        
+        The buffer is replaced rather than resized, so that the views
+        on former messages stay valid.
+        '''
+        available = len( self._buffer ) - self._pos
+        if available >= count:
+            return
+        parts = [ self._buffer[self._pos:] ]
+        while available < count:
+            chunk = self._socket.recv( max(self._buffer_size, count - available) )
+            if not chunk:
+                raise ConnectionError( "connection closed by the peer" )
+            parts.append( chunk )
+            available += len( chunk )
+        self._buffer = b''.join( parts )
+        self._pos = 0
+
+
+#=============================================================================
+## Frontend messages
+def bind(portal       : str,
+         statement    : str,
+         params       : Sequence[Optional[bytes]],
+         result_format: Union[int, Sequence[int]]) -> Union[bytes, List[object]]:
+    '''Builds a Bind message.
+    
+    Parameters are sent in text format, but the memoryviews returned by
+    encode_param() which are sent in binary format.  A message with such
+    views is returned as the list of its buffers rather than as bytes, for
+    the views not to be copied into the message (see PGConnection._send()).
+    
+    The result format is either the format of all the columns,  or the
+    sequence of the formats of every column (see result_formats_of()).
+    '''
+    binary = [ isinstance(param, memoryview) for param in params ]
+    if any( binary ):
+        formats = _INT16.pack( len(params) ) + b''.join( _FORMAT_CODES[b] for b in binary )
+    else:
+        formats = _INT16.pack( 0 )
+    parts = [ _cstr(portal), _cstr(statement), formats, _INT16.pack(len(params)) ]
+    for param in params:
+        if param is None:
+            parts.append( _NULL_LENGTH )
+        else:
+            parts.append( _INT32.pack(len(param)) )
+            parts.append( param )
+    if isinstance( result_format, int ):
+        parts.append( _INT16x2.pack(1, result_format) )
+    else:
+        parts.append( struct.pack(f'>h{len(result_format)}h', len(result_format), *result_format) )
+    if not any( binary ):
+        return message( b'B', b''.join(parts) )
+    
+    buffers = []
+    pending = []
+    for part in parts:
+        if isinstance( part, memoryview ):
+            buffers += [ b''.join(pending), part ]
+            pending.clear()
+        else:
+            pending.append( part )
+    buffers.append( b''.join(pending) )
+    buffers[0] = b'B' + _INT32.pack( sum(map(len, buffers)) + 4 ) + buffers[0]
+    return buffers
+
+def cancel_request(backend_pid: int, secret_key: int) -> bytes:
+    '''Builds a CancelRequest, sent on a new connection to the server.
+    '''
+    return _INT32.pack( 16 ) + _INT32.pack( CANCEL_REQUEST_CODE ) + _INT32x2.pack( backend_pid, secret_key )
+
+def close(kind: bytes, name: str) -> bytes:
+    '''Builds a Close message of a statement (kind b'S') or a portal (kind b'P').
+    '''
+    return message( b'C', kind + _cstr(name) )
+
+def copy_data(data: bytes) -> bytes:
+    '''Builds a CopyData message.
+    '''
+    return message( b'd', data )
+
+def copy_fail(reason: str) -> bytes:
+    '''Builds a CopyFail message.
+    '''
+    return message( b'f', _cstr(reason) )
+
+def describe(kind: bytes, name: str) -> bytes:
+    '''Builds a Describe message of a statement (kind b'S') or a portal (kind b'P').
+    '''
+    return message( b'D', kind + _cstr(name) )
+
+def execute(portal: str, max_rows: int = 0) -> bytes:
+    '''Builds an Execute message. max_rows 0 means all rows.
+    '''
+    return message( b'E', _cstr(portal) + _INT32.pack(max_rows) )
+
+def parse(statement: str, query: str) -> bytes:
+    '''Builds a Parse message with parameters types to be inferred by the server.
+    '''
+    return message( b'P', _cstr(statement) + _cstr(query) + _INT16.pack(0) )
+
+def password(text: bytes) -> bytes:
+    '''Builds a PasswordMessage.
+    '''
+    return message( b'p', text + b'\0' )
+
+def query(text: str) -> bytes:
+    '''Builds a simple Query message.
+    '''
+    return message( b'Q', _cstr(text) )
+
+def startup(params: Dict[str, str]) -> bytes:
+    '''Builds a StartupMessage.
+    '''
+    body = _INT32.pack( PROTOCOL_VERSION ) + b''.join( _cstr(k) + _cstr(v) for k, v in params.items() ) + b'\0'
+    return _INT32.pack( len(body) + 4 ) + body
+
+COPY_DONE = b'c\0\0\0\4'
+FLUSH     = b'H\0\0\0\4'
+SYNC      = b'S\0\0\0\4'
+TERMINATE = b'X\0\0\0\4'
+
+
+#=============================================================================
+## Backend messages parsing
+def parse_backend_key_data(body: memoryview) -> Tuple[int, int]:
+    '''Returns the process id and the secret key of a BackendKeyData message.
+    '''
+    return _INT32x2.unpack( body )
+
+def parse_command_complete(body: memoryview) -> Tuple[str, int]:
+    '''Returns the command of a CommandComplete message and its count of rows, or -1.
+    '''
+    tag = bytes( body[:-1] ).decode()
+    words = tag.split()
+    if words and words[-1].isdigit() and words[0] in _COUNTED_COMMANDS:
+        return words[0], int( words[-1] )
+    return tag, -1
+
+def parse_data_row(body: memoryview, decoders: Sequence[Callable]) -> tuple:
+    '''Returns the decoded values of a DataRow message.
+    '''
+    pos = 2
+    values = []
+    for decoder in decoders:
+        length, = _INT32.unpack_from( body, pos )
+        pos += 4
+        if length < 0:
+            values.append( None )
+        else:
+            values.append( decoder(body[pos:pos + length]) )
+            pos += length
+    return tuple( values )
+
+def parse_fields(body: memoryview) -> Dict[str, str]:
+    '''Returns the fields of an ErrorResponse or a NoticeResponse message, keyed by their code.
+    '''
+    fields = {}
+    for field in bytes( body ).split( b'\0' ):
+        if field:
+            fields[ chr(field[0]) ] = field[1:].decode( errors='replace' )
+    return fields
+
+def parse_row_description(body: memoryview) -> List[Tuple[str, int, int, int]]:
+    '''Returns the list of (name, type OID, type size, format) of a RowDescription message.
+    '''
+    count, = _INT16.unpack_from( body, 0 )
+    pos = 2
+    columns = []
+    raw = bytes( body )
+    for _ in range( count ):
+        end = raw.index( b'\0', pos )
+        name = raw[ pos:end ].decode()
+        _table_oid, _column, type_oid, type_size, _modifier, value_format = _FIELD.unpack_from( raw, end + 1 )
+        columns.append( (name, type_oid, type_size, value_format) )
+        pos = end + 1 + _FIELD.size
+    return columns
+
+def parse_strings(body: memoryview) -> List[str]:
+    '''Returns the null-terminated strings of a message body.
+    '''
+    return [ s.decode() for s in bytes( body ).split( b'\0' )[:-1] ]
+
+
+#=============================================================================
+## Parameters encoding - parameters are sent in text format, but binary values
+def encode_param(value: object) -> Optional[Union[bytes, memoryview]]:
+    '''Returns the text format of a parameter value, or None for NULL.
+    
+    Objects supporting the buffer protocol (bytes, bytearray, mmap, NumPy
+    arrays, ...) are returned as flat memoryviews of their bytes, with
+    no copy. They are sent in binary format (see bind()).
+    '''
+    if value is None:
+        return None
+    if value is True:
+        return b't'
+    if value is False:
+        return b'f'
+    if isinstance( value, (datetime.date, datetime.time) ):
+        return value.isoformat().encode()
+    if isinstance( value, (bytes, bytearray, memoryview) ) or _is_buffer( value ):
+        view = memoryview( value )
+        return view if view.format == 'B' and view.ndim == 1 else view.cast( 'B' )
+    return str( value ).encode()
+
+def _is_buffer(value: object) -> bool:
+    '''Returns True if value supports the buffer protocol.
+    
+    The answer is cached per type of value.
+    '''
+    try:
+        return _BUFFER_TYPES[ type(value) ]
+    except KeyError:
+        try:
+            memoryview( value )
+            is_buffer = True
+        except TypeError:
+            is_buffer = False
+        _BUFFER_TYPES[ type(value) ] = is_buffer
+        return is_buffer
+
+
+#=============================================================================
+## Binary format decoders, keyed by type OID
+def _decode_date(data: memoryview) -> datetime.date:
+    return _PG_EPOCH_DATE + datetime.timedelta( days=_INT32.unpack(data)[0] )
+
+def _decode_numeric(data: memoryview) -> Decimal:
+    ndigits, weight, sign, dscale = _NUMERIC_HEADER.unpack_from( data )
+    special = _NUMERIC_SPECIALS.get( sign )
+    if special is not None:
+        return special
+    ## base 10000 digits, built into an exact Decimal with dscale decimal digits
+    text = ''.join( [ f'{digit:04d}' for digit in struct.unpack_from(f'>{ndigits}H', data, 8) ] )
+    shift = (weight - ndigits + 1) * 4 + dscale
+    if shift > 0:
+        text += '0' * shift
+    elif shift < 0:
+        text = text[:shift]     ## the zeros of the last base 10000 digit beyond dscale
+    return Decimal( (sign == 0x4000, tuple(map(int, text or '0')), -dscale) )
+
+def _decode_time(data: memoryview) -> datetime.time:
+    return (datetime.datetime.min + datetime.timedelta( microseconds=_INT64.unpack(data)[0] )).time()
+
+def _decode_timestamp(data: memoryview) -> datetime.datetime:
+    return _PG_EPOCH + datetime.timedelta( microseconds=_INT64.unpack(data)[0] )
+
+def _decode_timestamptz(data: memoryview) -> datetime.datetime:
+    return _PG_EPOCH_UTC + datetime.timedelta( microseconds=_INT64.unpack(data)[0] )
+
+def _decode_text(data: memoryview) -> str:
+    return str( data, 'utf-8' )
+
+DECODERS: Dict[int, Callable[[memoryview], object]] = {
+    BOOL_OID       : lambda data: data[0] != 0,
+    BYTEA_OID      : memoryview,  ## views on the receive buffer, with no copy
+    NAME_OID       : _decode_text,
+    INT8_OID       : lambda data: _INT64.unpack( data )[0],
+    INT2_OID       : lambda data: _INT16.unpack( data )[0],
+    INT4_OID       : lambda data: _INT32.unpack( data )[0],
+    TEXT_OID       : _decode_text,
+    OID_OID        : lambda data: _UINT32.unpack( data )[0],
+    JSON_OID       : _decode_text,
+    FLOAT4_OID     : lambda data: _FLOAT4.unpack( data )[0],
+    FLOAT8_OID     : lambda data: _FLOAT8.unpack( data )[0],
+    UNKNOWN_OID    : _decode_text,
+    BPCHAR_OID     : _decode_text,
+    VARCHAR_OID    : _decode_text,
+    DATE_OID       : _decode_date,
+    TIME_OID       : _decode_time,
+    TIMESTAMP_OID  : _decode_timestamp,
+    TIMESTAMPTZ_OID: _decode_timestamptz,
+    NUMERIC_OID    : _decode_numeric,
+}
+
+
+#=============================================================================
+## Text format decoders, keyed by type OID - the values of other types are
+## decoded as str.  They return the same values as the binary decoders.
+def _decode_bytea_text(data: memoryview) -> memoryview:
+    return memoryview( bytes.fromhex(str(data[2:], 'ascii')) )  ## hex format: \x0a1b...
+
+def _decode_timestamptz_text(data: memoryview) -> datetime.datetime:
+    return datetime.datetime.fromisoformat( str(data, 'ascii') ).astimezone( datetime.timezone.utc )
+
+TEXT_DECODERS: Dict[int, Callable[[memoryview], object]] = {
+    BOOL_OID       : lambda data: data == b't',
+    BYTEA_OID      : _decode_bytea_text,
+    INT8_OID       : int,
+    INT2_OID       : int,
+    INT4_OID       : int,
+    OID_OID        : int,
+    FLOAT4_OID     : float,
+    FLOAT8_OID     : float,
+    DATE_OID       : lambda data: datetime.date.fromisoformat( str(data, 'ascii') ),
+    TIME_OID       : lambda data: datetime.time.fromisoformat( str(data, 'ascii') ),
+    TIMESTAMP_OID  : lambda data: datetime.datetime.fromisoformat( str(data, 'ascii') ),
+    TIMESTAMPTZ_OID: _decode_timestamptz_text,
+    NUMERIC_OID    : lambda data: Decimal( str(data, 'ascii') ),
+}
+
+
+#-------------------------------------------------------------------------
+def decoder_of(type_oid: int, value_format: int) -> Callable[[memoryview], object]:
+    '''Returns the decoder of the values of a type, in a format.
+    
+    Values of types with no decoder are returned as bytes in binary for-
+    mat and as str in text format.
+    '''
+    if value_format == BINARY_FORMAT:
+        return DECODERS.get( type_oid, bytes )
+    return TEXT_DECODERS.get( type_oid, _decode_text )
+
+#-------------------------------------------------------------------------
+def result_formats_of(columns: Optional[Sequence[Tuple[str, int, int, int]]]) -> Union[int, Tuple[int, ...]]:
+    '''Returns the result format of the Bind messages of a statement, from the columns of its result set.
+    
+    Columns are received in binary format, but the ones with no binary
+    decoder which are received in text format.
+    
+    Args:
+        columns: Sequence[Tuple[str, int, int, int]]
+            The columns (name, type OID, type size, format) of a result
+            set of the statement, or None if it has no result set.
+    '''
+    if columns is None or all( oid in DECODERS for _, oid, _, _ in columns ):
+        return BINARY_FORMAT
+    return tuple( BINARY_FORMAT if oid in DECODERS else TEXT_FORMAT for _, oid, _, _ in columns )
+
+
+#=============================================================================
+## Binary format encoders, keyed by type OID - used by the fake server
+def _encode_date(value: datetime.date) -> bytes:
+    return _INT32.pack( (value - _PG_EPOCH_DATE).days )
+
+def _encode_timestamp(value: datetime.datetime) -> bytes:
+    return _INT64.pack( (value - _PG_EPOCH) // datetime.timedelta(microseconds=1) )
+
+ENCODERS: Dict[int, Callable[[object], bytes]] = {
+    BOOL_OID     : lambda value: b'\1' if value else b'\0',
+    BYTEA_OID    : bytes,
+    INT8_OID     : lambda value: _INT64.pack( value ),
+    INT4_OID     : lambda value: _INT32.pack( value ),
+    INT2_OID     : lambda value: _INT16.pack( value ),
+    TEXT_OID     : lambda value: str( value ).encode(),
+    FLOAT8_OID   : lambda value: _FLOAT8.pack( value ),
+    DATE_OID     : _encode_date,
+    TIMESTAMP_OID: _encode_timestamp,
+}
+
+
+#=============================================================================
+def message(msg_type: bytes, body: bytes) -> bytes:
+    '''Builds a message from its type byte and its body.
+    '''
+    return msg_type + _INT32.pack( len(body) + 4 ) + body
+
+
+def _cstr(text: str) -> bytes:
+    return text.encode() + b'\0'
+
+
+#=============================================================================
+_INT16   = struct.Struct( '>h' )
+_INT16x2 = struct.Struct( '>hh' )
+_INT32   = struct.Struct( '>i' )
+_INT32x2 = struct.Struct( '>ii' )
+_UINT32  = struct.Struct( '>I' )
+_INT64   = struct.Struct( '>q' )
+_FLOAT4  = struct.Struct( '>f' )
+_FLOAT8  = struct.Struct( '>d' )
+_FIELD   = struct.Struct( '>ihihih' )
+
+_NUMERIC_HEADER = struct.Struct( '>hhHh' )
+_NUMERIC_SPECIALS = { 0xC000: Decimal('NaN'), 0xD000: Decimal('Infinity'), 0xF000: Decimal('-Infinity') }
+
+_NULL_LENGTH = _INT32.pack( -1 )
+
+_FORMAT_CODES = { False: _INT16.pack(TEXT_FORMAT), True: _INT16.pack(BINARY_FORMAT) }
+
+_BUFFER_TYPES: Dict[type, bool] = {}  ## True for the types supporting the buffer protocol, see _is_buffer()
+
+_PG_EPOCH      = datetime.datetime( 2000, 1, 1 )
+_PG_EPOCH_DATE = datetime.date( 2000, 1, 1 )
+_PG_EPOCH_UTC  = datetime.datetime( 2000, 1, 1, tzinfo=datetime.timezone.utc )
+
+_COUNTED_COMMANDS = frozenset( ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'MERGE', 'MOVE', 'FETCH', 'COPY') )
+
+
+#=====   end of   SubProjects.PostgreSQL.pg_protocol   =====#
@@ -27,7 +27,8 @@ SOFTWARE.
 #
 
 #=============================================================================
-from typing import Callable
+from inspect import iscoroutinefunction
+from typing  import Callable
 
 
 #=============================================================================
@@ -43,6 +44,11 @@ def abstract(method: Callable) -> Callable:
     abc (see https://docs.python.org/3/library/abc.html)  and 
     its decorator '@abstractmethod'.
     
+    When the decorated method is a coroutine function, the wrapper
+    is a coroutine function also: the exception is raised when the
+    returned coroutine is awaited,  and  no  coroutine of  the dec-
+    orated method is left unawaited.
+    
     Args:
         method: Callable
             A reference to the decorated method.
@@ -56,11 +62,10 @@ def abstract(method: Callable) -> Callable:
         considered as not implemented.
     '''
     #---------------------------------------------------------------------
-    def _wrapper(*args, **kwargs) -> None:
-        '''The internal decorator function. Raises the exception.
+    def _msg_txt(*args) -> str:
+        '''Returns the text of the raised exception.
         '''
-        def _msg_txt() -> str:
-            return f"method '{method.__name__}()' must be implemented"
+        msg_txt = f"method '{method.__name__}()' must be implemented"
         
         try:
             type_name = str(args[0]).split()
@@ -73,13 +78,25 @@ def abstract(method: Callable) -> Callable:
             try:
                 class_name = args[0]
             except:
-                raise NotImplementedError( f"{_msg_txt()}." )
+                return f"{msg_txt}."
         
+        return f"{msg_txt} in class '{class_name}'."
+    
+    #---------------------------------------------------------------------
+    def _wrapper(*args, **kwargs) -> None:
+        '''The internal decorator function. Raises the exception.
+        '''
         method( *args, **kwargs )
-        
-        raise NotImplementedError( f"{_msg_txt()} in class '{class_name}'." )
+        raise NotImplementedError( _msg_txt(*args) )
+    
+    #---------------------------------------------------------------------
+    async def _async_wrapper(*args, **kwargs) -> None:
+        '''The internal decorator coroutine. Raises the exception once awaited.
+        '''
+        await method( *args, **kwargs )
+        raise NotImplementedError( _msg_txt(*args) )
     #---------------------------------------------------------------------
     
-    return _wrapper
+    return _async_wrapper if iscoroutinefunction( method ) else _wrapper
 
 #=====   end of   Utils.decorators   =====#